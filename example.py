@@ -87,16 +87,9 @@ bpf=rtfir.RTFIR_bandpass(taps,flow/fs,fhigh/fs)
 bsf=rtfir.RTFIR_bandstop(taps,flow/fs,fhigh/fs)
 
 
-# Filter chirp
-lowpass=np.zeros(len(sweep))
-highpass=np.zeros(len(sweep))
-bandpass=np.zeros(len(sweep))
-bandstop=np.zeros(len(sweep))
-for i in range(0,len(sweep)):
-    lowpass[i]=lpf.Filter(sweep[i])
-    highpass[i]=hpf.Filter(sweep[i])
-    bandpass[i]=bpf.Filter(sweep[i])
-    bandstop[i]=bsf.Filter(sweep[i])
+# Filter chirp with all filters sharing one delay line
+bank=rtfir.RTFIR_bank([lpf,hpf,bpf,bsf])
+lowpass,highpass,bandpass,bandstop=bank.FilterBlock(sweep)
 
 
 # Plot FFT data
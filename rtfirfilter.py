@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+#
+# Filters binary recordings with realtime fir filters
+#
+# Reads and writes raw float32/float64 samples or .npy files, memory mapping
+# files and reading pipes in large chunks. Chunks are filtered as blocks
+# with the filter state carried across them, so the output is identical to
+# filtering the whole recording at once. Files can also be filtered on a pool
+# of processes with the same output.
+#
+import numpy as np
+import sys,os,ast,rtfir
+
+FORMATS={'f32':np.float32,'f64':np.float64}
+NPY_MAGIC=b'\x93NUMPY'
+
+
+# Guess the format of a file from its name
+def guessformat(path,default):
+    extension=os.path.splitext(path)[1].lower()
+    if extension=='.npy':
+        return 'npy'
+    if extension in ('.f32','.float32'):
+        return 'f32'
+    if extension in ('.f64','.float64'):
+        return 'f64'
+    return default
+
+
+# Read exactly size bytes from a stream, or fewer at the end of it
+def readfully(stream,size):
+    data=bytearray(size)
+    view=memoryview(data)
+    done=0
+    while done<size:
+        n=stream.readinto(view[done:])
+        if not n:
+            break
+        done+=n
+    return data[:done]
+
+
+# Parse the header of a .npy stream, returning dtype and shape
+def readnpyheader(stream):
+    magic=readfully(stream,8)
+    if bytes(magic[:6])!=NPY_MAGIC:
+        raise ValueError('Not a .npy stream')
+    size=readfully(stream,2 if magic[6]==1 else 4)
+    header=ast.literal_eval(readfully(stream,int.from_bytes(size,'little')).decode('latin1'))
+    if header['fortran_order']:
+        raise ValueError('Fortran ordered .npy files are not supported')
+    return np.dtype(header['descr']),tuple(header['shape'])
+
+
+# Build a version 1.0 .npy header, padded to a fixed size so it can be
+# rewritten in place once the number of frames is known
+def npyheader(dtype,shape):
+    header="{'descr': '%s', 'fortran_order': False, 'shape': %s, }" % (np.dtype(dtype).str,repr(tuple(shape)))
+    header=header.ljust(128-10-1)+'\n'
+    return NPY_MAGIC+b'\x01\x00'+len(header).to_bytes(2,'little')+header.encode('latin1')
+
+
+# Open the input, returning a chunk iterator, the number of channels, the
+# number of frames (or None if unknown until the end of a pipe) and the
+# memory mapped data (or None for pipes)
+def openinput(path,format,channels,chunk):
+    stream=sys.stdin.buffer if path=='-' else None
+    if format=='npy':
+        if stream:
+            dtype,shape=readnpyheader(stream)
+        else:
+            data=np.load(path,mmap_mode='r')
+            dtype,shape=data.dtype,data.shape
+        if len(shape) not in (1,2):
+            raise ValueError('Expected a 1-D or 2-D (frames x channels) .npy array')
+        channels=shape[1] if len(shape)==2 else 1
+        frames=shape[0]
+    else:
+        dtype=np.dtype(FORMATS[format])
+        if not stream:
+            data=np.memmap(path,dtype=dtype,mode='r')
+            if len(data)%channels:
+                raise ValueError('Input is not a whole number of frames')
+            data=data.reshape(-1,channels) if channels>1 else data
+        frames=None if stream else len(data)
+    if stream:
+        return readchunks(stream,dtype,channels,frames,chunk),channels,frames,None
+    return (data[i:i+chunk] for i in range(0,frames,chunk)),channels,frames,data
+
+
+# Read chunks of frames from a pipe
+def readchunks(stream,dtype,channels,frames,chunk):
+    framesize=dtype.itemsize*channels
+    remaining=frames
+    while remaining is None or remaining>0:
+        n=chunk if remaining is None else min(chunk,remaining)
+        data=readfully(stream,n*framesize)
+        if len(data)%framesize:
+            raise ValueError('Input is not a whole number of frames')
+        if not len(data):
+            break
+        block=np.frombuffer(data,dtype=dtype)
+        yield block.reshape(-1,channels) if channels>1 else block
+        if remaining is not None:
+            remaining-=len(data)//framesize
+
+
+# Create the filter
+def createfilter(spec,channels):
+    name,args=spec
+    if name=='lowpass':         design=rtfir.RTFIR_lowpass(int(args[0]),args[1])
+    elif name=='highpass':      design=rtfir.RTFIR_highpass(int(args[0]),args[1])
+    elif name=='bandpass':      design=rtfir.RTFIR_bandpass(int(args[0]),args[1],args[2])
+    elif name=='bandstop':      design=rtfir.RTFIR_bandstop(int(args[0]),args[1],args[2])
+    elif name=='kaiser-lowpass':design=rtfir.RTFIR_kaiser_lowpass(args[0],args[1],args[2])
+    else:                       design=rtfir.RTFIR_kaiser_highpass(args[0],args[1],args[2])
+    return rtfir.RTFIR_multichannel(design,channels) if channels>1 else design
+
+
+# Filter the input to the output
+def process(spec,input,inputformat,output,outputformat,channels,chunk,processes):
+    chunks,channels,frames,data=openinput(input,inputformat,channels,chunk)
+    filter=createfilter(spec,channels)
+    dtype=np.dtype(FORMATS.get(outputformat,np.float64))
+    shape=lambda n: (n,channels) if channels>1 else (n,)
+
+    # Shard files across processes, one chunk per shard
+    if processes>1 and data is not None and output!='-':
+        if outputformat=='npy':
+            result=np.lib.format.open_memmap(output,mode='w+',dtype=dtype,shape=shape(frames))
+        else:
+            result=np.memmap(output,dtype=dtype,mode='w+',shape=shape(frames))
+        rtfir.FilterSharded(filter,data,processes,chunk,result)
+        result.flush()
+        return frames
+
+    # Memory map the output file if the length is known
+    if output!='-' and outputformat=='npy' and frames is not None:
+        result=np.lib.format.open_memmap(output,mode='w+',dtype=dtype,shape=shape(frames))
+        done=0
+        for block in chunks:
+            result[done:done+len(block)]=filter.FilterBlock(block)
+            done+=len(block)
+        result.flush()
+        return done
+
+    # Otherwise write chunks sequentially
+    if output=='-':
+        if outputformat=='npy' and frames is None:
+            raise ValueError('Writing .npy to a pipe requires an input of known length')
+        stream=sys.stdout.buffer
+    else:
+        stream=open(output,'wb')
+    try:
+        if outputformat=='npy':
+            stream.write(npyheader(dtype,shape(frames or 0)))
+        done=0
+        for block in chunks:
+            stream.write(filter.FilterBlock(block).astype(dtype,copy=False).tobytes())
+            done+=len(block)
+        if outputformat=='npy' and frames is None:
+            stream.seek(0)
+            stream.write(npyheader(dtype,shape(done)))
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+        else:
+            stream.flush()
+    return done
+
+
+# Display help-message
+def helpmsg(caller):
+    print('RTFIR Filter 1.0')
+    print('Filters binary recordings')
+    print('Fiksdal(C)2021')
+    print('')
+    print('Usage: '+caller+' [OPTIONS] FILTER INPUT OUTPUT')
+    print('')
+    print('INPUT and OUTPUT are file names, or - for stdin and stdout.')
+    print('')
+    print('Options:')
+    print('\t--samplerate HZ\t\tSamplerate in hertz, frequencies are normalized by default')
+    print('\t--format FORMAT\t\tInput format: f32, f64 or npy (default from extension or content, or f64)')
+    print('\t--output-format FORMAT\tOutput format: f32, f64 or npy (default as input)')
+    print('\t--channels N\t\tInterleaved channels of raw input (default 1)')
+    print('\t--chunk N\t\tFrames per chunk (default 1048576)')
+    print('\t--processes N\t\tFilter chunks of an input file on N processes (default 1)')
+    print('')
+    print('Filters:')
+    print('\t--lowpass TAPS F0')
+    print('\t--highpass TAPS F0')
+    print('\t--bandpass TAPS F1 F2')
+    print('\t--bandstop TAPS F1 F2')
+    print('\t--kaiser-lowpass FP FS DB')
+    print('\t--kaiser-highpass FP FS DB')
+    print('')
+    print('Output samples are float64 for npy output, raw output is converted to the')
+    print('given type. Multichannel data is filtered with RTFIR_multichannel. Filtering')
+    print('on several processes gives the same output as filtering on one.')
+    exit()
+
+
+if __name__=='__main__':
+    # Parse settings
+    fs=1.0
+    inputformat=''
+    outputformat=''
+    channels=1
+    chunk=1<<20
+    processes=1
+    spec=None
+    files=[]
+    arguments={'lowpass':2,'highpass':2,'bandpass':3,'bandstop':3,'kaiser-lowpass':3,'kaiser-highpass':3}
+    i=1
+    while i<len(sys.argv):
+        if sys.argv[i]=='--samplerate':
+            i+=1
+            fs=float(sys.argv[i])
+        elif sys.argv[i]=='--format':
+            i+=1
+            inputformat=sys.argv[i]
+        elif sys.argv[i]=='--output-format':
+            i+=1
+            outputformat=sys.argv[i]
+        elif sys.argv[i]=='--channels':
+            i+=1
+            channels=int(sys.argv[i])
+        elif sys.argv[i]=='--chunk':
+            i+=1
+            chunk=int(sys.argv[i])
+        elif sys.argv[i]=='--processes':
+            i+=1
+            processes=int(sys.argv[i])
+        elif sys.argv[i]=='--help':
+            helpmsg(sys.argv[0])
+        elif sys.argv[i][:2]=='--' and sys.argv[i][2:] in arguments:
+            name=sys.argv[i][2:]
+            values=[float(v) for v in sys.argv[i+1:i+1+arguments[name]]]
+            i+=arguments[name]
+            spec=(name,values)
+        elif sys.argv[i][:2]=='--':
+            print('Invalid parameter: '+sys.argv[i])
+            exit(2)
+        else:
+            files.append(sys.argv[i])
+        i+=1
+    if not spec or len(files)!=2:
+        helpmsg(sys.argv[0])
+
+    # Normalize frequencies, tap counts are left as is
+    name,values=spec
+    first=0 if name.startswith('kaiser') else 1
+    last=2 if name.startswith('kaiser') else len(values)
+    spec=(name,values[:first]+[v/fs for v in values[first:last]]+values[last:])
+
+    if not inputformat and files[0]=='-':
+        inputformat='npy' if sys.stdin.buffer.peek(len(NPY_MAGIC))[:len(NPY_MAGIC)]==NPY_MAGIC else 'f64'
+    inputformat=inputformat or guessformat(files[0],'f64')
+    outputformat=outputformat or guessformat(files[1],inputformat)
+    for f in (inputformat,outputformat):
+        if f not in ('f32','f64','npy'):
+            print('Invalid format: '+f)
+            exit(2)
+    try:
+        frames=process(spec,files[0],inputformat,files[1],outputformat,channels,chunk,processes)
+    except (ValueError,OSError) as e:
+        sys.stderr.write(str(e)+'\n')
+        exit(1)
+    sys.stderr.write('Filtered '+str(frames)+' frames\n')
@@ -2,6 +2,7 @@ from setuptools import setup, Extension
 from distutils.command.build import build
 from shutil import copyfile
 from os.path import exists
+from os import environ
 
 # Need custom build sequence to accomodate swig
 class CustomBuild(build):
@@ -11,10 +12,20 @@ class CustomBuild(build):
         build.run(self)
 
 
+# Numpy headers are needed for the array typemaps
+try:
+    from numpy import get_include
+    numpy_include=[get_include()]
+except ImportError:
+    numpy_include=[]
+
+# Count filter statistics if requested, e.g. RTFIR_STATS=1 python3 setup.py build
+macros=[('RTFIR_STATS',None)] if environ.get('RTFIR_STATS') else []
+
 # Assert manifest
 if not exists('MANIFEST.in'):
     fd=open('MANIFEST.in','w')
-    fd.write('include src/rtfir.hpp')
+    fd.write('include src/rtfir.hpp\ninclude src/rtfir_kernels.h\n')
     fd.close()
 
 # Try to compile binary extensions
@@ -22,8 +33,9 @@ try:
     setup(
         name='rtfir',
         version='1.1.3',
-        ext_modules=[Extension('_rtfir',['src/rtfir.cpp','src/rtfir.i'],extra_compile_args=['-O2'],swig_opts=['-c++'])],
+        ext_modules=[Extension('_rtfir',['src/rtfir.cpp','src/rtfir.i'],depends=['src/rtfir.hpp','src/rtfir_kernels.h'],include_dirs=numpy_include,define_macros=macros,extra_compile_args=['-O2'],swig_opts=['-c++'])],
         py_modules=['rtfir'],
+        scripts=['rtfirfilter.py'],
         author='Vegard Fiksdal',
         author_email='vegard@fiksdal.cc',
         description='Realtime FIR filteters',
@@ -39,9 +51,9 @@ except SystemExit as e:
     print('='*74)
     print('Compilation of binary extensions failed, please read the')
     print('error-information above and fix the problem. Alternatively you can')
-    print('choose to install the pure-python fallback, but this will incur')
-    print('a *massive* performance hit and will not be suitable for embedded')
-    print('systems, big filters or large datasets.')
+    print('choose to install the pure-python fallback, which uses numpy for')
+    print('block filtering but will incur a *massive* performance hit when')
+    print('filtering sample by sample, and is not suitable for embedded systems.')
     print('='*74)
 
     # Get user confirmation
@@ -65,6 +77,7 @@ except SystemExit as e:
             name='rtfir',
             version='1.1.3',
             py_modules=['rtfir'],
+            scripts=['rtfirfilter.py'],
             author='Vegard Fiksdal',
             author_email='vegard@fiksdal.cc',
             description='Realtime FIR filteters',
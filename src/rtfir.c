@@ -2,13 +2,124 @@
 #include <string.h>
 #include <stdlib.h>
 #include <math.h>
+#ifdef RTFIR_STATS
+    #include <time.h>
+#endif
 #include "rtfir.h"
+#include "rtfir_kernels.h"
 
 // Some math.h implementations don't define M_PI
 #ifndef M_PI
     #define M_PI 3.14159265358979323846
 #endif
 
+// Samples filtered through all stages of a chain at a time
+#define RTFIR_CHAIN_CHUNK 256
+
+// Time and count filter calls only if statistics are compiled in
+#ifdef RTFIR_STATS
+    #define RTFIR_STATS_BEGIN() uint64_t stats_start=RTFIR_stats_clock()
+    #define RTFIR_STATS_END(Stats,Samples,Block) RTFIR_stats_count(Stats,stats_start,Samples,Block)
+
+/*!\brief Monotonic clock for the statistics
+ * \return Current time in nanoseconds
+ */
+static inline uint64_t RTFIR_stats_clock(void){
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC,&ts);
+    return (uint64_t)ts.tv_sec*1000000000+ts.tv_nsec;
+}
+
+/*!\brief Adds a call to the statistics of a filter
+ * \param Stats Statistics to update
+ * \param Start Time the call started
+ * \param Samples Samples filtered by the call
+ * \param Block True if a block was filtered
+ */
+static inline void RTFIR_stats_count(RTFIR_stats *Stats,const uint64_t Start,const unsigned int Samples,const bool Block){
+    uint64_t elapsed=RTFIR_stats_clock()-Start;
+    Stats->samples+=Samples;
+    Stats->calls++;
+    Stats->block_calls+=Block;
+    Stats->total_ns+=elapsed;
+    if(elapsed>Stats->max_ns){
+        Stats->max_ns=elapsed;
+    }
+}
+#else
+    #define RTFIR_STATS_BEGIN()
+    #define RTFIR_STATS_END(Stats,Samples,Block)
+#endif
+
+
+/*!\brief Computes sin(2*pi*Freq*i) with exact zero crossings
+ *
+ * The sine of a multiple of pi is not exactly zero in floating point, so
+ * the zero crossings of sinc designs are set exactly, which keeps the
+ * zeros of half-band designs for the sparse form.
+ *
+ * \param Freq Normalized frequency (f/fs)
+ * \param i Tap relative to the center
+ * \return Sine of 2*pi*Freq*i
+ */
+static double RTFIR_sin_pi(const double Freq,const int i){
+    double x=2*Freq*i;
+    return x==floor(x) ? 0 : sin(2*M_PI*Freq*i);
+}
+
+/*!\brief Generates the coefficients of a sinc design
+ * \param Coeff Buffer to receive Taps coefficients
+ * \param Taps Number of taps in the FIR filter
+ * \param Type Type of design
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), ignored by lowpass and highpass
+ */
+static void RTFIR_sinc(double *Coeff,const unsigned int Taps,const RTFIR_design_type Type,const double Freq1,const double Freq2){
+    int W=Taps/2;
+    for(int i=-W;i<(int)Taps-W;i++){
+        switch(Type){
+            case RTFIR_DESIGN_LOWPASS:
+                Coeff[i+W]=i==0 ? 2*Freq1 : RTFIR_sin_pi(Freq1,i)/(i*(M_PI));
+                break;
+            case RTFIR_DESIGN_HIGHPASS:
+                Coeff[i+W]=i==0 ? 1-(2*Freq1) : -RTFIR_sin_pi(Freq1,i)/(i*M_PI);
+                break;
+            case RTFIR_DESIGN_BANDPASS:
+                Coeff[i+W]=i==0 ? ((2*M_PI*Freq2)-(2*M_PI*Freq1))/M_PI : (RTFIR_sin_pi(Freq2,i)-RTFIR_sin_pi(Freq1,i))/(i*M_PI);
+                break;
+            case RTFIR_DESIGN_BANDSTOP:
+                Coeff[i+W]=i==0 ? 1+((2*M_PI*Freq1)-(2*M_PI*Freq2))/M_PI : (RTFIR_sin_pi(Freq1,i)-RTFIR_sin_pi(Freq2,i))/(i*M_PI);
+                break;
+        }
+    }
+}
+
+/*!\brief Records the design of a filter for retuning, without a crossfade
+ * \param Filter RTFIR filter object being initialized
+ * \param Type Type of design
+ * \param Window Window applied to the coefficients
+ * \param Beta Shape of the Kaiser window
+ */
+static void RTFIR_set_design(RTFIR *Filter,const RTFIR_design_type Type,const RTFIR_window Window,const double Beta){
+    Filter->type=Type;
+    Filter->window=Window;
+    Filter->beta=Beta;
+    Filter->fade=0;
+    Filter->fadelength=0;
+    Filter->fadeposition=0;
+}
+
+/*!\brief Clears the sparse form of a filter being initialized
+ * \param Filter RTFIR filter object being initialized
+ */
+static void RTFIR_init_sparse(RTFIR *Filter){
+    Filter->sparse=true;
+    Filter->stride=1;
+    Filter->compactcoeff=0;
+    Filter->exceptioncount=0;
+    Filter->phases=0;
+    Filter->nextphase=0;
+}
 
 /*!\brief Initializes a RTFIR object and generates lowpass coefficients
  * \param Filter RTFIR filter object to initialize
@@ -24,22 +135,22 @@ bool RTFIR_init_lowpass(RTFIR *Filter,const unsigned int Taps,const double Freq)
 
     // Allocate memory
     Filter->coeff=(double*)malloc(Taps*sizeof(double));
-    Filter->buffer=(double*)malloc(Taps*sizeof(double));
+    Filter->buffer=(double*)malloc(2*Taps*sizeof(double));
     Filter->taps=Taps;
+    Filter->offset=0;
+    Filter->symmetry=0;
+    Filter->design=0;
+    Filter->storage=0;
+    RTFIR_init_sparse(Filter);
+    RTFIR_set_design(Filter,RTFIR_DESIGN_LOWPASS,RTFIR_WINDOW_RECTANGULAR,0);
+    RTFIR_reset_stats(Filter);
 
     // Unset buffer
-    memset(Filter->buffer,0,Taps*sizeof(double));
+    memset(Filter->buffer,0,2*Taps*sizeof(double));
     
     // Generate coefficients
-    int W=Taps/2;
-    for(int i=-W;i<W;i++){
-        if(i==0){
-            Filter->coeff[W]=2*Freq;
-        }
-        else{      
-            Filter->coeff[i+W]=sin(2*(M_PI)*Freq*i)/(i*(M_PI));
-        }
-    }
+    RTFIR_sinc(Filter->coeff,Taps,RTFIR_DESIGN_LOWPASS,Freq,0);
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
     return true;
 }
 
@@ -57,22 +168,22 @@ bool RTFIR_init_highpass(RTFIR *Filter,const unsigned int Taps,const double Freq
 
     // Allocate memory
     Filter->coeff=(double*)malloc(Taps*sizeof(double));
-    Filter->buffer=(double*)malloc(Taps*sizeof(double));
+    Filter->buffer=(double*)malloc(2*Taps*sizeof(double));
     Filter->taps=Taps;
+    Filter->offset=0;
+    Filter->symmetry=0;
+    Filter->design=0;
+    Filter->storage=0;
+    RTFIR_init_sparse(Filter);
+    RTFIR_set_design(Filter,RTFIR_DESIGN_HIGHPASS,RTFIR_WINDOW_RECTANGULAR,0);
+    RTFIR_reset_stats(Filter);
 
     // Unset buffer
-    memset(Filter->buffer,0,Taps*sizeof(double));
+    memset(Filter->buffer,0,2*Taps*sizeof(double));
     
     // Generate coefficients
-    int W=Taps/2;
-    for(int i=-W;i<W;i++){
-        if(i==0){
-            Filter->coeff[W]=1-(2*Freq);
-        }
-        else{
-            Filter->coeff[i+W]=-sin(2*M_PI*Freq*i)/(i*M_PI);
-        }
-    }
+    RTFIR_sinc(Filter->coeff,Taps,RTFIR_DESIGN_HIGHPASS,Freq,0);
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
     return true;
 }
 
@@ -91,22 +202,22 @@ bool RTFIR_init_bandpass(RTFIR *Filter,const unsigned int Taps,const double Low,
 
     // Allocate memory
     Filter->coeff=(double*)malloc(Taps*sizeof(double));
-    Filter->buffer=(double*)malloc(Taps*sizeof(double));
+    Filter->buffer=(double*)malloc(2*Taps*sizeof(double));
     Filter->taps=Taps;
+    Filter->offset=0;
+    Filter->symmetry=0;
+    Filter->design=0;
+    Filter->storage=0;
+    RTFIR_init_sparse(Filter);
+    RTFIR_set_design(Filter,RTFIR_DESIGN_BANDPASS,RTFIR_WINDOW_RECTANGULAR,0);
+    RTFIR_reset_stats(Filter);
 
     // Unset buffer
-    memset(Filter->buffer,0,Taps*sizeof(double));
+    memset(Filter->buffer,0,2*Taps*sizeof(double));
     
     // Generate coefficients
-    int W=Taps/2;
-    for(int i=-W;i<W;i++){
-        if(i==0){
-            Filter->coeff[i+W]=((2*M_PI*High)-(2*M_PI*Low))/M_PI;
-        }
-        else{
-            Filter->coeff[i+W]=(sin(2*M_PI*High*i)-sin(2*M_PI*Low*i))/(i*M_PI);
-        }
-    }
+    RTFIR_sinc(Filter->coeff,Taps,RTFIR_DESIGN_BANDPASS,Low,High);
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
     return true;
 }
 
@@ -125,55 +236,2752 @@ bool RTFIR_init_bandstop(RTFIR *Filter,const unsigned int Taps,const double Low,
 
     // Allocate memory
     Filter->coeff=(double*)malloc(Taps*sizeof(double));
-    Filter->buffer=(double*)malloc(Taps*sizeof(double));
+    Filter->buffer=(double*)malloc(2*Taps*sizeof(double));
     Filter->taps=Taps;
+    Filter->offset=0;
+    Filter->symmetry=0;
+    Filter->design=0;
+    Filter->storage=0;
+    RTFIR_init_sparse(Filter);
+    RTFIR_set_design(Filter,RTFIR_DESIGN_BANDSTOP,RTFIR_WINDOW_RECTANGULAR,0);
+    RTFIR_reset_stats(Filter);
 
     // Unset buffer
-    memset(Filter->buffer,0,Taps*sizeof(double));
+    memset(Filter->buffer,0,2*Taps*sizeof(double));
     
     // Generate coefficients
+    RTFIR_sinc(Filter->coeff,Taps,RTFIR_DESIGN_BANDSTOP,Low,High);
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
+    return true;
+}
+
+/*!\brief Check if a span of coefficients is (anti)symmetric
+ * \param Filter RTFIR filter object to check
+ * \param First First coefficient of the span
+ * \param Last Last coefficient of the span
+ * \param Sign 1 to check for symmetry, -1 for antisymmetry
+ * \param Tolerance Allowed deviation relative to the largest coefficient
+ * \return True if the span is (anti)symmetric
+ */
+static bool RTFIR_is_symmetric(const RTFIR *Filter,const unsigned int First,const unsigned int Last,const int Sign,const double Tolerance){
+    double peak=0.0;
+    for(unsigned int i=0;i<Filter->taps;i++){
+        peak=fmax(peak,fabs(Filter->coeff[i]));
+    }
+    for(unsigned int i=First,j=Last;i<j;i++,j--){
+        if(fabs(Filter->coeff[i]-Sign*Filter->coeff[j])>Tolerance*peak){
+            return false;
+        }
+    }
+    return true;
+}
+
+/*!\brief Modified Bessel function of the first kind and order zero
+ * \param X Argument
+ * \return I0(X)
+ */
+static double RTFIR_bessel_i0(const double X){
+    double sum=1.0;
+    double term=1.0;
+    for(int k=1;term>1e-17*sum;k++){
+        term*=(X/(2*k))*(X/(2*k));
+        sum+=term;
+    }
+    return sum;
+}
+
+/*!\brief Multiplies the coefficients of a filter with a window
+ *
+ * The window is centered on the center tap of the sinc designs, so the
+ * coefficients stay (anti)symmetric.
+ *
+ * \param Coeff Coefficients to window
+ * \param Taps Number of coefficients
+ * \param Window Window to apply
+ * \param Beta Shape of the Kaiser window
+ */
+static void RTFIR_apply_window(double *Coeff,const unsigned int Taps,const RTFIR_window Window,const double Beta){
     int W=Taps/2;
-    for(int i=-W;i<W;i++){
-        if(i==0){
-            Filter->coeff[i+W]=1+((2*M_PI*Low)-(2*M_PI*High))/M_PI;
+    if(Window==RTFIR_WINDOW_RECTANGULAR || W==0){
+        return;
+    }
+    for(int i=-W;i<(int)Taps-W;i++){
+        double x=(double)i/W;
+        double w=1.0;
+        switch(Window){
+            case RTFIR_WINDOW_HAMMING:  w=0.54+0.46*cos(M_PI*x);                         break;
+            case RTFIR_WINDOW_BLACKMAN: w=0.42+0.5*cos(M_PI*x)+0.08*cos(2*M_PI*x);       break;
+            case RTFIR_WINDOW_KAISER:   w=RTFIR_bessel_i0(Beta*sqrt(1-x*x))/RTFIR_bessel_i0(Beta); break;
+            default:                    break;
         }
-        else{
-            Filter->coeff[i+W]=(sin(2*M_PI*Low*i)-sin(2*M_PI*High*i))/(i*M_PI);
+        Coeff[i+W]*=w;
+    }
+}
+
+/*!\brief Initializes a RTFIR object with a windowed design
+ *
+ * The sinc designs are truncated by a rectangular window, which gives the
+ * narrowest transition band but only about 21dB stopband rejection. The
+ * Hamming, Blackman and Kaiser windows trade a wider transition band for
+ * better rejection, so fewer taps are needed for a given rejection.
+ *
+ * \param Filter RTFIR filter object to initialize
+ * \param Type Type of design
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), ignored by lowpass and highpass
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
+ * \return True if successful
+ */
+bool RTFIR_init_windowed(RTFIR *Filter,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta){
+    bool result=false;
+    switch(Type){
+        case RTFIR_DESIGN_LOWPASS:  result=RTFIR_init_lowpass(Filter,Taps,Freq1);        break;
+        case RTFIR_DESIGN_HIGHPASS: result=RTFIR_init_highpass(Filter,Taps,Freq1);       break;
+        case RTFIR_DESIGN_BANDPASS: result=RTFIR_init_bandpass(Filter,Taps,Freq1,Freq2); break;
+        case RTFIR_DESIGN_BANDSTOP: result=RTFIR_init_bandstop(Filter,Taps,Freq1,Freq2); break;
+    }
+    if(!result){
+        return false;
+    }
+    RTFIR_apply_window(Filter->coeff,Taps,Window,Beta);
+    RTFIR_set_design(Filter,Type,Window,Beta);
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
+    return true;
+}
+
+/*!\brief Get the Kaiser window shape for a stopband attenuation
+ * \param Attenuation Stopband attenuation in dB
+ * \return Beta of the Kaiser window
+ */
+double RTFIR_kaiser_beta(const double Attenuation){
+    if(Attenuation>50){
+        return 0.1102*(Attenuation-8.7);
+    }
+    if(Attenuation>=21){
+        return 0.5842*pow(Attenuation-21,0.4)+0.07886*(Attenuation-21);
+    }
+    return 0.0;
+}
+
+/*!\brief Get the minimum number of taps of a Kaiser windowed design
+ *
+ * Uses the Kaiser formula, rounded up to an odd number of taps so the
+ * design is symmetric around the center tap, which highpass designs need.
+ *
+ * \param Transition Normalized width of the transition band (f/fs)
+ * \param Attenuation Stopband attenuation in dB
+ * \return Number of taps, or zero if the specification is invalid
+ */
+unsigned int RTFIR_kaiser_taps(const double Transition,const double Attenuation){
+    if(Transition<=0.0 || Transition>0.5 || Attenuation<=0.0){
+        printf("Invalid filter specification");
+        return 0;
+    }
+    unsigned int taps=(unsigned int)ceil((Attenuation-7.95)/(2.285*2*M_PI*Transition))+1;
+    if(taps<3){
+        taps=3;
+    }
+    return taps|1;
+}
+
+/*!\brief Initializes a RTFIR object with the shortest Kaiser windowed lowpass meeting a specification
+ * \param Filter RTFIR filter object to initialize
+ * \param Pass Normalized passband edge (f/fs)
+ * \param Stop Normalized stopband edge (f/fs), above Pass
+ * \param Attenuation Stopband attenuation in dB
+ * \return True if successful
+ */
+bool RTFIR_init_kaiser_lowpass(RTFIR *Filter,const double Pass,const double Stop,const double Attenuation){
+    unsigned int taps=RTFIR_kaiser_taps(Stop-Pass,Attenuation);
+    if(!taps){
+        return false;
+    }
+    return RTFIR_init_windowed(Filter,RTFIR_DESIGN_LOWPASS,taps,(Pass+Stop)/2,0,RTFIR_WINDOW_KAISER,RTFIR_kaiser_beta(Attenuation));
+}
+
+/*!\brief Initializes a RTFIR object with the shortest Kaiser windowed highpass meeting a specification
+ * \param Filter RTFIR filter object to initialize
+ * \param Pass Normalized passband edge (f/fs)
+ * \param Stop Normalized stopband edge (f/fs), below Pass
+ * \param Attenuation Stopband attenuation in dB
+ * \return True if successful
+ */
+bool RTFIR_init_kaiser_highpass(RTFIR *Filter,const double Pass,const double Stop,const double Attenuation){
+    unsigned int taps=RTFIR_kaiser_taps(Pass-Stop,Attenuation);
+    if(!taps){
+        return false;
+    }
+    return RTFIR_init_windowed(Filter,RTFIR_DESIGN_HIGHPASS,taps,(Pass+Stop)/2,0,RTFIR_WINDOW_KAISER,RTFIR_kaiser_beta(Attenuation));
+}
+
+/*!\brief Rounds a size up to whole cache lines
+ * \param Bytes Size in bytes
+ * \return Size in bytes, a multiple of RTFIR_ALIGNMENT
+ */
+static size_t RTFIR_aligned(const size_t Bytes){
+    return (Bytes+RTFIR_ALIGNMENT-1)&~(size_t)(RTFIR_ALIGNMENT-1);
+}
+
+/*!\brief Get the bytes of cache aligned arrays of a filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Retune True to include the arrays for retuning and the sparse form
+ * \return Bytes of the arrays, from a cache aligned start
+ */
+static size_t RTFIR_storage_bytes(const unsigned int Taps,const bool Retune){
+    size_t bytes=RTFIR_aligned(Taps*sizeof(double))                         // Coefficients
+                +RTFIR_aligned(2*Taps*sizeof(double));                      // Delay line
+    if(Retune){
+        bytes+=RTFIR_aligned(Taps*sizeof(double))                           // Crossfade
+              +RTFIR_aligned(Taps*sizeof(double))                           // Sparse coefficients
+              +RTFIR_aligned(2*(Taps+RTFIR_SPARSE_STRIDE)*sizeof(double));  // Sparse phases
+    }
+    return bytes;
+}
+
+/*!\brief Get the bytes of storage for a filter with caller supplied storage
+ *
+ * The storage holds the coefficients and delay line, and optionally the
+ * arrays used when retuning with a crossfade or filtering with the sparse
+ * form, so the filter never allocates. Without them the filter can not be
+ * retuned and always uses the dense form. Each array starts on a cache
+ * line, and the size allows for storage at any address.
+ *
+ * \param Taps Number of taps in the FIR filter
+ * \param Retune True to reserve the arrays for retuning and the sparse form
+ * \return Bytes of storage to pass to the RTFIR_init_*_storage functions
+ */
+size_t RTFIR_get_storage_size(const unsigned int Taps,const bool Retune){
+    return RTFIR_storage_bytes(Taps,Retune)+RTFIR_ALIGNMENT-1;
+}
+
+/*!\brief Sets up a RTFIR object with its arrays in caller supplied storage
+ * \param Filter RTFIR filter object to initialize
+ * \param Storage Storage for the arrays of the filter
+ * \param Size Bytes of Storage, with the arrays for retuning and the sparse form if they fit
+ * \param Taps Number of taps in the FIR filter
+ * \param Type Type of design
+ * \param Window Window applied to the coefficients
+ * \param Beta Shape of the Kaiser window
+ * \return True if the storage is large enough
+ */
+static bool RTFIR_init_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const RTFIR_design_type Type,const RTFIR_window Window,const double Beta){
+    // Start on a cache line
+    uintptr_t address=(uintptr_t)Storage;
+    size_t skip=(RTFIR_ALIGNMENT-address%RTFIR_ALIGNMENT)%RTFIR_ALIGNMENT;
+    size_t bytes=RTFIR_storage_bytes(Taps,false);
+    if(!Storage || !Taps || Size<skip || Size-skip<bytes){
+        printf("Storage is too small for the filter");
+        return false;
+    }
+    bool retune=Size-skip>=RTFIR_storage_bytes(Taps,true);
+    if(retune){
+        bytes=RTFIR_storage_bytes(Taps,true);
+    }
+    unsigned char *start=(unsigned char*)Storage+skip;
+    memset(start,0,bytes);
+
+    // Lay out the arrays one after the other
+    Filter->taps=Taps;
+    Filter->offset=0;
+    Filter->symmetry=0;
+    Filter->design=0;
+    Filter->storage=Storage;
+    RTFIR_init_sparse(Filter);
+    RTFIR_set_design(Filter,Type,Window,Beta);
+    RTFIR_reset_stats(Filter);
+    Filter->coeff=(double*)start;
+    start+=RTFIR_aligned(Taps*sizeof(double));
+    Filter->buffer=(double*)start;
+    start+=RTFIR_aligned(2*Taps*sizeof(double));
+    if(!retune){
+        return true;
+    }
+    Filter->fade=(double*)start;
+    start+=RTFIR_aligned(Taps*sizeof(double));
+    Filter->compactcoeff=(double*)start;
+    start+=RTFIR_aligned(Taps*sizeof(double));
+    Filter->phases=(double*)start;
+    return true;
+}
+
+/*!\brief Initializes a RTFIR object with a windowed design in caller supplied storage
+ *
+ * Works like RTFIR_init_windowed without allocating, so filters can live
+ * in static memory on systems without a heap. Retuning and the sparse
+ * form use the storage as well if it was sized for them, and RTFIR_close
+ * leaves it to the caller.
+ *
+ * \param Filter RTFIR filter object to initialize
+ * \param Storage Storage for the arrays of the filter
+ * \param Size Bytes of Storage, at least RTFIR_get_storage_size(Taps,Retune)
+ * \param Type Type of design
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), ignored by lowpass and highpass
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
+ * \return True if successful
+ */
+bool RTFIR_init_windowed_storage(RTFIR *Filter,void *Storage,const size_t Size,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta){
+    // Check for normalization
+    bool band=Type==RTFIR_DESIGN_BANDPASS || Type==RTFIR_DESIGN_BANDSTOP;
+    if(Freq1<0.0 || Freq1>0.5 || (band && (Freq2<0.0 || Freq2>0.5))){
+        printf("Frequencies must be normalized");
+        return false;
+    }
+    if(!RTFIR_init_storage(Filter,Storage,Size,Taps,Type,Window,Beta)){
+        return false;
+    }
+
+    // Generate coefficients
+    RTFIR_sinc(Filter->coeff,Taps,Type,Freq1,Freq2);
+    RTFIR_apply_window(Filter->coeff,Taps,Window,Beta);
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
+    return true;
+}
+
+/*!\brief Initializes a RTFIR object with lowpass coefficients in caller supplied storage
+ * \param Filter RTFIR filter object to initialize
+ * \param Storage Storage for the arrays of the filter
+ * \param Size Bytes of Storage, at least RTFIR_get_storage_size(Taps,Retune)
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_lowpass_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Freq){
+    return RTFIR_init_windowed_storage(Filter,Storage,Size,RTFIR_DESIGN_LOWPASS,Taps,Freq,0,RTFIR_WINDOW_RECTANGULAR,0);
+}
+
+/*!\brief Initializes a RTFIR object with highpass coefficients in caller supplied storage
+ * \param Filter RTFIR filter object to initialize
+ * \param Storage Storage for the arrays of the filter
+ * \param Size Bytes of Storage, at least RTFIR_get_storage_size(Taps,Retune)
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_highpass_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Freq){
+    return RTFIR_init_windowed_storage(Filter,Storage,Size,RTFIR_DESIGN_HIGHPASS,Taps,Freq,0,RTFIR_WINDOW_RECTANGULAR,0);
+}
+
+/*!\brief Initializes a RTFIR object with bandpass coefficients in caller supplied storage
+ * \param Filter RTFIR filter object to initialize
+ * \param Storage Storage for the arrays of the filter
+ * \param Size Bytes of Storage, at least RTFIR_get_storage_size(Taps,Retune)
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized higher cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_bandpass_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Low,const double High){
+    return RTFIR_init_windowed_storage(Filter,Storage,Size,RTFIR_DESIGN_BANDPASS,Taps,Low,High,RTFIR_WINDOW_RECTANGULAR,0);
+}
+
+/*!\brief Initializes a RTFIR object with bandstop coefficients in caller supplied storage
+ * \param Filter RTFIR filter object to initialize
+ * \param Storage Storage for the arrays of the filter
+ * \param Size Bytes of Storage, at least RTFIR_get_storage_size(Taps,Retune)
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized higher cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_bandstop_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Low,const double High){
+    return RTFIR_init_windowed_storage(Filter,Storage,Size,RTFIR_DESIGN_BANDSTOP,Taps,Low,High,RTFIR_WINDOW_RECTANGULAR,0);
+}
+
+/*!\brief Drops a reference to a shared design, freeing it when unused
+ * \param Design Design to release
+ */
+static void RTFIR_release_design(RTFIR_design *Design){
+    Design->refs--;
+    if(!Design->refs){
+        free(Design->coeff);
+        free(Design);
+    }
+}
+
+/*!\brief Removes a design from the recently used list of a cache
+ * \param Cache Cache holding the design
+ * \param Design Design to remove
+ */
+static void RTFIR_unlink_design(RTFIR_cache *Cache,RTFIR_design *Design){
+    if(Design->prev){
+        Design->prev->next=Design->next;
+    }
+    else{
+        Cache->head=Design->next;
+    }
+    if(Design->next){
+        Design->next->prev=Design->prev;
+    }
+    else{
+        Cache->tail=Design->prev;
+    }
+    Design->prev=0;
+    Design->next=0;
+}
+
+/*!\brief Initializes an empty design cache
+ *
+ * Filters initialized through a cache share one immutable copy of the
+ * coefficients of identical designs, keyed by type, taps and normalized
+ * frequencies, instead of computing and storing their own. When more than
+ * Capacity designs are cached, the least recently used one is dropped from
+ * the cache, but lives on until the last filter using it is closed. A
+ * cache is not thread safe, so calls sharing a cache must be serialized.
+ *
+ * \param Cache Cache object to initialize
+ * \param Capacity Maximum number of cached designs
+ * \return True if successful
+ */
+bool RTFIR_init_cache(RTFIR_cache *Cache,const unsigned int Capacity){
+    memset(Cache,0,sizeof(RTFIR_cache));
+    Cache->stats.capacity=Capacity;
+    return true;
+}
+
+/*!\brief Initializes a RTFIR object with a windowed design from a cache
+ * \param Filter RTFIR filter object to initialize
+ * \param Cache Cache to look the design up in, or add it to
+ * \param Type Type of design
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), or zero
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
+ * \return True if successful
+ */
+bool RTFIR_init_windowed_cached(RTFIR *Filter,RTFIR_cache *Cache,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta){
+    // Look for the design, most recently used first
+    double beta=Window==RTFIR_WINDOW_KAISER ? Beta : 0;
+    RTFIR_design *design=Cache->head;
+    while(design && !(design->type==Type && design->taps==Taps && design->freq1==Freq1 && design->freq2==Freq2 && design->window==Window && design->beta==beta)){
+        design=design->next;
+    }
+    if(design){
+        Cache->stats.hits++;
+        RTFIR_unlink_design(Cache,design);
+    }
+    else{
+        // Compute the design with a private filter and adopt its coefficients
+        RTFIR filter;
+        if(!RTFIR_init_windowed(&filter,Type,Taps,Freq1,Freq2,Window,Beta)){
+            return false;
+        }
+        design=(RTFIR_design*)malloc(sizeof(RTFIR_design));
+        if(!design){
+            printf("Could not allocate design");
+            RTFIR_close(&filter);
+            return false;
+        }
+        design->coeff=filter.coeff;
+        design->taps=Taps;
+        design->type=Type;
+        design->freq1=Freq1;
+        design->freq2=Freq2;
+        design->window=Window;
+        design->beta=beta;
+        design->refs=Cache->stats.capacity ? 1 : 0;
+        design->prev=0;
+        design->next=0;
+        filter.coeff=0;
+        RTFIR_close(&filter);
+        Cache->stats.misses++;
+        if(Cache->stats.capacity){
+            Cache->stats.size++;
+        }
+    }
+
+    // Mark as most recently used and evict the least recently used designs
+    if(Cache->stats.capacity){
+        design->next=Cache->head;
+        if(Cache->head){
+            Cache->head->prev=design;
+        }
+        Cache->head=design;
+        if(!Cache->tail){
+            Cache->tail=design;
+        }
+        while(Cache->stats.size>Cache->stats.capacity){
+            RTFIR_design *evicted=Cache->tail;
+            RTFIR_unlink_design(Cache,evicted);
+            RTFIR_release_design(evicted);
+            Cache->stats.size--;
+            Cache->stats.evictions++;
         }
     }
+
+    // Set up filter with the shared coefficients
+    design->refs++;
+    Filter->coeff=design->coeff;
+    Filter->buffer=(double*)calloc(2*Taps,sizeof(double));
+    Filter->taps=Taps;
+    Filter->offset=0;
+    Filter->symmetry=0;
+    Filter->design=design;
+    Filter->storage=0;
+    RTFIR_init_sparse(Filter);
+    RTFIR_set_design(Filter,Type,Window,Beta);
+    RTFIR_reset_stats(Filter);
+    if(!Filter->buffer){
+        printf("Could not allocate filter");
+        RTFIR_close(Filter);
+        return false;
+    }
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
     return true;
 }
 
-/*!\brief Filters input data
- * \param Filter RTFIR filter object to filter with
- * \param Sample Sample to filter
- * \return Filtered sample
+/*!\brief Initializes a RTFIR object with lowpass coefficients from a cache
+ * \param Filter RTFIR filter object to initialize
+ * \param Cache Cache to share the design through
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
  */
-double RTFIR_filter(RTFIR *Filter,const double Sample){
-    // Roll back samplebuffer
-    memmove(&Filter->buffer[1],&Filter->buffer[0],(Filter->taps-1)*sizeof(*Filter->buffer));
-    Filter->buffer[0]=Sample;
+bool RTFIR_init_lowpass_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Freq){
+    return RTFIR_init_windowed_cached(Filter,Cache,RTFIR_DESIGN_LOWPASS,Taps,Freq,0,RTFIR_WINDOW_RECTANGULAR,0);
+}
 
-    // Perform multiplication
-    double output=0.0;
-    for(unsigned int i=0;i<Filter->taps;i++){
-        output+=Filter->buffer[i]*Filter->coeff[i];
+/*!\brief Initializes a RTFIR object with highpass coefficients from a cache
+ * \param Filter RTFIR filter object to initialize
+ * \param Cache Cache to share the design through
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_highpass_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Freq){
+    return RTFIR_init_windowed_cached(Filter,Cache,RTFIR_DESIGN_HIGHPASS,Taps,Freq,0,RTFIR_WINDOW_RECTANGULAR,0);
+}
+
+/*!\brief Initializes a RTFIR object with bandpass coefficients from a cache
+ * \param Filter RTFIR filter object to initialize
+ * \param Cache Cache to share the design through
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_bandpass_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Low,const double High){
+    return RTFIR_init_windowed_cached(Filter,Cache,RTFIR_DESIGN_BANDPASS,Taps,Low,High,RTFIR_WINDOW_RECTANGULAR,0);
+}
+
+/*!\brief Initializes a RTFIR object with bandstop coefficients from a cache
+ * \param Filter RTFIR filter object to initialize
+ * \param Cache Cache to share the design through
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_bandstop_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Low,const double High){
+    return RTFIR_init_windowed_cached(Filter,Cache,RTFIR_DESIGN_BANDSTOP,Taps,Low,High,RTFIR_WINDOW_RECTANGULAR,0);
+}
+
+/*!\brief Get the statistics of a design cache
+ * \param Cache Cache to get the statistics of
+ * \return Hits, misses, evictions, size and capacity of the cache
+ */
+RTFIR_cache_stats RTFIR_get_cache_stats(const RTFIR_cache *Cache){
+    return Cache->stats;
+}
+
+/*!\brief Drops all designs from a cache
+ *
+ * Filters using the designs keep working, and free the designs when closed.
+ *
+ * \param Cache Cache to clear
+ */
+void RTFIR_clear_cache(RTFIR_cache *Cache){
+    while(Cache->tail){
+        RTFIR_design *design=Cache->tail;
+        RTFIR_unlink_design(Cache,design);
+        RTFIR_release_design(design);
     }
-    return output;  
+    Cache->stats.size=0;
 }
 
-/*!\brief Free filter data and close object
- * \param Filter RTFIR filter object to free
+/*!\brief Drops all designs and closes a cache
+ * \param Cache Cache to close
  */
-void RTFIR_close(RTFIR *Filter){
-    if(Filter->coeff){
-        free(Filter->coeff);
-        Filter->coeff=0;
+void RTFIR_close_cache(RTFIR_cache *Cache){
+    RTFIR_clear_cache(Cache);
+    Cache->stats.capacity=0;
+}
+
+/*!\brief Selects the dot product kernels used by all filters
+ *
+ * The fastest kernel supported by the CPU is selected when the library is
+ * loaded. The scalar kernel is the reference, the SIMD kernels add in a
+ * different order and differ from it by rounding only. The selection is not
+ * synchronized, so it must not be changed while other threads filter.
+ *
+ * \param Kernel Kernel to use, or RTFIR_KERNEL_AUTO for the fastest supported
+ * \return True if the kernel is supported by this CPU
+ */
+bool RTFIR_set_kernel(const RTFIR_kernel Kernel){
+    return RTFIR_select_kernel(Kernel);
+}
+
+/*!\brief Get the dot product kernels used by all filters
+ * \return Kernel in use
+ */
+RTFIR_kernel RTFIR_get_kernel(void){
+    return RTFIR_active_kernel;
+}
+
+/*!\brief Allocates the storage of the sparse form for any stride
+ * \param Filter RTFIR filter object
+ * \return True if successful
+ */
+static bool RTFIR_reserve_sparse(RTFIR *Filter){
+    // Caller supplied storage without the arrays keeps the dense form
+    if(Filter->storage && !Filter->phases){
+        return false;
     }
-    if(Filter->buffer){
-        free(Filter->buffer);
-        Filter->buffer=0;
+    if(!Filter->compactcoeff){
+        Filter->compactcoeff=(double*)malloc(Filter->taps*sizeof(double));
+    }
+    if(!Filter->phases){
+        Filter->phases=(double*)malloc(2*(Filter->taps+RTFIR_SPARSE_STRIDE)*sizeof(double));
+    }
+    if(!Filter->compactcoeff || !Filter->phases){
+        printf("Could not allocate filter");
+        return false;
+    }
+    return true;
+}
+
+/*!\brief Splits the delay line into the phases of the sparse form
+ * \param Filter RTFIR filter object using the sparse form
+ */
+static void RTFIR_split_phases(RTFIR *Filter){
+    const unsigned int stride=Filter->stride;
+    const unsigned int compact=Filter->compact;
+    for(unsigned int q=0;q<stride;q++){
+        // The newest sample of this phase, counted back from the newest sample
+        unsigned int delay=(Filter->nextphase+2*stride-1-q)%stride;
+        double *line=&Filter->phases[2*q*compact];
+        for(unsigned int k=0;k<compact;k++){
+            unsigned int i=delay+k*stride;
+            line[k]=i<Filter->taps ? Filter->buffer[Filter->offset+i] : 0;
+            line[k+compact]=line[k];
+        }
+        Filter->phaseoffsets[q]=0;
     }
-    Filter->taps=0;
 }
 
+/*!\brief Selects the sparse form for coefficients with regular zeros
+ *
+ * Half-band designs, with the cutoff at a quarter of the samplerate, have
+ * every other coefficient zero apart from the center tap, and zero-stuffed
+ * filters have all but every n'th coefficient zero. The coefficients on
+ * such a stride all multiply samples of one phase of the input, so the
+ * delay line is also kept split into stride phases, where those samples
+ * are contiguous for the dot product kernels and fold like the full
+ * coefficients. The few non-zero coefficients off the stride, such as the
+ * center tap, are multiplied directly. The sparse form is used if it saves
+ * at least a quarter of the multiplications.
+ *
+ * \param Filter RTFIR filter object with new coefficients or folding
+ */
+static void RTFIR_sparsify(RTFIR *Filter){
+    const unsigned int taps=Filter->taps;
+    const double *coeff=Filter->coeff;
+    Filter->stride=1;
+    if(!Filter->sparse || taps<4){
+        return;
+    }
+    unsigned int dense=Filter->symmetry ? taps-(Filter->last-Filter->first+1)/2 : taps;
+    unsigned int nonzero=0;
+    for(unsigned int i=0;i<taps;i++){
+        nonzero+=coeff[i]!=0;
+    }
+    if(4*nonzero>3*taps){
+        return;
+    }
+
+    // Find the cheapest stride and phase with few non-zero taps off it
+    unsigned int cost=3*dense/4+1,stride=1,residue=0,count=0;
+    int symmetry=0;
+    for(unsigned int m=2;m<=RTFIR_SPARSE_STRIDE && 2*m<=taps;m++){
+        for(unsigned int r=0;r<m;r++){
+            unsigned int off=0;
+            for(unsigned int i=0;i<taps && off<=RTFIR_SPARSE_EXCEPTIONS;i++){
+                off+=i%m!=r && coeff[i]!=0;
+            }
+            if(off>RTFIR_SPARSE_EXCEPTIONS){
+                continue;
+            }
+            unsigned int n=(taps-1-r)/m+1;
+            bool folds=Filter->symmetry!=0;
+            for(unsigned int k=0;k<n/2 && folds;k++){
+                folds=coeff[r+k*m]==Filter->symmetry*coeff[r+(n-1-k)*m];
+            }
+            unsigned int c=(folds ? (n+1)/2 : n)+off;
+            if(c<cost){
+                cost=c;
+                stride=m;
+                residue=r;
+                count=n;
+                symmetry=folds ? Filter->symmetry : 0;
+            }
+        }
+    }
+    if(stride==1 || !RTFIR_reserve_sparse(Filter)){
+        return;
+    }
+
+    // Gather the coefficients on the stride and the taps off it
+    Filter->stride=stride;
+    Filter->residue=residue;
+    Filter->compact=count;
+    Filter->compactsymmetry=symmetry;
+    Filter->exceptioncount=0;
+    for(unsigned int i=0;i<taps;i++){
+        if(i%stride==residue){
+            Filter->compactcoeff[i/stride]=coeff[i];
+        }
+        else if(coeff[i]!=0){
+            Filter->exceptions[Filter->exceptioncount++]=i;
+        }
+    }
+    Filter->nextphase=0;
+    RTFIR_split_phases(Filter);
+}
+
+/*!\brief Selects folding of (anti)symmetric coefficients
+ *
+ * Linear phase filters have (anti)symmetric coefficients, so the mirrored
+ * samples can be added before multiplying, halving the multiplications.
+ * The windowed sinc designs are symmetric around the center tap, but an
+ * even number of taps leaves the first tap without a mirror, so spans
+ * excluding the first or last tap are considered as well. Taps outside the
+ * folded span are multiplied directly.
+ *
+ * \param Filter RTFIR filter object to configure
+ * \param Mode RTFIR_FOLD_AUTO to fold exactly (anti)symmetric coefficients,
+ *             RTFIR_FOLD_FORCE to fold nearly (anti)symmetric coefficients,
+ *             RTFIR_FOLD_DISABLE to always use the direct form
+ * \return True if the folded form is used
+ */
+bool RTFIR_set_folding(RTFIR *Filter,const RTFIR_fold Mode){
+    Filter->fold=Mode;
+    Filter->symmetry=0;
+    if(Mode==RTFIR_FOLD_DISABLE || Filter->taps<2){
+        RTFIR_sparsify(Filter);
+        return false;
+    }
+
+    // Try the widest spans first
+    double tolerance=Mode==RTFIR_FOLD_FORCE ? 1e-9 : 0.0;
+    for(unsigned int trim=0;trim<3 && trim+2<=Filter->taps && !Filter->symmetry;trim++){
+        for(unsigned int head=0;head<=trim && !Filter->symmetry;head++){
+            unsigned int first=head;
+            unsigned int last=Filter->taps-1-(trim-head);
+            for(int sign=1;sign>=-1 && !Filter->symmetry;sign-=2){
+                if(RTFIR_is_symmetric(Filter,first,last,sign,tolerance)){
+                    Filter->symmetry=sign;
+                    Filter->first=first;
+                    Filter->last=last;
+                }
+            }
+        }
+    }
+    RTFIR_sparsify(Filter);
+    return Filter->symmetry!=0;
+}
+
+/*!\brief Selects whether a RTFIR object skips the zeros of sparse coefficients
+ * \param Filter RTFIR filter object to configure
+ * \param Enable True to use the sparse form when it saves multiplications
+ * \return True if the sparse form is used
+ */
+bool RTFIR_set_sparse(RTFIR *Filter,const bool Enable){
+    Filter->sparse=Enable;
+    RTFIR_sparsify(Filter);
+    return Filter->stride>1;
+}
+
+/*!\brief Get the spacing of the coefficients multiplied in the sparse form
+ * \param Filter RTFIR filter object
+ * \return Stride of the non-zero coefficients, or 1 if all are multiplied
+ */
+unsigned int RTFIR_get_stride(const RTFIR *Filter){
+    return Filter->stride>1 ? Filter->stride : 1;
+}
+
+/*!\brief Prepares a RTFIR object for retuning without allocations
+ *
+ * Retuning writes new coefficients into the existing storage, so a filter
+ * sharing a cached design first gets a private copy of the coefficients,
+ * and storage for the coefficients faded out from is allocated. This
+ * happens on the first retune, unless prepared in advance, so call this
+ * outside the realtime thread to keep later retunes free of allocations.
+ *
+ * \param Filter RTFIR filter object to prepare
+ * \return True if successful
+ */
+bool RTFIR_prepare_retune(RTFIR *Filter){
+    // Adopt the shared coefficients if no other filter uses them, or copy them
+    if(Filter->design){
+        RTFIR_design *design=Filter->design;
+        if(design->refs==1){
+            free(design);
+        }
+        else{
+            double *coeff=(double*)malloc(Filter->taps*sizeof(double));
+            if(!coeff){
+                printf("Could not allocate filter");
+                return false;
+            }
+            memcpy(coeff,Filter->coeff,Filter->taps*sizeof(double));
+            RTFIR_release_design(design);
+            Filter->coeff=coeff;
+        }
+        Filter->design=0;
+    }
+    if(Filter->storage && !Filter->fade){
+        printf("Storage has no room for retuning");
+        return false;
+    }
+    if(!Filter->fade){
+        Filter->fade=(double*)malloc(Filter->taps*sizeof(double));
+        if(!Filter->fade){
+            printf("Could not allocate filter");
+            return false;
+        }
+    }
+    return RTFIR_reserve_sparse(Filter);
+}
+
+/*!\brief Starts a crossfade from the current coefficients
+ *
+ * If a crossfade is already running, the mix heard so far is faded out
+ * from, so the output stays continuous.
+ *
+ * \param Filter RTFIR filter object about to get new coefficients
+ * \param Fade Samples to crossfade over, or zero to switch at once
+ */
+static void RTFIR_start_crossfade(RTFIR *Filter,const unsigned int Fade){
+    if(Fade){
+        for(unsigned int i=0;i<Filter->taps;i++){
+            if(Filter->fadeposition<Filter->fadelength){
+                Filter->fade[i]+=(Filter->coeff[i]-Filter->fade[i])*Filter->fadeposition/Filter->fadelength;
+            }
+            else{
+                Filter->fade[i]=Filter->coeff[i];
+            }
+        }
+    }
+    Filter->fadelength=Fade;
+    Filter->fadeposition=0;
+}
+
+/*!\brief Retunes the cutoff-frequencies of a RTFIR object
+ *
+ * Regenerates the coefficients of the design the filter was initialized
+ * with, keeping the taps, window and delay line, so the output continues
+ * without the transient of a new filter. With a crossfade, the outputs of
+ * the previous and new coefficients are mixed linearly over Fade samples,
+ * which costs a second dot product per sample while fading. Folding is
+ * selected again in the mode last given to RTFIR_set_folding.
+ *
+ * \param Filter RTFIR filter object to retune
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), ignored by lowpass and highpass
+ * \param Fade Samples to crossfade over, or zero to switch at once
+ * \return True if successful
+ */
+bool RTFIR_retune(RTFIR *Filter,const double Freq1,const double Freq2,const unsigned int Fade){
+    // Check for normalization
+    bool band=Filter->type==RTFIR_DESIGN_BANDPASS || Filter->type==RTFIR_DESIGN_BANDSTOP;
+    if(Freq1<0.0 || Freq1>0.5 || (band && (Freq2<0.0 || Freq2>0.5))){
+        printf("Frequencies must be normalized");
+        return false;
+    }
+    if(!RTFIR_prepare_retune(Filter)){
+        return false;
+    }
+    RTFIR_start_crossfade(Filter,Fade);
+    RTFIR_sinc(Filter->coeff,Filter->taps,Filter->type,Freq1,Freq2);
+    RTFIR_apply_window(Filter->coeff,Filter->taps,Filter->window,Filter->beta);
+    RTFIR_set_folding(Filter,Filter->fold);
+    return true;
+}
+
+/*!\brief Replaces the coefficients of a RTFIR object
+ *
+ * Works like RTFIR_retune with coefficients from any design. Retuning
+ * afterwards regenerates the design the filter was initialized with.
+ *
+ * \param Filter RTFIR filter object to update
+ * \param Coeff New coefficients, as many as the taps of the filter
+ * \param Fade Samples to crossfade over, or zero to switch at once
+ * \return True if successful
+ */
+bool RTFIR_set_coefficients(RTFIR *Filter,const double *Coeff,const unsigned int Fade){
+    if(!RTFIR_prepare_retune(Filter)){
+        return false;
+    }
+    RTFIR_start_crossfade(Filter,Fade);
+    memcpy(Filter->coeff,Coeff,Filter->taps*sizeof(double));
+    RTFIR_set_folding(Filter,Filter->fold);
+    return true;
+}
+
+/*!\brief Multiplies the latest samples with the non-zero coefficients
+ * \param Filter RTFIR filter object using the sparse form
+ * \param Window Latest taps samples, newest first
+ * \return Filtered sample
+ */
+static double RTFIR_convolve_sparse(const RTFIR *Filter,const double *Window){
+    // The newest sample on the stride is residue samples old, and its phase
+    // holds the rest of them contiguously
+    const unsigned int compact=Filter->compact;
+    unsigned int q=Filter->nextphase+Filter->stride-1-Filter->residue;
+    if(q>=Filter->stride){
+        q-=Filter->stride;
+    }
+    const double *line=&Filter->phases[2*q*compact+Filter->phaseoffsets[q]];
+    double output;
+    if(Filter->compactsymmetry){
+        unsigned int half=compact/2;
+        output=RTFIR_dot_folded(line,&line[compact-1],Filter->compactcoeff,half,Filter->compactsymmetry);
+        if(compact%2){
+            output+=line[half]*Filter->compactcoeff[half];
+        }
+    }
+    else{
+        output=RTFIR_dot(line,Filter->compactcoeff,compact);
+    }
+    for(unsigned int e=0;e<Filter->exceptioncount;e++){
+        output+=Window[Filter->exceptions[e]]*Filter->coeff[Filter->exceptions[e]];
+    }
+    return output;
+}
+
+/*!\brief Multiplies the latest samples with the coefficients
+ * \param Filter RTFIR filter object to filter with
+ * \param Window Latest taps samples, newest first
+ * \return Filtered sample
+ */
+static double RTFIR_convolve(const RTFIR *Filter,const double *Window){
+    const double *coeff=Filter->coeff;
+    if(Filter->stride>1){
+        return RTFIR_convolve_sparse(Filter,Window);
+    }
+    if(!Filter->symmetry){
+        return RTFIR_dot(Window,coeff,Filter->taps);
+    }
+
+    // Add mirrored samples and multiply once
+    unsigned int first=Filter->first;
+    unsigned int last=Filter->last;
+    unsigned int half=(last-first+1)/2;
+    double output=RTFIR_dot_folded(&Window[first],&Window[last],&coeff[first],half,Filter->symmetry);
+    if((last-first)%2==0){
+        output+=Window[first+half]*coeff[first+half];
+    }
+    for(unsigned int i=0;i<first;i++){
+        output+=Window[i]*coeff[i];
+    }
+    for(unsigned int i=last+1;i<Filter->taps;i++){
+        output+=Window[i]*coeff[i];
+    }
+    return output;  
+}
+
+/*!\brief Crossfades from the previous coefficients after a retune
+ * \param Filter RTFIR filter object to filter with
+ * \param Output Sample filtered with the current coefficients
+ * \param Window Latest taps samples, newest first
+ * \return Output mixed with the output of the previous coefficients
+ */
+static inline double RTFIR_crossfade(RTFIR *Filter,const double Output,const double *Window){
+    if(Filter->fadeposition==Filter->fadelength){
+        return Output;
+    }
+    double previous=RTFIR_dot(Window,Filter->fade,Filter->taps);
+    Filter->fadeposition++;
+    return previous+(Output-previous)*Filter->fadeposition/Filter->fadelength;
+}
+
+/*!\brief Filters input data without counting statistics
+ * \param Filter RTFIR filter object to filter with
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+static inline double RTFIR_filter_sample(RTFIR *Filter,const double Sample){
+    // Step back in the circular buffer and store the sample in both halves,
+    // so the latest taps samples are always contiguous from the offset
+    if(Filter->offset==0){
+        Filter->offset=Filter->taps;
+    }
+    Filter->offset--;
+    Filter->buffer[Filter->offset]=Sample;
+    Filter->buffer[Filter->offset+Filter->taps]=Sample;
+
+    // Store the sample in its phase of the sparse form as well
+    if(Filter->stride>1){
+        double *line=&Filter->phases[2*Filter->nextphase*Filter->compact];
+        unsigned int *o=&Filter->phaseoffsets[Filter->nextphase];
+        if(*o==0){
+            *o=Filter->compact;
+        }
+        (*o)--;
+        line[*o]=Sample;
+        line[*o+Filter->compact]=Sample;
+        if(++Filter->nextphase==Filter->stride){
+            Filter->nextphase=0;
+        }
+    }
+
+    // Perform multiplication
+    const double *window=&Filter->buffer[Filter->offset];
+    return RTFIR_crossfade(Filter,RTFIR_convolve(Filter,window),window);
+}
+
+/*!\brief Filters input data
+ * \param Filter RTFIR filter object to filter with
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+double RTFIR_filter(RTFIR *Filter,const double Sample){
+    RTFIR_STATS_BEGIN();
+    double output=RTFIR_filter_sample(Filter,Sample);
+    RTFIR_STATS_END(&Filter->stats,1,false);
+    return output;
+}
+
+/*!\brief Filters a block of input data
+ * \param Filter RTFIR filter object to filter with
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_filter_block(RTFIR *Filter,const double *Input,double *Output,const unsigned int Length){
+    RTFIR_STATS_BEGIN();
+    for(unsigned int i=0;i<Length;i++){
+        Output[i]=RTFIR_filter_sample(Filter,Input[i]);
+    }
+    RTFIR_STATS_END(&Filter->stats,Length,true);
+}
+
+/*!\brief Get the statistics of a filter
+ *
+ * Calls are only counted and timed if the library is compiled with
+ * RTFIR_STATS defined, otherwise the statistics stay zero.
+ *
+ * \param Filter RTFIR filter object
+ * \return Statistics since the filter was initialized or last reset
+ */
+RTFIR_stats RTFIR_get_stats(const RTFIR *Filter){
+    return Filter->stats;
+}
+
+/*!\brief Reset the statistics of a filter
+ * \param Filter RTFIR filter object
+ */
+void RTFIR_reset_stats(RTFIR *Filter){
+    memset(&Filter->stats,0,sizeof(RTFIR_stats));
+}
+
+/*!\brief Check if the library counts statistics
+ * \return True if compiled with RTFIR_STATS
+ */
+bool RTFIR_stats_enabled(void){
+#ifdef RTFIR_STATS
+    return true;
+#else
+    return false;
+#endif
+}
+
+/*!\brief Free filter data and close object
+ * \param Filter RTFIR filter object to free
+ */
+void RTFIR_close(RTFIR *Filter){
+    // Caller supplied storage holds all arrays and is not freed
+    if(Filter->storage){
+        Filter->coeff=0;
+        Filter->buffer=0;
+        Filter->fade=0;
+        Filter->compactcoeff=0;
+        Filter->phases=0;
+        Filter->storage=0;
+    }
+    if(Filter->design){
+        RTFIR_release_design(Filter->design);
+        Filter->design=0;
+        Filter->coeff=0;
+    }
+    if(Filter->coeff){
+        free(Filter->coeff);
+        Filter->coeff=0;
+    }
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+    if(Filter->fade){
+        free(Filter->fade);
+        Filter->fade=0;
+    }
+    if(Filter->compactcoeff){
+        free(Filter->compactcoeff);
+        Filter->compactcoeff=0;
+    }
+    if(Filter->phases){
+        free(Filter->phases);
+        Filter->phases=0;
+    }
+    Filter->taps=0;
+    Filter->offset=0;
+    Filter->symmetry=0;
+    Filter->stride=1;
+    Filter->fadelength=0;
+    Filter->fadeposition=0;
+}
+
+/*!\brief Get the multiplications per sample of a RTFIR object
+ * \param Filter RTFIR filter object
+ * \return Multiplications per filtered sample, halved by folding
+ */
+unsigned int RTFIR_get_cost(const RTFIR *Filter){
+    if(Filter->stride>1){
+        return (Filter->compactsymmetry ? (Filter->compact+1)/2 : Filter->compact)+Filter->exceptioncount;
+    }
+    if(!Filter->symmetry){
+        return Filter->taps;
+    }
+    return Filter->taps-(Filter->last-Filter->first+1)/2;
+}
+
+/*!\brief Get the delay line of a RTFIR object
+ *
+ * Only the latest taps-1 samples affect later outputs, so they are the
+ * whole state of the filter apart from its coefficients. Filtering resumes
+ * exactly where it left off after setting the state on a filter with the
+ * same coefficients.
+ *
+ * \param Filter RTFIR filter object
+ * \param State Buffer to receive the latest taps-1 samples, oldest first
+ */
+void RTFIR_get_state(const RTFIR *Filter,double *State){
+    for(unsigned int i=0;i+1<Filter->taps;i++){
+        State[i]=Filter->buffer[Filter->offset+Filter->taps-2-i];
+    }
+}
+
+/*!\brief Set the delay line of a RTFIR object
+ * \param Filter RTFIR filter object
+ * \param State Latest taps-1 samples, oldest first
+ */
+void RTFIR_set_state(RTFIR *Filter,const double *State){
+    const unsigned int taps=Filter->taps;
+    memset(Filter->buffer,0,2*taps*sizeof(double));
+    for(unsigned int i=0;i+1<taps;i++){
+        Filter->buffer[i]=State[taps-2-i];
+        Filter->buffer[i+taps]=State[taps-2-i];
+    }
+    Filter->offset=0;
+    if(Filter->stride>1){
+        RTFIR_split_phases(Filter);
+    }
+}
+
+/*!\brief Initializes a RTFIR object with a copy of a filter's coefficients
+ * \param Filter RTFIR filter object to initialize
+ * \param Design RTFIR filter object to copy coefficients and folding from
+ * \return True if successful
+ */
+static bool RTFIR_init_copy(RTFIR *Filter,const RTFIR *Design){
+    unsigned int taps=Design->taps;
+    Filter->coeff=(double*)malloc(taps*sizeof(double));
+    Filter->buffer=(double*)calloc(2*taps,sizeof(double));
+    Filter->taps=taps;
+    Filter->offset=0;
+    Filter->design=0;
+    Filter->storage=0;
+    RTFIR_init_sparse(Filter);
+    RTFIR_set_design(Filter,Design->type,Design->window,Design->beta);
+    RTFIR_reset_stats(Filter);
+    if(!Filter->coeff || !Filter->buffer){
+        printf("Could not allocate filter");
+        RTFIR_close(Filter);
+        return false;
+    }
+    memcpy(Filter->coeff,Design->coeff,taps*sizeof(double));
+    Filter->symmetry=Design->symmetry;
+    Filter->fold=Design->fold;
+    Filter->first=Design->first;
+    Filter->last=Design->last;
+    Filter->sparse=Design->sparse;
+    RTFIR_sparsify(Filter);
+    return true;
+}
+
+/*!\brief Initializes a chain of RTFIR objects filtering in series
+ *
+ * Filtering with a series of FIR filters equals filtering once with the
+ * convolution of their coefficients, which has one tap less per stage
+ * than the stages together. The fused filter is used unless running the
+ * stages is cheaper, which happens when the stages fold but the fused
+ * coefficients do not. Staged blocks are filtered a chunk at a time
+ * through all stages, so the samples stay in the cache between stages.
+ * The stages are copied with their folding, so they can be closed
+ * afterwards.
+ *
+ * \param Chain RTFIR_chain object to initialize
+ * \param Stages RTFIR filter objects to copy, in the order they filter
+ * \param Count Number of stages
+ * \param Plan RTFIR_CHAIN_AUTO to pick the cheaper plan, or the plan to use
+ * \return True if successful
+ */
+bool RTFIR_init_chain(RTFIR_chain *Chain,const RTFIR *Stages,const unsigned int Count,const RTFIR_chain_plan Plan){
+    Chain->stages=0;
+    Chain->count=0;
+    if(!Count){
+        printf("At least one stage is required");
+        return false;
+    }
+
+    // Convolve the coefficients of the stages
+    unsigned int taps=1;
+    for(unsigned int s=0;s<Count;s++){
+        taps+=Stages[s].taps-1;
+    }
+    double *fused=(double*)calloc(taps,sizeof(double));
+    double *next=(double*)malloc(taps*sizeof(double));
+    if(!fused || !next){
+        printf("Could not allocate filter");
+        free(fused);
+        free(next);
+        return false;
+    }
+    unsigned int length=1;
+    fused[0]=1;
+    for(unsigned int s=0;s<Count;s++){
+        memset(next,0,taps*sizeof(double));
+        for(unsigned int i=0;i<length;i++){
+            for(unsigned int j=0;j<Stages[s].taps;j++){
+                next[i+j]+=fused[i]*Stages[s].coeff[j];
+            }
+        }
+        length+=Stages[s].taps-1;
+        double *swap=fused;
+        fused=next;
+        next=swap;
+    }
+    free(next);
+
+    // Rounding in the convolution breaks exact symmetry, so fold nearly
+    // (anti)symmetric coefficients
+    RTFIR design={0};
+    design.coeff=fused;
+    design.taps=taps;
+    RTFIR_set_folding(&design,RTFIR_FOLD_FORCE);
+    bool ok=RTFIR_init_copy(&Chain->fused,&design);
+    free(fused);
+    if(!ok){
+        return false;
+    }
+    RTFIR_set_sparse(&Chain->fused,true);
+
+    // Pick the plan with the fewest multiplications per sample
+    unsigned int staged=0;
+    for(unsigned int s=0;s<Count;s++){
+        staged+=RTFIR_get_cost(&Stages[s]);
+    }
+    Chain->plan=Plan;
+    if(Plan==RTFIR_CHAIN_AUTO){
+        Chain->plan=RTFIR_get_cost(&Chain->fused)<=staged ? RTFIR_CHAIN_FUSED : RTFIR_CHAIN_STAGED;
+    }
+    if(Chain->plan==RTFIR_CHAIN_FUSED){
+        return true;
+    }
+
+    // Copy the stages
+    Chain->stages=(RTFIR*)malloc(Count*sizeof(RTFIR));
+    if(!Chain->stages){
+        printf("Could not allocate filter");
+        RTFIR_close_chain(Chain);
+        return false;
+    }
+    for(;Chain->count<Count;Chain->count++){
+        if(!RTFIR_init_copy(&Chain->stages[Chain->count],&Stages[Chain->count])){
+            RTFIR_close_chain(Chain);
+            return false;
+        }
+    }
+    return true;
+}
+
+/*!\brief Get the plan a chain filters with
+ * \param Chain RTFIR_chain object
+ * \return RTFIR_CHAIN_FUSED or RTFIR_CHAIN_STAGED
+ */
+RTFIR_chain_plan RTFIR_get_chain_plan(const RTFIR_chain *Chain){
+    return Chain->plan;
+}
+
+/*!\brief Get the multiplications per sample of a chain
+ * \param Chain RTFIR_chain object
+ * \return Multiplications per filtered sample of the plan in use
+ */
+unsigned int RTFIR_get_chain_cost(const RTFIR_chain *Chain){
+    if(Chain->plan==RTFIR_CHAIN_FUSED){
+        return RTFIR_get_cost(&Chain->fused);
+    }
+    unsigned int cost=0;
+    for(unsigned int s=0;s<Chain->count;s++){
+        cost+=RTFIR_get_cost(&Chain->stages[s]);
+    }
+    return cost;
+}
+
+/*!\brief Filters a sample through all stages of a chain
+ * \param Chain RTFIR_chain object to filter with
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+double RTFIR_filter_chain(RTFIR_chain *Chain,const double Sample){
+    if(Chain->plan==RTFIR_CHAIN_FUSED){
+        return RTFIR_filter(&Chain->fused,Sample);
+    }
+    double output=Sample;
+    for(unsigned int s=0;s<Chain->count;s++){
+        output=RTFIR_filter(&Chain->stages[s],output);
+    }
+    return output;
+}
+
+/*!\brief Filters a block of samples through all stages of a chain
+ * \param Chain RTFIR_chain object to filter with
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_filter_chain_block(RTFIR_chain *Chain,const double *Input,double *Output,const unsigned int Length){
+    if(Chain->plan==RTFIR_CHAIN_FUSED){
+        RTFIR_filter_block(&Chain->fused,Input,Output,Length);
+        return;
+    }
+
+    // Run each chunk through all stages while it is in the cache
+    for(unsigned int done=0;done<Length;done+=RTFIR_CHAIN_CHUNK){
+        unsigned int n=Length-done<RTFIR_CHAIN_CHUNK ? Length-done : RTFIR_CHAIN_CHUNK;
+        RTFIR_filter_block(&Chain->stages[0],&Input[done],&Output[done],n);
+        for(unsigned int s=1;s<Chain->count;s++){
+            RTFIR_filter_block(&Chain->stages[s],&Output[done],&Output[done],n);
+        }
+    }
+}
+
+/*!\brief Free chain data and close object
+ * \param Chain RTFIR_chain object to free
+ */
+void RTFIR_close_chain(RTFIR_chain *Chain){
+    RTFIR_close(&Chain->fused);
+    if(Chain->stages){
+        for(unsigned int s=0;s<Chain->count;s++){
+            RTFIR_close(&Chain->stages[s]);
+        }
+        free(Chain->stages);
+        Chain->stages=0;
+    }
+    Chain->count=0;
+}
+
+
+/*!\brief Initializes a multichannel RTFIR object
+ *
+ * All channels share one copy of the coefficients of an existing filter,
+ * and the delay line is interleaved so each frame of channel samples is
+ * contiguous. The existing filter can be closed afterwards.
+ *
+ * \param Filter Multichannel RTFIR filter object to initialize
+ * \param Design RTFIR filter object to copy coefficients from
+ * \param Channels Number of channels to filter
+ */
+bool RTFIR_init_multichannel(RTFIR_multichannel *Filter,const RTFIR *Design,const unsigned int Channels){
+    if(!Channels){
+        printf("At least one channel is required");
+        return false;
+    }
+
+    // Allocate memory
+    unsigned int taps=Design->taps;
+    Filter->coeff=(double*)malloc(taps*sizeof(double));
+    Filter->buffer=(double*)malloc(2*taps*Channels*sizeof(double));
+    Filter->taps=taps;
+    Filter->channels=Channels;
+    Filter->offset=0;
+
+    // Copy coefficients and unset buffer
+    memcpy(Filter->coeff,Design->coeff,taps*sizeof(double));
+    memset(Filter->buffer,0,2*taps*Channels*sizeof(double));
+    return true;
+}
+
+/*!\brief Filters a frame of one sample per channel
+ * \param Filter Multichannel RTFIR filter object to filter with
+ * \param Frame Samples to filter, one per channel
+ * \param Output Buffer to receive one filtered sample per channel (may equal Frame)
+ */
+void RTFIR_filter_multichannel(RTFIR_multichannel *Filter,const double *Frame,double *Output){
+    // Step back in the circular buffer and store the frame in both halves
+    unsigned int channels=Filter->channels;
+    if(Filter->offset==0){
+        Filter->offset=Filter->taps;
+    }
+    Filter->offset--;
+    memcpy(&Filter->buffer[Filter->offset*channels],Frame,channels*sizeof(double));
+    memcpy(&Filter->buffer[(Filter->offset+Filter->taps)*channels],Frame,channels*sizeof(double));
+
+    // Accumulate four channels at a time in registers, stepping through
+    // the interleaved frames tap by tap
+    const double *window=&Filter->buffer[Filter->offset*channels];
+    const double *coeff=Filter->coeff;
+    unsigned int taps=Filter->taps;
+    unsigned int j=0;
+    for(;j+4<=channels;j+=4){
+        double a0=0,a1=0,a2=0,a3=0;
+        const double *frame=&window[j];
+        for(unsigned int i=0;i<taps;i++,frame+=channels){
+            const double c=coeff[i];
+            a0+=frame[0]*c;
+            a1+=frame[1]*c;
+            a2+=frame[2]*c;
+            a3+=frame[3]*c;
+        }
+        Output[j]=a0;
+        Output[j+1]=a1;
+        Output[j+2]=a2;
+        Output[j+3]=a3;
+    }
+    for(;j<channels;j++){
+        double a=0;
+        const double *frame=&window[j];
+        for(unsigned int i=0;i<taps;i++,frame+=channels){
+            a+=frame[0]*coeff[i];
+        }
+        Output[j]=a;
+    }
+}
+
+/*!\brief Filters a block of frames
+ * \param Filter Multichannel RTFIR filter object to filter with
+ * \param Frames Length frames of one sample per channel to filter
+ * \param Output Buffer to receive the filtered frames (may equal Frames)
+ * \param Length Number of frames in Frames and Output
+ */
+void RTFIR_filter_multichannel_block(RTFIR_multichannel *Filter,const double *Frames,double *Output,const unsigned int Length){
+    for(unsigned int i=0;i<Length;i++){
+        RTFIR_filter_multichannel(Filter,&Frames[i*Filter->channels],&Output[i*Filter->channels]);
+    }
+}
+
+/*!\brief Free multichannel filter data and close object
+ * \param Filter Multichannel RTFIR filter object to free
+ */
+void RTFIR_close_multichannel(RTFIR_multichannel *Filter){
+    if(Filter->coeff){
+        free(Filter->coeff);
+        Filter->coeff=0;
+    }
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+    Filter->taps=0;
+    Filter->channels=0;
+    Filter->offset=0;
+}
+
+/*!\brief Adds the mirrored samples of a folded span
+ *
+ * The folded window holds the sums of the mirrored samples, the center
+ * sample of an odd span, and the samples before and after the span, in
+ * the order RTFIR_convolve multiplies them. With Sign zero, the
+ * coefficients are gathered in the same order.
+ *
+ * \param Window Latest Taps samples, newest first, or coefficients
+ * \param Taps Number of coefficients
+ * \param First First coefficient of the folded span
+ * \param Last Last coefficient of the folded span
+ * \param Sign 1 if symmetric, -1 if antisymmetric, 0 to gather coefficients
+ * \param Folded Buffer to receive the folded window
+ * \return Number of samples in the folded window
+ */
+static unsigned int RTFIR_fold_window(const double *Window,const unsigned int Taps,const unsigned int First,const unsigned int Last,const double Sign,double *Folded){
+    unsigned int half=(Last-First+1)/2,n=0;
+    for(unsigned int i=0;i<half;i++){
+        Folded[n++]=Window[First+i]+Sign*Window[Last-i];
+    }
+    if((Last-First)%2==0){
+        Folded[n++]=Window[First+half];
+    }
+    for(unsigned int i=0;i<First;i++){
+        Folded[n++]=Window[i];
+    }
+    for(unsigned int i=Last+1;i<Taps;i++){
+        Folded[n++]=Window[i];
+    }
+    return n;
+}
+
+/*!\brief Groups the filters of a bank by taps and folding
+ *
+ * The coefficients of four filters of a group at a time are interleaved
+ * in the order of the folded window, so the kernel accumulates four
+ * filters per sample in one vector.
+ *
+ * \param Filter RTFIR_bank filter object with its filters copied
+ * \return True if successful
+ */
+static bool RTFIR_group_bank(RTFIR_bank *Filter){
+    Filter->groups=(RTFIR_bank_group*)calloc(Filter->filters,sizeof(RTFIR_bank_group));
+    Filter->order=(unsigned int*)malloc(Filter->filters*sizeof(unsigned int));
+    Filter->folded=(double*)malloc(Filter->taps*sizeof(double));
+    if(!Filter->groups || !Filter->order || !Filter->folded){
+        return false;
+    }
+
+    // Collect the filters of each group after one another
+    unsigned int placed=0;
+    for(unsigned int k=0;k<Filter->filters;k++){
+        const RTFIR *band=&Filter->bands[k];
+        unsigned int first=band->symmetry ? band->first : 0;
+        unsigned int last=band->symmetry ? band->last : band->taps-1;
+        bool grouped=false;
+        for(unsigned int g=0;g<Filter->groupcount && !grouped;g++){
+            grouped=Filter->groups[g].taps==band->taps && Filter->groups[g].symmetry==band->symmetry && Filter->groups[g].first==first && Filter->groups[g].last==last;
+        }
+        if(grouped){
+            continue;
+        }
+        RTFIR_bank_group *group=&Filter->groups[Filter->groupcount++];
+        group->taps=band->taps;
+        group->symmetry=band->symmetry;
+        group->first=first;
+        group->last=last;
+        group->length=band->symmetry ? RTFIR_fold_window(band->coeff,band->taps,first,last,0,Filter->folded) : band->taps;
+        group->start=placed;
+        for(unsigned int j=k;j<Filter->filters;j++){
+            const RTFIR *other=&Filter->bands[j];
+            if(other->taps==band->taps && other->symmetry==band->symmetry && (!band->symmetry || (other->first==first && other->last==last))){
+                Filter->order[placed++]=j;
+            }
+        }
+        group->count=placed-group->start;
+    }
+
+    // Interleave the coefficients of four filters at a time, in the order
+    // of the folded window
+    for(unsigned int g=0;g<Filter->groupcount;g++){
+        RTFIR_bank_group *group=&Filter->groups[g];
+        unsigned int quads=group->count/4;
+        if(!quads){
+            continue;
+        }
+        group->coeff=(double*)malloc(4*quads*group->length*sizeof(double));
+        if(!group->coeff){
+            return false;
+        }
+        for(unsigned int k=0;k<4*quads;k++){
+            const RTFIR *band=&Filter->bands[Filter->order[group->start+k]];
+            const double *ordered=band->coeff;
+            if(group->symmetry){
+                RTFIR_fold_window(band->coeff,band->taps,group->first,group->last,0,Filter->folded);
+                ordered=Filter->folded;
+            }
+            double *lanes=&group->coeff[(k/4)*4*group->length+k%4];
+            for(unsigned int i=0;i<group->length;i++){
+                lanes[4*i]=ordered[i];
+            }
+        }
+    }
+    return true;
+}
+
+/*!\brief Initializes a bank of RTFIR objects filtering the same input
+ *
+ * All filters share one delay line, long enough for the longest filter,
+ * so each input sample is stored once and every filter multiplies the
+ * latest samples in the same pass. Each filter keeps its coefficients and
+ * folding. Filters with the same taps and folding are grouped, so the
+ * mirrored samples are added once per group, and multiplied four at a
+ * time. The existing filters can be closed afterwards. Decimating
+ * filters are separate types, such as RTFIR_moving_average, so only
+ * filters at the rate of the bank can be passed.
+ *
+ * \param Filter RTFIR_bank filter object to initialize
+ * \param Filters RTFIR filter objects to copy coefficients and folding from
+ * \param Count Number of filters
+ * \return True if successful
+ */
+bool RTFIR_init_bank(RTFIR_bank *Filter,const RTFIR *Filters,const unsigned int Count){
+    if(!Count){
+        printf("At least one filter is required");
+        return false;
+    }
+
+    // Allocate memory
+    unsigned int taps=0;
+    for(unsigned int k=0;k<Count;k++){
+        taps=Filters[k].taps>taps ? Filters[k].taps : taps;
+    }
+    Filter->bands=(RTFIR*)calloc(Count,sizeof(RTFIR));
+    Filter->buffer=(double*)calloc(2*taps,sizeof(double));
+    Filter->taps=taps;
+    Filter->filters=0;
+    Filter->offset=0;
+    Filter->groups=0;
+    Filter->groupcount=0;
+    Filter->order=0;
+    Filter->folded=0;
+    if(!Filter->bands || !Filter->buffer){
+        printf("Could not allocate filter");
+        RTFIR_close_bank(Filter);
+        return false;
+    }
+
+    // Copy coefficients and folding, the delay lines of the bands are unused
+    for(;Filter->filters<Count;Filter->filters++){
+        const RTFIR *design=&Filters[Filter->filters];
+        RTFIR *band=&Filter->bands[Filter->filters];
+        band->coeff=(double*)malloc(design->taps*sizeof(double));
+        if(!band->coeff){
+            printf("Could not allocate filter");
+            RTFIR_close_bank(Filter);
+            return false;
+        }
+        memcpy(band->coeff,design->coeff,design->taps*sizeof(double));
+        band->taps=design->taps;
+        band->symmetry=design->symmetry;
+        band->first=design->first;
+        band->last=design->last;
+    }
+    if(!RTFIR_group_bank(Filter)){
+        printf("Could not allocate filter");
+        RTFIR_close_bank(Filter);
+        return false;
+    }
+    return true;
+}
+
+/*!\brief Filters a sample with all filters of a bank
+ * \param Filter RTFIR_bank filter object to filter with
+ * \param Sample Sample to filter
+ * \param Output Buffer to receive the filtered samples
+ * \param Stride Distance between the outputs of consecutive filters
+ */
+static inline void RTFIR_filter_bank_sample(RTFIR_bank *Filter,const double Sample,double *Output,const unsigned int Stride){
+    // Store the sample once in both halves of the shared delay line
+    if(Filter->offset==0){
+        Filter->offset=Filter->taps;
+    }
+    Filter->offset--;
+    Filter->buffer[Filter->offset]=Sample;
+    Filter->buffer[Filter->offset+Filter->taps]=Sample;
+
+    // Every filter multiplies the latest of the same samples, folded once
+    // per group and four filters at a time
+    const double *window=&Filter->buffer[Filter->offset];
+    for(unsigned int g=0;g<Filter->groupcount;g++){
+        const RTFIR_bank_group *group=&Filter->groups[g];
+        const unsigned int *order=&Filter->order[group->start];
+        unsigned int quads=group->count/4;
+        const double *samples=window;
+        if(quads && group->symmetry){
+            RTFIR_fold_window(window,group->taps,group->first,group->last,group->symmetry,Filter->folded);
+            samples=Filter->folded;
+        }
+        double lanes[4];
+        for(unsigned int q=0;q<quads;q++){
+            RTFIR_dot4(samples,&group->coeff[4*q*group->length],group->length,lanes);
+            for(unsigned int l=0;l<4;l++){
+                Output[order[4*q+l]*Stride]=lanes[l];
+            }
+        }
+        for(unsigned int k=4*quads;k<group->count;k++){
+            Output[order[k]*Stride]=RTFIR_convolve(&Filter->bands[order[k]],window);
+        }
+    }
+}
+
+/*!\brief Filters a sample with all filters of a bank
+ * \param Filter RTFIR_bank filter object to filter with
+ * \param Sample Sample to filter
+ * \param Output Buffer to receive one filtered sample per filter
+ */
+void RTFIR_filter_bank(RTFIR_bank *Filter,const double Sample,double *Output){
+    RTFIR_filter_bank_sample(Filter,Sample,Output,1);
+}
+
+/*!\brief Filters a block of samples with all filters of a bank
+ * \param Filter RTFIR_bank filter object to filter with
+ * \param Input Samples to filter
+ * \param Output Buffer to receive filters x Length samples, the output of
+ *               each filter following the previous
+ * \param Length Number of samples in Input
+ */
+void RTFIR_filter_bank_block(RTFIR_bank *Filter,const double *Input,double *Output,const unsigned int Length){
+    for(unsigned int i=0;i<Length;i++){
+        RTFIR_filter_bank_sample(Filter,Input[i],&Output[i],Length);
+    }
+}
+
+/*!\brief Free filter bank data and close object
+ * \param Filter RTFIR_bank filter object to free
+ */
+void RTFIR_close_bank(RTFIR_bank *Filter){
+    if(Filter->bands){
+        for(unsigned int k=0;k<Filter->filters;k++){
+            RTFIR_close(&Filter->bands[k]);
+        }
+        free(Filter->bands);
+        Filter->bands=0;
+    }
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+    if(Filter->groups){
+        for(unsigned int g=0;g<Filter->groupcount;g++){
+            free(Filter->groups[g].coeff);
+        }
+        free(Filter->groups);
+        Filter->groups=0;
+    }
+    free(Filter->order);
+    free(Filter->folded);
+    Filter->order=0;
+    Filter->folded=0;
+    Filter->groupcount=0;
+    Filter->taps=0;
+    Filter->filters=0;
+    Filter->offset=0;
+}
+
+/*!\brief Get the bytes of arena for a pool of filters
+ * \param Capacity Number of filters
+ * \param Taps Number of taps of the longest filter
+ * \param Retune True to reserve the arrays for retuning and the sparse form
+ * \return Bytes of arena to pass to RTFIR_init_pool or RTFIR_init_pool_storage
+ */
+size_t RTFIR_get_pool_size(const unsigned int Capacity,const unsigned int Taps,const bool Retune){
+    return Capacity*RTFIR_storage_bytes(Taps,Retune)+RTFIR_ALIGNMENT-1;
+}
+
+/*!\brief Initializes a pool of RTFIR objects in caller supplied storage
+ *
+ * Filters added to the pool are laid out one after the other in the
+ * arena, each array starting on a cache line, and the filter objects are
+ * kept in one array, so stepping all filters walks memory in order.
+ * Nothing is allocated, neither here nor when adding, filtering with or
+ * retuning the filters. Only filters of pools with Retune set can be
+ * retuned or use the sparse form.
+ *
+ * \param Pool RTFIR_pool object to initialize
+ * \param Filters Array of Capacity filter objects
+ * \param Capacity Maximum number of filters
+ * \param Arena Storage for the arrays of all filters
+ * \param Size Bytes of Arena, see RTFIR_get_pool_size
+ * \param Retune True to give each filter the arrays for retuning and the sparse form
+ * \return True if successful
+ */
+bool RTFIR_init_pool_storage(RTFIR_pool *Pool,RTFIR *Filters,const unsigned int Capacity,void *Arena,const size_t Size,const bool Retune){
+    uintptr_t address=(uintptr_t)Arena;
+    size_t skip=(RTFIR_ALIGNMENT-address%RTFIR_ALIGNMENT)%RTFIR_ALIGNMENT;
+    Pool->filters=Filters;
+    Pool->count=0;
+    Pool->capacity=Capacity;
+    Pool->arena=(unsigned char*)Arena+skip;
+    Pool->size=Size>skip ? Size-skip : 0;
+    Pool->used=0;
+    Pool->retune=Retune;
+    Pool->memory=0;
+    if(!Filters || !Arena){
+        printf("Storage is required for the pool");
+        return false;
+    }
+    return true;
+}
+
+/*!\brief Initializes a pool of RTFIR objects in one allocation
+ *
+ * Works like RTFIR_init_pool_storage with the filter objects and arena
+ * allocated together, so thousands of filters cost one allocation and
+ * leave no fragments behind when closed.
+ *
+ * \param Pool RTFIR_pool object to initialize
+ * \param Capacity Maximum number of filters
+ * \param Size Bytes of arena, see RTFIR_get_pool_size
+ * \param Retune True to give each filter the arrays for retuning and the sparse form
+ * \return True if successful
+ */
+bool RTFIR_init_pool(RTFIR_pool *Pool,const unsigned int Capacity,const size_t Size,const bool Retune){
+    size_t filters=RTFIR_aligned(Capacity*sizeof(RTFIR));
+    unsigned char *memory=(unsigned char*)malloc(filters+Size);
+    if(!memory){
+        printf("Could not allocate pool");
+        Pool->filters=0;
+        Pool->count=0;
+        Pool->memory=0;
+        return false;
+    }
+    RTFIR_init_pool_storage(Pool,(RTFIR*)memory,Capacity,memory+filters,Size,Retune);
+    Pool->memory=memory;
+    return true;
+}
+
+/*!\brief Adds a filter with a windowed design to a pool
+ * \param Pool RTFIR_pool object to add to
+ * \param Type Type of design
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), ignored by lowpass and highpass
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
+ * \return The added filter, or 0 if the pool is full
+ */
+RTFIR *RTFIR_add_pool_filter(RTFIR_pool *Pool,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta){
+    size_t bytes=RTFIR_storage_bytes(Taps,Pool->retune);
+    if(Pool->count==Pool->capacity || Pool->size-Pool->used<bytes){
+        printf("Pool is full");
+        return 0;
+    }
+    RTFIR *filter=&Pool->filters[Pool->count];
+    if(!RTFIR_init_windowed_storage(filter,Pool->arena+Pool->used,bytes,Type,Taps,Freq1,Freq2,Window,Beta)){
+        return 0;
+    }
+    Pool->used+=bytes;
+    Pool->count++;
+    return filter;
+}
+
+/*!\brief Filters one sample with each filter of a pool
+ *
+ * Filters stepped through a pool do not count statistics.
+ *
+ * \param Pool RTFIR_pool object to filter with
+ * \param Input One sample per filter, in the order the filters were added
+ * \param Output Buffer to receive one filtered sample per filter (may equal Input)
+ */
+void RTFIR_filter_pool(RTFIR_pool *Pool,const double *Input,double *Output){
+    RTFIR *filters=Pool->filters;
+    for(unsigned int k=0;k<Pool->count;k++){
+        Output[k]=RTFIR_filter_sample(&filters[k],Input[k]);
+    }
+}
+
+/*!\brief Filters a block of frames with the filters of a pool
+ *
+ * Each filter filters all frames before the next, so its coefficients and
+ * delay line stay in the cache, which gives the same output as stepping
+ * the pool frame by frame.
+ *
+ * \param Pool RTFIR_pool object to filter with
+ * \param Input Length frames of one sample per filter
+ * \param Output Buffer to receive Length frames of filtered samples (may equal Input)
+ * \param Length Number of frames in Input and Output
+ */
+void RTFIR_filter_pool_block(RTFIR_pool *Pool,const double *Input,double *Output,const unsigned int Length){
+    const unsigned int count=Pool->count;
+    for(unsigned int k=0;k<count;k++){
+        RTFIR *filter=&Pool->filters[k];
+        for(unsigned int i=0;i<Length;i++){
+            Output[i*count+k]=RTFIR_filter_sample(filter,Input[i*count+k]);
+        }
+    }
+}
+
+/*!\brief Close a pool and its filters, freeing the pool if it allocated itself
+ * \param Pool RTFIR_pool object to free
+ */
+void RTFIR_close_pool(RTFIR_pool *Pool){
+    for(unsigned int k=0;k<Pool->count;k++){
+        RTFIR_close(&Pool->filters[k]);
+    }
+    if(Pool->memory){
+        free(Pool->memory);
+        Pool->memory=0;
+    }
+    Pool->filters=0;
+    Pool->arena=0;
+    Pool->count=0;
+    Pool->capacity=0;
+    Pool->size=0;
+    Pool->used=0;
+}
+
+/*!\brief Initializes a polyphase resampling RTFIR object
+ *
+ * Resamples by Up/Down by upsampling, lowpass filtering and downsampling.
+ * The lowpass prototype is split into Up polyphase branches, so the zeros
+ * inserted by upsampling are never multiplied and only the kept outputs
+ * are computed.
+ *
+ * \param Filter Resampling RTFIR filter object to initialize
+ * \param Taps Number of taps in the prototype lowpass filter
+ * \param Up Interpolation factor
+ * \param Down Decimation factor
+ * \param Freq Normalized cutoff-frequency of the prototype (f/(Up*fs)),
+ *             or zero for 0.5/max(Up,Down)
+ */
+bool RTFIR_init_resampler(RTFIR_resampler *Filter,const unsigned int Taps,const unsigned int Up,const unsigned int Down,const double Freq){
+    if(!Up || !Down){
+        printf("Resampling factors must be positive");
+        return false;
+    }
+
+    // Design prototype lowpass filter
+    RTFIR prototype;
+    if(!RTFIR_init_lowpass(&prototype,Taps,Freq>0 ? Freq : 0.5/(Up>Down ? Up : Down))){
+        return false;
+    }
+
+    // Allocate memory
+    unsigned int length=(Taps+Up-1)/Up;
+    Filter->coeff=(double*)malloc(Up*length*sizeof(double));
+    Filter->buffer=(double*)malloc(2*length*sizeof(double));
+    Filter->taps=Taps;
+    Filter->length=length;
+    Filter->up=Up;
+    Filter->down=Down;
+    Filter->offset=0;
+    Filter->phase=0;
+
+    // Unset buffer
+    memset(Filter->buffer,0,2*length*sizeof(double));
+
+    // Split prototype into branches, compensating for the upsampling gain
+    for(unsigned int k=0;k<Up;k++){
+        for(unsigned int j=0;j<length;j++){
+            unsigned int i=j*Up+k;
+            Filter->coeff[k*length+j]=i<Taps ? Up*prototype.coeff[i] : 0.0;
+        }
+    }
+    RTFIR_close(&prototype);
+    return true;
+}
+
+/*!\brief Initializes a polyphase interpolating RTFIR object
+ * \param Filter Resampling RTFIR filter object to initialize
+ * \param Taps Number of taps in the prototype lowpass filter
+ * \param Factor Interpolation factor
+ * \param Freq Normalized cutoff-frequency of the prototype (f/(Factor*fs)),
+ *             or zero for 0.5/Factor
+ */
+bool RTFIR_init_interpolator(RTFIR_resampler *Filter,const unsigned int Taps,const unsigned int Factor,const double Freq){
+    return RTFIR_init_resampler(Filter,Taps,Factor,1,Freq);
+}
+
+/*!\brief Get the number of outputs produced by a block
+ * \param Filter Resampling RTFIR filter object
+ * \param Length Number of input samples
+ * \return Number of samples RTFIR_filter_resampler_block() will produce
+ */
+unsigned int RTFIR_get_resampler_output_length(const RTFIR_resampler *Filter,const unsigned int Length){
+    unsigned long long span=(unsigned long long)Length*Filter->up;
+    if(span<=Filter->phase){
+        return 0;
+    }
+    return (span-Filter->phase+Filter->down-1)/Filter->down;
+}
+
+/*!\brief Resamples a block of input data
+ * \param Filter Resampling RTFIR filter object to filter with
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Output Buffer to receive RTFIR_get_resampler_output_length() samples
+ * \return Number of samples written to Output
+ */
+unsigned int RTFIR_filter_resampler_block(RTFIR_resampler *Filter,const double *Input,const unsigned int Length,double *Output){
+    unsigned int n=0;
+    for(unsigned int i=0;i<Length;i++){
+        // Step back in the circular buffer and store the sample in both halves
+        if(Filter->offset==0){
+            Filter->offset=Filter->length;
+        }
+        Filter->offset--;
+        Filter->buffer[Filter->offset]=Input[i];
+        Filter->buffer[Filter->offset+Filter->length]=Input[i];
+
+        // Compute the outputs falling within this input sample
+        const double *window=&Filter->buffer[Filter->offset];
+        while(Filter->phase<Filter->up){
+            Output[n++]=RTFIR_dot(window,&Filter->coeff[Filter->phase*Filter->length],Filter->length);
+            Filter->phase+=Filter->down;
+        }
+        Filter->phase-=Filter->up;
+    }
+    return n;
+}
+
+/*!\brief Free resampling filter data and close object
+ * \param Filter Resampling RTFIR filter object to free
+ */
+void RTFIR_close_resampler(RTFIR_resampler *Filter){
+    if(Filter->coeff){
+        free(Filter->coeff);
+        Filter->coeff=0;
+    }
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+    Filter->taps=0;
+    Filter->length=0;
+    Filter->offset=0;
+    Filter->phase=0;
+}
+
+
+/*!\brief Rounds a value to a fixed-point integer
+ * \param Value Value to quantize, nominally within [-1,1)
+ * \param Bits Number of fractional bits
+ * \return Rounded value saturated to [-2^Bits,2^Bits-1]
+ */
+static int64_t RTFIR_quantize(const double Value,const int Bits){
+    double scale=ldexp(1.0,Bits);
+    double q=floor(Value*scale+0.5);
+    if(q>scale-1){
+        q=scale-1;
+    }
+    if(q<-scale){
+        q=-scale;
+    }
+    return (int64_t)q;
+}
+
+/*!\brief Adds two accumulators, saturating instead of wrapping on overflow
+ * \param A First term
+ * \param B Second term
+ * \return Saturated sum
+ */
+static int64_t RTFIR_add_saturate(const int64_t A,const int64_t B){
+    if(B>0 && A>INT64_MAX-B){
+        return INT64_MAX;
+    }
+    if(B<0 && A<INT64_MIN-B){
+        return INT64_MIN;
+    }
+    return A+B;
+}
+
+/*!\brief Rounds an accumulator to the output format
+ * \param Accumulator Sum of products with 2*Bits fractional bits
+ * \param Bits Number of fractional bits of the output
+ * \param Min Smallest output value
+ * \param Max Largest output value
+ * \return Rounded output saturated to [Min,Max]
+ */
+static int64_t RTFIR_saturate(const int64_t Accumulator,const int Bits,const int64_t Min,const int64_t Max){
+    int64_t half=(int64_t)1<<(Bits-1);
+    int64_t value=Accumulator>INT64_MAX-half ? Max : (Accumulator+half)>>Bits;
+    return value<Min ? Min : value>Max ? Max : value;
+}
+
+/*!\brief Adds a value to a sum, keeping the rounding error separately
+ * \param Sum Sum to add to
+ * \param Compensation Rounding error of Sum
+ * \param Value Value to add
+ */
+static inline void RTFIR_add_compensated(double *Sum,double *Compensation,const double Value){
+    double t=*Sum+Value;
+    if(fabs(*Sum)>=fabs(Value)){
+        *Compensation+=(*Sum-t)+Value;
+    }
+    else{
+        *Compensation+=(Value-t)+*Sum;
+    }
+    *Sum=t;
+}
+
+/*!\brief Initializes a moving average object
+ *
+ * Averages the latest Length samples with a running sum, so each sample
+ * costs the same whatever the length. The sum is compensated for rounding,
+ * and replaced every Length samples by a sum of only the samples in the
+ * buffer, so it never drifts from the samples it averages.
+ *
+ * \param Filter Moving average object to initialize
+ * \param Length Number of samples averaged
+ * \param Factor Decimation factor, 1 to keep every output
+ * \return True if successful
+ */
+bool RTFIR_init_moving_average(RTFIR_moving_average *Filter,const unsigned int Length,const unsigned int Factor){
+    if(!Length || !Factor){
+        printf("Length and decimation factor must be positive");
+        return false;
+    }
+
+    // Allocate memory
+    Filter->buffer=(double*)malloc(Length*sizeof(double));
+    if(!Filter->buffer){
+        printf("Could not allocate filter");
+        return false;
+    }
+    Filter->length=Length;
+    Filter->factor=Factor;
+    Filter->offset=0;
+    Filter->phase=0;
+    Filter->count=0;
+    Filter->sum=0;
+    Filter->compensation=0;
+    Filter->fresh=0;
+    Filter->freshcompensation=0;
+
+    // Unset buffer
+    memset(Filter->buffer,0,Length*sizeof(double));
+    return true;
+}
+
+/*!\brief Get the number of outputs produced by a block
+ * \param Filter Moving average object
+ * \param Length Number of input samples
+ * \return Number of filtered samples RTFIR_filter_moving_average_block will produce
+ */
+unsigned int RTFIR_get_moving_average_output_length(const RTFIR_moving_average *Filter,const unsigned int Length){
+    return (Filter->phase+Length)/Filter->factor;
+}
+
+/*!\brief Adds a sample to the running sums of a moving average
+ * \param Filter Moving average object
+ * \param Sample Sample to add
+ */
+static inline void RTFIR_push_moving_average(RTFIR_moving_average *Filter,const double Sample){
+    double oldest=Filter->buffer[Filter->offset];
+    Filter->buffer[Filter->offset]=Sample;
+    if(++Filter->offset==Filter->length){
+        Filter->offset=0;
+    }
+    RTFIR_add_compensated(&Filter->sum,&Filter->compensation,Sample);
+    RTFIR_add_compensated(&Filter->sum,&Filter->compensation,-oldest);
+    RTFIR_add_compensated(&Filter->fresh,&Filter->freshcompensation,Sample);
+
+    // The fresh sum holds exactly the buffer every length samples
+    if(++Filter->count==Filter->length){
+        Filter->sum=Filter->fresh;
+        Filter->compensation=Filter->freshcompensation;
+        Filter->fresh=0;
+        Filter->freshcompensation=0;
+        Filter->count=0;
+    }
+}
+
+/*!\brief Filters and decimates Factor samples with a moving average
+ * \param Filter Moving average object
+ * \param Samples Factor samples to filter
+ * \return Average of the latest Length samples
+ */
+double RTFIR_filter_moving_average(RTFIR_moving_average *Filter,const double *Samples){
+    double output=0;
+    RTFIR_filter_moving_average_block(Filter,Samples,Filter->factor,&output);
+    return output;
+}
+
+/*!\brief Filters and decimates a block of input data with a moving average
+ * \param Filter Moving average object
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Output Buffer to receive RTFIR_get_moving_average_output_length() filtered samples
+ * \return Number of filtered samples written to Output
+ */
+unsigned int RTFIR_filter_moving_average_block(RTFIR_moving_average *Filter,const double *Input,const unsigned int Length,double *Output){
+    unsigned int n=0;
+    for(unsigned int i=0;i<Length;i++){
+        RTFIR_push_moving_average(Filter,Input[i]);
+        if(++Filter->phase==Filter->factor){
+            Filter->phase=0;
+            Output[n++]=(Filter->sum+Filter->compensation)/Filter->length;
+        }
+    }
+    return n;
+}
+
+/*!\brief Free moving average data and close object
+ * \param Filter Moving average object to free
+ */
+void RTFIR_close_moving_average(RTFIR_moving_average *Filter){
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+}
+
+/*!\brief Initializes a cascaded integrator-comb object
+ *
+ * Filters with Stages moving sums of Factor*Delay samples in series, using
+ * an integrator per stage at the input rate and a comb per stage at the
+ * output rate, so each sample costs the same whatever the length. The
+ * integrators wrap modulo 2^64, which the combs undo exactly, so the
+ * output never drifts. The output is not normalized, divide by
+ * RTFIR_get_cic_gain() for unity gain at DC.
+ *
+ * \param Filter Cascaded integrator-comb object to initialize
+ * \param Stages Number of integrator and comb stages
+ * \param Factor Decimation factor, 1 to keep every output
+ * \param Delay Differential delay of the combs
+ * \return True if successful
+ */
+bool RTFIR_init_cic(RTFIR_cic *Filter,const unsigned int Stages,const unsigned int Factor,const unsigned int Delay){
+    if(!Stages || !Factor || !Delay){
+        printf("Stages, decimation factor and delay must be positive");
+        return false;
+    }
+
+    // The gain must leave room for 32 bit samples in 64 bit outputs
+    uint64_t gain=1,length=(uint64_t)Factor*Delay,limit=(uint64_t)1<<32;
+    for(unsigned int k=0;k<Stages;k++){
+        if(length>limit/gain){
+            printf("Gain of the filter must not exceed 2^32");
+            return false;
+        }
+        gain*=length;
+    }
+
+    // Allocate memory
+    Filter->integrators=(uint64_t*)calloc(Stages,sizeof(uint64_t));
+    Filter->delays=(uint64_t*)calloc(Stages*Delay,sizeof(uint64_t));
+    if(!Filter->integrators || !Filter->delays){
+        printf("Could not allocate filter");
+        RTFIR_close_cic(Filter);
+        return false;
+    }
+    Filter->stages=Stages;
+    Filter->factor=Factor;
+    Filter->delay=Delay;
+    Filter->offset=0;
+    Filter->phase=0;
+    return true;
+}
+
+/*!\brief Get the number of outputs produced by a block
+ * \param Filter Cascaded integrator-comb object
+ * \param Length Number of input samples
+ * \return Number of filtered samples RTFIR_filter_cic_block will produce
+ */
+unsigned int RTFIR_get_cic_output_length(const RTFIR_cic *Filter,const unsigned int Length){
+    return (Filter->phase+Length)/Filter->factor;
+}
+
+/*!\brief Get the gain at DC of a cascaded integrator-comb filter
+ * \param Filter Cascaded integrator-comb object
+ * \return (Factor*Delay)^Stages
+ */
+double RTFIR_get_cic_gain(const RTFIR_cic *Filter){
+    return pow((double)Filter->factor*Filter->delay,Filter->stages);
+}
+
+/*!\brief Filters and decimates Factor samples with a cascaded integrator-comb filter
+ * \param Filter Cascaded integrator-comb object
+ * \param Samples Factor samples to filter
+ * \return Filtered sample
+ */
+int64_t RTFIR_filter_cic(RTFIR_cic *Filter,const int32_t *Samples){
+    int64_t output=0;
+    RTFIR_filter_cic_block(Filter,Samples,Filter->factor,&output);
+    return output;
+}
+
+/*!\brief Filters and decimates a block of input data with a cascaded integrator-comb filter
+ * \param Filter Cascaded integrator-comb object
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Output Buffer to receive RTFIR_get_cic_output_length() filtered samples
+ * \return Number of filtered samples written to Output
+ */
+unsigned int RTFIR_filter_cic_block(RTFIR_cic *Filter,const int32_t *Input,const unsigned int Length,int64_t *Output){
+    const unsigned int stages=Filter->stages;
+    uint64_t *integrators=Filter->integrators;
+    unsigned int n=0;
+    for(unsigned int i=0;i<Length;i++){
+        // Integrate at the input rate
+        uint64_t value=(uint64_t)(int64_t)Input[i];
+        for(unsigned int k=0;k<stages;k++){
+            integrators[k]+=value;
+            value=integrators[k];
+        }
+
+        // Comb at the output rate
+        if(++Filter->phase==Filter->factor){
+            Filter->phase=0;
+            uint64_t *line=&Filter->delays[Filter->offset];
+            for(unsigned int k=0;k<stages;k++){
+                uint64_t oldest=line[k*Filter->delay];
+                line[k*Filter->delay]=value;
+                value-=oldest;
+            }
+            if(++Filter->offset==Filter->delay){
+                Filter->offset=0;
+            }
+            Output[n++]=(int64_t)value;
+        }
+    }
+    return n;
+}
+
+/*!\brief Free cascaded integrator-comb data and close object
+ * \param Filter Cascaded integrator-comb object to free
+ */
+void RTFIR_close_cic(RTFIR_cic *Filter){
+    if(Filter->integrators){
+        free(Filter->integrators);
+        Filter->integrators=0;
+    }
+    if(Filter->delays){
+        free(Filter->delays);
+        Filter->delays=0;
+    }
+}
+
+/*!\brief Initializes a single precision RTFIR object from a filter design
+ *
+ * The coefficients of an existing filter are rounded to float, halving the
+ * memory bandwidth and allowing single precision FPUs to do the work. The
+ * existing filter can be closed afterwards.
+ *
+ * \param Filter RTFIR_float filter object to initialize
+ * \param Design RTFIR filter object to copy the coefficients from
+ * \return True if successful
+ */
+bool RTFIR_init_float(RTFIR_float *Filter,const RTFIR *Design){
+    // Allocate memory
+    unsigned int taps=Design->taps;
+    Filter->coeff=(float*)malloc(taps*sizeof(float));
+    Filter->buffer=(float*)calloc(2*taps,sizeof(float));
+    Filter->taps=taps;
+    Filter->offset=0;
+    if(!Filter->coeff || !Filter->buffer){
+        printf("Could not allocate filter");
+        RTFIR_close_float(Filter);
+        return false;
+    }
+
+    // Round coefficients
+    for(unsigned int i=0;i<taps;i++){
+        Filter->coeff[i]=(float)Design->coeff[i];
+    }
+    return true;
+}
+
+/*!\brief Initializes a single precision RTFIR object with lowpass coefficients
+ * \param Filter RTFIR_float filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_float_lowpass(RTFIR_float *Filter,const unsigned int Taps,const double Freq){
+    RTFIR design;
+    if(!RTFIR_init_lowpass(&design,Taps,Freq)){
+        return false;
+    }
+    bool result=RTFIR_init_float(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a single precision RTFIR object with highpass coefficients
+ * \param Filter RTFIR_float filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_float_highpass(RTFIR_float *Filter,const unsigned int Taps,const double Freq){
+    RTFIR design;
+    if(!RTFIR_init_highpass(&design,Taps,Freq)){
+        return false;
+    }
+    bool result=RTFIR_init_float(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a single precision RTFIR object with bandpass coefficients
+ * \param Filter RTFIR_float filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_float_bandpass(RTFIR_float *Filter,const unsigned int Taps,const double Low,const double High){
+    RTFIR design;
+    if(!RTFIR_init_bandpass(&design,Taps,Low,High)){
+        return false;
+    }
+    bool result=RTFIR_init_float(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a single precision RTFIR object with bandstop coefficients
+ * \param Filter RTFIR_float filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_float_bandstop(RTFIR_float *Filter,const unsigned int Taps,const double Low,const double High){
+    RTFIR design;
+    if(!RTFIR_init_bandstop(&design,Taps,Low,High)){
+        return false;
+    }
+    bool result=RTFIR_init_float(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Filters input data with a single precision filter
+ * \param Filter RTFIR_float filter object to filter with
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+float RTFIR_filter_float(RTFIR_float *Filter,const float Sample){
+    // Step back in the circular buffer and store the sample in both halves
+    if(Filter->offset==0){
+        Filter->offset=Filter->taps;
+    }
+    Filter->offset--;
+    Filter->buffer[Filter->offset]=Sample;
+    Filter->buffer[Filter->offset+Filter->taps]=Sample;
+
+    // Perform multiplication
+    const float *window=&Filter->buffer[Filter->offset];
+    float output=0.0f;
+    for(unsigned int i=0;i<Filter->taps;i++){
+        output+=window[i]*Filter->coeff[i];
+    }
+    return output;
+}
+
+/*!\brief Filters a block of input data with a single precision filter
+ * \param Filter RTFIR_float filter object to filter with
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_filter_float_block(RTFIR_float *Filter,const float *Input,float *Output,const unsigned int Length){
+    for(unsigned int i=0;i<Length;i++){
+        Output[i]=RTFIR_filter_float(Filter,Input[i]);
+    }
+}
+
+/*!\brief Free single precision filter data and close object
+ * \param Filter RTFIR_float filter object to free
+ */
+void RTFIR_close_float(RTFIR_float *Filter){
+    if(Filter->coeff){
+        free(Filter->coeff);
+        Filter->coeff=0;
+    }
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+    Filter->taps=0;
+    Filter->offset=0;
+}
+
+/*!\brief Initializes a Q15 fixed-point RTFIR object from a filter design
+ *
+ * The coefficients of an existing filter are rounded to Q15, saturating
+ * at [-1,1). Products are accumulated in 64 bits, which cannot overflow,
+ * and the output is rounded and saturated to Q15. The existing filter can
+ * be closed afterwards.
+ *
+ * \param Filter RTFIR_q15 filter object to initialize
+ * \param Design RTFIR filter object to copy the coefficients from
+ * \return True if successful
+ */
+bool RTFIR_init_q15(RTFIR_q15 *Filter,const RTFIR *Design){
+    // Allocate memory
+    unsigned int taps=Design->taps;
+    Filter->coeff=(int16_t*)malloc(taps*sizeof(int16_t));
+    Filter->buffer=(int16_t*)calloc(2*taps,sizeof(int16_t));
+    Filter->taps=taps;
+    Filter->offset=0;
+    if(!Filter->coeff || !Filter->buffer){
+        printf("Could not allocate filter");
+        RTFIR_close_q15(Filter);
+        return false;
+    }
+
+    // Quantize coefficients
+    for(unsigned int i=0;i<taps;i++){
+        Filter->coeff[i]=(int16_t)RTFIR_quantize(Design->coeff[i],15);
+    }
+    return true;
+}
+
+/*!\brief Initializes a Q15 fixed-point RTFIR object with lowpass coefficients
+ * \param Filter RTFIR_q15 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q15_lowpass(RTFIR_q15 *Filter,const unsigned int Taps,const double Freq){
+    RTFIR design;
+    if(!RTFIR_init_lowpass(&design,Taps,Freq)){
+        return false;
+    }
+    bool result=RTFIR_init_q15(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a Q15 fixed-point RTFIR object with highpass coefficients
+ * \param Filter RTFIR_q15 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q15_highpass(RTFIR_q15 *Filter,const unsigned int Taps,const double Freq){
+    RTFIR design;
+    if(!RTFIR_init_highpass(&design,Taps,Freq)){
+        return false;
+    }
+    bool result=RTFIR_init_q15(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a Q15 fixed-point RTFIR object with bandpass coefficients
+ * \param Filter RTFIR_q15 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q15_bandpass(RTFIR_q15 *Filter,const unsigned int Taps,const double Low,const double High){
+    RTFIR design;
+    if(!RTFIR_init_bandpass(&design,Taps,Low,High)){
+        return false;
+    }
+    bool result=RTFIR_init_q15(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a Q15 fixed-point RTFIR object with bandstop coefficients
+ * \param Filter RTFIR_q15 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q15_bandstop(RTFIR_q15 *Filter,const unsigned int Taps,const double Low,const double High){
+    RTFIR design;
+    if(!RTFIR_init_bandstop(&design,Taps,Low,High)){
+        return false;
+    }
+    bool result=RTFIR_init_q15(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Filters input data with a Q15 fixed-point filter
+ * \param Filter RTFIR_q15 filter object to filter with
+ * \param Sample Q15 sample to filter
+ * \return Filtered Q15 sample
+ */
+int16_t RTFIR_filter_q15(RTFIR_q15 *Filter,const int16_t Sample){
+    // Step back in the circular buffer and store the sample in both halves
+    if(Filter->offset==0){
+        Filter->offset=Filter->taps;
+    }
+    Filter->offset--;
+    Filter->buffer[Filter->offset]=Sample;
+    Filter->buffer[Filter->offset+Filter->taps]=Sample;
+
+    // Accumulate Q30 products
+    const int16_t *window=&Filter->buffer[Filter->offset];
+    int64_t output=0;
+    for(unsigned int i=0;i<Filter->taps;i++){
+        output+=(int32_t)window[i]*Filter->coeff[i];
+    }
+    return (int16_t)RTFIR_saturate(output,15,INT16_MIN,INT16_MAX);
+}
+
+/*!\brief Filters a block of input data with a Q15 fixed-point filter
+ * \param Filter RTFIR_q15 filter object to filter with
+ * \param Input Q15 samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_filter_q15_block(RTFIR_q15 *Filter,const int16_t *Input,int16_t *Output,const unsigned int Length){
+    for(unsigned int i=0;i<Length;i++){
+        Output[i]=RTFIR_filter_q15(Filter,Input[i]);
+    }
+}
+
+/*!\brief Free Q15 fixed-point filter data and close object
+ * \param Filter RTFIR_q15 filter object to free
+ */
+void RTFIR_close_q15(RTFIR_q15 *Filter){
+    if(Filter->coeff){
+        free(Filter->coeff);
+        Filter->coeff=0;
+    }
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+    Filter->taps=0;
+    Filter->offset=0;
+}
+
+/*!\brief Initializes a Q31 fixed-point RTFIR object from a filter design
+ *
+ * The coefficients of an existing filter are rounded to Q31, saturating
+ * at [-1,1). Products are accumulated as Q62 in 64 bits with saturating
+ * additions, and the output is rounded and saturated to Q31. The existing
+ * filter can be closed afterwards.
+ *
+ * \param Filter RTFIR_q31 filter object to initialize
+ * \param Design RTFIR filter object to copy the coefficients from
+ * \return True if successful
+ */
+bool RTFIR_init_q31(RTFIR_q31 *Filter,const RTFIR *Design){
+    // Allocate memory
+    unsigned int taps=Design->taps;
+    Filter->coeff=(int32_t*)malloc(taps*sizeof(int32_t));
+    Filter->buffer=(int32_t*)calloc(2*taps,sizeof(int32_t));
+    Filter->taps=taps;
+    Filter->offset=0;
+    if(!Filter->coeff || !Filter->buffer){
+        printf("Could not allocate filter");
+        RTFIR_close_q31(Filter);
+        return false;
+    }
+
+    // Quantize coefficients
+    for(unsigned int i=0;i<taps;i++){
+        Filter->coeff[i]=(int32_t)RTFIR_quantize(Design->coeff[i],31);
+    }
+    return true;
+}
+
+/*!\brief Initializes a Q31 fixed-point RTFIR object with lowpass coefficients
+ * \param Filter RTFIR_q31 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q31_lowpass(RTFIR_q31 *Filter,const unsigned int Taps,const double Freq){
+    RTFIR design;
+    if(!RTFIR_init_lowpass(&design,Taps,Freq)){
+        return false;
+    }
+    bool result=RTFIR_init_q31(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a Q31 fixed-point RTFIR object with highpass coefficients
+ * \param Filter RTFIR_q31 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q31_highpass(RTFIR_q31 *Filter,const unsigned int Taps,const double Freq){
+    RTFIR design;
+    if(!RTFIR_init_highpass(&design,Taps,Freq)){
+        return false;
+    }
+    bool result=RTFIR_init_q31(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a Q31 fixed-point RTFIR object with bandpass coefficients
+ * \param Filter RTFIR_q31 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q31_bandpass(RTFIR_q31 *Filter,const unsigned int Taps,const double Low,const double High){
+    RTFIR design;
+    if(!RTFIR_init_bandpass(&design,Taps,Low,High)){
+        return false;
+    }
+    bool result=RTFIR_init_q31(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Initializes a Q31 fixed-point RTFIR object with bandstop coefficients
+ * \param Filter RTFIR_q31 filter object to initialize
+ * \param Taps Number of taps in the FIR filter
+ * \param Low Normalized lower cutoff-frequency (f/fs)
+ * \param High Normalized upper cutoff-frequency (f/fs)
+ * \return True if successful
+ */
+bool RTFIR_init_q31_bandstop(RTFIR_q31 *Filter,const unsigned int Taps,const double Low,const double High){
+    RTFIR design;
+    if(!RTFIR_init_bandstop(&design,Taps,Low,High)){
+        return false;
+    }
+    bool result=RTFIR_init_q31(Filter,&design);
+    RTFIR_close(&design);
+    return result;
+}
+
+/*!\brief Filters input data with a Q31 fixed-point filter
+ * \param Filter RTFIR_q31 filter object to filter with
+ * \param Sample Q31 sample to filter
+ * \return Filtered Q31 sample
+ */
+int32_t RTFIR_filter_q31(RTFIR_q31 *Filter,const int32_t Sample){
+    // Step back in the circular buffer and store the sample in both halves
+    if(Filter->offset==0){
+        Filter->offset=Filter->taps;
+    }
+    Filter->offset--;
+    Filter->buffer[Filter->offset]=Sample;
+    Filter->buffer[Filter->offset+Filter->taps]=Sample;
+
+    // Accumulate Q62 products
+    const int32_t *window=&Filter->buffer[Filter->offset];
+    int64_t output=0;
+    for(unsigned int i=0;i<Filter->taps;i++){
+        output=RTFIR_add_saturate(output,(int64_t)window[i]*Filter->coeff[i]);
+    }
+    return (int32_t)RTFIR_saturate(output,31,INT32_MIN,INT32_MAX);
+}
+
+/*!\brief Filters a block of input data with a Q31 fixed-point filter
+ * \param Filter RTFIR_q31 filter object to filter with
+ * \param Input Q31 samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_filter_q31_block(RTFIR_q31 *Filter,const int32_t *Input,int32_t *Output,const unsigned int Length){
+    for(unsigned int i=0;i<Length;i++){
+        Output[i]=RTFIR_filter_q31(Filter,Input[i]);
+    }
+}
+
+/*!\brief Free Q31 fixed-point filter data and close object
+ * \param Filter RTFIR_q31 filter object to free
+ */
+void RTFIR_close_q31(RTFIR_q31 *Filter){
+    if(Filter->coeff){
+        free(Filter->coeff);
+        Filter->coeff=0;
+    }
+    if(Filter->buffer){
+        free(Filter->buffer);
+        Filter->buffer=0;
+    }
+    Filter->taps=0;
+    Filter->offset=0;
+}
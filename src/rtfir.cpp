@@ -1,47 +1,443 @@
 #include <stdexcept>
+#include <algorithm>
+#include <list>
+#include <map>
+#include <mutex>
+#include <tuple>
 #include <stdio.h>
 #include <string.h>
 #include <math.h>
 #include "rtfir.hpp"
+#include "rtfir_kernels.h"
 
 // Some math.h implementations don't define M_PI
 #ifndef M_PI
     #define M_PI 3.14159265358979323846
 #endif
 
+// Time and count filter calls only if statistics are compiled in
+#ifdef RTFIR_STATS
+#include <chrono>
+
+//! Adds the enclosing call to the statistics of a filter when it goes out of scope
+class RTFIR_stats_timer {
+    private:
+        RTFIR_stats &stats;
+        unsigned int samples;
+        bool block;
+        std::chrono::steady_clock::time_point start;
+    public:
+        RTFIR_stats_timer(RTFIR_stats &Stats,const unsigned int &Samples,const bool &Block) :
+            stats(Stats),samples(Samples),block(Block),start(std::chrono::steady_clock::now()){
+        }
+        ~RTFIR_stats_timer(){
+            uint64_t elapsed=std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now()-start).count();
+            stats.samples+=samples;
+            stats.calls++;
+            stats.block_calls+=block;
+            stats.total_ns+=elapsed;
+            stats.max_ns=std::max(stats.max_ns,elapsed);
+        }
+};
+    #define RTFIR_STATS_COUNT(Samples,Block) RTFIR_stats_timer stats_timer(stats,Samples,Block)
+#else
+    #define RTFIR_STATS_COUNT(Samples,Block)
+#endif
+
+
+// Largest spacing of non-zero coefficients, and most non-zero coefficients
+// off the spacing, for sparse filters
+static const unsigned int SparseStride=8;
+static const unsigned int SparseExceptions=4;
+
+/*!\brief Computes sin(2*pi*Freq*i) with exact zero crossings
+ *
+ * The sine of a multiple of pi is not exactly zero in floating point, so
+ * the zero crossings of sinc designs are set exactly, which keeps the
+ * zeros of half-band designs for the sparse form.
+ *
+ * \param Freq Normalized frequency (f/fs)
+ * \param i Tap relative to the center
+ * \return Sine of 2*pi*Freq*i
+ */
+static double SinPi(const double &Freq,const int &i){
+    double x=2*Freq*i;
+    return x==floor(x) ? 0 : sin(2*M_PI*Freq*i);
+}
 
 /*!\brief Constructor for base FIR object
  * \param Taps Number of taps in the filter
  */
-RTFIR::RTFIR(const unsigned int &Taps){
-    coeff=new double[Taps];
-    buffer=new double[Taps];
-    memset(buffer,0,Taps*sizeof(double));
+RTFIR::RTFIR(const unsigned int &Taps) : RTFIR(Taps,true){
+}
+
+/*!\brief Constructor for base FIR object with or without coefficients
+ *
+ * Sinc designs share their coefficients through the design cache, so they
+ * only allocate private coefficients in Design() when the design is not
+ * cached, and a cache hit allocates nothing but the delay line.
+ *
+ * \param Taps Number of taps in the filter
+ * \param Allocate True to allocate private coefficients, false to leave them to Design()
+ */
+RTFIR::RTFIR(const unsigned int &Taps,const bool &Allocate){
+    if(Allocate){
+        design.reset(new double[Taps],std::default_delete<double[]>());
+    }
+    coeff=design.get();
+    buffer=new double[2*Taps];
+    memset(buffer,0,2*Taps*sizeof(double));
     taps=Taps;
+    offset=0;
+    symmetry=0;
+    fold=RTFIR_FOLD_AUTO;
+    stats=RTFIR_stats();
+    type=RTFIR_DESIGN_LOWPASS;
+    window=RTFIR_WINDOW_RECTANGULAR;
+    beta=0;
+    designed=false;
+    fadelength=0;
+    fadeposition=0;
+    sparse=true;
+    stride=1;
+    nextphase=0;
 }
 
 /*!\brief Deconstructor for base FIR object
  */
 RTFIR::~RTFIR(){
-    delete [] coeff;
     delete [] buffer;
 }
 
+/*!\brief Check if a span of coefficients is (anti)symmetric
+ * \param First First coefficient of the span
+ * \param Last Last coefficient of the span
+ * \param Sign 1 to check for symmetry, -1 for antisymmetry
+ * \param Tolerance Allowed deviation relative to the largest coefficient
+ * \return True if the span is (anti)symmetric
+ */
+bool RTFIR::IsSymmetric(const unsigned int &First,const unsigned int &Last,const int &Sign,const double &Tolerance) const{
+    double peak=0;
+    for(unsigned int i=0;i<taps;i++){
+        peak=fmax(peak,fabs(coeff[i]));
+    }
+    for(unsigned int i=First,j=Last;i<j;i++,j--){
+        if(fabs(coeff[i]-Sign*coeff[j])>Tolerance*peak){
+            return false;
+        }
+    }
+    return true;
+}
+
+/*!\brief Selects folding of (anti)symmetric coefficients
+ *
+ * Linear phase filters have (anti)symmetric coefficients, so the mirrored
+ * samples can be added before multiplying, halving the multiplications.
+ * The windowed sinc designs are symmetric around the center tap, but an
+ * even number of taps leaves the first tap without a mirror, so spans
+ * excluding the first or last tap are considered as well. Taps outside the
+ * folded span are multiplied directly.
+ *
+ * \param Mode RTFIR_FOLD_AUTO to fold exactly (anti)symmetric coefficients,
+ *             RTFIR_FOLD_FORCE to fold nearly (anti)symmetric coefficients,
+ *             RTFIR_FOLD_DISABLE to always use the direct form
+ * \return True if the folded form is used
+ */
+bool RTFIR::SetFolding(const RTFIR_fold &Mode){
+    fold=Mode;
+    symmetry=0;
+    if(Mode==RTFIR_FOLD_DISABLE || taps<2){
+        Sparsify();
+        return false;
+    }
+
+    // Try the widest spans first
+    double tolerance=Mode==RTFIR_FOLD_FORCE ? 1e-9 : 0;
+    for(unsigned int trim=0;trim<3 && trim+2<=taps && !symmetry;trim++){
+        for(unsigned int head=0;head<=trim && !symmetry;head++){
+            unsigned int f=head;
+            unsigned int l=taps-1-(trim-head);
+            for(int sign=1;sign>=-1 && !symmetry;sign-=2){
+                if(IsSymmetric(f,l,sign,tolerance)){
+                    symmetry=sign;
+                    first=f;
+                    last=l;
+                }
+            }
+        }
+    }
+    Sparsify();
+    return symmetry!=0;
+}
+
+/*!\brief Selects the sparse form for coefficients with regular zeros
+ *
+ * Half-band designs, with the cutoff at a quarter of the samplerate, have
+ * every other coefficient zero apart from the center tap, and zero-stuffed
+ * filters have all but every n'th coefficient zero. The coefficients on
+ * such a stride all multiply samples of one phase of the input, so the
+ * delay line is also kept split into stride phases, where those samples
+ * are contiguous for the dot product kernels and fold like the full
+ * coefficients. The few non-zero coefficients off the stride, such as the
+ * center tap, are multiplied directly. The sparse form is used if it saves
+ * at least a quarter of the multiplications.
+ */
+void RTFIR::Sparsify(){
+    stride=1;
+    if(!sparse || taps<4){
+        return;
+    }
+    unsigned int dense=symmetry ? taps-(last-first+1)/2 : taps;
+    unsigned int nonzero=0;
+    for(unsigned int i=0;i<taps;i++){
+        nonzero+=coeff[i]!=0;
+    }
+    if(4*nonzero>3*taps){
+        return;
+    }
+
+    // Find the cheapest stride and phase with few non-zero taps off it
+    unsigned int cost=3*dense/4+1,bestresidue=0,bestcount=0;
+    int bestsymmetry=0;
+    for(unsigned int m=2;m<=SparseStride && 2*m<=taps;m++){
+        for(unsigned int r=0;r<m;r++){
+            unsigned int off=0;
+            for(unsigned int i=0;i<taps && off<=SparseExceptions;i++){
+                off+=i%m!=r && coeff[i]!=0;
+            }
+            if(off>SparseExceptions){
+                continue;
+            }
+            unsigned int count=(taps-1-r)/m+1;
+            bool folds=symmetry!=0;
+            for(unsigned int k=0;k<count/2 && folds;k++){
+                folds=coeff[r+k*m]==symmetry*coeff[r+(count-1-k)*m];
+            }
+            unsigned int c=(folds ? (count+1)/2 : count)+off;
+            if(c<cost){
+                cost=c;
+                stride=m;
+                bestresidue=r;
+                bestcount=count;
+                bestsymmetry=folds ? symmetry : 0;
+            }
+        }
+    }
+    if(stride==1){
+        return;
+    }
+
+    // Gather the coefficients on the stride and the taps off it, within
+    // the storage reserved by PrepareRetune
+    residue=bestresidue;
+    compact=bestcount;
+    compactsymmetry=bestsymmetry;
+    ReserveSparse();
+    compactcoeff.resize(compact);
+    exceptions.clear();
+    for(unsigned int i=0;i<taps;i++){
+        if(i%stride==residue){
+            compactcoeff[i/stride]=coeff[i];
+        }
+        else if(coeff[i]!=0){
+            exceptions.push_back(i);
+        }
+    }
+    phases.resize(2*stride*compact);
+    phaseoffsets.resize(stride);
+    nextphase=0;
+    SplitPhases();
+}
+
+/*!\brief Reserves the storage of the sparse form for any stride
+ */
+void RTFIR::ReserveSparse(){
+    compactcoeff.reserve(taps);
+    exceptions.reserve(SparseExceptions);
+    phases.reserve(2*(taps+SparseStride));
+    phaseoffsets.reserve(SparseStride);
+}
+
+/*!\brief Splits the delay line into the phases of the sparse form
+ */
+void RTFIR::SplitPhases(){
+    for(unsigned int q=0;q<stride;q++){
+        // The newest sample of this phase, counted back from the newest sample
+        unsigned int delay=(nextphase+2*stride-1-q)%stride;
+        double *line=&phases[2*q*compact];
+        for(unsigned int k=0;k<compact;k++){
+            unsigned int i=delay+k*stride;
+            line[k]=i<taps ? buffer[offset+i] : 0;
+            line[k+compact]=line[k];
+        }
+        phaseoffsets[q]=0;
+    }
+}
+
+/*!\brief Selects whether zeros of sparse coefficients are skipped
+ * \param Enable True to use the sparse form when it saves multiplications
+ * \return True if the sparse form is used
+ */
+bool RTFIR::SetSparse(const bool &Enable){
+    sparse=Enable;
+    Sparsify();
+    return stride>1;
+}
+
+/*!\brief Get the spacing of the coefficients multiplied in the sparse form
+ * \return Stride of the non-zero coefficients, or 1 if all are multiplied
+ */
+unsigned int RTFIR::GetStride() const{
+    return stride;
+}
+
+/*!\brief Get the folding mode reapplied when the coefficients change
+ * \return Mode last given to SetFolding()
+ */
+RTFIR_fold RTFIR::GetFolding() const{
+    return fold;
+}
+
+/*!\brief Get the symmetry used for folding
+ * \return 1 if symmetric, -1 if antisymmetric, 0 if not folded
+ */
+int RTFIR::GetSymmetry() const{
+    return symmetry;
+}
+
+/*!\brief Get the multiplications per sample
+ * \return Multiplications per filtered sample, halved by folding
+ */
+unsigned int RTFIR::GetCost() const{
+    if(stride>1){
+        return (compactsymmetry ? (compact+1)/2 : compact)+exceptions.size();
+    }
+    if(!symmetry){
+        return taps;
+    }
+    return taps-(last-first+1)/2;
+}
+
+/*!\brief Adds a sample to the delay line without filtering
+ * \param Sample Sample to add
+ */
+void RTFIR::Push(const double &Sample){
+    // Step back in the circular buffer and store the sample in both halves,
+    // so the latest taps samples are always contiguous from the offset
+    if(offset==0){
+        offset=taps;
+    }
+    offset--;
+    buffer[offset]=Sample;
+    buffer[offset+taps]=Sample;
+
+    // Store the sample in its phase of the sparse form as well
+    if(stride>1){
+        double *line=&phases[2*nextphase*compact];
+        unsigned int &o=phaseoffsets[nextphase];
+        if(o==0){
+            o=compact;
+        }
+        o--;
+        line[o]=Sample;
+        line[o+compact]=Sample;
+        if(++nextphase==stride){
+            nextphase=0;
+        }
+    }
+}
+
+/*!\brief Multiplies the latest samples with the coefficients
+ * \param Window Latest taps samples, newest first
+ * \return Filtered sample
+ */
+double RTFIR::Convolve(const double *Window) const{
+    if(stride>1){
+        return ConvolveSparse(Window);
+    }
+    if(!symmetry){
+        return RTFIR_dot(Window,coeff,taps);
+    }
+
+    // Add mirrored samples and multiply once
+    unsigned int half=(last-first+1)/2;
+    double output=RTFIR_dot_folded(&Window[first],&Window[last],&coeff[first],half,symmetry);
+    if((last-first)%2==0){
+        output+=Window[first+half]*coeff[first+half];
+    }
+    for(unsigned int i=0;i<first;i++){
+        output+=Window[i]*coeff[i];
+    }
+    for(unsigned int i=last+1;i<taps;i++){
+        output+=Window[i]*coeff[i];
+    }
+    return output;
+}
+
+/*!\brief Multiplies the latest samples with the non-zero coefficients
+ * \param Window Latest taps samples, newest first
+ * \return Filtered sample
+ */
+double RTFIR::ConvolveSparse(const double *Window) const{
+    // The newest sample on the stride is residue samples old, and its phase
+    // holds the rest of them contiguously
+    unsigned int q=nextphase+stride-1-residue;
+    if(q>=stride){
+        q-=stride;
+    }
+    const double *line=&phases[2*q*compact+phaseoffsets[q]];
+    double output;
+    if(compactsymmetry){
+        unsigned int half=compact/2;
+        output=RTFIR_dot_folded(line,&line[compact-1],&compactcoeff[0],half,compactsymmetry);
+        if(compact%2){
+            output+=line[half]*compactcoeff[half];
+        }
+    }
+    else{
+        output=RTFIR_dot(line,&compactcoeff[0],compact);
+    }
+    for(unsigned int e=0;e<exceptions.size();e++){
+        output+=Window[exceptions[e]]*coeff[exceptions[e]];
+    }
+    return output;
+}
+
+/*!\brief Crossfades from the previous coefficients after a retune
+ * \param Output Sample filtered with the current coefficients
+ * \param Window Latest taps samples, newest first
+ * \return Output mixed with the output of the previous coefficients
+ */
+double RTFIR::Crossfade(const double &Output,const double *Window){
+    if(fadeposition==fadelength){
+        return Output;
+    }
+    double previous=RTFIR_dot(Window,&fade[0],taps);
+    fadeposition++;
+    return previous+(Output-previous)*fadeposition/fadelength;
+}
+
 /*!\brief Filters input data
  * \param Sample Sample to filter
  * \return Filtered sample
  */
 double RTFIR::Filter(const double &Sample){
-    // Roll back samplebuffer
-    memmove(&buffer[1],&buffer[0],(taps-1)*sizeof(*buffer));
-    buffer[0]=Sample;
+    RTFIR_STATS_COUNT(1,false);
+    Push(Sample);
+    return Crossfade(Convolve(&buffer[offset]),&buffer[offset]);
+}
 
-    // Perform multiplication
-    double output=0;
-    for(unsigned int i=0;i<taps;i++){
-        output+=buffer[i]*coeff[i];
+/*!\brief Filters a block of input data
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR::FilterBlock(const double *Input,double *Output,const unsigned int &Length){
+    RTFIR_STATS_COUNT(Length,true);
+    for(unsigned int i=0;i<Length;i++){
+        Push(Input[i]);
+        Output[i]=Crossfade(Convolve(&buffer[offset]),&buffer[offset]);
     }
-    return output;  
 }
 
 /*!\brief Get a list of coefficients for debugging
@@ -56,45 +452,457 @@ std::vector<double> RTFIR::GetCoefficients() const{
     return c;
 }
 
+/*!\brief Get the delay line of the filter
+ *
+ * Only the latest taps-1 samples affect later outputs, so they are the
+ * whole state of the filter apart from its coefficients. Filtering resumes
+ * exactly where it left off after setting the state on a filter with the
+ * same coefficients.
+ *
+ * \return Latest taps-1 samples, oldest first
+ */
+std::vector<double> RTFIR::GetState() const{
+    std::vector<double> state(taps-1);
+    for(unsigned int i=0;i+1<taps;i++){
+        state[i]=buffer[offset+taps-2-i];
+    }
+    return state;
+}
+
+/*!\brief Set the delay line of the filter
+ * \param State Latest taps-1 samples, oldest first
+ */
+void RTFIR::SetState(const std::vector<double> &State){
+    if(State.size()!=taps-1){
+        throw std::invalid_argument("Expected taps-1 samples of state");
+    }
+    memset(buffer,0,2*taps*sizeof(double));
+    for(unsigned int i=0;i+1<taps;i++){
+        buffer[i]=State[taps-2-i];
+        buffer[i+taps]=State[taps-2-i];
+    }
+    offset=0;
+    if(stride>1){
+        SplitPhases();
+    }
+}
+
+/*!\brief Prepares the filter for retuning without allocations
+ *
+ * Retuning writes new coefficients into the existing storage, so a filter
+ * sharing a cached design first gets a private copy of the coefficients,
+ * and storage for the coefficients faded out from is allocated. This
+ * happens on the first retune, unless prepared in advance, so call this
+ * outside the realtime thread to keep later retunes free of allocations.
+ */
+void RTFIR::PrepareRetune(){
+    if(design.use_count()>1){
+        std::shared_ptr<double> copy(new double[taps],std::default_delete<double[]>());
+        memcpy(copy.get(),coeff,taps*sizeof(double));
+        design=copy;
+        coeff=design.get();
+    }
+    fade.resize(taps);
+    ReserveSparse();
+}
+
+/*!\brief Starts a crossfade from the current coefficients
+ *
+ * If a crossfade is already running, the mix heard so far is faded out
+ * from, so the output stays continuous.
+ *
+ * \param Fade Samples to crossfade over, or zero to switch at once
+ */
+void RTFIR::StartCrossfade(const unsigned int &Fade){
+    if(Fade){
+        for(unsigned int i=0;i<taps;i++){
+            if(fadeposition<fadelength){
+                fade[i]+=(coeff[i]-fade[i])*fadeposition/fadelength;
+            }
+            else{
+                fade[i]=coeff[i];
+            }
+        }
+    }
+    fadelength=Fade;
+    fadeposition=0;
+}
+
+/*!\brief Retunes the cutoff-frequencies of the filter
+ *
+ * Regenerates the coefficients of the design the filter was constructed
+ * with, keeping the taps, window and delay line, so the output continues
+ * without the transient of a new filter. With a crossfade, the outputs of
+ * the previous and new coefficients are mixed linearly over Fade samples,
+ * which costs a second dot product per sample while fading. Folding is
+ * selected again in the mode last given to SetFolding().
+ *
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), ignored by lowpass and highpass
+ * \param Fade Samples to crossfade over, or zero to switch at once
+ */
+void RTFIR::Retune(const double &Freq1,const double &Freq2,const unsigned int &Fade){
+    if(!designed){
+        throw std::invalid_argument("Only sinc designs can be retuned");
+    }
+    bool band=type==RTFIR_DESIGN_BANDPASS || type==RTFIR_DESIGN_BANDSTOP;
+    if(Freq1<0.0 || Freq1>0.5 || (band && (Freq2<0.0 || Freq2>0.5))){
+        throw std::invalid_argument("Frequencies must be normalized");
+    }
+    PrepareRetune();
+    StartCrossfade(Fade);
+    Sinc(type,Freq1,Freq2);
+    ApplyWindow(window,beta);
+    SetFolding(fold);
+}
+
+/*!\brief Replaces the coefficients of the filter
+ *
+ * Works like Retune() with coefficients from any design. Retuning
+ * afterwards regenerates the design the filter was constructed with.
+ *
+ * \param Coeff New coefficients, one per tap
+ * \param Fade Samples to crossfade over, or zero to switch at once
+ */
+void RTFIR::SetCoefficients(const std::vector<double> &Coeff,const unsigned int &Fade){
+    if(Coeff.size()!=taps){
+        throw std::invalid_argument("Expected one coefficient per tap");
+    }
+    PrepareRetune();
+    StartCrossfade(Fade);
+    for(unsigned int i=0;i<taps;i++){
+        coeff[i]=Coeff[i];
+    }
+    SetFolding(fold);
+}
+
+/*!\brief Get the statistics of the filter
+ *
+ * Calls are only counted and timed if the library is compiled with
+ * RTFIR_STATS defined, otherwise the statistics stay zero.
+ *
+ * \return Statistics since the filter was constructed or last reset
+ */
+RTFIR_stats RTFIR::GetStats() const{
+    return stats;
+}
+
+/*!\brief Reset the statistics of the filter
+ */
+void RTFIR::ResetStats(){
+    stats=RTFIR_stats();
+}
+
+/*!\brief Check if the library counts statistics
+ * \return True if compiled with RTFIR_STATS
+ */
+bool RTFIR::StatsEnabled(){
+#ifdef RTFIR_STATS
+    return true;
+#else
+    return false;
+#endif
+}
+
+/*!\brief Selects the dot product kernels used by all filters
+ *
+ * The fastest kernel supported by the CPU is selected when the library is
+ * loaded. The selection is not synchronized, so it must not be changed
+ * while other threads filter.
+ *
+ * \param Kernel Kernel to use, or RTFIR_KERNEL_AUTO for the fastest supported
+ * \return True if the kernel is supported by this CPU
+ */
+bool RTFIR::SetKernel(const RTFIR_kernel &Kernel){
+    return RTFIR_select_kernel(Kernel);
+}
+
+/*!\brief Get the dot product kernels used by all filters
+ * \return Kernel in use
+ */
+RTFIR_kernel RTFIR::GetKernel(){
+    return RTFIR_active_kernel;
+}
+
+//! Key of a design in the design cache
+typedef std::tuple<int,unsigned int,double,double,int,double> RTFIR_design_key;
+
+//! Designs in the design cache, most recently used first, and their index
+struct RTFIR_cache_state {
+    std::mutex lock;
+    std::list<std::pair<RTFIR_design_key,std::shared_ptr<double> > > designs;
+    std::map<RTFIR_design_key,std::list<std::pair<RTFIR_design_key,std::shared_ptr<double> > >::iterator> index;
+    RTFIR_cache_stats stats;
+    RTFIR_cache_state() : stats() {
+        stats.capacity=64;
+    }
+};
+
+/*!\brief Get the design cache shared by all filters
+ * \return Design cache, created on first use
+ */
+static RTFIR_cache_state &CacheState(){
+    static RTFIR_cache_state state;
+    return state;
+}
+
+/*!\brief Drops the least recently used designs exceeding the capacity
+ * \param State Design cache, which must be locked
+ */
+static void CacheEvict(RTFIR_cache_state &State){
+    while(State.designs.size()>State.stats.capacity){
+        State.index.erase(State.designs.back().first);
+        State.designs.pop_back();
+        State.stats.evictions++;
+    }
+    State.stats.size=State.designs.size();
+}
+
+/*!\brief Set the maximum number of cached designs
+ *
+ * Filters with identical type, taps and normalized frequencies share one
+ * immutable copy of their coefficients through the design cache, instead of
+ * computing and storing their own. When more than Capacity designs are
+ * cached, the least recently used one is dropped from the cache, but lives
+ * on until the last filter using it is destroyed. The cache is thread safe.
+ *
+ * \param Capacity Maximum number of cached designs, zero to disable caching
+ */
+void RTFIR_cache::SetCapacity(const unsigned int &Capacity){
+    RTFIR_cache_state &state=CacheState();
+    std::lock_guard<std::mutex> guard(state.lock);
+    state.stats.capacity=Capacity;
+    CacheEvict(state);
+}
+
+/*!\brief Get the maximum number of cached designs
+ * \return Maximum number of cached designs
+ */
+unsigned int RTFIR_cache::GetCapacity(){
+    RTFIR_cache_state &state=CacheState();
+    std::lock_guard<std::mutex> guard(state.lock);
+    return state.stats.capacity;
+}
+
+/*!\brief Get the statistics of the design cache
+ * \return Hits, misses, evictions, size and capacity of the cache
+ */
+RTFIR_cache_stats RTFIR_cache::GetStats(){
+    RTFIR_cache_state &state=CacheState();
+    std::lock_guard<std::mutex> guard(state.lock);
+    return state.stats;
+}
+
+/*!\brief Drops all designs from the cache
+ *
+ * Filters using the designs keep working, and free the designs when destroyed.
+ */
+void RTFIR_cache::Clear(){
+    RTFIR_cache_state &state=CacheState();
+    std::lock_guard<std::mutex> guard(state.lock);
+    state.designs.clear();
+    state.index.clear();
+    state.stats.size=0;
+}
+
+/*!\brief Use the coefficients of a cached design
+ * \param Type Type of design
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), or zero
+ * \param Window Window applied to the coefficients
+ * \param Beta Shape of the Kaiser window, or zero
+ * \return True if the design was cached, otherwise the coefficients must be computed and stored
+ */
+bool RTFIR::Lookup(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2,const RTFIR_window &Window,const double &Beta){
+    RTFIR_cache_state &state=CacheState();
+    std::lock_guard<std::mutex> guard(state.lock);
+    RTFIR_design_key key(Type,taps,Freq1,Freq2,Window,Window==RTFIR_WINDOW_KAISER ? Beta : 0);
+    auto found=state.index.find(key);
+    if(found==state.index.end()){
+        state.stats.misses++;
+        return false;
+    }
+
+    // Mark as most recently used and share the coefficients
+    state.designs.splice(state.designs.begin(),state.designs,found->second);
+    state.stats.hits++;
+    design=found->second->second;
+    coeff=design.get();
+    return true;
+}
+
+/*!\brief Add the computed coefficients to the design cache
+ * \param Type Type of design
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), or zero
+ * \param Window Window applied to the coefficients
+ * \param Beta Shape of the Kaiser window, or zero
+ */
+void RTFIR::Store(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2,const RTFIR_window &Window,const double &Beta){
+    RTFIR_cache_state &state=CacheState();
+    std::lock_guard<std::mutex> guard(state.lock);
+    RTFIR_design_key key(Type,taps,Freq1,Freq2,Window,Window==RTFIR_WINDOW_KAISER ? Beta : 0);
+    if(!state.stats.capacity || state.index.count(key)){
+        return;
+    }
+    state.designs.push_front(std::make_pair(key,design));
+    state.index[key]=state.designs.begin();
+    CacheEvict(state);
+}
+
+/*!\brief Modified Bessel function of the first kind and order zero
+ * \param X Argument
+ * \return I0(X)
+ */
+static double BesselI0(const double &X){
+    double sum=1.0;
+    double term=1.0;
+    for(int k=1;term>1e-17*sum;k++){
+        term*=(X/(2*k))*(X/(2*k));
+        sum+=term;
+    }
+    return sum;
+}
+
+/*!\brief Multiplies the coefficients with a window
+ *
+ * The window is centered on the center tap of the sinc designs, so the
+ * coefficients stay (anti)symmetric. Must be called before Store().
+ *
+ * \param Window Window to apply
+ * \param Beta Shape of the Kaiser window
+ */
+void RTFIR::ApplyWindow(const RTFIR_window &Window,const double &Beta){
+    int W=taps/2;
+    if(Window==RTFIR_WINDOW_RECTANGULAR || W==0){
+        return;
+    }
+    for(int i=-W;i<(int)taps-W;i++){
+        double x=(double)i/W;
+        double w=1.0;
+        switch(Window){
+            case RTFIR_WINDOW_HAMMING:  w=0.54+0.46*cos(M_PI*x);                    break;
+            case RTFIR_WINDOW_BLACKMAN: w=0.42+0.5*cos(M_PI*x)+0.08*cos(2*M_PI*x);  break;
+            case RTFIR_WINDOW_KAISER:   w=BesselI0(Beta*sqrt(1-x*x))/BesselI0(Beta); break;
+            default:                    break;
+        }
+        coeff[i+W]*=w;
+    }
+}
+
+/*!\brief Generates the coefficients of a sinc design
+ * \param Type Type of design
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), ignored by lowpass and highpass
+ */
+void RTFIR::Sinc(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2){
+    int W=taps/2;
+    for(int i=-W;i<(int)taps-W;i++){
+        switch(Type){
+            case RTFIR_DESIGN_LOWPASS:
+                coeff[i+W]=i==0 ? 2*Freq1 : SinPi(Freq1,i)/(i*(M_PI));
+                break;
+            case RTFIR_DESIGN_HIGHPASS:
+                coeff[i+W]=i==0 ? 1-(2*Freq1) : -SinPi(Freq1,i)/(i*M_PI);
+                break;
+            case RTFIR_DESIGN_BANDPASS:
+                coeff[i+W]=i==0 ? ((2*M_PI*Freq2)-(2*M_PI*Freq1))/M_PI : (SinPi(Freq2,i)-SinPi(Freq1,i))/(i*M_PI);
+                break;
+            case RTFIR_DESIGN_BANDSTOP:
+                coeff[i+W]=i==0 ? 1+((2*M_PI*Freq1)-(2*M_PI*Freq2))/M_PI : (SinPi(Freq1,i)-SinPi(Freq2,i))/(i*M_PI);
+                break;
+        }
+    }
+}
+
+/*!\brief Sets up the coefficients of a windowed sinc design
+ *
+ * The coefficients are shared through the design cache, and only computed
+ * in private storage when the design is not cached. The design is recorded
+ * so Retune() can regenerate it.
+ *
+ * \param Type Type of design
+ * \param Freq1 Normalized (lower) cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs), or zero
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
+ */
+void RTFIR::Design(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2,const RTFIR_window &Window,const double &Beta){
+    type=Type;
+    window=Window;
+    beta=Beta;
+    designed=true;
+    if(!Lookup(Type,Freq1,Freq2,Window,Beta)){
+        design.reset(new double[taps],std::default_delete<double[]>());
+        coeff=design.get();
+        Sinc(Type,Freq1,Freq2);
+        ApplyWindow(Window,Beta);
+        Store(Type,Freq1,Freq2,Window,Beta);
+    }
+    SetFolding(RTFIR_FOLD_AUTO);
+}
+
+/*!\brief Get the Kaiser window shape for a stopband attenuation
+ * \param Attenuation Stopband attenuation in dB
+ * \return Beta of the Kaiser window
+ */
+double RTFIR::KaiserBeta(const double &Attenuation){
+    if(Attenuation>50){
+        return 0.1102*(Attenuation-8.7);
+    }
+    if(Attenuation>=21){
+        return 0.5842*pow(Attenuation-21,0.4)+0.07886*(Attenuation-21);
+    }
+    return 0.0;
+}
+
+/*!\brief Get the minimum number of taps of a Kaiser windowed design
+ *
+ * Uses the Kaiser formula, rounded up to an odd number of taps so the
+ * design is symmetric around the center tap, which highpass designs need.
+ *
+ * \param Transition Normalized width of the transition band (f/fs)
+ * \param Attenuation Stopband attenuation in dB
+ * \return Number of taps
+ */
+unsigned int RTFIR::KaiserTaps(const double &Transition,const double &Attenuation){
+    if(Transition<=0.0 || Transition>0.5 || Attenuation<=0.0){
+        throw std::invalid_argument("Invalid filter specification");
+    }
+    unsigned int t=(unsigned int)ceil((Attenuation-7.95)/(2.285*2*M_PI*Transition))+1;
+    if(t<3){
+        t=3;
+    }
+    return t|1;
+}
+
 /*!\brief Constructor for lowpass FIR filter
  * \param Taps Number of taps in the FIR filter
  * \param Freq Normalized cutoff-frequency (f/fs)
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
  */
-RTFIR_lowpass::RTFIR_lowpass(const unsigned int &Taps,const double &Freq) : RTFIR(Taps){
+RTFIR_lowpass::RTFIR_lowpass(const unsigned int &Taps,const double &Freq,const RTFIR_window &Window,const double &Beta) : RTFIR(Taps,false){
     if (Freq<0.0 || Freq>0.5){
         throw std::invalid_argument("Frequencies must be normalized");
     }
     else{
-        int W=Taps/2;
-        for(int i=-W;i<W;i++){
-            if(i==0){
-                coeff[W]=2*Freq;
-            }
-            else{      
-                coeff[i+W]=sin(2*(M_PI)*Freq*i)/(i*(M_PI));
-            }
-        }
+        Design(RTFIR_DESIGN_LOWPASS,Freq,0,Window,Beta);
     }
 }
 
 /*!\brief Constructor for highpass FIR filter
  * \param Taps Number of taps in the FIR filter
  * \param Freq Normalized cutoff-frequency (f/fs)
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
  */
-RTFIR_highpass::RTFIR_highpass(const unsigned int &Taps,const double &Freq) : RTFIR(Taps){
+RTFIR_highpass::RTFIR_highpass(const unsigned int &Taps,const double &Freq,const RTFIR_window &Window,const double &Beta) : RTFIR(Taps,false){
     if (Freq<0.0 || Freq>0.5){
         throw std::invalid_argument("Frequencies must be normalized");
     }
     else{
-        int W=Taps/2;
-        for(int i=-W;i<W;i++){
-            if(i==0){
-                coeff[W]=1-(2*Freq);
-            }
-            else{
-                coeff[i+W]=-sin(2*M_PI*Freq*i)/(i*M_PI);
-            }
-        }
+        Design(RTFIR_DESIGN_HIGHPASS,Freq,0,Window,Beta);
     }
 }
 
@@ -102,21 +910,15 @@ RTFIR_highpass::RTFIR_highpass(const unsigned int &Taps,const double &Freq) : RT
  * \param Taps Number of taps in the FIR filter
  * \param Low Normalized lower cutoff-frequency (f/fs)
  * \param High Normalized higher cutoff-frequency (f/fs)
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
  */
-RTFIR_bandpass::RTFIR_bandpass(const unsigned int &Taps,const double &Low,const double &High) : RTFIR(Taps){
+RTFIR_bandpass::RTFIR_bandpass(const unsigned int &Taps,const double &Low,const double &High,const RTFIR_window &Window,const double &Beta) : RTFIR(Taps,false){
     if (Low<0.0 || Low>0.5 || High<0.0 || High>0.5){
         throw std::invalid_argument("Frequencies must be normalized");
     }
     else{
-        int W=Taps/2;
-        for(int i=-W;i<W;i++){
-            if(i==0){
-                coeff[W]=((2*M_PI*High)-(2*M_PI*Low))/M_PI;
-            }
-            else{
-                coeff[i+W]=(sin(2*M_PI*High*i)-sin(2*M_PI*Low*i))/(i*M_PI);
-            }
-        }
+        Design(RTFIR_DESIGN_BANDPASS,Low,High,Window,Beta);
     }
 }
 
@@ -124,21 +926,1642 @@ RTFIR_bandpass::RTFIR_bandpass(const unsigned int &Taps,const double &Low,const
  * \param Taps Number of taps in the FIR filter
  * \param Low Normalized lower cutoff-frequency (f/fs)
  * \param High Normalized higher cutoff-frequency (f/fs)
+ * \param Window Window to apply to the coefficients
+ * \param Beta Shape of the Kaiser window, ignored by other windows
  */
-RTFIR_bandstop::RTFIR_bandstop(const unsigned int &Taps,const double &Low,const double &High) : RTFIR(Taps){
+RTFIR_bandstop::RTFIR_bandstop(const unsigned int &Taps,const double &Low,const double &High,const RTFIR_window &Window,const double &Beta) : RTFIR(Taps,false){
     if (Low<0.0 || Low>0.5 || High<0.0 || High>0.5){
         throw std::invalid_argument("Frequencies must be normalized");
     }
     else{
-        int W=Taps/2;
-        for(int i=-W;i<W;i++){
-            if(i==0){
-                coeff[W]=1+((2*M_PI*Low)-(2*M_PI*High))/M_PI;
-            }
-            else{
-                coeff[i+W]=(sin(2*M_PI*Low*i)-sin(2*M_PI*High*i))/(i*M_PI);
-            }
-        }
+        Design(RTFIR_DESIGN_BANDSTOP,Low,High,Window,Beta);
     }
 }
 
+
+/*!\brief Constructor for the shortest Kaiser windowed lowpass meeting a specification
+ * \param Pass Normalized passband edge (f/fs)
+ * \param Stop Normalized stopband edge (f/fs), above Pass
+ * \param Attenuation Stopband attenuation in dB
+ */
+RTFIR_kaiser_lowpass::RTFIR_kaiser_lowpass(const double &Pass,const double &Stop,const double &Attenuation) :
+        RTFIR_lowpass(KaiserTaps(Stop-Pass,Attenuation),(Pass+Stop)/2,RTFIR_WINDOW_KAISER,KaiserBeta(Attenuation)){
+}
+
+/*!\brief Constructor for the shortest Kaiser windowed highpass meeting a specification
+ * \param Pass Normalized passband edge (f/fs)
+ * \param Stop Normalized stopband edge (f/fs), below Pass
+ * \param Attenuation Stopband attenuation in dB
+ */
+RTFIR_kaiser_highpass::RTFIR_kaiser_highpass(const double &Pass,const double &Stop,const double &Attenuation) :
+        RTFIR_highpass(KaiserTaps(Pass-Stop,Attenuation),(Pass+Stop)/2,RTFIR_WINDOW_KAISER,KaiserBeta(Attenuation)){
+}
+
+// Cost of a multiply in the FFT relative to one in the direct form with the
+// SIMD kernels, measured on x86-64 with AVX2
+static const double FFTCostRatio=3.0;
+
+/*!\brief Constructor for FFT based FIR filter
+ *
+ * Filters with the coefficients of an existing filter using uniformly
+ * partitioned overlap-save convolution. The coefficients are split into
+ * partitions of BlockSize samples, so each block costs two FFT's of
+ * 2*BlockSize points plus one complex multiplication per partition and bin.
+ * The output is delayed by BlockSize samples compared to the direct form.
+ *
+ * If Automatic is set and the estimated cost of the FFT is higher than
+ * the direct form, the filter falls back to direct filtering without any
+ * added latency.
+ *
+ * \param Design Filter to copy coefficients from
+ * \param BlockSize Samples per block, rounded up to a power of two. Zero
+ *                  selects the smallest power of two covering all taps
+ * \param Automatic Choose between FFT and direct filtering by cost
+ */
+RTFIR_fft::RTFIR_fft(const RTFIR &Design,const unsigned int &BlockSize,const bool &Automatic) : RTFIR(Design.GetCoefficients().size()){
+    std::vector<double> c=Design.GetCoefficients();
+    for(unsigned int i=0;i<taps;i++){
+        coeff[i]=c[i];
+    }
+    SetFolding(RTFIR_FOLD_AUTO);
+
+    // Select block size
+    unsigned int target=BlockSize ? BlockSize : taps;
+    blocksize=1;
+    while(blocksize<target){
+        blocksize<<=1;
+    }
+    partitions=(taps+blocksize-1)/blocksize;
+    position=0;
+    head=0;
+
+    // Estimate cost per sample in multiplications for each method. A
+    // complex FFT of N points is N/2*log2(N) butterflies of 4 multiplies,
+    // and each partition adds one complex multiply of 4 multiplies per bin.
+    // The direct form multiplies GetCost() taps with the SIMD kernels, which
+    // measures about FFTCostRatio times faster per multiply.
+    unsigned int N=2*blocksize;
+    unsigned int stages=0;
+    while((1u<<stages)<N){
+        stages++;
+    }
+    double fftcost=(2.0*2.0*N*stages+4.0*N*partitions)/blocksize;
+    if(Automatic && FFTCostRatio*fftcost>=GetCost()){
+        blocksize=0;
+        partitions=0;
+        return;
+    }
+
+    // Bit reversal permutation and twiddle factors
+    reversed.resize(N);
+    for(unsigned int i=0;i<N;i++){
+        unsigned int r=0;
+        for(unsigned int b=0;b<stages;b++){
+            r|=((i>>b)&1)<<(stages-1-b);
+        }
+        reversed[i]=r;
+    }
+    twiddles.resize(N/2);
+    for(unsigned int i=0;i<N/2;i++){
+        twiddles[i]=std::polar(1.0,-2*M_PI*i/N);
+    }
+
+    // Transform partitions of zero-padded coefficients
+    spectra.assign(N*partitions,0);
+    TransformCoefficients();
+    history.assign(N*partitions,0);
+    work.assign(N,0);
+    input.assign(N,0);
+    output.assign(blocksize,0);
+    past.assign(taps-1+blocksize,0);
+}
+
+/*!\brief In-place radix-2 FFT
+ * \param Data 2*blocksize complex values to transform
+ * \param Inverse Perform unscaled inverse transform
+ */
+void RTFIR_fft::Transform(std::complex<double> *Data,const bool &Inverse){
+    unsigned int N=2*blocksize;
+    for(unsigned int i=0;i<N;i++){
+        if(i<reversed[i]){
+            std::swap(Data[i],Data[reversed[i]]);
+        }
+    }
+    for(unsigned int size=2;size<=N;size<<=1){
+        unsigned int half=size/2;
+        unsigned int step=N/size;
+        for(unsigned int start=0;start<N;start+=size){
+            for(unsigned int i=0;i<half;i++){
+                std::complex<double> w=Inverse ? std::conj(twiddles[i*step]) : twiddles[i*step];
+                std::complex<double> t=w*Data[start+i+half];
+                Data[start+i+half]=Data[start+i]-t;
+                Data[start+i]+=t;
+            }
+        }
+    }
+}
+
+/*!\brief Transforms partitions of zero-padded coefficients into the spectra
+ */
+void RTFIR_fft::TransformCoefficients(){
+    unsigned int N=2*blocksize;
+    for(unsigned int p=0;p<partitions;p++){
+        for(unsigned int i=0;i<N;i++){
+            spectra[p*N+i]=i<blocksize && p*blocksize+i<taps ? coeff[p*blocksize+i] : 0;
+        }
+        Transform(&spectra[p*N],false);
+    }
+}
+
+/*!\brief Replaces the coefficients of the filter, keeping its delay line
+ *
+ * The spectra of the partitions are transformed again in place, so this
+ * does not allocate once prepared, but FFT convolution can not crossfade.
+ *
+ * \param Coeff New coefficients, one per tap
+ * \param Fade Samples to crossfade over, which must be zero when using FFT
+ */
+void RTFIR_fft::SetCoefficients(const std::vector<double> &Coeff,const unsigned int &Fade){
+    if(blocksize && Fade){
+        throw std::invalid_argument("FFT filters can not crossfade");
+    }
+    RTFIR::SetCoefficients(Coeff,Fade);
+    TransformCoefficients();
+}
+
+/*!\brief Get the delay line of the filter
+ *
+ * When using FFT, the outputs still pending are delayed by GetLatency()
+ * samples, so the state holds the latest taps-1+GetLatency() samples
+ * before the current block followed by the samples of the current block.
+ * Its length tells how far the current block is filled.
+ *
+ * \return Latest taps-1 samples, or taps-1+GetLatency() samples plus the
+ *         current block when using FFT, oldest first
+ */
+std::vector<double> RTFIR_fft::GetState() const{
+    if(!blocksize){
+        return RTFIR::GetState();
+    }
+    std::vector<double> state(past);
+    state.insert(state.end(),input.begin()+blocksize,input.begin()+blocksize+position);
+    return state;
+}
+
+/*!\brief Set the delay line of the filter
+ *
+ * When using FFT, the blocks are transformed again from the samples, so
+ * the output matches that of the filter the state was taken from within
+ * rounding.
+ *
+ * \param State Samples returned by GetState(), oldest first
+ */
+void RTFIR_fft::SetState(const std::vector<double> &State){
+    if(!blocksize){
+        RTFIR::SetState(State);
+        return;
+    }
+    unsigned int length=taps-1+blocksize;
+    if(State.size()<length || State.size()>=length+blocksize){
+        throw std::invalid_argument("Expected taps-1+GetLatency() samples of state plus the current block");
+    }
+    std::fill(history.begin(),history.end(),0);
+    std::fill(input.begin(),input.end(),0);
+    std::fill(output.begin(),output.end(),0);
+    head=0;
+
+    // Start part way into a block of zeros, so the state ends as far into
+    // the current block as it did when it was taken
+    position=(blocksize-(taps-1)%blocksize)%blocksize;
+    for(unsigned int i=0;i<State.size();i++){
+        input[blocksize+position]=State[i];
+        if(++position==blocksize){
+            ProcessBlock();
+            position=0;
+        }
+    }
+}
+
+/*!\brief Filters the current input block
+ */
+void RTFIR_fft::ProcessBlock(){
+    // Transform the latest 2*blocksize samples into the delay line
+    unsigned int N=2*blocksize;
+    head=head ? head-1 : partitions-1;
+    std::complex<double> *x=&history[head*N];
+    for(unsigned int i=0;i<N;i++){
+        x[i]=input[i];
+    }
+    Transform(x,false);
+
+    // Multiply and accumulate with the partitions
+    for(unsigned int i=0;i<N;i++){
+        work[i]=0;
+    }
+    for(unsigned int p=0;p<partitions;p++){
+        const std::complex<double> *h=&spectra[p*N];
+        x=&history[((head+p)%partitions)*N];
+        for(unsigned int i=0;i<N;i++){
+            work[i]+=x[i]*h[i];
+        }
+    }
+
+    // Keep the last half of the circular convolution
+    Transform(&work[0],true);
+    for(unsigned int i=0;i<blocksize;i++){
+        output[i]=work[blocksize+i].real()/N;
+        input[i]=input[blocksize+i];
+    }
+
+    // Keep the samples before the next block for GetState
+    std::copy(past.begin()+blocksize,past.end(),past.begin());
+    std::copy(input.begin(),input.begin()+blocksize,past.end()-blocksize);
+}
+
+/*!\brief Filters input data
+ * \param Sample Sample to filter
+ * \return Filtered sample, delayed by GetLatency() samples
+ */
+double RTFIR_fft::Filter(const double &Sample){
+    if(!blocksize){
+        return RTFIR::Filter(Sample);
+    }
+    RTFIR_STATS_COUNT(1,false);
+    double y=output[position];
+    input[blocksize+position]=Sample;
+    if(++position==blocksize){
+        ProcessBlock();
+        position=0;
+    }
+    return y;
+}
+
+/*!\brief Filters a block of input data
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_fft::FilterBlock(const double *Input,double *Output,const unsigned int &Length){
+    if(!blocksize){
+        RTFIR::FilterBlock(Input,Output,Length);
+        return;
+    }
+    RTFIR_STATS_COUNT(Length,true);
+    unsigned int done=0;
+    while(done<Length){
+        unsigned int n=std::min(blocksize-position,Length-done);
+        for(unsigned int i=0;i<n;i++){
+            double x=Input[done+i];
+            Output[done+i]=output[position+i];
+            input[blocksize+position+i]=x;
+        }
+        position+=n;
+        done+=n;
+        if(position==blocksize){
+            ProcessBlock();
+            position=0;
+        }
+    }
+}
+
+/*!\brief Get the number of samples per FFT block
+ * \return Block size, or zero when filtering directly
+ */
+unsigned int RTFIR_fft::GetBlockSize() const{
+    return blocksize;
+}
+
+/*!\brief Get the latency added compared to direct filtering
+ * \return Latency in samples
+ */
+unsigned int RTFIR_fft::GetLatency() const{
+    return blocksize;
+}
+
+/*!\brief Check whether the FFT or the direct form is used
+ * \return True if the filter uses FFT convolution
+ */
+bool RTFIR_fft::UsesFFT() const{
+    return blocksize>0;
+}
+
+/*!\brief Check that a filter can be merged into a chain or bank
+ *
+ * Chains and banks run the coefficients of their filters in the direct
+ * form, which would drop the FFT engine and its latency.
+ *
+ * \param Filter Filter to check
+ */
+static void RejectFFT(const RTFIR *Filter){
+    const RTFIR_fft *fft=dynamic_cast<const RTFIR_fft*>(Filter);
+    if(fft && fft->UsesFFT()){
+        throw std::invalid_argument("FFT filters can not be chained or banked");
+    }
+}
+
+/*!\brief Check that a filter filters at the rate of a chain or bank
+ *
+ * Chains and banks filter every sample with the coefficients of their
+ * filters, which would drop the decimation.
+ *
+ * \param Filter Filter to check
+ */
+static void RejectDecimator(const RTFIR *Filter){
+    if(dynamic_cast<const RTFIR_decimator*>(Filter)){
+        throw std::invalid_argument("Decimators can not be chained or banked");
+    }
+}
+
+// Samples filtered through all stages of a chain at a time
+static const unsigned int ChainChunk=256;
+
+/*!\brief Get the number of taps of the convolution of the stages
+ * \param Stages Filters in series
+ * \return Number of taps of the fused filter
+ */
+static unsigned int ChainTaps(const std::vector<RTFIR*> &Stages){
+    if(Stages.empty()){
+        throw std::invalid_argument("At least one stage is required");
+    }
+    unsigned int taps=1;
+    for(unsigned int s=0;s<Stages.size();s++){
+        taps+=Stages[s]->GetCoefficients().size()-1;
+    }
+    return taps;
+}
+
+/*!\brief Constructor for a chain of filters in series
+ *
+ * Filtering with a series of FIR filters equals filtering once with the
+ * convolution of their coefficients, which has one tap less per stage
+ * than the stages together. The fused filter is used unless running the
+ * stages is cheaper, which happens when the stages fold but the fused
+ * coefficients do not. Staged blocks are filtered a chunk at a time
+ * through all stages, so the samples stay in the cache between stages.
+ * The stages are copied with their folding, and the coefficients of the
+ * chain are those of the fused filter either way.
+ *
+ * \param Stages Filters to copy, in the order they filter
+ * \param Plan RTFIR_CHAIN_AUTO to pick the cheaper plan, or the plan to use
+ */
+RTFIR_chain::RTFIR_chain(const std::vector<RTFIR*> &Stages,const RTFIR_chain_plan &Plan) : RTFIR(ChainTaps(Stages)){
+    // Convolve the coefficients of the stages
+    std::vector<double> fused(1,1.0);
+    count=Stages.size();
+    staged=0;
+    for(unsigned int s=0;s<count;s++){
+        RejectFFT(Stages[s]);
+        RejectDecimator(Stages[s]);
+        const RTFIR &stage=*Stages[s];
+        std::vector<double> next(fused.size()+stage.taps-1,0);
+        for(unsigned int i=0;i<fused.size();i++){
+            for(unsigned int j=0;j<stage.taps;j++){
+                next[i+j]+=fused[i]*stage.coeff[j];
+            }
+        }
+        fused.swap(next);
+        staged+=stage.GetCost();
+    }
+    for(unsigned int i=0;i<taps;i++){
+        coeff[i]=fused[i];
+    }
+
+    // Rounding in the convolution breaks exact symmetry, so fold nearly
+    // (anti)symmetric coefficients
+    SetFolding(RTFIR_FOLD_FORCE);
+
+    // Pick the plan with the fewest multiplications per sample
+    plan=Plan;
+    if(Plan==RTFIR_CHAIN_AUTO){
+        plan=RTFIR::GetCost()<=staged ? RTFIR_CHAIN_FUSED : RTFIR_CHAIN_STAGED;
+    }
+    if(plan==RTFIR_CHAIN_FUSED){
+        return;
+    }
+
+    // Copy the stages
+    for(unsigned int s=0;s<count;s++){
+        const RTFIR &stage=*Stages[s];
+        RTFIR *copy=new RTFIR(stage.taps);
+        memcpy(copy->coeff,stage.coeff,stage.taps*sizeof(double));
+        copy->symmetry=stage.symmetry;
+        copy->fold=stage.fold;
+        copy->first=stage.first;
+        copy->last=stage.last;
+        copy->sparse=stage.sparse;
+        copy->Sparsify();
+        stages.push_back(copy);
+    }
+}
+
+/*!\brief Deconstructor for a chain of filters
+ */
+RTFIR_chain::~RTFIR_chain(){
+    for(unsigned int s=0;s<stages.size();s++){
+        delete stages[s];
+    }
+}
+
+/*!\brief Filters a sample through all stages
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+double RTFIR_chain::Filter(const double &Sample){
+    if(plan==RTFIR_CHAIN_FUSED){
+        return RTFIR::Filter(Sample);
+    }
+    RTFIR_STATS_COUNT(1,false);
+    Push(Sample);
+    double y=Sample;
+    for(unsigned int s=0;s<count;s++){
+        y=stages[s]->Filter(y);
+    }
+    return y;
+}
+
+/*!\brief Filters a block of input data through all stages
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_chain::FilterBlock(const double *Input,double *Output,const unsigned int &Length){
+    if(plan==RTFIR_CHAIN_FUSED){
+        RTFIR::FilterBlock(Input,Output,Length);
+        return;
+    }
+    RTFIR_STATS_COUNT(Length,true);
+
+    // Keep the delay line of the fused filter for GetState
+    for(unsigned int i=0;i<Length;i++){
+        Push(Input[i]);
+    }
+
+    // Run each chunk through all stages while it is in the cache
+    for(unsigned int done=0;done<Length;done+=ChainChunk){
+        unsigned int n=std::min(ChainChunk,Length-done);
+        stages[0]->FilterBlock(&Input[done],&Output[done],n);
+        for(unsigned int s=1;s<count;s++){
+            stages[s]->FilterBlock(&Output[done],&Output[done],n);
+        }
+    }
+}
+
+/*!\brief Set the delay line of the chain
+ *
+ * The delay lines of the stages are primed by filtering the state through
+ * them, which leaves them exactly as if the samples were filtered before,
+ * since the state spans the delay lines of all stages.
+ *
+ * \param State Latest taps-1 samples, oldest first
+ */
+void RTFIR_chain::SetState(const std::vector<double> &State){
+    RTFIR::SetState(State);
+    if(plan==RTFIR_CHAIN_FUSED){
+        return;
+    }
+    for(unsigned int s=0;s<count;s++){
+        stages[s]->SetState(std::vector<double>(stages[s]->taps-1,0));
+    }
+    std::vector<double> scratch(std::min(ChainChunk,taps));
+    for(unsigned int done=0;done<State.size();done+=ChainChunk){
+        unsigned int n=std::min(ChainChunk,(unsigned int)State.size()-done);
+        stages[0]->FilterBlock(&State[done],&scratch[0],n);
+        for(unsigned int s=1;s<count;s++){
+            stages[s]->FilterBlock(&scratch[0],&scratch[0],n);
+        }
+    }
+}
+
+/*!\brief Refuses new coefficients for the chain
+ *
+ * The coefficients of a chain are the convolution of its stages, and the
+ * staged plan filters with copies of the stages, so replacing them would
+ * leave GetCoefficients() and the output disagreeing. Chain new stages
+ * instead.
+ */
+void RTFIR_chain::SetCoefficients(const std::vector<double>&,const unsigned int&){
+    throw std::invalid_argument("Chains can not take new coefficients, chain new stages instead");
+}
+
+/*!\brief Get the plan the chain filters with
+ * \return RTFIR_CHAIN_FUSED or RTFIR_CHAIN_STAGED
+ */
+RTFIR_chain_plan RTFIR_chain::GetPlan() const{
+    return plan;
+}
+
+/*!\brief Get the number of stages in the chain
+ * \return Number of stages
+ */
+unsigned int RTFIR_chain::GetStages() const{
+    return count;
+}
+
+/*!\brief Get the multiplications per sample of the plan in use
+ * \return Multiplications per filtered sample
+ */
+unsigned int RTFIR_chain::GetCost() const{
+    return plan==RTFIR_CHAIN_FUSED ? RTFIR::GetCost() : staged;
+}
+
+/*!\brief Adds the mirrored samples of a folded span
+ *
+ * The folded window holds the sums of the mirrored samples, the center
+ * sample of an odd span, and the samples before and after the span, in
+ * the order RTFIR::Convolve multiplies them. With Sign zero, the
+ * coefficients are gathered in the same order.
+ *
+ * \param Window Latest Taps samples, newest first, or coefficients
+ * \param Taps Number of coefficients
+ * \param First First coefficient of the folded span
+ * \param Last Last coefficient of the folded span
+ * \param Sign 1 if symmetric, -1 if antisymmetric, 0 to gather coefficients
+ * \param Folded Buffer to receive the folded window
+ * \return Number of samples in the folded window
+ */
+static unsigned int FoldWindow(const double *Window,const unsigned int &Taps,const unsigned int &First,const unsigned int &Last,const double &Sign,double *Folded){
+    unsigned int half=(Last-First+1)/2,n=0;
+    for(unsigned int i=0;i<half;i++){
+        Folded[n++]=Window[First+i]+Sign*Window[Last-i];
+    }
+    if((Last-First)%2==0){
+        Folded[n++]=Window[First+half];
+    }
+    for(unsigned int i=0;i<First;i++){
+        Folded[n++]=Window[i];
+    }
+    for(unsigned int i=Last+1;i<Taps;i++){
+        Folded[n++]=Window[i];
+    }
+    return n;
+}
+
+/*!\brief Constructor for a bank of filters sharing one delay line
+ *
+ * All filters share one delay line, long enough for the longest filter,
+ * so each input sample is stored once and every filter multiplies the
+ * latest samples in the same pass. Each filter keeps its coefficients and
+ * folding. Filters with the same taps and folding are grouped, so the
+ * mirrored samples are added once per group, and the filters of a group
+ * are multiplied four at a time with their coefficients interleaved, so
+ * the kernel accumulates four filters per sample in one vector.
+ *
+ * \param Filters Filters to copy coefficients and folding from
+ */
+RTFIR_bank::RTFIR_bank(const std::vector<RTFIR*> &Filters){
+    if(Filters.empty()){
+        throw std::invalid_argument("At least one filter is required");
+    }
+    taps=0;
+    offset=0;
+    for(unsigned int k=0;k<Filters.size();k++){
+        RejectFFT(Filters[k]);
+        RejectDecimator(Filters[k]);
+    }
+    for(unsigned int k=0;k<Filters.size();k++){
+        const RTFIR &filter=*Filters[k];
+        RTFIR *band=new RTFIR(filter.taps);
+        memcpy(band->coeff,filter.coeff,filter.taps*sizeof(double));
+        band->symmetry=filter.symmetry;
+        band->first=filter.first;
+        band->last=filter.last;
+        bands.push_back(band);
+        taps=std::max(taps,filter.taps);
+    }
+    buffer=new double[2*taps];
+    memset(buffer,0,2*taps*sizeof(double));
+    folded=new double[taps];
+
+    // Group the filters by taps and folding
+    for(unsigned int k=0;k<bands.size();k++){
+        const RTFIR &band=*bands[k];
+        unsigned int first=band.symmetry ? band.first : 0;
+        unsigned int last=band.symmetry ? band.last : band.taps-1;
+        unsigned int g=0;
+        while(g<groups.size() && (groups[g].taps!=band.taps || groups[g].symmetry!=band.symmetry || groups[g].first!=first || groups[g].last!=last)){
+            g++;
+        }
+        if(g==groups.size()){
+            Group group;
+            group.taps=band.taps;
+            group.symmetry=band.symmetry;
+            group.first=first;
+            group.last=last;
+            group.length=band.symmetry ? FoldWindow(band.coeff,band.taps,first,last,0,folded) : band.taps;
+            groups.push_back(group);
+        }
+        groups[g].filters.push_back(k);
+    }
+
+    // Interleave the coefficients of four filters at a time, in the order
+    // of the folded window
+    for(unsigned int g=0;g<groups.size();g++){
+        Group &group=groups[g];
+        unsigned int quads=group.filters.size()/4;
+        group.coeff.assign(4*quads*group.length,0);
+        for(unsigned int k=0;k<4*quads;k++){
+            const RTFIR &band=*bands[group.filters[k]];
+            const double *ordered=band.coeff;
+            if(group.symmetry){
+                FoldWindow(band.coeff,band.taps,group.first,group.last,0,folded);
+                ordered=folded;
+            }
+            double *lanes=&group.coeff[(k/4)*4*group.length+k%4];
+            for(unsigned int i=0;i<group.length;i++){
+                lanes[4*i]=ordered[i];
+            }
+        }
+    }
+}
+
+/*!\brief Deconstructor for a bank of filters
+ */
+RTFIR_bank::~RTFIR_bank(){
+    for(unsigned int k=0;k<bands.size();k++){
+        delete bands[k];
+    }
+    delete [] buffer;
+    delete [] folded;
+}
+
+/*!\brief Filters a sample with all filters
+ * \param Sample Sample to filter
+ * \param Outputs Buffer to receive the filtered samples
+ * \param Stride Distance between the outputs of consecutive filters
+ */
+inline void RTFIR_bank::Compute(const double &Sample,double *Outputs,const unsigned int &Stride){
+    // Store the sample once in both halves of the shared delay line
+    if(offset==0){
+        offset=taps;
+    }
+    offset--;
+    buffer[offset]=Sample;
+    buffer[offset+taps]=Sample;
+
+    // Every filter multiplies the latest of the same samples, folded once
+    // per group and four filters at a time
+    const double *window=&buffer[offset];
+    for(unsigned int g=0;g<groups.size();g++){
+        const Group &group=groups[g];
+        unsigned int quads=group.filters.size()/4;
+        const double *samples=window;
+        if(quads && group.symmetry){
+            FoldWindow(window,group.taps,group.first,group.last,group.symmetry,folded);
+            samples=folded;
+        }
+        double lanes[4];
+        for(unsigned int q=0;q<quads;q++){
+            RTFIR_dot4(samples,&group.coeff[4*q*group.length],group.length,lanes);
+            for(unsigned int l=0;l<4;l++){
+                Outputs[group.filters[4*q+l]*Stride]=lanes[l];
+            }
+        }
+        for(unsigned int k=4*quads;k<group.filters.size();k++){
+            Outputs[group.filters[k]*Stride]=bands[group.filters[k]]->Convolve(window);
+        }
+    }
+}
+
+/*!\brief Filters a sample with all filters
+ * \param Sample Sample to filter
+ * \param Outputs Buffer to receive one filtered sample per filter
+ */
+void RTFIR_bank::Filter(const double &Sample,double *Outputs){
+    Compute(Sample,Outputs,1);
+}
+
+/*!\brief Filters a block of input data with all filters
+ * \param Input Samples to filter
+ * \param Outputs Buffer to receive filters x Length samples, the output of
+ *                each filter following the previous
+ * \param Length Number of samples in Input
+ */
+void RTFIR_bank::FilterBlock(const double *Input,double *Outputs,const unsigned int &Length){
+    for(unsigned int i=0;i<Length;i++){
+        Compute(Input[i],&Outputs[i],Length);
+    }
+}
+
+/*!\brief Get the number of filters in the bank
+ * \return Number of filters
+ */
+unsigned int RTFIR_bank::GetFilters() const{
+    return bands.size();
+}
+
+/*!\brief Get the coefficients of a filter in the bank
+ * \param Index Filter to get the coefficients of
+ * \return List of FIR coefficients
+ */
+std::vector<double> RTFIR_bank::GetCoefficients(const unsigned int &Index) const{
+    if(Index>=bands.size()){
+        throw std::invalid_argument("No such filter");
+    }
+    return bands[Index]->GetCoefficients();
+}
+
+/*!\brief Get the shared delay line of the bank
+ * \return Latest taps-1 samples of the longest filter, oldest first
+ */
+std::vector<double> RTFIR_bank::GetState() const{
+    std::vector<double> state(taps-1);
+    for(unsigned int i=0;i+1<taps;i++){
+        state[i]=buffer[offset+taps-2-i];
+    }
+    return state;
+}
+
+/*!\brief Set the shared delay line of the bank
+ * \param State Latest taps-1 samples of the longest filter, oldest first
+ */
+void RTFIR_bank::SetState(const std::vector<double> &State){
+    if(State.size()!=taps-1){
+        throw std::invalid_argument("Expected taps-1 samples of state");
+    }
+    memset(buffer,0,2*taps*sizeof(double));
+    for(unsigned int i=0;i+1<taps;i++){
+        buffer[i]=State[taps-2-i];
+        buffer[i+taps]=State[taps-2-i];
+    }
+    offset=0;
+}
+
+/*!\brief Constructor for multichannel FIR filter
+ *
+ * All channels share one copy of the coefficients of an existing filter,
+ * and the delay line is interleaved so each frame of channel samples is
+ * contiguous.
+ *
+ * \param Design Filter to copy coefficients from
+ * \param Channels Number of channels to filter
+ */
+RTFIR_multichannel::RTFIR_multichannel(const RTFIR &Design,const unsigned int &Channels){
+    if(!Channels){
+        throw std::invalid_argument("At least one channel is required");
+    }
+    std::vector<double> c=Design.GetCoefficients();
+    taps=c.size();
+    channels=Channels;
+    offset=0;
+    coeff=new double[taps];
+    buffer=new double[2*taps*channels];
+    memset(buffer,0,2*taps*channels*sizeof(double));
+    for(unsigned int i=0;i<taps;i++){
+        coeff[i]=c[i];
+    }
+}
+
+/*!\brief Deconstructor for multichannel FIR filter
+ */
+RTFIR_multichannel::~RTFIR_multichannel(){
+    delete [] coeff;
+    delete [] buffer;
+}
+
+/*!\brief Filters a frame of one sample per channel
+ * \param Frame Samples to filter, one per channel
+ * \param Output Buffer to receive one filtered sample per channel (may equal Frame)
+ */
+void RTFIR_multichannel::Filter(const double *Frame,double *Output){
+    // Step back in the circular buffer and store the frame in both halves
+    if(offset==0){
+        offset=taps;
+    }
+    offset--;
+    memcpy(&buffer[offset*channels],Frame,channels*sizeof(double));
+    memcpy(&buffer[(offset+taps)*channels],Frame,channels*sizeof(double));
+
+    // Accumulate four channels at a time in registers, stepping through
+    // the interleaved frames tap by tap
+    const double *window=&buffer[offset*channels];
+    unsigned int j=0;
+    for(;j+4<=channels;j+=4){
+        double a0=0,a1=0,a2=0,a3=0;
+        const double *frame=&window[j];
+        for(unsigned int i=0;i<taps;i++,frame+=channels){
+            const double c=coeff[i];
+            a0+=frame[0]*c;
+            a1+=frame[1]*c;
+            a2+=frame[2]*c;
+            a3+=frame[3]*c;
+        }
+        Output[j]=a0;
+        Output[j+1]=a1;
+        Output[j+2]=a2;
+        Output[j+3]=a3;
+    }
+    for(;j<channels;j++){
+        double a=0;
+        const double *frame=&window[j];
+        for(unsigned int i=0;i<taps;i++,frame+=channels){
+            a+=frame[0]*coeff[i];
+        }
+        Output[j]=a;
+    }
+}
+
+/*!\brief Filters a block of frames
+ * \param Frames Length frames of one sample per channel to filter
+ * \param Output Buffer to receive the filtered frames (may equal Frames)
+ * \param Length Number of frames in Frames and Output
+ */
+void RTFIR_multichannel::FilterBlock(const double *Frames,double *Output,const unsigned int &Length){
+    for(unsigned int i=0;i<Length;i++){
+        Filter(&Frames[i*channels],&Output[i*channels]);
+    }
+}
+
+/*!\brief Get the number of channels
+ * \return Number of samples per frame
+ */
+unsigned int RTFIR_multichannel::GetChannels() const{
+    return channels;
+}
+
+/*!\brief Get a list of coefficients for debugging
+ * \return List of FIR coefficients
+ */
+std::vector<double> RTFIR_multichannel::GetCoefficients() const{
+    return std::vector<double>(coeff,coeff+taps);
+}
+
+/*!\brief Get the delay line of the filter
+ * \return Latest taps-1 frames, oldest first
+ */
+std::vector<double> RTFIR_multichannel::GetState() const{
+    std::vector<double> state((taps-1)*channels);
+    for(unsigned int i=0;i+1<taps;i++){
+        memcpy(&state[i*channels],&buffer[(offset+taps-2-i)*channels],channels*sizeof(double));
+    }
+    return state;
+}
+
+/*!\brief Set the delay line of the filter
+ * \param State Latest taps-1 frames, oldest first
+ */
+void RTFIR_multichannel::SetState(const std::vector<double> &State){
+    if(State.size()!=(taps-1)*channels){
+        throw std::invalid_argument("Expected taps-1 frames of state");
+    }
+    memset(buffer,0,2*taps*channels*sizeof(double));
+    for(unsigned int i=0;i+1<taps;i++){
+        memcpy(&buffer[i*channels],&State[(taps-2-i)*channels],channels*sizeof(double));
+        memcpy(&buffer[(i+taps)*channels],&State[(taps-2-i)*channels],channels*sizeof(double));
+    }
+    offset=0;
+}
+
+/*!\brief Constructor for decimating lowpass FIR filter
+ *
+ * Only every Factor'th output of the lowpass filter is kept, so only those
+ * outputs are computed. Each kept output is the sum over all polyphase
+ * branches, evaluated directly on the full rate delay line, which costs
+ * taps/Factor multiplications per input sample.
+ *
+ * \param Taps Number of taps in the FIR filter
+ * \param Factor Decimation factor
+ * \param Freq Normalized cutoff-frequency (f/fs), or zero for 0.5/Factor
+ */
+RTFIR_decimator::RTFIR_decimator(const unsigned int &Taps,const unsigned int &Factor,const double &Freq) : RTFIR_lowpass(Taps,Freq>0 ? Freq : 0.5/(Factor ? Factor : 1)){
+    if(!Factor){
+        throw std::invalid_argument("Decimation factor must be positive");
+    }
+    factor=Factor;
+    phase=0;
+}
+
+/*!\brief Filters and decimates Factor samples
+ * \param Samples Factor samples to filter
+ * \return Filtered sample
+ */
+double RTFIR_decimator::Filter(const double *Samples){
+    double output=0;
+    FilterBlock(Samples,factor,&output);
+    return output;
+}
+
+/*!\brief Filters and decimates a block of input data
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Output Buffer to receive GetOutputLength(Length) filtered samples
+ * \return Number of filtered samples written to Output
+ */
+unsigned int RTFIR_decimator::FilterBlock(const double *Input,const unsigned int &Length,double *Output){
+    unsigned int n=0;
+    for(unsigned int i=0;i<Length;i++){
+        Push(Input[i]);
+        if(++phase==factor){
+            phase=0;
+            Output[n++]=Crossfade(Convolve(&buffer[offset]),&buffer[offset]);
+        }
+    }
+    return n;
+}
+
+/*!\brief Get the decimation factor
+ * \return Decimation factor
+ */
+unsigned int RTFIR_decimator::GetFactor() const{
+    return factor;
+}
+
+/*!\brief Get the number of outputs produced by a block
+ * \param Length Number of input samples
+ * \return Number of filtered samples FilterBlock() will produce
+ */
+unsigned int RTFIR_decimator::GetOutputLength(const unsigned int &Length) const{
+    return (phase+Length)/factor;
+}
+
+/*!\brief Constructor for polyphase resampling FIR filter
+ *
+ * Resamples by Up/Down by upsampling, lowpass filtering and downsampling.
+ * The lowpass prototype is split into Up polyphase branches, so the zeros
+ * inserted by upsampling are never multiplied and only the kept outputs
+ * are computed.
+ *
+ * \param Taps Number of taps in the prototype lowpass filter
+ * \param Up Interpolation factor
+ * \param Down Decimation factor
+ * \param Freq Normalized cutoff-frequency of the prototype (f/(Up*fs)),
+ *             or zero for 0.5/max(Up,Down)
+ */
+RTFIR_resampler::RTFIR_resampler(const unsigned int &Taps,const unsigned int &Up,const unsigned int &Down,const double &Freq){
+    if(!Up || !Down){
+        throw std::invalid_argument("Resampling factors must be positive");
+    }
+    std::vector<double> prototype=RTFIR_lowpass(Taps,Freq>0 ? Freq : 0.5/std::max(Up,Down)).GetCoefficients();
+    taps=Taps;
+    length=(Taps+Up-1)/Up;
+    up=Up;
+    down=Down;
+    offset=0;
+    phase=0;
+    coeff=new double[up*length];
+    buffer=new double[2*length];
+    memset(buffer,0,2*length*sizeof(double));
+
+    // Split prototype into branches, compensating for the upsampling gain
+    for(unsigned int k=0;k<up;k++){
+        for(unsigned int j=0;j<length;j++){
+            unsigned int i=j*up+k;
+            coeff[k*length+j]=i<taps ? up*prototype[i] : 0;
+        }
+    }
+}
+
+/*!\brief Deconstructor for polyphase resampling FIR filter
+ */
+RTFIR_resampler::~RTFIR_resampler(){
+    delete [] coeff;
+    delete [] buffer;
+}
+
+/*!\brief Resamples a block of input data
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Output Buffer to receive GetOutputLength(Length) samples
+ * \return Number of samples written to Output
+ */
+unsigned int RTFIR_resampler::FilterBlock(const double *Input,const unsigned int &Length,double *Output){
+    unsigned int n=0;
+    for(unsigned int i=0;i<Length;i++){
+        // Step back in the circular buffer and store the sample in both halves
+        if(offset==0){
+            offset=length;
+        }
+        offset--;
+        buffer[offset]=Input[i];
+        buffer[offset+length]=Input[i];
+
+        // Compute the outputs falling within this input sample
+        const double *window=&buffer[offset];
+        while(phase<up){
+            Output[n++]=RTFIR_dot(window,&coeff[phase*length],length);
+            phase+=down;
+        }
+        phase-=up;
+    }
+    return n;
+}
+
+/*!\brief Get the number of outputs produced by a block
+ * \param Length Number of input samples
+ * \return Number of samples FilterBlock() will produce
+ */
+unsigned int RTFIR_resampler::GetOutputLength(const unsigned int &Length) const{
+    unsigned long long span=(unsigned long long)Length*up;
+    if(span<=phase){
+        return 0;
+    }
+    return (span-phase+down-1)/down;
+}
+
+/*!\brief Get the interpolation factor
+ * \return Interpolation factor
+ */
+unsigned int RTFIR_resampler::GetUp() const{
+    return up;
+}
+
+/*!\brief Get the decimation factor
+ * \return Decimation factor
+ */
+unsigned int RTFIR_resampler::GetDown() const{
+    return down;
+}
+
+/*!\brief Get a list of coefficients for debugging
+ * \return List of prototype coefficients, including the gain of Up
+ */
+std::vector<double> RTFIR_resampler::GetCoefficients() const{
+    std::vector<double> c(taps);
+    for(unsigned int i=0;i<taps;i++){
+        c[i]=coeff[(i%up)*length+i/up];
+    }
+    return c;
+}
+
+/*!\brief Constructor for polyphase interpolating FIR filter
+ * \param Taps Number of taps in the prototype lowpass filter
+ * \param Factor Interpolation factor
+ * \param Freq Normalized cutoff-frequency of the prototype (f/(Factor*fs)),
+ *             or zero for 0.5/Factor
+ */
+RTFIR_interpolator::RTFIR_interpolator(const unsigned int &Taps,const unsigned int &Factor,const double &Freq) : RTFIR_resampler(Taps,Factor,1,Freq){
+}
+
+/*!\brief Adds a value to a sum, keeping the rounding error separately
+ * \param Sum Sum to add to
+ * \param Compensation Rounding error of Sum
+ * \param Value Value to add
+ */
+static inline void AddCompensated(double &Sum,double &Compensation,const double &Value){
+    double t=Sum+Value;
+    if(fabs(Sum)>=fabs(Value)){
+        Compensation+=(Sum-t)+Value;
+    }
+    else{
+        Compensation+=(Value-t)+Sum;
+    }
+    Sum=t;
+}
+
+/*!\brief Constructor for moving average filter
+ *
+ * Averages the latest Length samples with a running sum, so each sample
+ * costs the same whatever the length. The sum is compensated for rounding,
+ * and replaced every Length samples by a sum of only the samples in the
+ * buffer, so it never drifts from the samples it averages.
+ *
+ * \param Length Number of samples averaged
+ * \param Factor Decimation factor, 1 to keep every output
+ */
+RTFIR_moving_average::RTFIR_moving_average(const unsigned int &Length,const unsigned int &Factor){
+    if(!Length || !Factor){
+        throw std::invalid_argument("Length and decimation factor must be positive");
+    }
+    length=Length;
+    factor=Factor;
+    offset=0;
+    phase=0;
+    count=0;
+    sum=0;
+    compensation=0;
+    fresh=0;
+    freshcompensation=0;
+    buffer=new double[length];
+    memset(buffer,0,length*sizeof(double));
+}
+
+/*!\brief Destructor for moving average filter
+ */
+RTFIR_moving_average::~RTFIR_moving_average(){
+    delete [] buffer;
+}
+
+/*!\brief Adds a sample to the running sums
+ * \param Sample Sample to add
+ */
+void RTFIR_moving_average::Push(const double &Sample){
+    double oldest=buffer[offset];
+    buffer[offset]=Sample;
+    if(++offset==length){
+        offset=0;
+    }
+    AddCompensated(sum,compensation,Sample);
+    AddCompensated(sum,compensation,-oldest);
+    AddCompensated(fresh,freshcompensation,Sample);
+
+    // The fresh sum holds exactly the buffer every length samples
+    if(++count==length){
+        sum=fresh;
+        compensation=freshcompensation;
+        fresh=0;
+        freshcompensation=0;
+        count=0;
+    }
+}
+
+/*!\brief Filters and decimates Factor samples
+ * \param Samples Factor samples to filter
+ * \return Average of the latest Length samples
+ */
+double RTFIR_moving_average::Filter(const double *Samples){
+    double output=0;
+    FilterBlock(Samples,factor,&output);
+    return output;
+}
+
+/*!\brief Filters and decimates a block of input data
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Output Buffer to receive GetOutputLength(Length) filtered samples
+ * \return Number of filtered samples written to Output
+ */
+unsigned int RTFIR_moving_average::FilterBlock(const double *Input,const unsigned int &Length,double *Output){
+    unsigned int n=0;
+    for(unsigned int i=0;i<Length;i++){
+        Push(Input[i]);
+        if(++phase==factor){
+            phase=0;
+            Output[n++]=(sum+compensation)/length;
+        }
+    }
+    return n;
+}
+
+/*!\brief Get the number of samples averaged
+ * \return Number of samples averaged
+ */
+unsigned int RTFIR_moving_average::GetLength() const{
+    return length;
+}
+
+/*!\brief Get the decimation factor
+ * \return Decimation factor
+ */
+unsigned int RTFIR_moving_average::GetFactor() const{
+    return factor;
+}
+
+/*!\brief Get the number of outputs produced by a block
+ * \param Length Number of input samples
+ * \return Number of filtered samples FilterBlock() will produce
+ */
+unsigned int RTFIR_moving_average::GetOutputLength(const unsigned int &Length) const{
+    return (phase+Length)/factor;
+}
+
+/*!\brief Constructor for cascaded integrator-comb filter
+ *
+ * Filters with Stages moving sums of Factor*Delay samples in series, using
+ * an integrator per stage at the input rate and a comb per stage at the
+ * output rate, so each sample costs the same whatever the length. The
+ * integrators wrap modulo 2^64, which the combs undo exactly, so the
+ * output never drifts. The output is not normalized, divide by GetGain()
+ * for unity gain at DC.
+ *
+ * \param Stages Number of integrator and comb stages
+ * \param Factor Decimation factor, 1 to keep every output
+ * \param Delay Differential delay of the combs
+ */
+RTFIR_cic::RTFIR_cic(const unsigned int &Stages,const unsigned int &Factor,const unsigned int &Delay){
+    if(!Stages || !Factor || !Delay){
+        throw std::invalid_argument("Stages, decimation factor and delay must be positive");
+    }
+
+    // The gain must leave room for 32 bit samples in 64 bit outputs
+    uint64_t gain=1,length=(uint64_t)Factor*Delay,limit=(uint64_t)1<<32;
+    for(unsigned int k=0;k<Stages;k++){
+        if(length>limit/gain){
+            throw std::invalid_argument("Gain of the filter must not exceed 2^32");
+        }
+        gain*=length;
+    }
+    stages=Stages;
+    factor=Factor;
+    delay=Delay;
+    offset=0;
+    phase=0;
+    integrators=new uint64_t[stages];
+    delays=new uint64_t[stages*delay];
+    memset(integrators,0,stages*sizeof(uint64_t));
+    memset(delays,0,stages*delay*sizeof(uint64_t));
+}
+
+/*!\brief Destructor for cascaded integrator-comb filter
+ */
+RTFIR_cic::~RTFIR_cic(){
+    delete [] integrators;
+    delete [] delays;
+}
+
+/*!\brief Filters and decimates Factor samples
+ * \param Samples Factor samples to filter
+ * \return Filtered sample
+ */
+int64_t RTFIR_cic::Filter(const int32_t *Samples){
+    int64_t output=0;
+    FilterBlock(Samples,factor,&output);
+    return output;
+}
+
+/*!\brief Filters and decimates a block of input data
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Output Buffer to receive GetOutputLength(Length) filtered samples
+ * \return Number of filtered samples written to Output
+ */
+unsigned int RTFIR_cic::FilterBlock(const int32_t *Input,const unsigned int &Length,int64_t *Output){
+    unsigned int n=0;
+    for(unsigned int i=0;i<Length;i++){
+        // Integrate at the input rate
+        uint64_t value=(uint64_t)(int64_t)Input[i];
+        for(unsigned int k=0;k<stages;k++){
+            integrators[k]+=value;
+            value=integrators[k];
+        }
+
+        // Comb at the output rate
+        if(++phase==factor){
+            phase=0;
+            uint64_t *line=&delays[offset];
+            for(unsigned int k=0;k<stages;k++){
+                uint64_t oldest=line[k*delay];
+                line[k*delay]=value;
+                value-=oldest;
+            }
+            if(++offset==delay){
+                offset=0;
+            }
+            Output[n++]=(int64_t)value;
+        }
+    }
+    return n;
+}
+
+/*!\brief Get the number of integrator and comb stages
+ * \return Number of stages
+ */
+unsigned int RTFIR_cic::GetStages() const{
+    return stages;
+}
+
+/*!\brief Get the decimation factor
+ * \return Decimation factor
+ */
+unsigned int RTFIR_cic::GetFactor() const{
+    return factor;
+}
+
+/*!\brief Get the differential delay of the combs
+ * \return Differential delay
+ */
+unsigned int RTFIR_cic::GetDelay() const{
+    return delay;
+}
+
+/*!\brief Get the gain at DC
+ * \return (Factor*Delay)^Stages
+ */
+double RTFIR_cic::GetGain() const{
+    return pow((double)factor*delay,stages);
+}
+
+/*!\brief Get the number of outputs produced by a block
+ * \param Length Number of input samples
+ * \return Number of filtered samples FilterBlock() will produce
+ */
+unsigned int RTFIR_cic::GetOutputLength(const unsigned int &Length) const{
+    return (phase+Length)/factor;
+}
+
+/*!\brief Rounds a value to a fixed-point integer
+ * \param Value Value to quantize, nominally within [-1,1)
+ * \param Bits Number of fractional bits
+ * \return Rounded value saturated to [-2^Bits,2^Bits-1]
+ */
+static int64_t Quantize(const double &Value,const int &Bits){
+    double scale=ldexp(1.0,Bits);
+    double q=floor(Value*scale+0.5);
+    return (int64_t)std::min(std::max(q,-scale),scale-1);
+}
+
+/*!\brief Adds two accumulators, saturating instead of wrapping on overflow
+ * \param A First term
+ * \param B Second term
+ * \return Saturated sum
+ */
+static int64_t AddSaturate(const int64_t &A,const int64_t &B){
+    if(B>0 && A>INT64_MAX-B){
+        return INT64_MAX;
+    }
+    if(B<0 && A<INT64_MIN-B){
+        return INT64_MIN;
+    }
+    return A+B;
+}
+
+/*!\brief Rounds an accumulator to the output format
+ * \param Accumulator Sum of products with 2*Bits fractional bits
+ * \param Bits Number of fractional bits of the output
+ * \param Min Smallest output value
+ * \param Max Largest output value
+ * \return Rounded output saturated to [Min,Max]
+ */
+static int64_t Saturate(const int64_t &Accumulator,const int &Bits,const int64_t &Min,const int64_t &Max){
+    int64_t half=(int64_t)1<<(Bits-1);
+    int64_t value=Accumulator>INT64_MAX-half ? Max : (Accumulator+half)>>Bits;
+    return std::min(std::max(value,Min),Max);
+}
+
+/*!\brief Constructor for single precision FIR filter
+ *
+ * The coefficients of an existing filter are rounded to float, halving the
+ * memory bandwidth and allowing single precision FPUs to do the work.
+ *
+ * \param Design Filter to copy the coefficients from
+ */
+RTFIR_float::RTFIR_float(const RTFIR &Design){
+    std::vector<double> c=Design.GetCoefficients();
+    taps=c.size();
+    offset=0;
+    coeff=new float[taps];
+    buffer=new float[2*taps];
+    memset(buffer,0,2*taps*sizeof(float));
+    for(unsigned int i=0;i<taps;i++){
+        coeff[i]=(float)c[i];
+    }
+}
+
+/*!\brief Deconstructor for single precision FIR filter
+ */
+RTFIR_float::~RTFIR_float(){
+    delete [] coeff;
+    delete [] buffer;
+}
+
+/*!\brief Filters input data
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+float RTFIR_float::Filter(const float &Sample){
+    // Step back in the circular buffer and store the sample in both halves
+    if(offset==0){
+        offset=taps;
+    }
+    offset--;
+    buffer[offset]=Sample;
+    buffer[offset+taps]=Sample;
+
+    // Perform multiplication
+    const float *window=&buffer[offset];
+    float output=0.0f;
+    for(unsigned int i=0;i<taps;i++){
+        output+=window[i]*coeff[i];
+    }
+    return output;
+}
+
+/*!\brief Filters a block of input data
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_float::FilterBlock(const float *Input,float *Output,const unsigned int &Length){
+    for(unsigned int i=0;i<Length;i++){
+        Output[i]=Filter(Input[i]);
+    }
+}
+
+/*!\brief Get a list of coefficients for debugging
+ * \return List of Single precision coefficients
+ */
+std::vector<float> RTFIR_float::GetCoefficients() const{
+    return std::vector<float>(coeff,coeff+taps);
+}
+
+/*!\brief Constructor for single precision lowpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ */
+RTFIR_float_lowpass::RTFIR_float_lowpass(const unsigned int &Taps,const double &Freq) : RTFIR_float(RTFIR_lowpass(Taps,Freq)){
+}
+
+/*!\brief Constructor for single precision highpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ */
+RTFIR_float_highpass::RTFIR_float_highpass(const unsigned int &Taps,const double &Freq) : RTFIR_float(RTFIR_highpass(Taps,Freq)){
+}
+
+/*!\brief Constructor for single precision bandpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized lower cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs)
+ */
+RTFIR_float_bandpass::RTFIR_float_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2) : RTFIR_float(RTFIR_bandpass(Taps,Freq1,Freq2)){
+}
+
+/*!\brief Constructor for single precision bandstop FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized lower cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs)
+ */
+RTFIR_float_bandstop::RTFIR_float_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2) : RTFIR_float(RTFIR_bandstop(Taps,Freq1,Freq2)){
+}
+
+/*!\brief Constructor for Q15 fixed-point FIR filter
+ *
+ * The coefficients of an existing filter are rounded to Q15, saturating
+ * at [-1,1). Products are accumulated in 64 bits, which cannot overflow,
+ * and the output is rounded and saturated to Q15.
+ *
+ * \param Design Filter to copy the coefficients from
+ */
+RTFIR_q15::RTFIR_q15(const RTFIR &Design){
+    std::vector<double> c=Design.GetCoefficients();
+    taps=c.size();
+    offset=0;
+    coeff=new int16_t[taps];
+    buffer=new int16_t[2*taps];
+    memset(buffer,0,2*taps*sizeof(int16_t));
+    for(unsigned int i=0;i<taps;i++){
+        coeff[i]=(int16_t)Quantize(c[i],15);
+    }
+}
+
+/*!\brief Deconstructor for Q15 fixed-point FIR filter
+ */
+RTFIR_q15::~RTFIR_q15(){
+    delete [] coeff;
+    delete [] buffer;
+}
+
+/*!\brief Filters input data
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+int16_t RTFIR_q15::Filter(const int16_t &Sample){
+    // Step back in the circular buffer and store the sample in both halves
+    if(offset==0){
+        offset=taps;
+    }
+    offset--;
+    buffer[offset]=Sample;
+    buffer[offset+taps]=Sample;
+
+    // Accumulate Q30 products
+    const int16_t *window=&buffer[offset];
+    int64_t output=0;
+    for(unsigned int i=0;i<taps;i++){
+        output+=(int32_t)window[i]*coeff[i];
+    }
+    return (int16_t)Saturate(output,15,INT16_MIN,INT16_MAX);
+}
+
+/*!\brief Filters a block of input data
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_q15::FilterBlock(const int16_t *Input,int16_t *Output,const unsigned int &Length){
+    for(unsigned int i=0;i<Length;i++){
+        Output[i]=Filter(Input[i]);
+    }
+}
+
+/*!\brief Get a list of coefficients for debugging
+ * \return List of Q15 coefficients
+ */
+std::vector<int16_t> RTFIR_q15::GetCoefficients() const{
+    return std::vector<int16_t>(coeff,coeff+taps);
+}
+
+/*!\brief Constructor for Q15 fixed-point lowpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ */
+RTFIR_q15_lowpass::RTFIR_q15_lowpass(const unsigned int &Taps,const double &Freq) : RTFIR_q15(RTFIR_lowpass(Taps,Freq)){
+}
+
+/*!\brief Constructor for Q15 fixed-point highpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ */
+RTFIR_q15_highpass::RTFIR_q15_highpass(const unsigned int &Taps,const double &Freq) : RTFIR_q15(RTFIR_highpass(Taps,Freq)){
+}
+
+/*!\brief Constructor for Q15 fixed-point bandpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized lower cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs)
+ */
+RTFIR_q15_bandpass::RTFIR_q15_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2) : RTFIR_q15(RTFIR_bandpass(Taps,Freq1,Freq2)){
+}
+
+/*!\brief Constructor for Q15 fixed-point bandstop FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized lower cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs)
+ */
+RTFIR_q15_bandstop::RTFIR_q15_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2) : RTFIR_q15(RTFIR_bandstop(Taps,Freq1,Freq2)){
+}
+
+/*!\brief Constructor for Q31 fixed-point FIR filter
+ *
+ * The coefficients of an existing filter are rounded to Q31, saturating
+ * at [-1,1). Products are accumulated as Q62 in 64 bits with saturating
+ * additions, and the output is rounded and saturated to Q31.
+ *
+ * \param Design Filter to copy the coefficients from
+ */
+RTFIR_q31::RTFIR_q31(const RTFIR &Design){
+    std::vector<double> c=Design.GetCoefficients();
+    taps=c.size();
+    offset=0;
+    coeff=new int32_t[taps];
+    buffer=new int32_t[2*taps];
+    memset(buffer,0,2*taps*sizeof(int32_t));
+    for(unsigned int i=0;i<taps;i++){
+        coeff[i]=(int32_t)Quantize(c[i],31);
+    }
+}
+
+/*!\brief Deconstructor for Q31 fixed-point FIR filter
+ */
+RTFIR_q31::~RTFIR_q31(){
+    delete [] coeff;
+    delete [] buffer;
+}
+
+/*!\brief Filters input data
+ * \param Sample Sample to filter
+ * \return Filtered sample
+ */
+int32_t RTFIR_q31::Filter(const int32_t &Sample){
+    // Step back in the circular buffer and store the sample in both halves
+    if(offset==0){
+        offset=taps;
+    }
+    offset--;
+    buffer[offset]=Sample;
+    buffer[offset+taps]=Sample;
+
+    // Accumulate Q62 products
+    const int32_t *window=&buffer[offset];
+    int64_t output=0;
+    for(unsigned int i=0;i<taps;i++){
+        output=AddSaturate(output,(int64_t)window[i]*coeff[i]);
+    }
+    return (int32_t)Saturate(output,31,INT32_MIN,INT32_MAX);
+}
+
+/*!\brief Filters a block of input data
+ * \param Input Samples to filter
+ * \param Output Buffer to receive the filtered samples (may equal Input)
+ * \param Length Number of samples in Input and Output
+ */
+void RTFIR_q31::FilterBlock(const int32_t *Input,int32_t *Output,const unsigned int &Length){
+    for(unsigned int i=0;i<Length;i++){
+        Output[i]=Filter(Input[i]);
+    }
+}
+
+/*!\brief Get a list of coefficients for debugging
+ * \return List of Q31 coefficients
+ */
+std::vector<int32_t> RTFIR_q31::GetCoefficients() const{
+    return std::vector<int32_t>(coeff,coeff+taps);
+}
+
+/*!\brief Constructor for Q31 fixed-point lowpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ */
+RTFIR_q31_lowpass::RTFIR_q31_lowpass(const unsigned int &Taps,const double &Freq) : RTFIR_q31(RTFIR_lowpass(Taps,Freq)){
+}
+
+/*!\brief Constructor for Q31 fixed-point highpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq Normalized cutoff-frequency (f/fs)
+ */
+RTFIR_q31_highpass::RTFIR_q31_highpass(const unsigned int &Taps,const double &Freq) : RTFIR_q31(RTFIR_highpass(Taps,Freq)){
+}
+
+/*!\brief Constructor for Q31 fixed-point bandpass FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized lower cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs)
+ */
+RTFIR_q31_bandpass::RTFIR_q31_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2) : RTFIR_q31(RTFIR_bandpass(Taps,Freq1,Freq2)){
+}
+
+/*!\brief Constructor for Q31 fixed-point bandstop FIR filter
+ * \param Taps Number of taps in the FIR filter
+ * \param Freq1 Normalized lower cutoff-frequency (f/fs)
+ * \param Freq2 Normalized upper cutoff-frequency (f/fs)
+ */
+RTFIR_q31_bandstop::RTFIR_q31_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2) : RTFIR_q31(RTFIR_bandstop(Taps,Freq1,Freq2)){
+}
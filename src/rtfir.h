@@ -7,25 +7,392 @@
 #define _RTFIR_H_
 
 #include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+// Largest spacing of non-zero coefficients, and most non-zero coefficients
+// off the spacing, for sparse filters
+#define RTFIR_SPARSE_STRIDE 8
+#define RTFIR_SPARSE_EXCEPTIONS 4
+
+// Alignment in bytes of the arrays in caller supplied storage and pools,
+// one cache line
+#define RTFIR_ALIGNMENT 64
+
+// Modes for folding of (anti)symmetric coefficients
+typedef enum {
+    RTFIR_FOLD_AUTO,        // Fold if the coefficients are exactly (anti)symmetric
+    RTFIR_FOLD_FORCE,       // Fold if the coefficients are nearly (anti)symmetric
+    RTFIR_FOLD_DISABLE      // Never fold
+} RTFIR_fold;
+
+// Plans for filtering with a chain of filters
+typedef enum {
+    RTFIR_CHAIN_AUTO,       // Plan with the fewest multiplications per sample
+    RTFIR_CHAIN_FUSED,      // One filter with the convolution of the stages
+    RTFIR_CHAIN_STAGED      // Each stage in turn, a chunk of samples at a time
+} RTFIR_chain_plan;
+
+// Dot product kernels, selected at runtime from the CPU features
+typedef enum {
+    RTFIR_KERNEL_AUTO,      // Fastest kernel supported by the CPU
+    RTFIR_KERNEL_SCALAR,    // Portable reference kernel
+    RTFIR_KERNEL_SSE2,      // x86 SSE2
+    RTFIR_KERNEL_AVX2,      // x86 AVX2 and FMA
+    RTFIR_KERNEL_NEON       // AArch64 NEON
+} RTFIR_kernel;
+
+// Filter designs, used as part of the key of the design cache
+typedef enum {
+    RTFIR_DESIGN_LOWPASS,
+    RTFIR_DESIGN_HIGHPASS,
+    RTFIR_DESIGN_BANDPASS,
+    RTFIR_DESIGN_BANDSTOP
+} RTFIR_design_type;
+
+// Windows applied to the sinc designs
+typedef enum {
+    RTFIR_WINDOW_RECTANGULAR,   // No window, the narrowest transition but poor rejection
+    RTFIR_WINDOW_HAMMING,       // About 53dB rejection
+    RTFIR_WINDOW_BLACKMAN,      // About 74dB rejection
+    RTFIR_WINDOW_KAISER         // Rejection selected by beta
+} RTFIR_window;
+
+// Struct to hold immutable coefficients shared through a design cache
+typedef struct RTFIR_design {
+    double *coeff;
+    unsigned int taps;
+    RTFIR_design_type type;
+    double freq1;
+    double freq2;
+    RTFIR_window window;
+    double beta;
+    unsigned int refs;              // Filters using the design, plus one while cached
+    struct RTFIR_design *prev;      // More recently used design in the cache
+    struct RTFIR_design *next;      // Less recently used design in the cache
+} RTFIR_design;
+
+// Statistics of a design cache
+typedef struct {
+    unsigned long hits;     // Designs found in the cache
+    unsigned long misses;   // Designs computed and added to the cache
+    unsigned long evictions;// Designs dropped to respect the capacity
+    unsigned int size;      // Designs currently cached
+    unsigned int capacity;  // Maximum number of cached designs
+} RTFIR_cache_stats;
+
+// Struct to hold a least recently used cache of filter designs
+typedef struct {
+    RTFIR_design *head;     // Most recently used design
+    RTFIR_design *tail;     // Least recently used design
+    RTFIR_cache_stats stats;
+} RTFIR_cache;
+
+// Statistics of a filter, only counted when compiled with RTFIR_STATS
+typedef struct {
+    uint64_t samples;       // Samples filtered
+    uint64_t calls;         // Calls filtering one sample or a block
+    uint64_t block_calls;   // Calls filtering a block
+    uint64_t total_ns;      // Time spent in the calls
+    uint64_t max_ns;        // Longest call
+} RTFIR_stats;
 
 // Struct to hold a FIR filter
 typedef struct {
     double *coeff;
-    double *buffer;
+    double *buffer;         // Circular buffer of 2*taps mirrored samples
     unsigned int taps;
+    unsigned int offset;    // Position of the newest sample in the buffer
+    int symmetry;           // 1 if symmetric, -1 if antisymmetric, 0 if not folded
+    RTFIR_fold fold;        // Folding mode reapplied when the coefficients change
+    unsigned int first;     // First coefficient of the folded span
+    unsigned int last;      // Last coefficient of the folded span
+    RTFIR_design *design;   // Shared design owning coeff, or 0 if coeff is private
+    void *storage;          // Caller supplied storage holding all arrays, or 0 if allocated
+    RTFIR_design_type type; // Design regenerated by RTFIR_retune
+    RTFIR_window window;    // Window regenerated by RTFIR_retune
+    double beta;            // Shape of the Kaiser window
+    double *fade;           // Coefficients faded out from, allocated when preparing retunes
+    unsigned int fadelength;    // Samples of the current crossfade
+    unsigned int fadeposition;  // Samples crossfaded so far
+    bool sparse;            // True if zeros of sparse coefficients may be skipped
+    unsigned int stride;    // Spacing of the multiplied coefficients, 1 if not sparse
+    unsigned int residue;   // First coefficient on the stride
+    unsigned int compact;   // Number of coefficients on the stride
+    int compactsymmetry;    // Folding of the coefficients on the stride
+    double *compactcoeff;   // Coefficients on the stride, allocated for any stride
+    unsigned int exceptions[RTFIR_SPARSE_EXCEPTIONS];   // Non-zero coefficients off the stride
+    unsigned int exceptioncount;                        // Number of non-zero coefficients off the stride
+    double *phases;         // Delay line split into stride phases of 2*compact mirrored samples
+    unsigned int phaseoffsets[RTFIR_SPARSE_STRIDE];     // Position of the newest sample in each phase
+    unsigned int nextphase; // Phase receiving the next sample
+    RTFIR_stats stats;
 } RTFIR;
 
+// Struct to hold a chain of FIR filters in series
+typedef struct {
+    RTFIR fused;            // Convolution of the stages, used by the fused plan
+    RTFIR *stages;          // Copies of the stages, used by the staged plan
+    unsigned int count;     // Number of copied stages
+    RTFIR_chain_plan plan;  // Plan in use, fused or staged
+} RTFIR_chain;
+
+// Struct to hold a FIR filter for several channels sharing one design
+typedef struct {
+    double *coeff;
+    double *buffer;         // Circular buffer of 2*taps mirrored frames
+    unsigned int taps;
+    unsigned int channels;
+    unsigned int offset;    // Position of the newest frame in the buffer
+} RTFIR_multichannel;
+
+// Struct to hold filters of a bank with the same taps and folding, multiplied four at a time
+typedef struct {
+    unsigned int taps;      // Number of coefficients of the filters
+    int symmetry;           // 1 if symmetric, -1 if antisymmetric, 0 if not folded
+    unsigned int first;     // First coefficient of the folded span
+    unsigned int last;      // Last coefficient of the folded span
+    unsigned int length;    // Number of samples in the folded window
+    unsigned int start;     // First filter of the group in the order of the bank
+    unsigned int count;     // Number of filters, those after the last four multiplied separately
+    double *coeff;          // Coefficients of four filters at a time, interleaved in the order of the folded window
+} RTFIR_bank_group;
+
+// Struct to hold a bank of FIR filters sharing one delay line
+typedef struct {
+    RTFIR *bands;           // Coefficients and folding of each filter, without delay lines
+    double *buffer;         // Circular buffer of 2*taps mirrored samples
+    unsigned int taps;      // Number of taps of the longest filter
+    unsigned int filters;   // Number of filters
+    unsigned int offset;    // Position of the newest sample in the buffer
+    RTFIR_bank_group *groups;   // Filters grouped by taps and folding
+    unsigned int groupcount;    // Number of groups
+    unsigned int *order;    // Filters in the order of their groups
+    double *folded;         // Window of the group being filtered, with the mirrored samples added
+} RTFIR_bank;
+
+// Struct to hold many FIR filters packed into one arena
+typedef struct {
+    RTFIR *filters;         // Filters added to the pool, in order
+    unsigned int count;     // Number of filters added
+    unsigned int capacity;  // Maximum number of filters
+    unsigned char *arena;   // Cache aligned storage of the arrays of all filters
+    size_t size;            // Bytes of the arena
+    size_t used;            // Bytes of the arena taken by filters
+    bool retune;            // Filters get the arrays for retuning and the sparse form
+    void *memory;           // Allocation of filters and arena, or 0 if supplied by the caller
+} RTFIR_pool;
+
+// Struct to hold a polyphase resampling FIR filter
+typedef struct {
+    double *coeff;          // Polyphase coefficients, one row of length per branch
+    double *buffer;         // Circular buffer of 2*length mirrored samples
+    unsigned int taps;
+    unsigned int length;    // Number of coefficients per branch
+    unsigned int up;
+    unsigned int down;
+    unsigned int offset;    // Position of the newest sample in the buffer
+    unsigned int phase;     // Branch of the next output
+} RTFIR_resampler;
+
+// Struct to hold a moving average filter
+typedef struct {
+    double *buffer;         // Circular buffer of the latest length samples
+    unsigned int length;    // Number of samples averaged
+    unsigned int factor;    // Decimation factor
+    unsigned int offset;    // Position of the oldest sample in the buffer
+    unsigned int phase;     // Samples received since the last output
+    unsigned int count;     // Samples summed by fresh since it was restarted
+    double sum;             // Running sum of the buffer
+    double compensation;    // Rounding error of sum
+    double fresh;           // Sum restarted every length samples, replacing sum when complete
+    double freshcompensation;   // Rounding error of fresh
+} RTFIR_moving_average;
+
+// Struct to hold a cascaded integrator-comb filter
+typedef struct {
+    uint64_t *integrators;  // Integrator of each stage, wrapping modulo 2^64
+    uint64_t *delays;       // Comb delay line of delay samples for each stage
+    unsigned int stages;
+    unsigned int factor;    // Decimation factor
+    unsigned int delay;     // Differential delay of the combs
+    unsigned int offset;    // Position of the oldest sample in the comb delay lines
+    unsigned int phase;     // Samples received since the last output
+} RTFIR_cic;
+
+// Struct to hold a single precision FIR filter
+typedef struct {
+    float *coeff;
+    float *buffer;          // Circular buffer of 2*taps mirrored samples
+    unsigned int taps;
+    unsigned int offset;    // Position of the newest sample in the buffer
+} RTFIR_float;
+
+// Struct to hold a Q15 fixed-point FIR filter
+typedef struct {
+    int16_t *coeff;
+    int16_t *buffer;        // Circular buffer of 2*taps mirrored samples
+    unsigned int taps;
+    unsigned int offset;    // Position of the newest sample in the buffer
+} RTFIR_q15;
+
+// Struct to hold a Q31 fixed-point FIR filter
+typedef struct {
+    int32_t *coeff;
+    int32_t *buffer;        // Circular buffer of 2*taps mirrored samples
+    unsigned int taps;
+    unsigned int offset;    // Position of the newest sample in the buffer
+} RTFIR_q31;
+
 // Initializes FIR objects of various types
 bool RTFIR_init_lowpass(RTFIR *Filter,const unsigned int Taps,const double Freq);
 bool RTFIR_init_highpass(RTFIR *Filter,const unsigned int Taps,const double Freq);
 bool RTFIR_init_bandpass(RTFIR *Filter,const unsigned int Taps,const double Low,const double High);
 bool RTFIR_init_bandstop(RTFIR *Filter,const unsigned int Taps,const double Low,const double High);
 
+// Initializes FIR objects with windowed designs
+bool RTFIR_init_windowed(RTFIR *Filter,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta);
+bool RTFIR_init_kaiser_lowpass(RTFIR *Filter,const double Pass,const double Stop,const double Attenuation);
+bool RTFIR_init_kaiser_highpass(RTFIR *Filter,const double Pass,const double Stop,const double Attenuation);
+unsigned int RTFIR_kaiser_taps(const double Transition,const double Attenuation);
+double RTFIR_kaiser_beta(const double Attenuation);
+
+// Initializes FIR objects in caller supplied storage, without allocations
+size_t RTFIR_get_storage_size(const unsigned int Taps,const bool Retune);
+bool RTFIR_init_lowpass_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Freq);
+bool RTFIR_init_highpass_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Freq);
+bool RTFIR_init_bandpass_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Low,const double High);
+bool RTFIR_init_bandstop_storage(RTFIR *Filter,void *Storage,const size_t Size,const unsigned int Taps,const double Low,const double High);
+bool RTFIR_init_windowed_storage(RTFIR *Filter,void *Storage,const size_t Size,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta);
+
+// Initializes FIR objects sharing designs through a cache
+bool RTFIR_init_cache(RTFIR_cache *Cache,const unsigned int Capacity);
+bool RTFIR_init_lowpass_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Freq);
+bool RTFIR_init_highpass_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Freq);
+bool RTFIR_init_bandpass_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Low,const double High);
+bool RTFIR_init_bandstop_cached(RTFIR *Filter,RTFIR_cache *Cache,const unsigned int Taps,const double Low,const double High);
+bool RTFIR_init_windowed_cached(RTFIR *Filter,RTFIR_cache *Cache,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta);
+RTFIR_cache_stats RTFIR_get_cache_stats(const RTFIR_cache *Cache);
+void RTFIR_clear_cache(RTFIR_cache *Cache);
+void RTFIR_close_cache(RTFIR_cache *Cache);
+
+// Selects the dot product kernels used by all filters, not while other threads filter
+bool RTFIR_set_kernel(const RTFIR_kernel Kernel);
+RTFIR_kernel RTFIR_get_kernel(void);
+
+// Selects folding of (anti)symmetric coefficients
+bool RTFIR_set_folding(RTFIR *Filter,const RTFIR_fold Mode);
+
+// Selects skipping the zeros of half-band and other sparse coefficients
+bool RTFIR_set_sparse(RTFIR *Filter,const bool Enable);
+unsigned int RTFIR_get_stride(const RTFIR *Filter);
+
+// Replaces the coefficients of a FIR object, keeping its delay line
+bool RTFIR_prepare_retune(RTFIR *Filter);
+bool RTFIR_retune(RTFIR *Filter,const double Freq1,const double Freq2,const unsigned int Fade);
+bool RTFIR_set_coefficients(RTFIR *Filter,const double *Coeff,const unsigned int Fade);
+
 // Filters a sample with a FIR object
 double RTFIR_filter(RTFIR *Filter,const double Sample);
 
+// Filters a block of samples with a FIR object
+void RTFIR_filter_block(RTFIR *Filter,const double *Input,double *Output,const unsigned int Length);
+
+// Gets and resets the statistics of a FIR object
+RTFIR_stats RTFIR_get_stats(const RTFIR *Filter);
+void RTFIR_reset_stats(RTFIR *Filter);
+bool RTFIR_stats_enabled(void);
+
+// Gets the multiplications per sample of a FIR object
+unsigned int RTFIR_get_cost(const RTFIR *Filter);
+
+// Gets and sets the delay line of a FIR object, the latest taps-1 samples
+void RTFIR_get_state(const RTFIR *Filter,double *State);
+void RTFIR_set_state(RTFIR *Filter,const double *State);
+
 // Deletes a FIR object
 void RTFIR_close(RTFIR *Filter);
 
+// Initializes, filters with and deletes chains of FIR objects
+bool RTFIR_init_chain(RTFIR_chain *Chain,const RTFIR *Stages,const unsigned int Count,const RTFIR_chain_plan Plan);
+RTFIR_chain_plan RTFIR_get_chain_plan(const RTFIR_chain *Chain);
+unsigned int RTFIR_get_chain_cost(const RTFIR_chain *Chain);
+double RTFIR_filter_chain(RTFIR_chain *Chain,const double Sample);
+void RTFIR_filter_chain_block(RTFIR_chain *Chain,const double *Input,double *Output,const unsigned int Length);
+void RTFIR_close_chain(RTFIR_chain *Chain);
+
+// Initializes, filters with and deletes multichannel FIR objects
+bool RTFIR_init_multichannel(RTFIR_multichannel *Filter,const RTFIR *Design,const unsigned int Channels);
+void RTFIR_filter_multichannel(RTFIR_multichannel *Filter,const double *Frame,double *Output);
+void RTFIR_filter_multichannel_block(RTFIR_multichannel *Filter,const double *Frames,double *Output,const unsigned int Length);
+void RTFIR_close_multichannel(RTFIR_multichannel *Filter);
+
+// Initializes, filters with and deletes banks of FIR objects
+bool RTFIR_init_bank(RTFIR_bank *Filter,const RTFIR *Filters,const unsigned int Count);
+void RTFIR_filter_bank(RTFIR_bank *Filter,const double Sample,double *Output);
+void RTFIR_filter_bank_block(RTFIR_bank *Filter,const double *Input,double *Output,const unsigned int Length);
+void RTFIR_close_bank(RTFIR_bank *Filter);
+
+// Initializes, fills, filters with and deletes pools of FIR objects
+size_t RTFIR_get_pool_size(const unsigned int Capacity,const unsigned int Taps,const bool Retune);
+bool RTFIR_init_pool(RTFIR_pool *Pool,const unsigned int Capacity,const size_t Size,const bool Retune);
+bool RTFIR_init_pool_storage(RTFIR_pool *Pool,RTFIR *Filters,const unsigned int Capacity,void *Arena,const size_t Size,const bool Retune);
+RTFIR *RTFIR_add_pool_filter(RTFIR_pool *Pool,const RTFIR_design_type Type,const unsigned int Taps,const double Freq1,const double Freq2,const RTFIR_window Window,const double Beta);
+void RTFIR_filter_pool(RTFIR_pool *Pool,const double *Input,double *Output);
+void RTFIR_filter_pool_block(RTFIR_pool *Pool,const double *Input,double *Output,const unsigned int Length);
+void RTFIR_close_pool(RTFIR_pool *Pool);
+
+// Initializes, filters with and deletes resampling FIR objects
+bool RTFIR_init_resampler(RTFIR_resampler *Filter,const unsigned int Taps,const unsigned int Up,const unsigned int Down,const double Freq);
+bool RTFIR_init_interpolator(RTFIR_resampler *Filter,const unsigned int Taps,const unsigned int Factor,const double Freq);
+unsigned int RTFIR_get_resampler_output_length(const RTFIR_resampler *Filter,const unsigned int Length);
+unsigned int RTFIR_filter_resampler_block(RTFIR_resampler *Filter,const double *Input,const unsigned int Length,double *Output);
+void RTFIR_close_resampler(RTFIR_resampler *Filter);
+
+// Initializes, filters with and deletes moving average objects
+bool RTFIR_init_moving_average(RTFIR_moving_average *Filter,const unsigned int Length,const unsigned int Factor);
+unsigned int RTFIR_get_moving_average_output_length(const RTFIR_moving_average *Filter,const unsigned int Length);
+double RTFIR_filter_moving_average(RTFIR_moving_average *Filter,const double *Samples);
+unsigned int RTFIR_filter_moving_average_block(RTFIR_moving_average *Filter,const double *Input,const unsigned int Length,double *Output);
+void RTFIR_close_moving_average(RTFIR_moving_average *Filter);
+
+// Initializes, filters with and deletes cascaded integrator-comb objects
+bool RTFIR_init_cic(RTFIR_cic *Filter,const unsigned int Stages,const unsigned int Factor,const unsigned int Delay);
+unsigned int RTFIR_get_cic_output_length(const RTFIR_cic *Filter,const unsigned int Length);
+double RTFIR_get_cic_gain(const RTFIR_cic *Filter);
+int64_t RTFIR_filter_cic(RTFIR_cic *Filter,const int32_t *Samples);
+unsigned int RTFIR_filter_cic_block(RTFIR_cic *Filter,const int32_t *Input,const unsigned int Length,int64_t *Output);
+void RTFIR_close_cic(RTFIR_cic *Filter);
+
+// Initializes, filters with and deletes single precision FIR objects
+bool RTFIR_init_float(RTFIR_float *Filter,const RTFIR *Design);
+bool RTFIR_init_float_lowpass(RTFIR_float *Filter,const unsigned int Taps,const double Freq);
+bool RTFIR_init_float_highpass(RTFIR_float *Filter,const unsigned int Taps,const double Freq);
+bool RTFIR_init_float_bandpass(RTFIR_float *Filter,const unsigned int Taps,const double Low,const double High);
+bool RTFIR_init_float_bandstop(RTFIR_float *Filter,const unsigned int Taps,const double Low,const double High);
+float RTFIR_filter_float(RTFIR_float *Filter,const float Sample);
+void RTFIR_filter_float_block(RTFIR_float *Filter,const float *Input,float *Output,const unsigned int Length);
+void RTFIR_close_float(RTFIR_float *Filter);
+
+// Initializes, filters with and deletes Q15 fixed-point FIR objects
+bool RTFIR_init_q15(RTFIR_q15 *Filter,const RTFIR *Design);
+bool RTFIR_init_q15_lowpass(RTFIR_q15 *Filter,const unsigned int Taps,const double Freq);
+bool RTFIR_init_q15_highpass(RTFIR_q15 *Filter,const unsigned int Taps,const double Freq);
+bool RTFIR_init_q15_bandpass(RTFIR_q15 *Filter,const unsigned int Taps,const double Low,const double High);
+bool RTFIR_init_q15_bandstop(RTFIR_q15 *Filter,const unsigned int Taps,const double Low,const double High);
+int16_t RTFIR_filter_q15(RTFIR_q15 *Filter,const int16_t Sample);
+void RTFIR_filter_q15_block(RTFIR_q15 *Filter,const int16_t *Input,int16_t *Output,const unsigned int Length);
+void RTFIR_close_q15(RTFIR_q15 *Filter);
+
+// Initializes, filters with and deletes Q31 fixed-point FIR objects
+bool RTFIR_init_q31(RTFIR_q31 *Filter,const RTFIR *Design);
+bool RTFIR_init_q31_lowpass(RTFIR_q31 *Filter,const unsigned int Taps,const double Freq);
+bool RTFIR_init_q31_highpass(RTFIR_q31 *Filter,const unsigned int Taps,const double Freq);
+bool RTFIR_init_q31_bandpass(RTFIR_q31 *Filter,const unsigned int Taps,const double Low,const double High);
+bool RTFIR_init_q31_bandstop(RTFIR_q31 *Filter,const unsigned int Taps,const double Low,const double High);
+int32_t RTFIR_filter_q31(RTFIR_q31 *Filter,const int32_t Sample);
+void RTFIR_filter_q31_block(RTFIR_q31 *Filter,const int32_t *Input,int32_t *Output,const unsigned int Length);
+void RTFIR_close_q31(RTFIR_q31 *Filter);
+
 #endif
 
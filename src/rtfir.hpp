@@ -8,39 +8,455 @@
 
 #include <vector>
 #include <string>
+#include <complex>
+#include <stdexcept>
+#include <stdint.h>
+#include <memory>
+
+//! Modes for folding of (anti)symmetric coefficients
+enum RTFIR_fold {
+    RTFIR_FOLD_AUTO,        //!< Fold if the coefficients are exactly (anti)symmetric
+    RTFIR_FOLD_FORCE,       //!< Fold if the coefficients are nearly (anti)symmetric
+    RTFIR_FOLD_DISABLE      //!< Never fold
+};
+
+//! Plans for filtering with a chain of filters
+enum RTFIR_chain_plan {
+    RTFIR_CHAIN_AUTO,       //!< Plan with the fewest multiplications per sample
+    RTFIR_CHAIN_FUSED,      //!< One filter with the convolution of the stages
+    RTFIR_CHAIN_STAGED      //!< Each stage in turn, a chunk of samples at a time
+};
+
+//! Dot product kernels, selected at runtime from the CPU features
+enum RTFIR_kernel {
+    RTFIR_KERNEL_AUTO,      //!< Fastest kernel supported by the CPU
+    RTFIR_KERNEL_SCALAR,    //!< Portable reference kernel
+    RTFIR_KERNEL_SSE2,      //!< x86 SSE2
+    RTFIR_KERNEL_AVX2,      //!< x86 AVX2 and FMA
+    RTFIR_KERNEL_NEON       //!< AArch64 NEON
+};
+
+//! Filter designs, used as part of the key of the design cache
+enum RTFIR_design_type {
+    RTFIR_DESIGN_LOWPASS,
+    RTFIR_DESIGN_HIGHPASS,
+    RTFIR_DESIGN_BANDPASS,
+    RTFIR_DESIGN_BANDSTOP
+};
+
+//! Windows applied to the sinc designs
+enum RTFIR_window {
+    RTFIR_WINDOW_RECTANGULAR,   //!< No window, the narrowest transition but poor rejection
+    RTFIR_WINDOW_HAMMING,       //!< About 53dB rejection
+    RTFIR_WINDOW_BLACKMAN,      //!< About 74dB rejection
+    RTFIR_WINDOW_KAISER         //!< Rejection selected by beta
+};
+
+//! Statistics of the design cache
+struct RTFIR_cache_stats {
+    unsigned long hits;     //!< Designs found in the cache
+    unsigned long misses;   //!< Designs computed and added to the cache
+    unsigned long evictions;//!< Designs dropped to respect the capacity
+    unsigned int size;      //!< Designs currently cached
+    unsigned int capacity;  //!< Maximum number of cached designs
+};
+
+//! Statistics of a filter, only counted when compiled with RTFIR_STATS
+struct RTFIR_stats {
+    uint64_t samples;       //!< Samples filtered
+    uint64_t calls;         //!< Calls filtering one sample or a block
+    uint64_t block_calls;   //!< Calls filtering a block
+    uint64_t total_ns;      //!< Time spent in the calls
+    uint64_t max_ns;        //!< Longest call
+};
+
+class RTFIR_cache {
+    public:
+        static void SetCapacity(const unsigned int &Capacity);
+        static unsigned int GetCapacity();
+        static RTFIR_cache_stats GetStats();
+        static void Clear();
+};
 
 class RTFIR {
+    friend class RTFIR_chain;
+    friend class RTFIR_bank;
     protected:
         double *coeff;      //!< Coefficients of the FIR filter
-        double *buffer;     //!< Sample buffer for FIR filter
+        std::shared_ptr<double> design; //!< Owner of coeff, possibly shared with other filters
+        double *buffer;     //!< Circular sample buffer of 2*taps mirrored samples
         unsigned int taps;  //!< Number of coefficients of the FIR filter
+        unsigned int offset;//!< Position of the newest sample in the buffer
+        int symmetry;       //!< 1 if symmetric, -1 if antisymmetric, 0 if not folded
+        RTFIR_fold fold;    //!< Folding mode reapplied when the coefficients change
+        unsigned int first; //!< First coefficient of the folded span
+        unsigned int last;  //!< Last coefficient of the folded span
+        RTFIR_stats stats;  //!< Statistics of the filter calls
+        RTFIR_design_type type;     //!< Design regenerated by Retune
+        RTFIR_window window;        //!< Window regenerated by Retune
+        double beta;                //!< Shape of the Kaiser window
+        bool designed;              //!< True if the coefficients are a sinc design Retune can regenerate
+        std::vector<double> fade;   //!< Coefficients faded out from, allocated when preparing retunes
+        unsigned int fadelength;    //!< Samples of the current crossfade
+        unsigned int fadeposition;  //!< Samples crossfaded so far
+        bool sparse;                //!< True if zeros of sparse coefficients may be skipped
+        unsigned int stride;        //!< Spacing of the multiplied coefficients, 1 if not sparse
+        unsigned int residue;       //!< First coefficient on the stride
+        unsigned int compact;       //!< Number of coefficients on the stride
+        int compactsymmetry;        //!< Folding of the coefficients on the stride
+        std::vector<double> compactcoeff;       //!< Coefficients on the stride
+        std::vector<unsigned int> exceptions;   //!< Non-zero coefficients off the stride
+        std::vector<double> phases;             //!< Delay line split into stride phases of 2*compact mirrored samples
+        std::vector<unsigned int> phaseoffsets; //!< Position of the newest sample in each phase
+        unsigned int nextphase;     //!< Phase receiving the next sample
+        bool IsSymmetric(const unsigned int &First,const unsigned int &Last,const int &Sign,const double &Tolerance) const;
+        void Push(const double &Sample);
+        double Convolve(const double *Window) const;
+        double ConvolveSparse(const double *Window) const;
+        void Sparsify();
+        void ReserveSparse();
+        void SplitPhases();
+        double Crossfade(const double &Output,const double *Window);
+        void StartCrossfade(const unsigned int &Fade);
+        void Sinc(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2);
+        void Design(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2,const RTFIR_window &Window,const double &Beta);
+        bool Lookup(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2,const RTFIR_window &Window,const double &Beta);
+        void Store(const RTFIR_design_type &Type,const double &Freq1,const double &Freq2,const RTFIR_window &Window,const double &Beta);
+        void ApplyWindow(const RTFIR_window &Window,const double &Beta);
+        RTFIR(const unsigned int &Taps,const bool &Allocate);
     public:
         RTFIR(const unsigned int &Taps);
-        ~RTFIR();
-        double Filter(const double &x);
+        virtual ~RTFIR();
+        virtual double Filter(const double &x);
+        virtual void FilterBlock(const double *Input,double *Output,const unsigned int &Length);
+        bool SetFolding(const RTFIR_fold &Mode);
+        RTFIR_fold GetFolding() const;
+        int GetSymmetry() const;
+        bool SetSparse(const bool &Enable);
+        unsigned int GetStride() const;
+        unsigned int GetCost() const;
         std::vector<double> GetCoefficients() const;
+        virtual std::vector<double> GetState() const;
+        virtual void SetState(const std::vector<double> &State);
+        void PrepareRetune();
+        void Retune(const double &Freq1,const double &Freq2=0,const unsigned int &Fade=0);
+        virtual void SetCoefficients(const std::vector<double> &Coeff,const unsigned int &Fade=0);
+        RTFIR_stats GetStats() const;
+        void ResetStats();
+        static bool StatsEnabled();
+        static bool SetKernel(const RTFIR_kernel &Kernel);
+        static RTFIR_kernel GetKernel();
+        static unsigned int KaiserTaps(const double &Transition,const double &Attenuation);
+        static double KaiserBeta(const double &Attenuation);
 };
     
 class RTFIR_lowpass : public RTFIR {
     public:
-        RTFIR_lowpass(const unsigned int &Taps,const double &Freq);
+        RTFIR_lowpass(const unsigned int &Taps,const double &Freq,const RTFIR_window &Window=RTFIR_WINDOW_RECTANGULAR,const double &Beta=0);
 };
 
 class RTFIR_highpass : public RTFIR {
     public:
-        RTFIR_highpass(const unsigned int &Taps,const double &Freq);
+        RTFIR_highpass(const unsigned int &Taps,const double &Freq,const RTFIR_window &Window=RTFIR_WINDOW_RECTANGULAR,const double &Beta=0);
 };
 
 class RTFIR_bandpass : public RTFIR {
     public:
-        RTFIR_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+        RTFIR_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2,const RTFIR_window &Window=RTFIR_WINDOW_RECTANGULAR,const double &Beta=0);
 };
 
 class RTFIR_bandstop : public RTFIR {
     public:
-        RTFIR_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+        RTFIR_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2,const RTFIR_window &Window=RTFIR_WINDOW_RECTANGULAR,const double &Beta=0);
+};
+
+class RTFIR_kaiser_lowpass : public RTFIR_lowpass {
+    public:
+        RTFIR_kaiser_lowpass(const double &Pass,const double &Stop,const double &Attenuation);
+};
+
+class RTFIR_kaiser_highpass : public RTFIR_highpass {
+    public:
+        RTFIR_kaiser_highpass(const double &Pass,const double &Stop,const double &Attenuation);
+};
+
+class RTFIR_decimator : public RTFIR_lowpass {
+    protected:
+        unsigned int factor;    //!< Decimation factor
+        unsigned int phase;     //!< Samples received since the last output
+    public:
+        RTFIR_decimator(const unsigned int &Taps,const unsigned int &Factor,const double &Freq=0);
+        double Filter(const double *Samples);
+        unsigned int FilterBlock(const double *Input,const unsigned int &Length,double *Output);
+        unsigned int GetFactor() const;
+        unsigned int GetOutputLength(const unsigned int &Length) const;
 };
 
+class RTFIR_resampler {
+    protected:
+        double *coeff;          //!< Polyphase coefficients, one row of length per branch
+        double *buffer;         //!< Circular buffer of 2*length mirrored samples
+        unsigned int taps;      //!< Number of coefficients of the prototype filter
+        unsigned int length;    //!< Number of coefficients per branch
+        unsigned int up;        //!< Interpolation factor
+        unsigned int down;      //!< Decimation factor
+        unsigned int offset;    //!< Position of the newest sample in the buffer
+        unsigned int phase;     //!< Branch of the next output
+    public:
+        RTFIR_resampler(const unsigned int &Taps,const unsigned int &Up,const unsigned int &Down,const double &Freq=0);
+        ~RTFIR_resampler();
+        unsigned int FilterBlock(const double *Input,const unsigned int &Length,double *Output);
+        unsigned int GetOutputLength(const unsigned int &Length) const;
+        unsigned int GetUp() const;
+        unsigned int GetDown() const;
+        std::vector<double> GetCoefficients() const;
+};
+
+class RTFIR_interpolator : public RTFIR_resampler {
+    public:
+        RTFIR_interpolator(const unsigned int &Taps,const unsigned int &Factor,const double &Freq=0);
+};
+
+class RTFIR_moving_average {
+    protected:
+        double *buffer;         //!< Circular buffer of the latest length samples
+        unsigned int length;    //!< Number of samples averaged
+        unsigned int factor;    //!< Decimation factor
+        unsigned int offset;    //!< Position of the oldest sample in the buffer
+        unsigned int phase;     //!< Samples received since the last output
+        unsigned int count;     //!< Samples summed by fresh since it was restarted
+        double sum;             //!< Running sum of the buffer
+        double compensation;    //!< Rounding error of sum
+        double fresh;           //!< Sum restarted every length samples, replacing sum when complete
+        double freshcompensation;   //!< Rounding error of fresh
+        void Push(const double &Sample);
+    public:
+        RTFIR_moving_average(const unsigned int &Length,const unsigned int &Factor=1);
+        ~RTFIR_moving_average();
+        double Filter(const double *Samples);
+        unsigned int FilterBlock(const double *Input,const unsigned int &Length,double *Output);
+        unsigned int GetLength() const;
+        unsigned int GetFactor() const;
+        unsigned int GetOutputLength(const unsigned int &Length) const;
+};
+
+class RTFIR_cic {
+    protected:
+        uint64_t *integrators;  //!< Integrator of each stage, wrapping modulo 2^64
+        uint64_t *delays;       //!< Comb delay line of delay samples for each stage
+        unsigned int stages;    //!< Number of integrator and comb stages
+        unsigned int factor;    //!< Decimation factor
+        unsigned int delay;     //!< Differential delay of the combs
+        unsigned int offset;    //!< Position of the oldest sample in the comb delay lines
+        unsigned int phase;     //!< Samples received since the last output
+    public:
+        RTFIR_cic(const unsigned int &Stages,const unsigned int &Factor,const unsigned int &Delay=1);
+        ~RTFIR_cic();
+        int64_t Filter(const int32_t *Samples);
+        unsigned int FilterBlock(const int32_t *Input,const unsigned int &Length,int64_t *Output);
+        unsigned int GetStages() const;
+        unsigned int GetFactor() const;
+        unsigned int GetDelay() const;
+        double GetGain() const;
+        unsigned int GetOutputLength(const unsigned int &Length) const;
+};
+
+class RTFIR_float {
+    protected:
+        float *coeff;         //!< Single precision coefficients of the FIR filter
+        float *buffer;        //!< Circular buffer of 2*taps mirrored samples
+        unsigned int taps;      //!< Number of coefficients of the FIR filter
+        unsigned int offset;    //!< Position of the newest sample in the buffer
+    public:
+        RTFIR_float(const RTFIR &Design);
+        ~RTFIR_float();
+        float Filter(const float &Sample);
+        void FilterBlock(const float *Input,float *Output,const unsigned int &Length);
+        std::vector<float> GetCoefficients() const;
+};
+
+class RTFIR_float_lowpass : public RTFIR_float {
+    public:
+        RTFIR_float_lowpass(const unsigned int &Taps,const double &Freq);
+};
+
+class RTFIR_float_highpass : public RTFIR_float {
+    public:
+        RTFIR_float_highpass(const unsigned int &Taps,const double &Freq);
+};
+
+class RTFIR_float_bandpass : public RTFIR_float {
+    public:
+        RTFIR_float_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+};
+
+class RTFIR_float_bandstop : public RTFIR_float {
+    public:
+        RTFIR_float_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+};
+
+class RTFIR_q15 {
+    protected:
+        int16_t *coeff;       //!< Q15 coefficients of the FIR filter
+        int16_t *buffer;      //!< Circular buffer of 2*taps mirrored samples
+        unsigned int taps;      //!< Number of coefficients of the FIR filter
+        unsigned int offset;    //!< Position of the newest sample in the buffer
+    public:
+        RTFIR_q15(const RTFIR &Design);
+        ~RTFIR_q15();
+        int16_t Filter(const int16_t &Sample);
+        void FilterBlock(const int16_t *Input,int16_t *Output,const unsigned int &Length);
+        std::vector<int16_t> GetCoefficients() const;
+};
+
+class RTFIR_q15_lowpass : public RTFIR_q15 {
+    public:
+        RTFIR_q15_lowpass(const unsigned int &Taps,const double &Freq);
+};
+
+class RTFIR_q15_highpass : public RTFIR_q15 {
+    public:
+        RTFIR_q15_highpass(const unsigned int &Taps,const double &Freq);
+};
+
+class RTFIR_q15_bandpass : public RTFIR_q15 {
+    public:
+        RTFIR_q15_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+};
+
+class RTFIR_q15_bandstop : public RTFIR_q15 {
+    public:
+        RTFIR_q15_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+};
+
+class RTFIR_q31 {
+    protected:
+        int32_t *coeff;       //!< Q31 coefficients of the FIR filter
+        int32_t *buffer;      //!< Circular buffer of 2*taps mirrored samples
+        unsigned int taps;      //!< Number of coefficients of the FIR filter
+        unsigned int offset;    //!< Position of the newest sample in the buffer
+    public:
+        RTFIR_q31(const RTFIR &Design);
+        ~RTFIR_q31();
+        int32_t Filter(const int32_t &Sample);
+        void FilterBlock(const int32_t *Input,int32_t *Output,const unsigned int &Length);
+        std::vector<int32_t> GetCoefficients() const;
+};
+
+class RTFIR_q31_lowpass : public RTFIR_q31 {
+    public:
+        RTFIR_q31_lowpass(const unsigned int &Taps,const double &Freq);
+};
+
+class RTFIR_q31_highpass : public RTFIR_q31 {
+    public:
+        RTFIR_q31_highpass(const unsigned int &Taps,const double &Freq);
+};
+
+class RTFIR_q31_bandpass : public RTFIR_q31 {
+    public:
+        RTFIR_q31_bandpass(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+};
+
+class RTFIR_q31_bandstop : public RTFIR_q31 {
+    public:
+        RTFIR_q31_bandstop(const unsigned int &Taps,const double &Freq1,const double &Freq2);
+};
+
+class RTFIR_chain : public RTFIR {
+    protected:
+        std::vector<RTFIR*> stages; //!< Copies of the stages, used by the staged plan
+        unsigned int count;         //!< Number of stages
+        unsigned int staged;        //!< Multiplications per sample of the staged plan
+        RTFIR_chain_plan plan;      //!< Plan in use, fused or staged
+    public:
+        RTFIR_chain(const std::vector<RTFIR*> &Stages,const RTFIR_chain_plan &Plan=RTFIR_CHAIN_AUTO);
+        ~RTFIR_chain();
+        double Filter(const double &Sample);
+        void FilterBlock(const double *Input,double *Output,const unsigned int &Length);
+        void SetState(const std::vector<double> &State);
+        void SetCoefficients(const std::vector<double> &Coeff,const unsigned int &Fade=0);
+        RTFIR_chain_plan GetPlan() const;
+        unsigned int GetStages() const;
+        unsigned int GetCost() const;
+};
+
+class RTFIR_multichannel {
+    protected:
+        double *coeff;          //!< Coefficients shared by all channels
+        double *buffer;         //!< Circular buffer of 2*taps mirrored frames
+        unsigned int taps;      //!< Number of coefficients of the FIR filter
+        unsigned int channels;  //!< Number of samples per frame
+        unsigned int offset;    //!< Position of the newest frame in the buffer
+    public:
+        RTFIR_multichannel(const RTFIR &Design,const unsigned int &Channels);
+        ~RTFIR_multichannel();
+        void Filter(const double *Frame,double *Output);
+        void FilterBlock(const double *Frames,double *Output,const unsigned int &Length);
+        unsigned int GetChannels() const;
+        std::vector<double> GetCoefficients() const;
+        std::vector<double> GetState() const;
+        void SetState(const std::vector<double> &State);
+};
+
+class RTFIR_bank {
+    protected:
+        //! Filters with the same taps and folding, multiplied four at a time
+        struct Group {
+            unsigned int taps;      //!< Number of coefficients of the filters
+            int symmetry;           //!< 1 if symmetric, -1 if antisymmetric, 0 if not folded
+            unsigned int first;     //!< First coefficient of the folded span
+            unsigned int last;      //!< Last coefficient of the folded span
+            unsigned int length;    //!< Number of samples in the folded window
+            std::vector<unsigned int> filters;  //!< Filters of the group, those after the last four multiplied separately
+            std::vector<double> coeff;          //!< Coefficients of four filters at a time, interleaved in the order of the folded window
+        };
+        std::vector<RTFIR*> bands;  //!< Copies of the filters, their delay lines are unused
+        std::vector<Group> groups;  //!< Filters grouped by taps and folding
+        double *buffer;         //!< Circular buffer of 2*taps mirrored samples shared by all filters
+        double *folded;         //!< Window of the group being filtered, with the mirrored samples added
+        unsigned int taps;      //!< Number of coefficients of the longest filter
+        unsigned int offset;    //!< Position of the newest sample in the buffer
+        void Compute(const double &Sample,double *Outputs,const unsigned int &Stride);
+    public:
+        RTFIR_bank(const std::vector<RTFIR*> &Filters);
+        ~RTFIR_bank();
+        void Filter(const double &Sample,double *Outputs);
+        void FilterBlock(const double *Input,double *Outputs,const unsigned int &Length);
+        unsigned int GetFilters() const;
+        std::vector<double> GetCoefficients(const unsigned int &Index) const;
+        std::vector<double> GetState() const;
+        void SetState(const std::vector<double> &State);
+};
+
+class RTFIR_fft : public RTFIR {
+    protected:
+        unsigned int blocksize;     //!< Samples per block, zero when filtering directly
+        unsigned int partitions;    //!< Number of blocksize partitions of the coefficients
+        unsigned int position;      //!< Position within the current block
+        unsigned int head;          //!< Newest spectrum in the frequency domain delay line
+        std::vector<unsigned int> reversed;             //!< Bit reversal permutation
+        std::vector<std::complex<double> > twiddles;    //!< FFT twiddle factors
+        std::vector<std::complex<double> > spectra;     //!< Spectra of the partitions
+        std::vector<std::complex<double> > history;     //!< Spectra of the latest input blocks
+        std::vector<std::complex<double> > work;        //!< FFT work area
+        std::vector<double> input;  //!< Previous and current input block
+        std::vector<double> output; //!< Filtered samples of the previous block
+        std::vector<double> past;   //!< Latest taps-1+blocksize samples before the current block
+        void Transform(std::complex<double> *Data,const bool &Inverse);
+        void TransformCoefficients();
+        void ProcessBlock();
+    public:
+        RTFIR_fft(const RTFIR &Design,const unsigned int &BlockSize=0,const bool &Automatic=true);
+        void SetCoefficients(const std::vector<double> &Coeff,const unsigned int &Fade=0);
+        std::vector<double> GetState() const;
+        void SetState(const std::vector<double> &State);
+        double Filter(const double &Sample);
+        void FilterBlock(const double *Input,double *Output,const unsigned int &Length);
+        unsigned int GetBlockSize() const;
+        unsigned int GetLatency() const;
+        bool UsesFFT() const;
+};
 
 #endif
 
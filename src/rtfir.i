@@ -1,14 +1,497 @@
-%module rtfir
+%module(threads="1") rtfir
+
+// Release the GIL while filtering blocks, so python threads can filter
+// independent streams in parallel. Single sample calls are too short to
+// gain from it, so they keep the GIL.
+%nothreadallow;
+%feature("nothreadallow","0") FilterBlock;
+
+%{
+#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
+#include <numpy/arrayobject.h>
+#include "rtfir.hpp"
+%}
 
 %include "std_vector.i"
 %include "std_string.i"
+%include "stdint.i"
+class RTFIR;
 namespace std {
    %template(IntVector) vector<int>;
    %template(DoubleVector) vector<double>;
+   %template(FloatVector) vector<float>;
+   %template(Int16Vector) vector<int16_t>;
+   %template(FilterVector) vector<RTFIR*>;
 }
 
-%{
-#include "rtfir.hpp"
+%init %{
+import_array();
+%}
+
+// Raise invalid arguments as python exceptions instead of aborting
+%include "exception.i"
+%exception {
+    try {
+        $action
+    }
+    catch(const std::invalid_argument &e){
+        SWIG_exception(SWIG_ValueError,e.what());
+    }
+}
+
+// Map a numpy array (or any sequence of numbers) to an input buffer and a
+// newly allocated numpy array of the same length, which is returned. The
+// samples are converted to the type of the filter.
+%define RTFIR_BLOCK_TYPEMAP(TYPE,NPYTYPE)
+%typemap(in,numinputs=1) (const TYPE *Input,TYPE *Output,const unsigned int &Length)
+        (PyArrayObject *inarray=NULL,PyArrayObject *outarray=NULL,unsigned int length=0){
+    inarray=(PyArrayObject*)PyArray_FROMANY($input,NPYTYPE,1,1,NPY_ARRAY_IN_ARRAY|NPY_ARRAY_FORCECAST);
+    if(!inarray) SWIG_fail;
+    npy_intp dims[1]={PyArray_DIM(inarray,0)};
+    outarray=(PyArrayObject*)PyArray_SimpleNew(1,dims,NPYTYPE);
+    if(!outarray) SWIG_fail;
+    length=(unsigned int)dims[0];
+    $1=(TYPE*)PyArray_DATA(inarray);
+    $2=(TYPE*)PyArray_DATA(outarray);
+    $3=&length;
+}
+%typemap(argout) (const TYPE *Input,TYPE *Output,const unsigned int &Length){
+    %append_output((PyObject*)outarray$argnum);
+    outarray$argnum=NULL;
+}
+%typemap(freearg) (const TYPE *Input,TYPE *Output,const unsigned int &Length){
+    Py_XDECREF(inarray$argnum);
+    Py_XDECREF(outarray$argnum);
+}
+%enddef
+RTFIR_BLOCK_TYPEMAP(double,NPY_DOUBLE)
+RTFIR_BLOCK_TYPEMAP(float,NPY_FLOAT)
+RTFIR_BLOCK_TYPEMAP(int16_t,NPY_INT16)
+RTFIR_BLOCK_TYPEMAP(int32_t,NPY_INT32)
+
+// Map a numpy array with one sample per channel to a frame and a newly
+// allocated numpy array of filtered samples, which is returned.
+%typemap(in,numinputs=1) (const double *Frame,double *Output)
+        (PyArrayObject *inarray=NULL,PyArrayObject *outarray=NULL){
+    inarray=(PyArrayObject*)PyArray_FROMANY($input,NPY_DOUBLE,1,1,NPY_ARRAY_IN_ARRAY);
+    if(!inarray) SWIG_fail;
+    if(PyArray_DIM(inarray,0)!=(npy_intp)arg1->GetChannels()){
+        PyErr_SetString(PyExc_ValueError,"Expected one sample per channel");
+        SWIG_fail;
+    }
+    outarray=(PyArrayObject*)PyArray_SimpleNew(1,PyArray_DIMS(inarray),NPY_DOUBLE);
+    if(!outarray) SWIG_fail;
+    $1=(double*)PyArray_DATA(inarray);
+    $2=(double*)PyArray_DATA(outarray);
+}
+%typemap(argout) (const double *Frame,double *Output){
+    %append_output((PyObject*)outarray$argnum);
+    outarray$argnum=NULL;
+}
+%typemap(freearg) (const double *Frame,double *Output){
+    Py_XDECREF(inarray$argnum);
+    Py_XDECREF(outarray$argnum);
+}
+
+// Map a 2-D numpy array of frames x channels to a block of frames and a
+// newly allocated numpy array of the same shape, which is returned.
+%typemap(in,numinputs=1) (const double *Frames,double *Output,const unsigned int &Length)
+        (PyArrayObject *inarray=NULL,PyArrayObject *outarray=NULL,unsigned int length=0){
+    inarray=(PyArrayObject*)PyArray_FROMANY($input,NPY_DOUBLE,2,2,NPY_ARRAY_IN_ARRAY);
+    if(!inarray) SWIG_fail;
+    if(PyArray_DIM(inarray,1)!=(npy_intp)arg1->GetChannels()){
+        PyErr_SetString(PyExc_ValueError,"Expected one column per channel");
+        SWIG_fail;
+    }
+    outarray=(PyArrayObject*)PyArray_SimpleNew(2,PyArray_DIMS(inarray),NPY_DOUBLE);
+    if(!outarray) SWIG_fail;
+    length=(unsigned int)PyArray_DIM(inarray,0);
+    $1=(double*)PyArray_DATA(inarray);
+    $2=(double*)PyArray_DATA(outarray);
+    $3=&length;
+}
+%typemap(argout) (const double *Frames,double *Output,const unsigned int &Length){
+    %append_output((PyObject*)outarray$argnum);
+    outarray$argnum=NULL;
+}
+%typemap(freearg) (const double *Frames,double *Output,const unsigned int &Length){
+    Py_XDECREF(inarray$argnum);
+    Py_XDECREF(outarray$argnum);
+}
+
+// Map a sample to a newly allocated numpy array of one filtered sample per
+// filter of a bank, which is returned.
+%typemap(in,numinputs=1) (const double &Sample,double *Outputs) (double sample=0,PyArrayObject *outarray=NULL){
+    sample=PyFloat_AsDouble($input);
+    if(PyErr_Occurred()) SWIG_fail;
+    npy_intp dims[1]={(npy_intp)arg1->GetFilters()};
+    outarray=(PyArrayObject*)PyArray_SimpleNew(1,dims,NPY_DOUBLE);
+    if(!outarray) SWIG_fail;
+    $1=&sample;
+    $2=(double*)PyArray_DATA(outarray);
+}
+%typemap(argout) (const double &Sample,double *Outputs){
+    %append_output((PyObject*)outarray$argnum);
+    outarray$argnum=NULL;
+}
+%typemap(freearg) (const double &Sample,double *Outputs){
+    Py_XDECREF(outarray$argnum);
+}
+
+// Map a numpy array to an input buffer and a newly allocated 2-D numpy
+// array of filters x samples, which is returned.
+%typemap(in,numinputs=1) (const double *Input,double *Outputs,const unsigned int &Length)
+        (PyArrayObject *inarray=NULL,PyArrayObject *outarray=NULL,unsigned int length=0){
+    inarray=(PyArrayObject*)PyArray_FROMANY($input,NPY_DOUBLE,1,1,NPY_ARRAY_IN_ARRAY|NPY_ARRAY_FORCECAST);
+    if(!inarray) SWIG_fail;
+    length=(unsigned int)PyArray_DIM(inarray,0);
+    npy_intp dims[2]={(npy_intp)arg1->GetFilters(),(npy_intp)length};
+    outarray=(PyArrayObject*)PyArray_SimpleNew(2,dims,NPY_DOUBLE);
+    if(!outarray) SWIG_fail;
+    $1=(double*)PyArray_DATA(inarray);
+    $2=(double*)PyArray_DATA(outarray);
+    $3=&length;
+}
+%typemap(argout) (const double *Input,double *Outputs,const unsigned int &Length){
+    %append_output((PyObject*)outarray$argnum);
+    outarray$argnum=NULL;
+}
+%typemap(freearg) (const double *Input,double *Outputs,const unsigned int &Length){
+    Py_XDECREF(inarray$argnum);
+    Py_XDECREF(outarray$argnum);
+}
+
+// Map a numpy array of one decimation factor of samples to the samples
+// of a decimating filter.
+%define RTFIR_SAMPLES_TYPEMAP(TYPE,NPYTYPE,FLAGS)
+%typemap(in,numinputs=1) (const TYPE *Samples) (PyArrayObject *inarray=NULL){
+    inarray=(PyArrayObject*)PyArray_FROMANY($input,NPYTYPE,1,1,FLAGS);
+    if(!inarray) SWIG_fail;
+    if(PyArray_DIM(inarray,0)!=(npy_intp)arg1->GetFactor()){
+        PyErr_SetString(PyExc_ValueError,"Expected one decimation factor of samples");
+        SWIG_fail;
+    }
+    $1=(TYPE*)PyArray_DATA(inarray);
+}
+%typemap(freearg) (const TYPE *Samples){
+    Py_XDECREF(inarray$argnum);
+}
+%enddef
+RTFIR_SAMPLES_TYPEMAP(double,NPY_DOUBLE,NPY_ARRAY_IN_ARRAY)
+RTFIR_SAMPLES_TYPEMAP(int32_t,NPY_INT32,NPY_ARRAY_IN_ARRAY|NPY_ARRAY_FORCECAST)
+
+// Map a numpy array to an input buffer and a newly allocated numpy array
+// sized by GetOutputLength(), which is returned in place of the count.
+%define RTFIR_OUTPUT_LENGTH_TYPEMAP(INTYPE,INNPYTYPE,FLAGS,OUTTYPE,OUTNPYTYPE)
+%typemap(in,numinputs=1) (const INTYPE *Input,const unsigned int &Length,OUTTYPE *Output)
+        (PyArrayObject *inarray=NULL,PyArrayObject *outarray=NULL,unsigned int length=0){
+    inarray=(PyArrayObject*)PyArray_FROMANY($input,INNPYTYPE,1,1,FLAGS);
+    if(!inarray) SWIG_fail;
+    length=(unsigned int)PyArray_DIM(inarray,0);
+    npy_intp dims[1]={(npy_intp)arg1->GetOutputLength(length)};
+    outarray=(PyArrayObject*)PyArray_SimpleNew(1,dims,OUTNPYTYPE);
+    if(!outarray) SWIG_fail;
+    $1=(INTYPE*)PyArray_DATA(inarray);
+    $2=&length;
+    $3=(OUTTYPE*)PyArray_DATA(outarray);
+}
+%typemap(argout) (const INTYPE *Input,const unsigned int &Length,OUTTYPE *Output){
+    %append_output((PyObject*)outarray$argnum);
+    outarray$argnum=NULL;
+}
+%typemap(freearg) (const INTYPE *Input,const unsigned int &Length,OUTTYPE *Output){
+    Py_XDECREF(inarray$argnum);
+    Py_XDECREF(outarray$argnum);
+}
+%enddef
+RTFIR_OUTPUT_LENGTH_TYPEMAP(double,NPY_DOUBLE,NPY_ARRAY_IN_ARRAY,double,NPY_DOUBLE)
+RTFIR_OUTPUT_LENGTH_TYPEMAP(int32_t,NPY_INT32,NPY_ARRAY_IN_ARRAY|NPY_ARRAY_FORCECAST,int64_t,NPY_INT64)
+%typemap(out) unsigned int FilterBlock "$result=NULL;";
+
+// Return the statistics of a filter as a dict
+%rename(_GetStats) RTFIR::GetStats;
+%extend RTFIR {
+%pythoncode %{
+    def GetStats(self):
+        """Get the statistics of the filter as a dict, counted if StatsEnabled()"""
+        stats=self._GetStats()
+        return {'samples':stats.samples,'calls':stats.calls,'block_calls':stats.block_calls,
+                'total_ns':stats.total_ns,'max_ns':stats.max_ns,'enabled':RTFIR.StatsEnabled()}
 %}
+}
 
 %include "rtfir.hpp"
+
+%pythoncode %{
+import os as _os
+import mmap as _mmap
+import asyncio as _asyncio
+import functools as _functools
+import threading as _threading
+import numpy as _np
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor as _ProcessPoolExecutor
+
+_batch_lock=_threading.Lock()
+_batch_pool=None
+_batch_threads=_os.cpu_count() or 1
+
+def SetBatchThreads(threads):
+    """Set the number of threads used by FilterBatch, zero for one per CPU"""
+    global _batch_pool,_batch_threads
+    with _batch_lock:
+        if _batch_pool:
+            _batch_pool.shutdown()
+            _batch_pool=None
+        _batch_threads=threads if threads>0 else (_os.cpu_count() or 1)
+
+def GetBatchThreads():
+    """Get the number of threads used by FilterBatch"""
+    return _batch_threads
+
+def FilterBatch(filters,inputs):
+    """Filter one block per filter concurrently and return the outputs in order
+
+    FilterBlock releases the GIL, so the filters run in parallel on a pool of
+    GetBatchThreads() threads. A filter must not appear twice in a batch, nor
+    be used by another thread while the batch runs.
+    """
+    global _batch_pool
+    filters=list(filters)
+    inputs=list(inputs)
+    if len(filters)!=len(inputs):
+        raise ValueError('Expected one input block per filter')
+    if len(set(map(id,filters)))!=len(filters):
+        raise ValueError('Filters must be distinct')
+    if len(filters)<2 or _batch_threads<2:
+        return [f.FilterBlock(x) for f,x in zip(filters,inputs)]
+    with _batch_lock:
+        if not _batch_pool:
+            _batch_pool=_ThreadPoolExecutor(_batch_threads,thread_name_prefix='rtfir')
+        pool=_batch_pool
+    return list(pool.map(lambda job: job[0].FilterBlock(job[1]),zip(filters,inputs)))
+
+class _Rechunker():
+    """Regroups chunks into blocks of a fixed number of samples (or frames)"""
+    def __init__(self,blocksize):
+        self.blocksize=blocksize
+        self.pending=[]
+        self.length=0
+
+    def push(self,chunk):
+        """Add a chunk and return the complete blocks"""
+        chunk=_np.asarray(chunk)
+        if not self.blocksize:
+            return [chunk] if len(chunk) else []
+        self.pending.append(chunk)
+        self.length+=len(chunk)
+        if self.length<self.blocksize:
+            # Producers may reuse their buffers, so keep a copy
+            self.pending[-1]=chunk.copy()
+            return []
+        data=_np.concatenate(self.pending) if len(self.pending)>1 else chunk
+        n=self.length-self.length%self.blocksize
+        blocks=[data[i:i+self.blocksize] for i in range(0,n,self.blocksize)]
+        self.pending=[data[n:].copy()] if n<self.length else []
+        self.length-=n
+        return blocks
+
+    def flush(self):
+        """Return the remaining samples as a last, shorter block"""
+        blocks=[_np.concatenate(self.pending)] if self.pending else []
+        self.pending=[]
+        self.length=0
+        return blocks
+
+def FilterStream(filter,chunks,blocksize=0):
+    """Filter an iterable of numpy chunks, yielding the filtered chunks
+
+    The chunks are filtered in order as one continuous signal. With a
+    blocksize, the input is regrouped into blocks of that many samples (or
+    frames) and one output is yielded per block, with the remainder last;
+    otherwise one output is yielded per chunk. Input is only pulled when the
+    next output is requested.
+    """
+    rechunker=_Rechunker(blocksize)
+    for chunk in chunks:
+        for block in rechunker.push(chunk):
+            yield filter.FilterBlock(block)
+    for block in rechunker.flush():
+        yield filter.FilterBlock(block)
+
+# Blocks this large are filtered on an executor by FilterStreamAsync,
+# smaller blocks are cheaper to filter than to hand off
+_stream_offload=4096
+
+async def FilterStreamAsync(filter,chunks,blocksize=0,executor=None):
+    """Filter an (async) iterable of numpy chunks, yielding the filtered chunks
+
+    Works like FilterStream. Large blocks are filtered on the executor, or
+    the default executor of the event loop, so the loop is not blocked while
+    FilterBlock runs without the GIL. Chunks are awaited only when the next
+    output is requested, so a slow consumer slows down the producer instead
+    of queueing data.
+    """
+    loop=_asyncio.get_running_loop()
+    rechunker=_Rechunker(blocksize)
+    async def run(block):
+        if block.size<_stream_offload:
+            return filter.FilterBlock(block)
+        return await loop.run_in_executor(executor,filter.FilterBlock,block)
+    if hasattr(chunks,'__aiter__'):
+        async for chunk in chunks:
+            for block in rechunker.push(chunk):
+                yield await run(block)
+    else:
+        for chunk in chunks:
+            for block in rechunker.push(chunk):
+                yield await run(block)
+    for block in rechunker.flush():
+        yield await run(block)
+
+# SWIG objects can not be pickled as they are, so the filters remember their
+# constructor arguments and are pickled as those, plus the coefficients,
+# folding and delay line. Filters given as arguments are copied, so the
+# pickle does not change when they are retuned later.
+def _copy_filter(filter):
+    """Copy the coefficients and folding of a filter to a plain RTFIR"""
+    coefficients=RTFIR.GetCoefficients(filter)
+    copy=RTFIR(len(coefficients))
+    copy.SetCoefficients(coefficients)
+    _restore_folding(copy,RTFIR.GetFolding(filter),RTFIR.GetCost(filter),RTFIR.GetStride(filter))
+    return copy
+
+def _restore_folding(filter,folding,cost,stride=1):
+    """Select the folding mode of the original and the sparse mode reproducing it"""
+    filter.SetFolding(folding)
+    for sparse in (True,False):
+        RTFIR.SetSparse(filter,sparse)
+        if RTFIR.GetCost(filter)==cost and RTFIR.GetStride(filter)==stride:
+            return
+
+def _copy_argument(value):
+    if isinstance(value,RTFIR):
+        return _copy_filter(value)
+    if isinstance(value,(list,tuple)) and any(isinstance(v,RTFIR) for v in value):
+        return [_copy_argument(v) for v in value]
+    return value
+
+def _reduce_filter(self):
+    if not hasattr(self,'_arguments'):
+        raise TypeError(type(self).__name__+' objects can not be pickled')
+    args,kwargs=self._arguments
+    state={'state':self.GetState()}
+    if isinstance(self,RTFIR) and not isinstance(self,RTFIR_chain):
+        state['coefficients']=self.GetCoefficients()
+        state['folding']=self.GetFolding()
+        state['cost']=self.GetCost()
+        state['stride']=self.GetStride()
+    return (_restore_filter,(type(self),args,kwargs,state))
+
+def _restore_filter(cls,args,kwargs,state):
+    filter=cls(*args,**kwargs)
+    if 'coefficients' in state:
+        if filter.GetCoefficients()!=state['coefficients']:
+            filter.SetCoefficients(state['coefficients'])
+        _restore_folding(filter,state['folding'],state['cost'],state['stride'])
+    filter.SetState(state['state'])
+    return filter
+
+def _picklable(cls):
+    init=cls.__init__
+    @_functools.wraps(init)
+    def __init__(self,*args,**kwargs):
+        init(self,*args,**kwargs)
+        self._arguments=(tuple(_copy_argument(a) for a in args),{k:_copy_argument(v) for k,v in kwargs.items()})
+    cls.__init__=__init__
+    cls.__reduce__=_reduce_filter
+
+for _cls in (RTFIR,RTFIR_lowpass,RTFIR_highpass,RTFIR_bandpass,RTFIR_bandstop,
+             RTFIR_kaiser_lowpass,RTFIR_kaiser_highpass,RTFIR_fft,RTFIR_chain,
+             RTFIR_multichannel,RTFIR_bank):
+    _picklable(_cls)
+
+# Decimators, resamplers, moving averages, CIC filters and the float and
+# fixed point filters keep a phase or delay line without state methods, so
+# they refuse pickling with a clear error instead of failing in SWIG
+for _cls in (RTFIR_decimator,RTFIR_resampler,RTFIR_moving_average,RTFIR_cic,
+             RTFIR_float,RTFIR_q15,RTFIR_q31):
+    _cls.__reduce__=_reduce_filter
+del _cls
+
+# Data filtered by the processes of FilterSharded
+_shard_data=None
+
+def _open_shard_data(source):
+    """Process pool initializer, mapping memory mapped files again"""
+    global _shard_data
+    if isinstance(source,tuple):
+        filename,dtype,offset,shape,order=source
+        source=_np.memmap(filename,dtype=dtype,mode='r',offset=offset,shape=shape,order=order)
+    _shard_data=source
+
+def _filter_shard(filter,start,stop,history,kernel):
+    """Filter one shard, priming the filter with the samples before it"""
+    RTFIR.SetKernel(kernel)
+    if start>=history:
+        filter.SetState(_np.asarray(_shard_data[start-history:start],dtype=float).ravel().tolist())
+    else:
+        filter.FilterBlock(_shard_data[:start])
+    return filter.FilterBlock(_shard_data[start:stop])
+
+def FilterSharded(filter,data,processes=0,shardsize=0,output=None):
+    """Filter a large array as one signal on a pool of processes
+
+    The data is split into shards of shardsize samples (or frames), by
+    default one per process. Each process filters a shard with a copy of the
+    filter, primed with the samples before the shard, so the output is
+    bit-identical to filtering all data with FilterBlock. A memory mapped
+    file is mapped by each process instead of being copied to it. The output
+    is written to output if given, which may be memory mapped as well, and
+    the filter is left as if it had filtered the data itself.
+
+    The filter must be picklable and not crossfading: RTFIR and its designs,
+    chains, multichannel filters, banks and FFT filters filtering directly.
+    """
+    if isinstance(filter,RTFIR_decimator):
+        raise ValueError('Decimators can not be sharded')
+    if not hasattr(filter,'_arguments'):
+        raise ValueError(type(filter).__name__+' objects can not be pickled, so they can not be sharded')
+    if isinstance(filter,RTFIR_fft) and filter.UsesFFT():
+        raise ValueError('FFT filters can only be sharded while filtering directly')
+    data=data if isinstance(data,_np.ndarray) else _np.asarray(data)
+    length=len(data)
+    bank=isinstance(filter,RTFIR_bank)
+    channels=filter.GetChannels() if isinstance(filter,RTFIR_multichannel) else 1
+    history=len(filter.GetState())//channels
+    if output is None:
+        output=_np.empty((filter.GetFilters(),length) if bank else data.shape)
+    processes=processes if processes>0 else (_os.cpu_count() or 1)
+    shardsize=shardsize if shardsize>0 else max(1,-(-length//processes))
+    shards=list(range(0,length,shardsize))
+    if processes<2 or len(shards)<2:
+        output[...]=filter.FilterBlock(data)
+        return output
+
+    # Memory mapped files are mapped again rather than copied to each process
+    source=data
+    if isinstance(data,_np.memmap) and isinstance(data.base,_mmap.mmap):
+        order='F' if data.flags.f_contiguous and not data.flags.c_contiguous else 'C'
+        source=(data.filename,data.dtype,data.offset,data.shape,order)
+    n=len(shards)
+    with _ProcessPoolExecutor(min(processes,n),initializer=_open_shard_data,initargs=(source,)) as pool:
+        stops=[min(start+shardsize,length) for start in shards]
+        results=pool.map(_filter_shard,[filter]*n,shards,stops,[history]*n,[RTFIR.GetKernel()]*n)
+        for start,stop,result in zip(shards,stops,results):
+            if bank:
+                output[:,start:stop]=result
+            else:
+                output[start:stop]=result
+
+    # Leave the filter with the delay line after the data
+    if length>=history:
+        filter.SetState(_np.asarray(data[length-history:],dtype=float).ravel().tolist())
+    else:
+        filter.FilterBlock(data)
+    return output
+%}
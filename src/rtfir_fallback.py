@@ -1,83 +1,1228 @@
 #
 # Pure python fallback for systems without working compilers
 #
-# This will work well enough for short filters with low sampling rate, but
-# is not recommended due to the performance hit compared to the compiled 
-# counterparts.
+# Filtering is done with numpy, which makes block filtering reasonably fast,
+# but filtering one sample at a time still suffers from the python overhead
+# per call and is much slower than the compiled counterparts.
 #
 import numpy as np
+import collections
+import threading
+import asyncio
 import sys
+import os
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+
+RTFIR_FOLD_AUTO=0
+RTFIR_FOLD_FORCE=1
+RTFIR_FOLD_DISABLE=2
+RTFIR_CHAIN_AUTO=0
+RTFIR_CHAIN_FUSED=1
+RTFIR_CHAIN_STAGED=2
+RTFIR_KERNEL_AUTO=0
+RTFIR_KERNEL_SCALAR=1
+RTFIR_KERNEL_SSE2=2
+RTFIR_KERNEL_AVX2=3
+RTFIR_KERNEL_NEON=4
+RTFIR_DESIGN_LOWPASS=0
+RTFIR_DESIGN_HIGHPASS=1
+RTFIR_DESIGN_BANDPASS=2
+RTFIR_DESIGN_BANDSTOP=3
+RTFIR_WINDOW_RECTANGULAR=0
+RTFIR_WINDOW_HAMMING=1
+RTFIR_WINDOW_BLACKMAN=2
+RTFIR_WINDOW_KAISER=3
+
+class RTFIR_cache_stats():
+    def __init__(self,hits=0,misses=0,evictions=0,size=0,capacity=0):
+        self.hits=hits
+        self.misses=misses
+        self.evictions=evictions
+        self.size=size
+        self.capacity=capacity
+
+class RTFIR_cache():
+    # Read-only coefficient arrays shared by identical designs, most
+    # recently used last
+    lock=threading.Lock()
+    designs=collections.OrderedDict()
+    stats=RTFIR_cache_stats(capacity=64)
+
+    @staticmethod
+    def SetCapacity(capacity):
+        with RTFIR_cache.lock:
+            RTFIR_cache.stats.capacity=capacity
+            RTFIR_cache.Evict()
+
+    @staticmethod
+    def GetCapacity():
+        return RTFIR_cache.stats.capacity
+
+    @staticmethod
+    def GetStats():
+        with RTFIR_cache.lock:
+            stats=RTFIR_cache.stats
+            return RTFIR_cache_stats(stats.hits,stats.misses,stats.evictions,len(RTFIR_cache.designs),stats.capacity)
+
+    @staticmethod
+    def Clear():
+        with RTFIR_cache.lock:
+            RTFIR_cache.designs.clear()
+
+    @staticmethod
+    def Evict():
+        while len(RTFIR_cache.designs)>RTFIR_cache.stats.capacity:
+            RTFIR_cache.designs.popitem(last=False)
+            RTFIR_cache.stats.evictions+=1
     
 class RTFIR():
     def __init__(self,taps):
         sys.stderr.write('WARNING: You are using the uncompiled fallback for python.\n')
         self.coeff=np.zeros(taps)
-        self.buffer=np.zeros(taps)
+        self.buffer=np.zeros(2*taps)
+        self.offset=0
         self.taps=taps
+        self.symmetry=0
+        self.fold=RTFIR_FOLD_AUTO
+        self.sparse=True
+        self.stride=1
+        self.design=None
+        self.fade=None
+        self.fadelength=0
+        self.fadeposition=0
 
     def GetCoefficients(self):
         return self.coeff
 
+    def GetState(self):
+        return self.buffer[self.offset:self.offset+self.taps-1][::-1].copy()
+
+    def SetState(self,state):
+        state=np.asarray(state,dtype=float)
+        if state.shape!=(self.taps-1,):
+            raise ValueError('Expected taps-1 samples of state')
+        latest=np.concatenate((state[::-1],np.zeros(1)))
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
+
+    @staticmethod
+    def SinPi(freq,i):
+        # Exact zero crossings keep the zeros of half-band designs
+        x=2*freq*i
+        return np.where(x==np.floor(x),0.0,np.sin(2*np.pi*freq*i))
+
+    @staticmethod
+    def Sinc(design,taps,freq1,freq2):
+        W=int(taps/2)
+        i=np.arange(-W,taps-W)
+        n=np.where(i==0,1,i)
+        sin=RTFIR.SinPi
+        if design==RTFIR_DESIGN_LOWPASS:
+            return np.where(i==0,2*freq1,sin(freq1,i)/(n*np.pi))
+        if design==RTFIR_DESIGN_HIGHPASS:
+            return np.where(i==0,1-2*freq1,-sin(freq1,i)/(n*np.pi))
+        if design==RTFIR_DESIGN_BANDPASS:
+            return np.where(i==0,((2*np.pi*freq2)-(2*np.pi*freq1))/np.pi,(sin(freq2,i)-sin(freq1,i))/(n*np.pi))
+        return np.where(i==0,1+((2*np.pi*freq1)-(2*np.pi*freq2))/np.pi,(sin(freq1,i)-sin(freq2,i))/(n*np.pi))
+
+    def Design(self,design,freq1,freq2,window,beta):
+        # Recorded so Retune can regenerate the design
+        self.design=(design,window,beta)
+        if not self.Lookup(design,freq1,freq2,window,beta):
+            self.coeff[:]=RTFIR.Sinc(design,self.taps,freq1,freq2)
+            self.ApplyWindow(window,beta)
+            self.Store(design,freq1,freq2,window,beta)
+        self.SetFolding(RTFIR_FOLD_AUTO)
+
+    def PrepareRetune(self):
+        # Cached designs are read-only and shared, so retune a private copy
+        if not self.coeff.flags.writeable:
+            self.coeff=self.coeff.copy()
+        if self.fade is None:
+            self.fade=np.zeros(self.taps)
+
+    def StartCrossfade(self,fade):
+        # Fade out from the mix heard so far if already crossfading
+        if fade:
+            if self.fadeposition<self.fadelength:
+                self.fade+=(self.coeff-self.fade)*self.fadeposition/self.fadelength
+            else:
+                self.fade[:]=self.coeff
+        self.fadelength=fade
+        self.fadeposition=0
+
+    def Crossfade(self,output,previous):
+        # Mix the first outputs with those of the faded out coefficients,
+        # which previous(n) computes for the first n outputs
+        n=min(len(output),self.fadelength-self.fadeposition)
+        ramp=np.arange(self.fadeposition+1,self.fadeposition+n+1)/self.fadelength
+        faded=previous(n)
+        output[:n]=faded+(output[:n]-faded)*ramp
+        self.fadeposition+=n
+
+    def Retune(self,freq1,freq2=0,fade=0):
+        if self.design is None:
+            raise ValueError('Only sinc designs can be retuned')
+        design,window,beta=self.design
+        band=design in (RTFIR_DESIGN_BANDPASS,RTFIR_DESIGN_BANDSTOP)
+        if freq1<0 or freq1>0.5 or (band and (freq2<0 or freq2>0.5)):
+            raise ValueError('Frequencies must be normalized')
+        self.PrepareRetune()
+        self.StartCrossfade(fade)
+        self.coeff[:]=RTFIR.Sinc(design,self.taps,freq1,freq2)
+        self.ApplyWindow(window,beta)
+        self.SetFolding(self.fold)
+
+    def SetCoefficients(self,coeff,fade=0):
+        coeff=np.asarray(coeff,dtype=float)
+        if coeff.shape!=(self.taps,):
+            raise ValueError('Expected one coefficient per tap')
+        self.PrepareRetune()
+        self.StartCrossfade(fade)
+        self.coeff[:]=coeff
+        self.SetFolding(self.fold)
+
+    def Lookup(self,design,freq1,freq2,window=RTFIR_WINDOW_RECTANGULAR,beta=0):
+        with RTFIR_cache.lock:
+            key=(design,self.taps,freq1,freq2,window,beta if window==RTFIR_WINDOW_KAISER else 0)
+            if key not in RTFIR_cache.designs:
+                RTFIR_cache.stats.misses+=1
+                return False
+            RTFIR_cache.designs.move_to_end(key)
+            RTFIR_cache.stats.hits+=1
+            self.coeff=RTFIR_cache.designs[key]
+            return True
+
+    def Store(self,design,freq1,freq2,window=RTFIR_WINDOW_RECTANGULAR,beta=0):
+        self.coeff.flags.writeable=False
+        with RTFIR_cache.lock:
+            key=(design,self.taps,freq1,freq2,window,beta if window==RTFIR_WINDOW_KAISER else 0)
+            if RTFIR_cache.stats.capacity and key not in RTFIR_cache.designs:
+                RTFIR_cache.designs[key]=self.coeff
+                RTFIR_cache.Evict()
+
+    def ApplyWindow(self,window,beta):
+        # Centered on the center tap, so the design stays (anti)symmetric
+        W=int(self.taps/2)
+        if window==RTFIR_WINDOW_RECTANGULAR or W==0:
+            return
+        x=np.arange(-W,self.taps-W)/W
+        if window==RTFIR_WINDOW_HAMMING:
+            self.coeff*=0.54+0.46*np.cos(np.pi*x)
+        elif window==RTFIR_WINDOW_BLACKMAN:
+            self.coeff*=0.42+0.5*np.cos(np.pi*x)+0.08*np.cos(2*np.pi*x)
+        elif window==RTFIR_WINDOW_KAISER:
+            self.coeff*=np.i0(beta*np.sqrt(1-x*x))/np.i0(beta)
+
+    @staticmethod
+    def KaiserBeta(attenuation):
+        if attenuation>50:
+            return 0.1102*(attenuation-8.7)
+        if attenuation>=21:
+            return 0.5842*(attenuation-21)**0.4+0.07886*(attenuation-21)
+        return 0.0
+
+    @staticmethod
+    def KaiserTaps(transition,attenuation):
+        # Kaiser formula, rounded up to an odd number of taps
+        if transition<=0 or transition>0.5 or attenuation<=0:
+            raise ValueError('Invalid filter specification')
+        taps=int(np.ceil((attenuation-7.95)/(2.285*2*np.pi*transition)))+1
+        return max(taps,3)|1
+
+    def SetFolding(self,mode):
+        # Numpy's dot product is not sped up by folding, so this only
+        # detects the symmetry to match the compiled classes
+        self.fold=mode
+        self.symmetry=0
+        if mode!=RTFIR_FOLD_DISABLE:
+            self.FindSymmetry(1e-9 if mode==RTFIR_FOLD_FORCE else 0.0)
+        self.Sparsify()
+        return self.symmetry!=0
+
+    def FindSymmetry(self,tolerance):
+        peak=np.max(np.abs(self.coeff)) if self.taps else 0.0
+        for trim in range(0,min(3,self.taps-1)):
+            for head in range(0,trim+1):
+                span=self.coeff[head:self.taps-(trim-head)]
+                for sign in (1,-1):
+                    if np.all(np.abs(span-sign*span[::-1])<=tolerance*peak):
+                        self.symmetry=sign
+                        self.first=head
+                        self.last=self.taps-1-(trim-head)
+                        return
+
+    def Sparsify(self):
+        # Like folding, the sparse form is detected to match the compiled
+        # classes, only the decimator skips the zeros
+        self.stride=1
+        if not self.sparse or self.taps<4:
+            return
+        if 4*np.count_nonzero(self.coeff)>3*self.taps:
+            return
+        # Strides up to 8 with at most 4 non-zero taps off the stride
+        cost=3*RTFIR.GetCost(self)//4+1
+        for m in range(2,min(8,self.taps//2)+1):
+            for r in range(0,m):
+                off=np.count_nonzero(self.coeff)-np.count_nonzero(self.coeff[r::m])
+                if off>4:
+                    continue
+                compact=self.coeff[r::m]
+                half=len(compact)//2
+                folds=self.symmetry!=0 and np.all(compact[:half]==self.symmetry*compact[::-1][:half])
+                c=((len(compact)+1)//2 if folds else len(compact))+off
+                if c<cost:
+                    cost=c
+                    self.stride=m
+                    self.sparsecost=c
+
+    def SetSparse(self,enable):
+        self.sparse=bool(enable)
+        self.Sparsify()
+        return self.stride>1
+
+    def GetStride(self):
+        return self.stride
+
+    def GetFolding(self):
+        return self.fold
+
+    def GetSymmetry(self):
+        return self.symmetry
+
+    def GetCost(self):
+        if self.stride>1:
+            return self.sparsecost
+        if not self.symmetry:
+            return self.taps
+        return self.taps-(self.last-self.first+1)//2
+
+    # Statistics are a compile-time option of the compiled module
+    def GetStats(self):
+        return {'samples':0,'calls':0,'block_calls':0,'total_ns':0,'max_ns':0,'enabled':False}
+
+    def ResetStats(self):
+        pass
+
+    @staticmethod
+    def StatsEnabled():
+        return False
+
+    # Numpy does the vectorization, so only the portable kernel is available
+    @staticmethod
+    def SetKernel(kernel):
+        return kernel in (RTFIR_KERNEL_AUTO,RTFIR_KERNEL_SCALAR)
+
+    @staticmethod
+    def GetKernel():
+        return RTFIR_KERNEL_SCALAR
+
     def Filter(self,sample):
-        for i in range(self.taps-1,0,-1):
-            self.buffer[i]=self.buffer[i-1]
-        self.buffer[0]=sample
-        output=0.0
-        for i in range(0,self.taps):
-            output+=self.buffer[i]*self.coeff[i]
+        # Step back in the mirrored circular buffer
+        if self.offset==0:
+            self.offset=self.taps
+        self.offset-=1
+        self.buffer[self.offset]=sample
+        self.buffer[self.offset+self.taps]=sample
+        window=self.buffer[self.offset:self.offset+self.taps]
+        output=float(np.dot(window,self.coeff))
+        if self.fadeposition<self.fadelength:
+            previous=float(np.dot(window,self.fade))
+            self.fadeposition+=1
+            output=previous+(output-previous)*self.fadeposition/self.fadelength
+        return output
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples,dtype=float)
+        if len(samples)==0:
+            return np.zeros(0)
+
+        # Prepend the delay line in chronological order and convolve
+        history=self.buffer[self.offset:self.offset+self.taps-1][::-1]
+        extended=np.concatenate((history,samples))
+        output=np.convolve(extended,self.coeff,'valid')
 
+        if self.fadeposition<self.fadelength:
+            self.Crossfade(output,lambda n: np.convolve(extended[:n+self.taps-1],self.fade,'valid'))
+
+        # Store the latest samples, newest first
+        latest=extended[-self.taps:][::-1]
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
         return output
 
 
 class RTFIR_lowpass(RTFIR):
-    def __init__(self,taps,fcutoff):
+    def __init__(self,taps,fcutoff,window=RTFIR_WINDOW_RECTANGULAR,beta=0):
         if fcutoff<0 or fcutoff>0.5:
             print('Cutoff frequency must be normalized')
             raise
         RTFIR.__init__(self,taps)
-        W=int(taps/2)
-        for i in range(-W,W):
-            if i==0:
-                self.coeff[i+W]=2*fcutoff
-            else:
-                self.coeff[i+W]=np.sin(2*np.pi*fcutoff*i)/(i*np.pi)
+        self.Design(RTFIR_DESIGN_LOWPASS,fcutoff,0,window,beta)
 
 class RTFIR_highpass(RTFIR):
-    def __init__(self,taps,fcutoff):
+    def __init__(self,taps,fcutoff,window=RTFIR_WINDOW_RECTANGULAR,beta=0):
         if fcutoff<0 or fcutoff>0.5:
             print('Cutoff frequency must be normalized')
             raise
         RTFIR.__init__(self,taps)
-        W=int(taps/2)
-        for i in range(-W,W):
-            if i==0:
-                self.coeff[i+W]=1-2*fcutoff
-            else:
-                self.coeff[i+W]=-np.sin(2*np.pi*fcutoff*i)/(i*np.pi)
+        self.Design(RTFIR_DESIGN_HIGHPASS,fcutoff,0,window,beta)
 
 class RTFIR_bandpass(RTFIR):
-    def __init__(self,taps,fclow,fchigh):
+    def __init__(self,taps,fclow,fchigh,window=RTFIR_WINDOW_RECTANGULAR,beta=0):
         if fclow<0 or fclow>0.5 or fchigh<0 or fchigh>0.5:
             print('Cutoff frequency must be normalized')
             raise
         RTFIR.__init__(self,taps)
-        W=int(taps/2)
-        for i in range(-W,W):
-            if i==0:
-                self.coeff[i+W]=((2*np.pi*fchigh)-(2*np.pi*fclow))/np.pi
-            else:
-                self.coeff[i+W]=(np.sin(2*np.pi*fchigh*i)-np.sin(2*np.pi*fclow*i))/(i*np.pi)
+        self.Design(RTFIR_DESIGN_BANDPASS,fclow,fchigh,window,beta)
 
 class RTFIR_bandstop(RTFIR):
-    def __init__(self,taps,fclow,fchigh):
+    def __init__(self,taps,fclow,fchigh,window=RTFIR_WINDOW_RECTANGULAR,beta=0):
         if fclow<0 or fclow>0.5 or fchigh<0 or fchigh>0.5:
             print('Cutoff frequency must be normalized')
             raise
         RTFIR.__init__(self,taps)
-        W=int(taps/2)
-        for i in range(-W,W):
-            if i==0:
-                self.coeff[i+W]=1+((2*np.pi*fclow)-(2*np.pi*fchigh))/np.pi
+        self.Design(RTFIR_DESIGN_BANDSTOP,fclow,fchigh,window,beta)
+
+class RTFIR_kaiser_lowpass(RTFIR_lowpass):
+    def __init__(self,fpass,fstop,attenuation):
+        taps=RTFIR.KaiserTaps(fstop-fpass,attenuation)
+        RTFIR_lowpass.__init__(self,taps,(fpass+fstop)/2,RTFIR_WINDOW_KAISER,RTFIR.KaiserBeta(attenuation))
+
+class RTFIR_kaiser_highpass(RTFIR_highpass):
+    def __init__(self,fpass,fstop,attenuation):
+        taps=RTFIR.KaiserTaps(fpass-fstop,attenuation)
+        RTFIR_highpass.__init__(self,taps,(fpass+fstop)/2,RTFIR_WINDOW_KAISER,RTFIR.KaiserBeta(attenuation))
+
+
+_FFT_COST_RATIO=3.0
+
+class RTFIR_fft(RTFIR):
+    def __init__(self,design,blocksize=0,automatic=True):
+        coeff=np.asarray(design.GetCoefficients(),dtype=float)
+        RTFIR.__init__(self,len(coeff))
+        self.coeff[:]=coeff
+        self.SetFolding(RTFIR_FOLD_AUTO)
+
+        # Select block size and fall back to direct filtering if cheaper
+        target=blocksize if blocksize else self.taps
+        self.blocksize=1
+        while self.blocksize<target:
+            self.blocksize*=2
+        self.partitions=(self.taps+self.blocksize-1)//self.blocksize
+        N=2*self.blocksize
+        fftcost=(2.0*2.0*N*np.log2(N)+4.0*N*self.partitions)/self.blocksize
+        # Same estimate as the compiled filters, where the direct form is
+        # about _FFT_COST_RATIO times faster per multiply
+        if automatic and _FFT_COST_RATIO*fftcost>=self.GetCost():
+            self.blocksize=0
+            self.partitions=0
+            return
+
+        self.TransformCoefficients()
+        self.history=np.zeros_like(self.spectra)
+        self.head=0
+        self.position=0
+        self.input=np.zeros(N)
+        self.output=np.zeros(self.blocksize)
+        self.past=np.zeros(self.taps-1+self.blocksize)
+
+    def TransformCoefficients(self):
+        # Transform partitions of zero-padded coefficients
+        padded=np.zeros(self.partitions*self.blocksize)
+        padded[:self.taps]=self.coeff
+        self.spectra=np.fft.rfft(padded.reshape(self.partitions,self.blocksize),2*self.blocksize)
+
+    def SetCoefficients(self,coeff,fade=0):
+        if self.blocksize and fade:
+            raise ValueError('FFT filters can not crossfade')
+        RTFIR.SetCoefficients(self,coeff,fade)
+        if self.blocksize:
+            self.TransformCoefficients()
+
+    # The pending outputs are delayed by a block, so the state holds the
+    # taps-1+blocksize samples before the current block and the current block
+    def GetState(self):
+        if not self.blocksize:
+            return RTFIR.GetState(self)
+        return np.concatenate((self.past,self.input[self.blocksize:self.blocksize+self.position]))
+
+    def SetState(self,state):
+        if not self.blocksize:
+            RTFIR.SetState(self,state)
+            return
+        state=np.asarray(state,dtype=float)
+        length=self.taps-1+self.blocksize
+        if state.ndim!=1 or not length<=len(state)<length+self.blocksize:
+            raise ValueError('Expected taps-1+GetLatency() samples of state plus the current block')
+        self.history[:]=0
+        self.input[:]=0
+        self.output=np.zeros(self.blocksize)
+        self.head=0
+        # Start part way into a block of zeros, so the state ends as far
+        # into the current block as it did when it was taken
+        self.position=-(self.taps-1)%self.blocksize
+        self.FilterBlock(state)
+
+    def ProcessBlock(self):
+        B=self.blocksize
+        self.head=(self.head-1)%self.partitions
+        self.history[self.head]=np.fft.rfft(self.input)
+        order=(self.head+np.arange(self.partitions))%self.partitions
+        y=np.fft.irfft(np.sum(self.history[order]*self.spectra,axis=0),2*B)
+        self.output=y[B:]
+        self.input[:B]=self.input[B:]
+        self.past=np.concatenate((self.past[B:],self.input[:B]))
+
+    def Filter(self,sample):
+        if not self.blocksize:
+            return RTFIR.Filter(self,sample)
+        output=self.output[self.position]
+        self.input[self.blocksize+self.position]=sample
+        self.position+=1
+        if self.position==self.blocksize:
+            self.ProcessBlock()
+            self.position=0
+        return float(output)
+
+    def FilterBlock(self,samples):
+        if not self.blocksize:
+            return RTFIR.FilterBlock(self,samples)
+        samples=np.asarray(samples,dtype=float)
+        output=np.zeros(len(samples))
+        done=0
+        while done<len(samples):
+            n=min(self.blocksize-self.position,len(samples)-done)
+            output[done:done+n]=self.output[self.position:self.position+n]
+            self.input[self.blocksize+self.position:self.blocksize+self.position+n]=samples[done:done+n]
+            self.position+=n
+            done+=n
+            if self.position==self.blocksize:
+                self.ProcessBlock()
+                self.position=0
+        return output
+
+    def GetBlockSize(self):
+        return self.blocksize
+
+    def GetLatency(self):
+        return self.blocksize
+
+    def UsesFFT(self):
+        return self.blocksize>0
+
+class RTFIR_chain(RTFIR):
+    def __init__(self,stages,plan=RTFIR_CHAIN_AUTO):
+        if not len(stages):
+            print('At least one stage is required')
+            raise
+        if any(isinstance(stage,RTFIR_fft) and stage.UsesFFT() for stage in stages):
+            print('FFT filters can not be chained or banked')
+            raise
+        if any(isinstance(stage,RTFIR_decimator) for stage in stages):
+            print('Decimators can not be chained or banked')
+            raise
+        fused=np.ones(1)
+        for stage in stages:
+            fused=np.convolve(fused,stage.coeff)
+        RTFIR.__init__(self,len(fused))
+        self.coeff[:]=fused
+        # Rounding in the convolution breaks exact symmetry
+        self.SetFolding(RTFIR_FOLD_FORCE)
+
+        # Pick the plan with the fewest multiplications per sample
+        self.count=len(stages)
+        self.staged=sum(stage.GetCost() for stage in stages)
+        self.plan=plan
+        if plan==RTFIR_CHAIN_AUTO:
+            self.plan=RTFIR_CHAIN_FUSED if RTFIR.GetCost(self)<=self.staged else RTFIR_CHAIN_STAGED
+        self.stages=[]
+        if self.plan==RTFIR_CHAIN_STAGED:
+            for stage in stages:
+                copy=RTFIR(stage.taps)
+                copy.coeff[:]=stage.coeff
+                copy.symmetry=stage.symmetry
+                copy.fold=stage.fold
+                if stage.symmetry:
+                    copy.first=stage.first
+                    copy.last=stage.last
+                copy.sparse=stage.sparse
+                copy.Sparsify()
+                self.stages.append(copy)
+
+    def Filter(self,sample):
+        if self.plan==RTFIR_CHAIN_FUSED:
+            return RTFIR.Filter(self,sample)
+        # Keep the delay line of the fused filter for GetState
+        if self.offset==0:
+            self.offset=self.taps
+        self.offset-=1
+        self.buffer[self.offset]=sample
+        self.buffer[self.offset+self.taps]=sample
+        for stage in self.stages:
+            sample=stage.Filter(sample)
+        return sample
+
+    def FilterBlock(self,samples):
+        # Numpy filters whole blocks, so stages are not run in chunks
+        if self.plan==RTFIR_CHAIN_FUSED:
+            return RTFIR.FilterBlock(self,samples)
+        samples=np.asarray(samples,dtype=float)
+        RTFIR.SetState(self,np.concatenate((RTFIR.GetState(self),samples))[len(samples):])
+        for stage in self.stages:
+            samples=stage.FilterBlock(samples)
+        return np.asarray(samples,dtype=float)
+
+    def SetState(self,state):
+        RTFIR.SetState(self,state)
+        if self.plan==RTFIR_CHAIN_FUSED:
+            return
+        # The state spans the delay lines of all stages
+        for stage in self.stages:
+            stage.SetState(np.zeros(stage.taps-1))
+        for stage in self.stages:
+            state=stage.FilterBlock(state)
+
+    # The staged plan filters with copies of the stages, so new coefficients
+    # would not reach the output
+    def SetCoefficients(self,coeff,fade=0):
+        raise ValueError('Chains can not take new coefficients, chain new stages instead')
+
+    def GetPlan(self):
+        return self.plan
+
+    def GetStages(self):
+        return self.count
+
+    def GetCost(self):
+        return RTFIR.GetCost(self) if self.plan==RTFIR_CHAIN_FUSED else self.staged
+
+class RTFIR_multichannel():
+    def __init__(self,design,channels):
+        if channels<1:
+            print('At least one channel is required')
+            raise
+        self.coeff=np.array(design.GetCoefficients(),dtype=float)
+        self.taps=len(self.coeff)
+        self.channels=channels
+        self.buffer=np.zeros((2*self.taps,channels))
+        self.offset=0
+
+    def GetChannels(self):
+        return self.channels
+
+    def GetCoefficients(self):
+        return self.coeff
+
+    def GetState(self):
+        return self.buffer[self.offset:self.offset+self.taps-1][::-1].ravel()
+
+    def SetState(self,state):
+        state=np.asarray(state,dtype=float)
+        if state.size!=(self.taps-1)*self.channels:
+            raise ValueError('Expected taps-1 frames of state')
+        latest=np.concatenate((state.reshape(self.taps-1,self.channels)[::-1],np.zeros((1,self.channels))))
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
+
+    def Filter(self,frame):
+        frame=np.asarray(frame,dtype=float)
+        if frame.shape!=(self.channels,):
+            raise ValueError('Expected one sample per channel')
+        if self.offset==0:
+            self.offset=self.taps
+        self.offset-=1
+        self.buffer[self.offset]=frame
+        self.buffer[self.offset+self.taps]=frame
+        return np.dot(self.coeff,self.buffer[self.offset:self.offset+self.taps])
+
+    def FilterBlock(self,frames):
+        frames=np.asarray(frames,dtype=float)
+        if frames.ndim!=2 or frames.shape[1]!=self.channels:
+            raise ValueError('Expected one column per channel')
+        if len(frames)==0:
+            return np.zeros((0,self.channels))
+
+        # Prepend the delay line in chronological order and convolve each channel
+        history=self.buffer[self.offset:self.offset+self.taps-1][::-1]
+        extended=np.concatenate((history,frames))
+        output=np.empty(frames.shape)
+        for i in range(0,self.channels):
+            output[:,i]=np.convolve(extended[:,i],self.coeff,'valid')
+
+        # Store the latest frames, newest first
+        latest=extended[-self.taps:][::-1]
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
+        return output
+
+class RTFIR_bank():
+    def __init__(self,filters):
+        if not len(filters):
+            print('At least one filter is required')
+            raise
+        if any(isinstance(f,RTFIR_fft) and f.UsesFFT() for f in filters):
+            print('FFT filters can not be chained or banked')
+            raise
+        if any(isinstance(f,RTFIR_decimator) for f in filters):
+            print('Decimators can not be chained or banked')
+            raise
+        # Shorter filters are zero padded, numpy gains nothing from folding
+        self.lengths=[len(f.GetCoefficients()) for f in filters]
+        self.taps=max(self.lengths)
+        self.coeff=np.zeros((len(filters),self.taps))
+        for k,f in enumerate(filters):
+            self.coeff[k,:self.lengths[k]]=f.GetCoefficients()
+        self.buffer=np.zeros(2*self.taps)
+        self.offset=0
+
+    def GetFilters(self):
+        return len(self.coeff)
+
+    def GetCoefficients(self,index):
+        if index<0 or index>=len(self.coeff):
+            raise ValueError('No such filter')
+        return self.coeff[index,:self.lengths[index]]
+
+    def GetState(self):
+        return self.buffer[self.offset:self.offset+self.taps-1][::-1].copy()
+
+    def SetState(self,state):
+        RTFIR.SetState(self,state)
+
+    def Filter(self,sample):
+        if self.offset==0:
+            self.offset=self.taps
+        self.offset-=1
+        self.buffer[self.offset]=sample
+        self.buffer[self.offset+self.taps]=sample
+        return np.dot(self.coeff,self.buffer[self.offset:self.offset+self.taps])
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples,dtype=float)
+        if len(samples)==0:
+            return np.zeros((len(self.coeff),0))
+
+        # Prepend the delay line in chronological order and convolve with
+        # each filter, which unlike a matrix product sums in the same order
+        # wherever a block starts
+        history=self.buffer[self.offset:self.offset+self.taps-1][::-1]
+        extended=np.concatenate((history,samples))
+        output=np.empty((len(self.coeff),len(samples)))
+        for k in range(0,len(self.coeff)):
+            output[k]=np.convolve(extended[self.taps-self.lengths[k]:],self.coeff[k,:self.lengths[k]],'valid')
+
+        # Store the latest samples, newest first
+        latest=extended[-self.taps:][::-1]
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
+        return output
+
+class RTFIR_decimator(RTFIR_lowpass):
+    def __init__(self,taps,factor,fcutoff=0):
+        if factor<1:
+            print('Decimation factor must be positive')
+            raise
+        RTFIR_lowpass.__init__(self,taps,fcutoff if fcutoff>0 else 0.5/factor)
+        self.factor=factor
+        self.phase=0
+
+    def GetFactor(self):
+        return self.factor
+
+    def GetOutputLength(self,length):
+        return (self.phase+length)//self.factor
+
+    def Filter(self,samples):
+        if len(samples)!=self.factor:
+            raise ValueError('Expected one decimation factor of samples')
+        return float(self.FilterBlock(samples)[0])
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples,dtype=float)
+        if len(samples)==0:
+            return np.zeros(0)
+
+        # Multiply only the windows of the kept outputs with the coefficients
+        history=self.buffer[self.offset:self.offset+self.taps-1][::-1]
+        extended=np.concatenate((history,samples))
+        first=self.factor-1-self.phase
+        windows=np.lib.stride_tricks.sliding_window_view(extended,self.taps)[first::self.factor]
+        if self.stride>1:
+            # Skip the zeros of half-band and other sparse coefficients
+            reversed=self.coeff[::-1]
+            nonzero=np.flatnonzero(reversed)
+            output=np.dot(windows[:,nonzero],reversed[nonzero])
+        else:
+            output=np.dot(windows,self.coeff[::-1])
+        if self.fadeposition<self.fadelength:
+            self.Crossfade(output,lambda n: np.dot(windows[:n],self.fade[::-1]))
+        self.phase=(self.phase+len(samples))%self.factor
+
+        # Store the latest samples, newest first
+        latest=extended[-self.taps:][::-1]
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
+        return output
+
+class RTFIR_resampler():
+    def __init__(self,taps,up,down,fcutoff=0):
+        if up<1 or down<1:
+            print('Resampling factors must be positive')
+            raise
+        prototype=RTFIR_lowpass(taps,fcutoff if fcutoff>0 else 0.5/max(up,down)).GetCoefficients()
+
+        # Split prototype into branches, compensating for the upsampling gain
+        self.taps=taps
+        self.length=(taps+up-1)//up
+        self.up=up
+        self.down=down
+        padded=np.zeros(up*self.length)
+        padded[:taps]=up*prototype
+        self.coeff=padded.reshape(self.length,up).T.copy()
+        self.buffer=np.zeros(2*self.length)
+        self.offset=0
+        self.phase=0
+
+    def GetUp(self):
+        return self.up
+
+    def GetDown(self):
+        return self.down
+
+    def GetCoefficients(self):
+        return self.coeff.T.reshape(-1)[:self.taps]
+
+    def GetOutputLength(self,length):
+        span=length*self.up
+        if span<=self.phase:
+            return 0
+        return (span-self.phase+self.down-1)//self.down
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples,dtype=float)
+        if len(samples)==0:
+            return np.zeros(0)
+
+        # Locate input sample and branch of each output
+        count=self.GetOutputLength(len(samples))
+        t=self.phase+self.down*np.arange(count)
+        index=t//self.up
+        branch=t%self.up
+
+        # Multiply the windows ending at each input sample with the branches
+        history=self.buffer[self.offset:self.offset+self.length-1][::-1]
+        extended=np.concatenate((history,samples))
+        windows=np.lib.stride_tricks.sliding_window_view(extended,self.length)[index]
+        output=np.sum(windows[:,::-1]*self.coeff[branch],axis=1)
+        self.phase+=count*self.down-len(samples)*self.up
+
+        # Store the latest samples, newest first
+        latest=extended[-self.length:][::-1]
+        self.offset=0
+        self.buffer[:self.length]=latest
+        self.buffer[self.length:]=latest
+        return output
+
+class RTFIR_interpolator(RTFIR_resampler):
+    def __init__(self,taps,factor,fcutoff=0):
+        RTFIR_resampler.__init__(self,taps,factor,1,fcutoff)
+
+class RTFIR_moving_average():
+    def __init__(self,length,factor=1):
+        if length<1 or factor<1:
+            print('Length and decimation factor must be positive')
+            raise
+        self.length=length
+        self.factor=factor
+        self.history=np.zeros(length-1)
+        self.phase=0
+
+    def GetLength(self):
+        return self.length
+
+    def GetFactor(self):
+        return self.factor
+
+    def GetOutputLength(self,length):
+        return (self.phase+length)//self.factor
+
+    def Filter(self,samples):
+        if len(samples)!=self.factor:
+            raise ValueError('Expected one decimation factor of samples')
+        return float(self.FilterBlock(samples)[0])
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples,dtype=float)
+        if len(samples)==0:
+            return np.zeros(0)
+
+        # Sum each window as the tail of one run of length samples and the
+        # head of the next, with sums restarted every run so they never drift
+        extended=np.concatenate((self.history,samples))
+        first=self.factor-1-self.phase
+        start=np.arange(first,len(samples),self.factor)
+        runs=len(extended)//self.length+2
+        padded=np.zeros(runs*self.length)
+        padded[:len(extended)]=extended
+        prefix=np.zeros((runs,self.length+1))
+        prefix[:,1:]=np.cumsum(padded.reshape(runs,self.length),axis=1)
+        run=start//self.length
+        position=start%self.length
+        sums=prefix[run,self.length]-prefix[run,position]+prefix[run+1,position]
+        self.phase=(self.phase+len(samples))%self.factor
+        self.history=extended[len(extended)-self.length+1:]
+        return sums/self.length
+
+class RTFIR_cic():
+    def __init__(self,stages,factor,delay=1):
+        if stages<1 or factor<1 or delay<1:
+            print('Stages, decimation factor and delay must be positive')
+            raise
+        if (factor*delay)**stages>2**32:
+            print('Gain of the filter must not exceed 2^32')
+            raise
+        self.stages=stages
+        self.factor=factor
+        self.delay=delay
+        # Integrators and combs wrap modulo 2^64 like the C and C++ filters
+        self.integrators=np.zeros(stages,dtype=np.uint64)
+        self.delays=np.zeros((stages,delay),dtype=np.uint64)
+        self.phase=0
+
+    def GetStages(self):
+        return self.stages
+
+    def GetFactor(self):
+        return self.factor
+
+    def GetDelay(self):
+        return self.delay
+
+    def GetGain(self):
+        return float((self.factor*self.delay)**self.stages)
+
+    def GetOutputLength(self,length):
+        return (self.phase+length)//self.factor
+
+    def Filter(self,samples):
+        if len(samples)!=self.factor:
+            raise ValueError('Expected one decimation factor of samples')
+        return int(self.FilterBlock(samples)[0])
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples).astype(np.int32)
+        if len(samples)==0:
+            return np.zeros(0,dtype=np.int64)
+
+        # Integrate at the input rate
+        value=samples.astype(np.int64).view(np.uint64)
+        for k in range(self.stages):
+            value=np.cumsum(value,dtype=np.uint64)+self.integrators[k]
+            self.integrators[k]=value[-1]
+
+        # Comb at the output rate
+        value=value[self.factor-1-self.phase::self.factor]
+        for k in range(self.stages):
+            extended=np.concatenate((self.delays[k],value))
+            value=extended[self.delay:]-extended[:-self.delay]
+            self.delays[k]=extended[-self.delay:]
+        self.phase=(self.phase+len(samples))%self.factor
+        return value.view(np.int64)
+
+class RTFIR_float():
+    def __init__(self,design):
+        self.coeff=np.asarray(design.GetCoefficients(),dtype=np.float32)
+        self.taps=len(self.coeff)
+        self.buffer=np.zeros(2*self.taps,dtype=np.float32)
+        self.offset=0
+
+    def GetCoefficients(self):
+        return self.coeff
+
+    def Filter(self,sample):
+        if self.offset==0:
+            self.offset=self.taps
+        self.offset-=1
+        self.buffer[self.offset]=sample
+        self.buffer[self.offset+self.taps]=sample
+        return float(np.dot(self.buffer[self.offset:self.offset+self.taps],self.coeff))
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples,dtype=np.float32)
+        if len(samples)==0:
+            return np.zeros(0,dtype=np.float32)
+        history=self.buffer[self.offset:self.offset+self.taps-1][::-1]
+        extended=np.concatenate((history,samples))
+        output=np.convolve(extended,self.coeff,'valid').astype(np.float32)
+        latest=extended[-self.taps:][::-1]
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
+        return output
+
+class _RTFIR_fixed():
+    def __init__(self,design,bits,dtype):
+        # Round coefficients, saturating at [-1,1)
+        scale=2.0**bits
+        coeff=np.floor(np.asarray(design.GetCoefficients())*scale+0.5)
+        self.coeff=np.clip(coeff,-scale,scale-1).astype(dtype)
+        self.taps=len(self.coeff)
+        self.bits=bits
+        self.dtype=dtype
+        self.buffer=np.zeros(2*self.taps,dtype=dtype)
+        self.offset=0
+
+    def GetCoefficients(self):
+        return self.coeff
+
+    def Saturate(self,accumulator,estimate):
+        # The integer sum wraps where the accumulator would saturate, which
+        # the floating point estimate detects
+        info=np.iinfo(self.dtype)
+        half=np.int64(1)<<(self.bits-1)
+        output=(accumulator+half)>>self.bits
+        output=np.where(estimate>=2.0**62,info.max,np.where(estimate<=-2.0**62,info.min,output))
+        return np.clip(output,info.min,info.max).astype(self.dtype)
+
+    def Filter(self,sample):
+        return int(self.FilterBlock([sample])[0])
+
+    def FilterBlock(self,samples):
+        samples=np.asarray(samples).astype(self.dtype)
+        if len(samples)==0:
+            return np.zeros(0,dtype=self.dtype)
+        history=self.buffer[self.offset:self.offset+self.taps-1][::-1]
+        extended=np.concatenate((history,samples))
+        accumulator=np.convolve(extended.astype(np.int64),self.coeff.astype(np.int64),'valid')
+        estimate=np.convolve(extended.astype(float),self.coeff.astype(float),'valid')
+        latest=extended[-self.taps:][::-1]
+        self.offset=0
+        self.buffer[:self.taps]=latest
+        self.buffer[self.taps:]=latest
+        return self.Saturate(accumulator,estimate)
+
+class RTFIR_q15(_RTFIR_fixed):
+    def __init__(self,design):
+        _RTFIR_fixed.__init__(self,design,15,np.int16)
+
+class RTFIR_q31(_RTFIR_fixed):
+    def __init__(self,design):
+        _RTFIR_fixed.__init__(self,design,31,np.int32)
+
+class RTFIR_float_lowpass(RTFIR_float):
+    def __init__(self,taps,fcutoff):
+        RTFIR_float.__init__(self,RTFIR_lowpass(taps,fcutoff))
+
+class RTFIR_float_highpass(RTFIR_float):
+    def __init__(self,taps,fcutoff):
+        RTFIR_float.__init__(self,RTFIR_highpass(taps,fcutoff))
+
+class RTFIR_float_bandpass(RTFIR_float):
+    def __init__(self,taps,fclow,fchigh):
+        RTFIR_float.__init__(self,RTFIR_bandpass(taps,fclow,fchigh))
+
+class RTFIR_float_bandstop(RTFIR_float):
+    def __init__(self,taps,fclow,fchigh):
+        RTFIR_float.__init__(self,RTFIR_bandstop(taps,fclow,fchigh))
+
+class RTFIR_q15_lowpass(RTFIR_q15):
+    def __init__(self,taps,fcutoff):
+        RTFIR_q15.__init__(self,RTFIR_lowpass(taps,fcutoff))
+
+class RTFIR_q15_highpass(RTFIR_q15):
+    def __init__(self,taps,fcutoff):
+        RTFIR_q15.__init__(self,RTFIR_highpass(taps,fcutoff))
+
+class RTFIR_q15_bandpass(RTFIR_q15):
+    def __init__(self,taps,fclow,fchigh):
+        RTFIR_q15.__init__(self,RTFIR_bandpass(taps,fclow,fchigh))
+
+class RTFIR_q15_bandstop(RTFIR_q15):
+    def __init__(self,taps,fclow,fchigh):
+        RTFIR_q15.__init__(self,RTFIR_bandstop(taps,fclow,fchigh))
+
+class RTFIR_q31_lowpass(RTFIR_q31):
+    def __init__(self,taps,fcutoff):
+        RTFIR_q31.__init__(self,RTFIR_lowpass(taps,fcutoff))
+
+class RTFIR_q31_highpass(RTFIR_q31):
+    def __init__(self,taps,fcutoff):
+        RTFIR_q31.__init__(self,RTFIR_highpass(taps,fcutoff))
+
+class RTFIR_q31_bandpass(RTFIR_q31):
+    def __init__(self,taps,fclow,fchigh):
+        RTFIR_q31.__init__(self,RTFIR_bandpass(taps,fclow,fchigh))
+
+class RTFIR_q31_bandstop(RTFIR_q31):
+    def __init__(self,taps,fclow,fchigh):
+        RTFIR_q31.__init__(self,RTFIR_bandstop(taps,fclow,fchigh))
+
+# Like the compiled module, filters without state methods refuse pickling
+def _reduce_unpicklable(self):
+    raise TypeError(type(self).__name__+' objects can not be pickled')
+
+_unpicklable=(RTFIR_decimator,RTFIR_resampler,RTFIR_moving_average,RTFIR_cic,RTFIR_float,_RTFIR_fixed)
+for _cls in _unpicklable:
+    _cls.__reduce__=_reduce_unpicklable
+del _cls
+
+# Numpy releases the GIL in parts of the convolutions, so batches gain
+# less from threads than with the compiled module
+_batch_lock=threading.Lock()
+_batch_pool=None
+_batch_threads=os.cpu_count() or 1
+
+def SetBatchThreads(threads):
+    global _batch_pool,_batch_threads
+    with _batch_lock:
+        if _batch_pool:
+            _batch_pool.shutdown()
+            _batch_pool=None
+        _batch_threads=threads if threads>0 else (os.cpu_count() or 1)
+
+def GetBatchThreads():
+    return _batch_threads
+
+def FilterBatch(filters,inputs):
+    global _batch_pool
+    filters=list(filters)
+    inputs=list(inputs)
+    if len(filters)!=len(inputs):
+        raise ValueError('Expected one input block per filter')
+    if len(set(map(id,filters)))!=len(filters):
+        raise ValueError('Filters must be distinct')
+    if len(filters)<2 or _batch_threads<2:
+        return [f.FilterBlock(x) for f,x in zip(filters,inputs)]
+    with _batch_lock:
+        if not _batch_pool:
+            _batch_pool=ThreadPoolExecutor(_batch_threads,thread_name_prefix='rtfir')
+        pool=_batch_pool
+    return list(pool.map(lambda job: job[0].FilterBlock(job[1]),zip(filters,inputs)))
+
+class _Rechunker():
+    def __init__(self,blocksize):
+        self.blocksize=blocksize
+        self.pending=[]
+        self.length=0
+
+    def push(self,chunk):
+        chunk=np.asarray(chunk)
+        if not self.blocksize:
+            return [chunk] if len(chunk) else []
+        self.pending.append(chunk)
+        self.length+=len(chunk)
+        if self.length<self.blocksize:
+            # Producers may reuse their buffers, so keep a copy
+            self.pending[-1]=chunk.copy()
+            return []
+        data=np.concatenate(self.pending) if len(self.pending)>1 else chunk
+        n=self.length-self.length%self.blocksize
+        blocks=[data[i:i+self.blocksize] for i in range(0,n,self.blocksize)]
+        self.pending=[data[n:].copy()] if n<self.length else []
+        self.length-=n
+        return blocks
+
+    def flush(self):
+        blocks=[np.concatenate(self.pending)] if self.pending else []
+        self.pending=[]
+        self.length=0
+        return blocks
+
+def FilterStream(filter,chunks,blocksize=0):
+    rechunker=_Rechunker(blocksize)
+    for chunk in chunks:
+        for block in rechunker.push(chunk):
+            yield filter.FilterBlock(block)
+    for block in rechunker.flush():
+        yield filter.FilterBlock(block)
+
+# Blocks this large are filtered on an executor by FilterStreamAsync,
+# smaller blocks are cheaper to filter than to hand off
+_stream_offload=4096
+
+async def FilterStreamAsync(filter,chunks,blocksize=0,executor=None):
+    loop=asyncio.get_running_loop()
+    rechunker=_Rechunker(blocksize)
+    async def run(block):
+        if block.size<_stream_offload:
+            return filter.FilterBlock(block)
+        return await loop.run_in_executor(executor,filter.FilterBlock,block)
+    if hasattr(chunks,'__aiter__'):
+        async for chunk in chunks:
+            for block in rechunker.push(chunk):
+                yield await run(block)
+    else:
+        for chunk in chunks:
+            for block in rechunker.push(chunk):
+                yield await run(block)
+    for block in rechunker.flush():
+        yield await run(block)
+
+# Data filtered by the processes of FilterSharded
+_shard_data=None
+
+def _open_shard_data(source):
+    global _shard_data
+    if isinstance(source,tuple):
+        filename,dtype,offset,shape,order=source
+        source=np.memmap(filename,dtype=dtype,mode='r',offset=offset,shape=shape,order=order)
+    _shard_data=source
+
+def _filter_shard(filter,start,stop,history):
+    if start>=history:
+        filter.SetState(_shard_data[start-history:start].ravel())
+    else:
+        filter.FilterBlock(_shard_data[:start])
+    return filter.FilterBlock(_shard_data[start:stop])
+
+def FilterSharded(filter,data,processes=0,shardsize=0,output=None):
+    if isinstance(filter,RTFIR_decimator):
+        raise ValueError('Decimators can not be sharded')
+    if isinstance(filter,_unpicklable):
+        raise ValueError(type(filter).__name__+' objects can not be pickled, so they can not be sharded')
+    if isinstance(filter,RTFIR_fft) and filter.UsesFFT():
+        raise ValueError('FFT filters can only be sharded while filtering directly')
+    data=data if isinstance(data,np.ndarray) else np.asarray(data)
+    length=len(data)
+    bank=isinstance(filter,RTFIR_bank)
+    channels=filter.GetChannels() if isinstance(filter,RTFIR_multichannel) else 1
+    history=len(filter.GetState())//channels
+    if output is None:
+        output=np.empty((filter.GetFilters(),length) if bank else data.shape)
+    processes=processes if processes>0 else (os.cpu_count() or 1)
+    shardsize=shardsize if shardsize>0 else max(1,-(-length//processes))
+    shards=list(range(0,length,shardsize))
+    if processes<2 or len(shards)<2:
+        output[...]=filter.FilterBlock(data)
+        return output
+
+    # Memory mapped files are mapped again rather than copied to each process
+    source=data
+    if isinstance(data,np.memmap) and isinstance(data.base,mmap.mmap):
+        order='F' if data.flags.f_contiguous and not data.flags.c_contiguous else 'C'
+        source=(data.filename,data.dtype,data.offset,data.shape,order)
+    n=len(shards)
+    with ProcessPoolExecutor(min(processes,n),initializer=_open_shard_data,initargs=(source,)) as pool:
+        stops=[min(start+shardsize,length) for start in shards]
+        results=pool.map(_filter_shard,[filter]*n,shards,stops,[history]*n)
+        for start,stop,result in zip(shards,stops,results):
+            if bank:
+                output[:,start:stop]=result
             else:
-                self.coeff[i+W]=(np.sin(2*np.pi*fclow*i)-np.sin(2*np.pi*fchigh*i))/(i*np.pi)
+                output[start:stop]=result
 
+    # Leave the filter with the delay line after the data
+    if length>=history:
+        filter.SetState(data[length-history:].ravel())
+    else:
+        filter.FilterBlock(data)
+    return output
@@ -0,0 +1,346 @@
+/*!\file rtfir_kernels.h
+ * \brief Dot product kernels with runtime CPU dispatch, shared by C and C++
+ * \author Vegard Fiksdal
+ *
+ * Include after rtfir.h or rtfir.hpp, which define RTFIR_kernel. Every
+ * translation unit gets its own copy of the dispatch state, so the C and
+ * C++ libraries select their kernels independently.
+ *
+ * The fastest kernels are selected once when the library is loaded, before
+ * any thread can filter, so filtering never writes the dispatch state.
+ * RTFIR_select_kernel() writes it unsynchronized and must not run while
+ * other threads filter. Compilers without constructor functions use the
+ * scalar kernels until a kernel is selected.
+ *
+ * The four filter kernels multiply each sample with the coefficients of
+ * four filters at once, which filter banks use to vectorize across their
+ * filters.
+ *
+ * The scalar kernels accumulate in order and are the reference. The SIMD
+ * kernels use several accumulators and FMA where available, which changes
+ * the order of the additions. For samples bounded by 1 the difference to
+ * the scalar kernels is within 2*Length*DBL_EPSILON*sum(|Coeff|).
+ *
+ * SSE2 and AVX2+FMA are compiled with function target attributes, so the
+ * library builds with plain -O2 and runs on any x86 CPU. NEON is used on
+ * AArch64, where double precision NEON is always available.
+ */
+
+#ifndef _RTFIR_KERNELS_H_
+#define _RTFIR_KERNELS_H_
+
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__))
+#define RTFIR_HAVE_X86
+#include <immintrin.h>
+#endif
+#if defined(__aarch64__) && defined(__ARM_NEON)
+#define RTFIR_HAVE_NEON
+#include <arm_neon.h>
+#endif
+
+//! Multiplies Length samples with Length coefficients
+typedef double (*RTFIR_dot_kernel)(const double *Window,const double *Coeff,unsigned int Length);
+
+//! Multiplies Low[i]+Sign*High[-i] with Coeff[i] for Length coefficients
+typedef double (*RTFIR_dot_folded_kernel)(const double *Low,const double *High,const double *Coeff,unsigned int Length,double Sign);
+
+//! Multiplies Length samples with the coefficients of four filters, interleaved as Coeff[4*i+k] for filter k
+typedef void (*RTFIR_dot4_kernel)(const double *Window,const double *Coeff,unsigned int Length,double *Output);
+
+static double RTFIR_dot_scalar(const double *Window,const double *Coeff,unsigned int Length){
+    double output=0.0;
+    for(unsigned int i=0;i<Length;i++){
+        output+=Window[i]*Coeff[i];
+    }
+    return output;
+}
+
+static double RTFIR_dot_folded_scalar(const double *Low,const double *High,const double *Coeff,unsigned int Length,double Sign){
+    double output=0.0;
+    for(unsigned int i=0;i<Length;i++){
+        output+=(Low[i]+Sign*(*(High-i)))*Coeff[i];
+    }
+    return output;
+}
+
+static void RTFIR_dot4_scalar(const double *Window,const double *Coeff,unsigned int Length,double *Output){
+    double a0=0.0,a1=0.0,a2=0.0,a3=0.0;
+    for(unsigned int i=0;i<Length;i++,Coeff+=4){
+        const double w=Window[i];
+        a0+=w*Coeff[0];
+        a1+=w*Coeff[1];
+        a2+=w*Coeff[2];
+        a3+=w*Coeff[3];
+    }
+    Output[0]=a0;
+    Output[1]=a1;
+    Output[2]=a2;
+    Output[3]=a3;
+}
+
+#ifdef RTFIR_HAVE_X86
+__attribute__((target("sse2")))
+static double RTFIR_dot_sse2(const double *Window,const double *Coeff,unsigned int Length){
+    __m128d s0=_mm_setzero_pd(),s1=_mm_setzero_pd(),s2=_mm_setzero_pd(),s3=_mm_setzero_pd();
+    unsigned int i=0;
+    for(;i+8<=Length;i+=8){
+        s0=_mm_add_pd(s0,_mm_mul_pd(_mm_loadu_pd(Window+i),_mm_loadu_pd(Coeff+i)));
+        s1=_mm_add_pd(s1,_mm_mul_pd(_mm_loadu_pd(Window+i+2),_mm_loadu_pd(Coeff+i+2)));
+        s2=_mm_add_pd(s2,_mm_mul_pd(_mm_loadu_pd(Window+i+4),_mm_loadu_pd(Coeff+i+4)));
+        s3=_mm_add_pd(s3,_mm_mul_pd(_mm_loadu_pd(Window+i+6),_mm_loadu_pd(Coeff+i+6)));
+    }
+    for(;i+2<=Length;i+=2){
+        s0=_mm_add_pd(s0,_mm_mul_pd(_mm_loadu_pd(Window+i),_mm_loadu_pd(Coeff+i)));
+    }
+    s0=_mm_add_pd(_mm_add_pd(s0,s1),_mm_add_pd(s2,s3));
+    double output=_mm_cvtsd_f64(_mm_add_sd(s0,_mm_unpackhi_pd(s0,s0)));
+    for(;i<Length;i++){
+        output+=Window[i]*Coeff[i];
+    }
+    return output;
+}
+
+__attribute__((target("sse2")))
+static double RTFIR_dot_folded_sse2(const double *Low,const double *High,const double *Coeff,unsigned int Length,double Sign){
+    __m128d sign=_mm_set1_pd(Sign);
+    __m128d s0=_mm_setzero_pd(),s1=_mm_setzero_pd();
+    unsigned int i=0;
+    for(;i+4<=Length;i+=4){
+        __m128d h0=_mm_loadu_pd(High-i-1),h1=_mm_loadu_pd(High-i-3);
+        h0=_mm_shuffle_pd(h0,h0,1);
+        h1=_mm_shuffle_pd(h1,h1,1);
+        s0=_mm_add_pd(s0,_mm_mul_pd(_mm_add_pd(_mm_loadu_pd(Low+i),_mm_mul_pd(sign,h0)),_mm_loadu_pd(Coeff+i)));
+        s1=_mm_add_pd(s1,_mm_mul_pd(_mm_add_pd(_mm_loadu_pd(Low+i+2),_mm_mul_pd(sign,h1)),_mm_loadu_pd(Coeff+i+2)));
+    }
+    s0=_mm_add_pd(s0,s1);
+    double output=_mm_cvtsd_f64(_mm_add_sd(s0,_mm_unpackhi_pd(s0,s0)));
+    for(;i<Length;i++){
+        output+=(Low[i]+Sign*(*(High-i)))*Coeff[i];
+    }
+    return output;
+}
+
+__attribute__((target("sse2")))
+static void RTFIR_dot4_sse2(const double *Window,const double *Coeff,unsigned int Length,double *Output){
+    __m128d s0=_mm_setzero_pd(),s1=_mm_setzero_pd(),s2=_mm_setzero_pd(),s3=_mm_setzero_pd();
+    unsigned int i=0;
+    for(;i+2<=Length;i+=2){
+        __m128d w0=_mm_load1_pd(Window+i),w1=_mm_load1_pd(Window+i+1);
+        s0=_mm_add_pd(s0,_mm_mul_pd(w0,_mm_loadu_pd(Coeff+4*i)));
+        s1=_mm_add_pd(s1,_mm_mul_pd(w0,_mm_loadu_pd(Coeff+4*i+2)));
+        s2=_mm_add_pd(s2,_mm_mul_pd(w1,_mm_loadu_pd(Coeff+4*i+4)));
+        s3=_mm_add_pd(s3,_mm_mul_pd(w1,_mm_loadu_pd(Coeff+4*i+6)));
+    }
+    for(;i<Length;i++){
+        __m128d w=_mm_load1_pd(Window+i);
+        s0=_mm_add_pd(s0,_mm_mul_pd(w,_mm_loadu_pd(Coeff+4*i)));
+        s1=_mm_add_pd(s1,_mm_mul_pd(w,_mm_loadu_pd(Coeff+4*i+2)));
+    }
+    _mm_storeu_pd(Output,_mm_add_pd(s0,s2));
+    _mm_storeu_pd(Output+2,_mm_add_pd(s1,s3));
+}
+
+__attribute__((target("avx2,fma")))
+static double RTFIR_dot_avx2(const double *Window,const double *Coeff,unsigned int Length){
+    __m256d s0=_mm256_setzero_pd(),s1=_mm256_setzero_pd(),s2=_mm256_setzero_pd(),s3=_mm256_setzero_pd();
+    unsigned int i=0;
+    for(;i+16<=Length;i+=16){
+        s0=_mm256_fmadd_pd(_mm256_loadu_pd(Window+i),_mm256_loadu_pd(Coeff+i),s0);
+        s1=_mm256_fmadd_pd(_mm256_loadu_pd(Window+i+4),_mm256_loadu_pd(Coeff+i+4),s1);
+        s2=_mm256_fmadd_pd(_mm256_loadu_pd(Window+i+8),_mm256_loadu_pd(Coeff+i+8),s2);
+        s3=_mm256_fmadd_pd(_mm256_loadu_pd(Window+i+12),_mm256_loadu_pd(Coeff+i+12),s3);
+    }
+    for(;i+4<=Length;i+=4){
+        s0=_mm256_fmadd_pd(_mm256_loadu_pd(Window+i),_mm256_loadu_pd(Coeff+i),s0);
+    }
+    s0=_mm256_add_pd(_mm256_add_pd(s0,s1),_mm256_add_pd(s2,s3));
+    __m128d h=_mm_add_pd(_mm256_castpd256_pd128(s0),_mm256_extractf128_pd(s0,1));
+    double output=_mm_cvtsd_f64(_mm_add_sd(h,_mm_unpackhi_pd(h,h)));
+    for(;i<Length;i++){
+        output+=Window[i]*Coeff[i];
+    }
+    return output;
+}
+
+__attribute__((target("avx2,fma")))
+static double RTFIR_dot_folded_avx2(const double *Low,const double *High,const double *Coeff,unsigned int Length,double Sign){
+    __m256d sign=_mm256_set1_pd(Sign);
+    __m256d s0=_mm256_setzero_pd(),s1=_mm256_setzero_pd();
+    unsigned int i=0;
+    for(;i+8<=Length;i+=8){
+        __m256d h0=_mm256_permute4x64_pd(_mm256_loadu_pd(High-i-3),0x1B);
+        __m256d h1=_mm256_permute4x64_pd(_mm256_loadu_pd(High-i-7),0x1B);
+        s0=_mm256_fmadd_pd(_mm256_fmadd_pd(sign,h0,_mm256_loadu_pd(Low+i)),_mm256_loadu_pd(Coeff+i),s0);
+        s1=_mm256_fmadd_pd(_mm256_fmadd_pd(sign,h1,_mm256_loadu_pd(Low+i+4)),_mm256_loadu_pd(Coeff+i+4),s1);
+    }
+    s0=_mm256_add_pd(s0,s1);
+    __m128d h=_mm_add_pd(_mm256_castpd256_pd128(s0),_mm256_extractf128_pd(s0,1));
+    double output=_mm_cvtsd_f64(_mm_add_sd(h,_mm_unpackhi_pd(h,h)));
+    for(;i<Length;i++){
+        output+=(Low[i]+Sign*(*(High-i)))*Coeff[i];
+    }
+    return output;
+}
+__attribute__((target("avx2,fma")))
+static void RTFIR_dot4_avx2(const double *Window,const double *Coeff,unsigned int Length,double *Output){
+    __m256d s0=_mm256_setzero_pd(),s1=_mm256_setzero_pd(),s2=_mm256_setzero_pd(),s3=_mm256_setzero_pd();
+    unsigned int i=0;
+    for(;i+4<=Length;i+=4){
+        s0=_mm256_fmadd_pd(_mm256_broadcast_sd(Window+i),_mm256_loadu_pd(Coeff+4*i),s0);
+        s1=_mm256_fmadd_pd(_mm256_broadcast_sd(Window+i+1),_mm256_loadu_pd(Coeff+4*i+4),s1);
+        s2=_mm256_fmadd_pd(_mm256_broadcast_sd(Window+i+2),_mm256_loadu_pd(Coeff+4*i+8),s2);
+        s3=_mm256_fmadd_pd(_mm256_broadcast_sd(Window+i+3),_mm256_loadu_pd(Coeff+4*i+12),s3);
+    }
+    for(;i<Length;i++){
+        s0=_mm256_fmadd_pd(_mm256_broadcast_sd(Window+i),_mm256_loadu_pd(Coeff+4*i),s0);
+    }
+    _mm256_storeu_pd(Output,_mm256_add_pd(_mm256_add_pd(s0,s1),_mm256_add_pd(s2,s3)));
+}
+#endif
+
+#ifdef RTFIR_HAVE_NEON
+static double RTFIR_dot_neon(const double *Window,const double *Coeff,unsigned int Length){
+    float64x2_t s0=vdupq_n_f64(0),s1=vdupq_n_f64(0),s2=vdupq_n_f64(0),s3=vdupq_n_f64(0);
+    unsigned int i=0;
+    for(;i+8<=Length;i+=8){
+        s0=vfmaq_f64(s0,vld1q_f64(Window+i),vld1q_f64(Coeff+i));
+        s1=vfmaq_f64(s1,vld1q_f64(Window+i+2),vld1q_f64(Coeff+i+2));
+        s2=vfmaq_f64(s2,vld1q_f64(Window+i+4),vld1q_f64(Coeff+i+4));
+        s3=vfmaq_f64(s3,vld1q_f64(Window+i+6),vld1q_f64(Coeff+i+6));
+    }
+    for(;i+2<=Length;i+=2){
+        s0=vfmaq_f64(s0,vld1q_f64(Window+i),vld1q_f64(Coeff+i));
+    }
+    double output=vaddvq_f64(vaddq_f64(vaddq_f64(s0,s1),vaddq_f64(s2,s3)));
+    for(;i<Length;i++){
+        output+=Window[i]*Coeff[i];
+    }
+    return output;
+}
+
+static double RTFIR_dot_folded_neon(const double *Low,const double *High,const double *Coeff,unsigned int Length,double Sign){
+    float64x2_t sign=vdupq_n_f64(Sign);
+    float64x2_t s0=vdupq_n_f64(0),s1=vdupq_n_f64(0);
+    unsigned int i=0;
+    for(;i+4<=Length;i+=4){
+        float64x2_t h0=vld1q_f64(High-i-1),h1=vld1q_f64(High-i-3);
+        h0=vextq_f64(h0,h0,1);
+        h1=vextq_f64(h1,h1,1);
+        s0=vfmaq_f64(s0,vfmaq_f64(vld1q_f64(Low+i),sign,h0),vld1q_f64(Coeff+i));
+        s1=vfmaq_f64(s1,vfmaq_f64(vld1q_f64(Low+i+2),sign,h1),vld1q_f64(Coeff+i+2));
+    }
+    double output=vaddvq_f64(vaddq_f64(s0,s1));
+    for(;i<Length;i++){
+        output+=(Low[i]+Sign*(*(High-i)))*Coeff[i];
+    }
+    return output;
+}
+
+static void RTFIR_dot4_neon(const double *Window,const double *Coeff,unsigned int Length,double *Output){
+    float64x2_t s0=vdupq_n_f64(0),s1=vdupq_n_f64(0),s2=vdupq_n_f64(0),s3=vdupq_n_f64(0);
+    unsigned int i=0;
+    for(;i+2<=Length;i+=2){
+        float64x2_t w0=vld1q_dup_f64(Window+i),w1=vld1q_dup_f64(Window+i+1);
+        s0=vfmaq_f64(s0,w0,vld1q_f64(Coeff+4*i));
+        s1=vfmaq_f64(s1,w0,vld1q_f64(Coeff+4*i+2));
+        s2=vfmaq_f64(s2,w1,vld1q_f64(Coeff+4*i+4));
+        s3=vfmaq_f64(s3,w1,vld1q_f64(Coeff+4*i+6));
+    }
+    for(;i<Length;i++){
+        float64x2_t w=vld1q_dup_f64(Window+i);
+        s0=vfmaq_f64(s0,w,vld1q_f64(Coeff+4*i));
+        s1=vfmaq_f64(s1,w,vld1q_f64(Coeff+4*i+2));
+    }
+    vst1q_f64(Output,vaddq_f64(s0,s2));
+    vst1q_f64(Output+2,vaddq_f64(s1,s3));
+}
+#endif
+
+static RTFIR_kernel RTFIR_active_kernel=RTFIR_KERNEL_SCALAR;
+static RTFIR_dot_kernel RTFIR_dot=RTFIR_dot_scalar;
+static RTFIR_dot_folded_kernel RTFIR_dot_folded=RTFIR_dot_folded_scalar;
+static RTFIR_dot4_kernel RTFIR_dot4=RTFIR_dot4_scalar;
+
+/*!\brief Checks whether the CPU supports a kernel
+ * \param Kernel Kernel to check
+ * \return True if the kernel is compiled in and supported by the CPU
+ */
+static bool RTFIR_kernel_supported(const RTFIR_kernel Kernel){
+    switch(Kernel){
+        case RTFIR_KERNEL_AUTO:
+        case RTFIR_KERNEL_SCALAR:
+            return true;
+#ifdef RTFIR_HAVE_X86
+        case RTFIR_KERNEL_SSE2:
+            return __builtin_cpu_supports("sse2");
+        case RTFIR_KERNEL_AVX2:
+            return __builtin_cpu_supports("avx2") && __builtin_cpu_supports("fma");
+#endif
+#ifdef RTFIR_HAVE_NEON
+        case RTFIR_KERNEL_NEON:
+            return true;
+#endif
+        default:
+            return false;
+    }
+}
+
+/*!\brief Selects the kernels used by all filters
+ *
+ * Not thread safe, call it only while no other thread is filtering.
+ *
+ * \param Kernel Kernel to use, or RTFIR_KERNEL_AUTO for the fastest supported
+ * \return True if the kernel is supported
+ */
+static bool RTFIR_select_kernel(RTFIR_kernel Kernel){
+    if(!RTFIR_kernel_supported(Kernel)){
+        return false;
+    }
+    if(Kernel==RTFIR_KERNEL_AUTO){
+        Kernel=RTFIR_KERNEL_SCALAR;
+        if(RTFIR_kernel_supported(RTFIR_KERNEL_NEON)) Kernel=RTFIR_KERNEL_NEON;
+        if(RTFIR_kernel_supported(RTFIR_KERNEL_SSE2)) Kernel=RTFIR_KERNEL_SSE2;
+        if(RTFIR_kernel_supported(RTFIR_KERNEL_AVX2)) Kernel=RTFIR_KERNEL_AVX2;
+    }
+    switch(Kernel){
+#ifdef RTFIR_HAVE_X86
+        case RTFIR_KERNEL_SSE2:
+            RTFIR_dot=RTFIR_dot_sse2;
+            RTFIR_dot_folded=RTFIR_dot_folded_sse2;
+            RTFIR_dot4=RTFIR_dot4_sse2;
+            break;
+        case RTFIR_KERNEL_AVX2:
+            RTFIR_dot=RTFIR_dot_avx2;
+            RTFIR_dot_folded=RTFIR_dot_folded_avx2;
+            RTFIR_dot4=RTFIR_dot4_avx2;
+            break;
+#endif
+#ifdef RTFIR_HAVE_NEON
+        case RTFIR_KERNEL_NEON:
+            RTFIR_dot=RTFIR_dot_neon;
+            RTFIR_dot_folded=RTFIR_dot_folded_neon;
+            RTFIR_dot4=RTFIR_dot4_neon;
+            break;
+#endif
+        default:
+            RTFIR_dot=RTFIR_dot_scalar;
+            RTFIR_dot_folded=RTFIR_dot_folded_scalar;
+            RTFIR_dot4=RTFIR_dot4_scalar;
+            break;
+    }
+    RTFIR_active_kernel=Kernel;
+    return true;
+}
+
+#if defined(__GNUC__)
+/*!\brief Selects the fastest kernels when the library is loaded
+ */
+__attribute__((constructor)) static void RTFIR_init_kernels(void){
+#ifdef RTFIR_HAVE_X86
+    __builtin_cpu_init();
+#endif
+    RTFIR_select_kernel(RTFIR_KERNEL_AUTO);
+}
+#endif
+
+#endif
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+#
+# Benchmark harness for realtime fir filters
+#
+# Runs ctest, cpptest and pytest.py (with the compiled module and with the
+# pure python fallback) in benchmark mode across a grid of filter types, tap
+# counts and block sizes, writes the throughput as JSON and compares it with
+# a stored baseline.
+#
+
+import sys,os,json,math,shutil,tempfile,platform,subprocess,time
+
+# Two sided 95% quantiles of Student's t-distribution by degrees of freedom
+T95=[0,12.706,4.303,3.182,2.776,2.571,2.447,2.365,2.306,2.262,2.228,
+     2.201,2.179,2.160,2.145,2.131,2.120,2.110,2.101,2.093,2.086,
+     2.080,2.074,2.069,2.064,2.060,2.056,2.052,2.048,2.045,2.042]
+
+BACKENDS=['c','cpp','python','fallback']
+FILTERS={'lowpass':['20'],'highpass':['20'],'bandpass':['10','30'],'bandstop':['10','30']}
+
+
+# Mean and half width of the 95% confidence interval of a list of rates
+def statistics(rates):
+    n=len(rates)
+    mean=sum(rates)/n
+    if n<2:
+        return mean,0.0
+    stdev=math.sqrt(sum((r-mean)**2 for r in rates)/(n-1))
+    t=T95[n-1] if n-1<len(T95) else 1.96
+    return mean,t*stdev/math.sqrt(n)
+
+
+# Command line running a backend in benchmark mode
+def command(backend,fallback):
+    here=os.path.dirname(os.path.abspath(__file__))
+    if backend=='c':
+        return [os.path.join(here,'ctest')],None
+    if backend=='cpp':
+        return [os.path.join(here,'cpptest')],None
+    env=dict(os.environ)
+    env['PYTHONPATH']=fallback if backend=='fallback' else here
+    return [sys.executable,os.path.join(here,'pytest.py')],env
+
+
+# Run one benchmark and parse the rates from its output
+def run(backend,fallback,filter,taps,blocksize,samples,warmup,repeats):
+    cmd,env=command(backend,fallback)
+    cmd+=['--benchmark','--blocksize',str(blocksize),'--samples',str(samples),
+          '--warmup',str(warmup),'--repeats',str(repeats),'--'+filter,str(taps)]+FILTERS[filter]
+    result=subprocess.run(cmd,stdout=subprocess.PIPE,stderr=subprocess.DEVNULL,env=env)
+    for line in result.stdout.decode('utf-8').splitlines():
+        fields=line.split()
+        if len(fields)>4 and fields[0]=='benchmark':
+            return [float(f) for f in fields[4:]]
+    raise RuntimeError('No benchmark output from '+' '.join(cmd))
+
+
+# Key identifying a benchmark across result files
+def key(result):
+    return (result['backend'],result['filter'],result['taps'],result['blocksize'])
+
+
+# Compare results with a baseline, returning the regressions
+def compare(results,baseline,threshold):
+    reference={key(r):r for r in baseline['results']}
+    regressions=[]
+    for r in results:
+        b=reference.get(key(r))
+        if not b:
+            continue
+        change=(r['mean']-b['mean'])/b['mean']
+        # Only flag slowdowns beyond both the threshold and the noise
+        regressed=r['mean']+r['ci']<b['mean']*(1-threshold) and r['mean']+r['ci']<b['mean']-b['ci']
+        print('%-8s %-8s taps:%-5d block:%-5d %+7.1f%%%s' % (r['backend'],r['filter'],r['taps'],r['blocksize'],100*change,'  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(r)
+    return regressions
+
+
+# Display help-message
+def helpmsg(caller):
+    print('RTFIR Benchmark 1.0')
+    print('Measures RTFIR throughput and checks for regressions')
+    print('Fiksdal(C)2021')
+    print('')
+    print('Usage: '+caller+' [OPTIONS]')
+    print('')
+    print('Options:')
+    print('\t--backends LIST\t\tComma separated backends (default '+','.join(BACKENDS)+')')
+    print('\t--filters LIST\t\tComma separated filter types (default '+','.join(FILTERS)+')')
+    print('\t--taps LIST\t\tComma separated tap counts (default 16,64,256,1024)')
+    print('\t--blocks LIST\t\tComma separated block sizes, 0 for per sample (default 0,64,1024)')
+    print('\t--samples N\t\tSamples per repeat (default 100000)')
+    print('\t--warmup N\t\tUntimed repeats (default 1)')
+    print('\t--repeats N\t\tTimed repeats (default 5)')
+    print('\t--output PATH\t\tWrite results as JSON')
+    print('\t--baseline PATH\t\tCompare with results of an earlier run')
+    print('\t--threshold PERCENT\tSlowdown counted as a regression (default 5)')
+    print('')
+    print('Exits with status 1 if any benchmark regressed.')
+    exit()
+
+
+# Parse settings
+backends=BACKENDS
+filters=list(FILTERS)
+taps=[16,64,256,1024]
+blocks=[0,64,1024]
+samples=100000
+warmup=1
+repeats=5
+output=''
+baseline=''
+threshold=5.0
+i=1
+while i<len(sys.argv):
+    if sys.argv[i]=='--backends':
+        i+=1
+        backends=sys.argv[i].split(',')
+    elif sys.argv[i]=='--filters':
+        i+=1
+        filters=sys.argv[i].split(',')
+    elif sys.argv[i]=='--taps':
+        i+=1
+        taps=[int(t) for t in sys.argv[i].split(',')]
+    elif sys.argv[i]=='--blocks':
+        i+=1
+        blocks=[int(b) for b in sys.argv[i].split(',')]
+    elif sys.argv[i]=='--samples':
+        i+=1
+        samples=int(sys.argv[i])
+    elif sys.argv[i]=='--warmup':
+        i+=1
+        warmup=int(sys.argv[i])
+    elif sys.argv[i]=='--repeats':
+        i+=1
+        repeats=int(sys.argv[i])
+    elif sys.argv[i]=='--output':
+        i+=1
+        output=sys.argv[i]
+    elif sys.argv[i]=='--baseline':
+        i+=1
+        baseline=sys.argv[i]
+    elif sys.argv[i]=='--threshold':
+        i+=1
+        threshold=float(sys.argv[i])
+    elif sys.argv[i]=='--help':
+        helpmsg(sys.argv[0])
+    else:
+        print('Invalid parameter: '+sys.argv[i])
+        exit(2)
+    i+=1
+for b in backends:
+    if b not in BACKENDS:
+        print('Invalid backend: '+b)
+        exit(2)
+for f in filters:
+    if f not in FILTERS:
+        print('Invalid filter: '+f)
+        exit(2)
+
+# The fallback is imported as rtfir from a directory of its own
+fallback=tempfile.mkdtemp()
+shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','src','rtfir_fallback.py'),os.path.join(fallback,'rtfir.py'))
+
+# Run the grid
+results=[]
+try:
+    for backend in backends:
+        for filter in filters:
+            for t in taps:
+                for blocksize in blocks:
+                    rates=run(backend,fallback,filter,t,blocksize,samples,warmup,repeats)
+                    mean,ci=statistics(rates)
+                    results.append({'backend':backend,'filter':filter,'taps':t,'blocksize':blocksize,
+                                    'mean':mean,'ci':ci,'min':min(rates),'max':max(rates),'rates':rates})
+                    print('%-8s %-8s taps:%-5d block:%-5d %12.0f +/- %.0f samples/s' % (backend,filter,t,blocksize,mean,ci))
+finally:
+    shutil.rmtree(fallback)
+
+# Store results
+if len(output):
+    with open(output,'w') as fd:
+        json.dump({'host':platform.node(),'machine':platform.machine(),'time':time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'samples':samples,'warmup':warmup,'repeats':repeats,'results':results},fd,indent=1)
+
+# Compare with baseline
+if len(baseline):
+    with open(baseline) as fd:
+        print('\nCompared with '+baseline+':')
+        regressions=compare(results,json.load(fd),threshold/100)
+    if regressions:
+        print(str(len(regressions))+' benchmark(s) regressed more than '+str(threshold)+'%')
+        exit(1)
+    print('No regressions')
@@ -1,24 +1,49 @@
+#ifdef __linux__
+    #include <sched.h>
+    #include <sys/mman.h>
+#endif
 #include <sys/time.h>
+#include <stdint.h>
+#include <algorithm>
+#include <time.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <math.h>
+#include <float.h>
 #include "../src/rtfir.hpp"
 
 typedef enum {
     MODE_STDIN,
     MODE_FILE,
     MODE_COEFF,
-    MODE_PERF
+    MODE_PERF,
+    MODE_SIMD,
+    MODE_PRECISION,
+    MODE_CACHE,
+    MODE_SPEC,
+    MODE_BENCHMARK,
+    MODE_LATENCY,
+    MODE_STATS,
+    MODE_RETUNE,
+    MODE_CHAIN,
+    MODE_BANK,
+    MODE_STATE,
+    MODE_SPARSE,
+    MODE_AVERAGE,
+    MODE_FFT,
+    MODE_RESAMPLER,
+    MODE_DECIMATOR,
+    MODE_MULTICHANNEL
 } testmode_t;
 
-/*!\brief High resolution clock
+/*!\brief High resolution monotonic clock
  * \return Current time as a double
  */
 double gettime(){
-    struct timeval tv;
-    struct timezone tz;
-    gettimeofday(&tv, &tz);
-    return 1e-6*tv.tv_usec + tv.tv_sec;
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC,&ts);
+    return 1e-9*ts.tv_nsec + ts.tv_sec;
 }
 
 /*!\brief Filter data provided from a file
@@ -45,8 +70,10 @@ void filterfile(RTFIR *Filter,FILE *FD){
 
 /*!\brief Performance-test filter
  * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \param Block Filter each dataset as one block rather than per sample
  */
-void filterperf(RTFIR *Filter,char *Type){
+void filterperf(RTFIR *Filter,char *Type,bool Block){
     // Generate random input data
     size_t n=1000;
     double samples[n];
@@ -57,15 +84,1270 @@ void filterperf(RTFIR *Filter,char *Type){
     // Filter dataset ...
     double start=gettime();
     double dummy;
+    double output[n];
     for(size_t i=0;i<n;i++){
-        for(size_t j=0;j<n;j++){
-            dummy=Filter->Filter(samples[j]);
+        if(Block){
+            Filter->FilterBlock(samples,output,n);
+        }
+        else{
+            for(size_t j=0;j<n;j++){
+                dummy=Filter->Filter(samples[j]);
+            }
         }
     }
     double end=gettime();
     printf("Filtered %d samples with %s in %f seconds\n",n*n,Type,end-start);
 }
 
+/*!\brief Benchmark a filter for the benchmark harness
+ *
+ * Prints one line with the throughput of each repeat in samples/second:
+ * "benchmark TYPE TAPS BLOCKSIZE RATE..."
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \param BlockSize Samples per call to FilterBlock, zero to filter per sample
+ * \param Samples Samples to filter per repeat
+ * \param Warmup Untimed repeats before measuring
+ * \param Repeats Timed repeats
+ */
+void filterbenchmark(RTFIR *Filter,char *Type,unsigned int BlockSize,unsigned int Samples,unsigned int Warmup,unsigned int Repeats){
+    std::vector<double> input(Samples),output(Samples);
+    for(unsigned int i=0;i<Samples;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    volatile double sink=0;
+    printf("benchmark %s %u %u",Type,(unsigned int)Filter->GetCoefficients().size(),BlockSize);
+    for(unsigned int r=0;r<Warmup+Repeats;r++){
+        double start=gettime();
+        if(BlockSize){
+            for(unsigned int i=0;i<Samples;i+=BlockSize){
+                Filter->FilterBlock(&input[i],&output[i],i+BlockSize<Samples ? BlockSize : Samples-i);
+            }
+        }
+        else{
+            for(unsigned int i=0;i<Samples;i++){
+                output[i]=Filter->Filter(input[i]);
+            }
+        }
+        double elapsed=gettime()-start;
+        sink+=output[Samples-1];
+        if(r>=Warmup){
+            printf(" %.6g",Samples/elapsed);
+        }
+    }
+    printf("\n");
+}
+
+/*!\brief Monotonic clock in nanoseconds
+ * \return Current time in nanoseconds
+ */
+uint64_t gettimens(){
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC,&ts);
+    return (uint64_t)ts.tv_sec*1000000000+ts.tv_nsec;
+}
+
+/*!\brief Pins the process to a CPU and locks its memory to reduce jitter
+ * \param Cpu CPU to run on, or negative to leave unpinned
+ * \param Lock Lock all current and future pages in memory
+ * \return True if successful
+ */
+bool realtime(int Cpu,bool Lock){
+#ifdef __linux__
+    if(Cpu>=0){
+        cpu_set_t set;
+        CPU_ZERO(&set);
+        CPU_SET(Cpu,&set);
+        if(sched_setaffinity(0,sizeof(set),&set)){
+            printf("Could not pin to CPU %d\n",Cpu);
+            return false;
+        }
+    }
+    if(Lock && mlockall(MCL_CURRENT|MCL_FUTURE)){
+        printf("Could not lock memory\n");
+        return false;
+    }
+    return true;
+#else
+    if(Cpu>=0 || Lock){
+        printf("CPU pinning and memory locking require linux\n");
+        return false;
+    }
+    return true;
+#endif
+}
+
+/*!\brief Measures the latency of each call to filter a sample
+ *
+ * Prints the median, 99th and 99.9th percentile and worst latency, and a
+ * histogram with power of two buckets. The latencies include the overhead
+ * of reading the clock, which is printed as well.
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \param Samples Number of samples to time
+ * \param Deadline Latency in nanoseconds no sample may exceed, or zero
+ * \return True if no sample exceeded the deadline
+ */
+bool filterlatency(RTFIR *Filter,char *Type,unsigned int Samples,uint64_t Deadline){
+    std::vector<double> input(Samples);
+    std::vector<uint64_t> latency(Samples);
+    for(unsigned int i=0;i<Samples;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+
+    // Measure the clock overhead, then time each sample after a warm-up
+    uint64_t overhead=UINT64_MAX;
+    for(int i=0;i<1000;i++){
+        uint64_t start=gettimens();
+        overhead=std::min(overhead,gettimens()-start);
+    }
+    volatile double sink=0;
+    for(unsigned int i=0;i<Samples && i<10000;i++){
+        sink+=Filter->Filter(input[i]);
+    }
+    for(unsigned int i=0;i<Samples;i++){
+        uint64_t start=gettimens();
+        sink+=Filter->Filter(input[i]);
+        latency[i]=gettimens()-start;
+    }
+
+    // Report percentiles, deadline misses and the histogram
+    unsigned int misses=0;
+    for(unsigned int i=0;i<Samples;i++){
+        misses+=Deadline && latency[i]>Deadline;
+    }
+    std::sort(latency.begin(),latency.end());
+    printf("%s latency: %u taps, %u samples, p50 %lluns p99 %lluns p99.9 %lluns max %lluns, clock overhead %lluns\n",Type,(unsigned int)Filter->GetCoefficients().size(),Samples,
+        (unsigned long long)latency[Samples/2],(unsigned long long)latency[(unsigned int)(Samples*0.99)],
+        (unsigned long long)latency[(unsigned int)(Samples*0.999)],(unsigned long long)latency[Samples-1],(unsigned long long)overhead);
+    unsigned int i=0;
+    for(uint64_t bucket=64;i<Samples;bucket*=2){
+        unsigned int count=0;
+        while(i<Samples && latency[i]<=bucket){
+            count++;
+            i++;
+        }
+        if(count){
+            printf("%12lluns: %u\n",(unsigned long long)bucket,count);
+        }
+    }
+    if(Deadline){
+        printf("%s deadline %lluns: %u misses: %s\n",Type,(unsigned long long)Deadline,misses,misses ? "FAILED" : "OK");
+    }
+    return misses==0;
+}
+
+/*!\brief Check the statistics counted by a filter
+ *
+ * Filters 1000 single samples and 10 blocks of 100 samples. Unless the
+ * library is compiled with RTFIR_STATS, the statistics must stay zero.
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \return True if the statistics match the calls
+ */
+bool filterstats(RTFIR *Filter,char *Type){
+    double input[100],output[100];
+    for(int i=0;i<100;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    Filter->ResetStats();
+    for(int i=0;i<1000;i++){
+        output[0]=Filter->Filter(input[i%100]);
+    }
+    for(int i=0;i<10;i++){
+        Filter->FilterBlock(input,output,100);
+    }
+    RTFIR_stats stats=Filter->GetStats();
+    bool enabled=RTFIR::StatsEnabled();
+    bool passed;
+    if(enabled){
+        passed=stats.samples==2000 && stats.calls==1010 && stats.block_calls==10 && stats.max_ns<=stats.total_ns && stats.total_ns>0;
+    }
+    else{
+        passed=!stats.samples && !stats.calls && !stats.block_calls && !stats.total_ns && !stats.max_ns;
+    }
+    printf("%s stats%s: %llu samples, %llu calls, %llu block calls, %lluns total, %lluns max: %s\n",Type,enabled ? "" : " (disabled)",
+        (unsigned long long)stats.samples,(unsigned long long)stats.calls,(unsigned long long)stats.block_calls,
+        (unsigned long long)stats.total_ns,(unsigned long long)stats.max_ns,passed ? "OK" : "FAILED");
+    return passed;
+}
+
+/*!\brief Compare SIMD kernels with the scalar reference kernel
+ *
+ * The SIMD kernels add in a different order, so for samples bounded by 1
+ * the outputs may differ by up to 2*taps*DBL_EPSILON*sum(|coeff|).
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \return True if all supported kernels are within the tolerance
+ */
+bool filtersimd(RTFIR *Filter,char *Type){
+    // Generate random input data and the tolerance
+    std::vector<double> coeffs=Filter->GetCoefficients();
+    unsigned int taps=coeffs.size();
+    size_t n=10000;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc(n*sizeof(double));
+    double *output=(double*)malloc((n+taps)*sizeof(double));
+    double *zeros=(double*)calloc(taps,sizeof(double));
+    for(size_t i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    double tolerance=0;
+    for(unsigned int i=0;i<taps;i++){
+        tolerance+=fabs(coeffs[i]);
+    }
+    tolerance*=2*taps*DBL_EPSILON;
+
+    // Filter with each kernel from the same (empty) state, folded and direct
+    const char *names[]={"auto","scalar","sse2","avx2","neon"};
+    RTFIR_fold folding[]={RTFIR_FOLD_AUTO,RTFIR_FOLD_DISABLE};
+    bool passed=true;
+    for(int f=0;f<2;f++){
+        Filter->SetFolding(folding[f]);
+        RTFIR::SetKernel(RTFIR_KERNEL_SCALAR);
+        Filter->FilterBlock(zeros,output,taps);
+        Filter->FilterBlock(input,reference,n);
+        for(int k=RTFIR_KERNEL_SSE2;k<=RTFIR_KERNEL_NEON;k++){
+            if(!RTFIR::SetKernel((RTFIR_kernel)k)){
+                continue;
+            }
+            Filter->FilterBlock(zeros,output,taps);
+            Filter->FilterBlock(input,output,n);
+            double error=0;
+            for(size_t i=0;i<n;i++){
+                error=fmax(error,fabs(output[i]-reference[i]));
+            }
+            printf("%s %s%s: max error %g, tolerance %g: %s\n",Type,names[k],f ? "" : " folded",error,tolerance,error<=tolerance ? "OK" : "FAILED");
+            passed&=error<=tolerance;
+        }
+    }
+    Filter->SetFolding(RTFIR_FOLD_AUTO);
+    RTFIR::SetKernel(RTFIR_KERNEL_AUTO);
+    free(input);
+    free(reference);
+    free(output);
+    free(zeros);
+    return passed;
+}
+
+/*!\brief Compare single precision and fixed-point variants with the double filter
+ *
+ * Single precision outputs may differ by up to taps*FLT_EPSILON*sum(|coeff|)
+ * for samples bounded by 1. Fixed-point outputs may differ by up to taps/2+1
+ * LSB from the double output saturated to the fixed-point range, as every
+ * coefficient is rounded by up to half an LSB, and so is the output.
+ *
+ * \param Filter Filter to use as reference
+ * \param Type Name of the filter
+ * \return True if all variants are within the tolerance
+ */
+bool filterprecision(RTFIR *Filter,char *Type){
+    // Generate random input data, exactly representable in all formats
+    std::vector<double> coeff=Filter->GetCoefficients();
+    unsigned int taps=coeff.size();
+    RTFIR_float ffilter(*Filter);
+    RTFIR_q15 q15filter(*Filter);
+    RTFIR_q31 q31filter(*Filter);
+    size_t n=10000;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc((n+taps)*sizeof(double));
+    double *zeros=(double*)calloc(taps,sizeof(double));
+    float *finput=(float*)malloc(n*sizeof(float));
+    float *foutput=(float*)malloc(n*sizeof(float));
+    int16_t *q15input=(int16_t*)malloc(n*sizeof(int16_t));
+    int16_t *q15output=(int16_t*)malloc(n*sizeof(int16_t));
+    int32_t *q31input=(int32_t*)malloc(n*sizeof(int32_t));
+    int32_t *q31output=(int32_t*)malloc(n*sizeof(int32_t));
+    for(size_t i=0;i<n;i++){
+        q15input[i]=(int16_t)(rand()%32768-16384);
+        q31input[i]=q15input[i]*65536;
+        finput[i]=q15input[i]/32768.0f;
+        input[i]=q15input[i]/32768.0;
+    }
+    double sum=0;
+    for(unsigned int i=0;i<taps;i++){
+        sum+=fabs(coeff[i]);
+    }
+
+    // Filter with all variants
+    Filter->FilterBlock(zeros,reference,taps);
+    Filter->FilterBlock(input,reference,n);
+    ffilter.FilterBlock(finput,foutput,n);
+    q15filter.FilterBlock(q15input,q15output,n);
+    q31filter.FilterBlock(q31input,q31output,n);
+
+    // Compare with the reference, saturated to the fixed-point range
+    double ferror=0,q15error=0,q31error=0;
+    for(size_t i=0;i<n;i++){
+        double q15reference=fmin(fmax(reference[i]*32768.0,INT16_MIN),INT16_MAX);
+        double q31reference=fmin(fmax(reference[i]*2147483648.0,INT32_MIN),INT32_MAX);
+        ferror=fmax(ferror,fabs(foutput[i]-reference[i]));
+        q15error=fmax(q15error,fabs(q15output[i]-q15reference));
+        q31error=fmax(q31error,fabs(q31output[i]-q31reference));
+    }
+    double ftolerance=taps*FLT_EPSILON*sum;
+    double qtolerance=taps/2.0+1;
+    printf("%s float: max error %g, tolerance %g: %s\n",Type,ferror,ftolerance,ferror<=ftolerance ? "OK" : "FAILED");
+    printf("%s q15: max error %g LSB, tolerance %g LSB: %s\n",Type,q15error,qtolerance,q15error<=qtolerance ? "OK" : "FAILED");
+    printf("%s q31: max error %g LSB, tolerance %g LSB: %s\n",Type,q31error,qtolerance,q31error<=qtolerance ? "OK" : "FAILED");
+    free(input);
+    free(reference);
+    free(zeros);
+    free(finput);
+    free(foutput);
+    free(q15input);
+    free(q15output);
+    free(q31input);
+    free(q31output);
+    return ferror<=ftolerance && q15error<=qtolerance && q31error<=qtolerance;
+}
+
+/*!\brief Check the frequency response of a filter against its specification
+ *
+ * The Kaiser formula is an estimate, so the stopband attenuation may fall
+ * short of the specification by up to 1dB.
+ *
+ * \param Filter Filter to check
+ * \param Type Name of the filter
+ * \param Pass Normalized passband edge
+ * \param Stop Normalized stopband edge
+ * \param Attenuation Specified stopband attenuation in dB
+ * \return True if the stopband attenuation meets the specification
+ */
+bool filterspec(RTFIR *Filter,char *Type,double Pass,double Stop,double Attenuation){
+    if(Attenuation<=0){
+        printf("%s: no specification to check\n",Type);
+        return true;
+    }
+
+    // Evaluate the response on a dense grid
+    std::vector<double> coeffs=Filter->GetCoefficients();
+    double stopgain=0,passmin=INFINITY,passmax=0;
+    for(int k=0;k<=4096;k++){
+        double f=0.5*k/4096;
+        std::complex<double> response=0;
+        for(unsigned int i=0;i<coeffs.size();i++){
+            response+=coeffs[i]*std::polar(1.0,-2*M_PI*f*i);
+        }
+        double gain=std::abs(response);
+        bool stopband=Pass<Stop ? f>=Stop : f<=Stop;
+        bool passband=Pass<Stop ? f<=Pass : f>=Pass;
+        if(stopband){
+            stopgain=fmax(stopgain,gain);
+        }
+        if(passband){
+            passmin=fmin(passmin,gain);
+            passmax=fmax(passmax,gain);
+        }
+    }
+    double measured=-20*log10(stopgain);
+    bool passed=measured>=Attenuation-1;
+    printf("%s: %u taps, stopband %.1fdB (specified %.1fdB), passband ripple %.4fdB: %s\n",Type,(unsigned int)coeffs.size(),measured,Attenuation,20*log10(passmax/passmin),passed ? "OK" : "FAILED");
+    return passed;
+}
+
+/*!\brief Construct a windowed filter of a design type
+ * \param Design Type of design
+ * \param Taps Number of taps
+ * \param Freq1 Normalized (lower) cutoff-frequency
+ * \param Freq2 Normalized upper cutoff-frequency
+ * \param Window Window of the design
+ * \param Beta Shape of the Kaiser window
+ * \return New filter
+ */
+RTFIR *createfilter(RTFIR_design_type Design,unsigned int Taps,double Freq1,double Freq2,RTFIR_window Window,double Beta){
+    if(Design==RTFIR_DESIGN_LOWPASS)    return new RTFIR_lowpass(Taps,Freq1,Window,Beta);
+    if(Design==RTFIR_DESIGN_HIGHPASS)   return new RTFIR_highpass(Taps,Freq1,Window,Beta);
+    if(Design==RTFIR_DESIGN_BANDPASS)   return new RTFIR_bandpass(Taps,Freq1,Freq2,Window,Beta);
+    return new RTFIR_bandstop(Taps,Freq1,Freq2,Window,Beta);
+}
+
+/*!\brief Construct many filters through the design cache
+ * \param Filter Filter constructed without the cache, for reference
+ * \param Type Name of the filter
+ * \param Design Type of design
+ * \param Taps Number of taps
+ * \param Freq1 Normalized (lower) cutoff-frequency
+ * \param Freq2 Normalized upper cutoff-frequency
+ * \param Window Window of the design
+ * \param Beta Shape of the Kaiser window
+ * \return True if all filters share the reference coefficients
+ */
+bool filtercache(RTFIR *Filter,char *Type,RTFIR_design_type Design,unsigned int Taps,double Freq1,double Freq2,RTFIR_window Window,double Beta){
+    size_t n=1000;
+    std::vector<RTFIR*> filters(n);
+    unsigned int capacity=RTFIR_cache::GetCapacity();
+
+    // Construct filters without and with the cache
+    double elapsed[2];
+    for(int c=0;c<2;c++){
+        RTFIR_cache::SetCapacity(c ? 4 : 0);
+        RTFIR_cache::Clear();
+        RTFIR_cache_stats before=RTFIR_cache::GetStats();
+        double start=gettime();
+        for(size_t i=0;i<n;i++){
+            filters[i]=createfilter(Design,Taps,Freq1,Freq2,Window,Beta);
+        }
+        elapsed[c]=gettime()-start;
+
+        // Check the coefficients and the statistics
+        RTFIR_cache_stats stats=RTFIR_cache::GetStats();
+        stats.hits-=before.hits;
+        stats.misses-=before.misses;
+        bool passed=true;
+        for(size_t i=0;i<n;i++){
+            passed&=filters[i]->GetCoefficients()==Filter->GetCoefficients() && filters[i]->GetSymmetry()==Filter->GetSymmetry();
+            delete filters[i];
+        }
+        if(c){
+            passed&=stats.hits==n-1 && stats.misses==1 && stats.size==1;
+            printf("Constructed %d %s filters in %f seconds, %f seconds cached\n",(int)n,Type,elapsed[0],elapsed[1]);
+            printf("%s cache: %lu hits, %lu misses, %u cached: %s\n",Type,stats.hits,stats.misses,stats.size,passed ? "OK" : "FAILED");
+        }
+        if(!passed){
+            RTFIR_cache::SetCapacity(capacity);
+            return false;
+        }
+    }
+    RTFIR_cache::SetCapacity(capacity);
+    return true;
+}
+
+/*!\brief Retune a filter in place and compare with filters of the new frequencies
+ *
+ * The filter shares its design with Filter through the cache, is retuned
+ * to 0.8 times its frequencies at once, and back with a crossfade. Since
+ * the delay line is kept, the output after a retune must equal a filter
+ * designed for the new frequencies, and the linear mix of both during the
+ * crossfade. The coefficients of an FFT filter are replaced at a block
+ * boundary, so the blocks processed afterwards must match as well.
+ *
+ * \param Filter Filter to use, with the original frequencies
+ * \param Type Name of the filter
+ * \param Design Type of design
+ * \param Taps Number of taps
+ * \param Freq1 Normalized (lower) cutoff-frequency
+ * \param Freq2 Normalized upper cutoff-frequency
+ * \param Window Window of the design
+ * \param Beta Shape of the Kaiser window
+ * \return True if the outputs match and the shared design is unchanged
+ */
+bool filterretune(RTFIR *Filter,char *Type,RTFIR_design_type Design,unsigned int Taps,double Freq1,double Freq2,RTFIR_window Window,double Beta){
+    unsigned int n=1024,fade=256;
+    std::vector<double> input(3*n),output(3*n),original(3*n),retuned(3*n);
+    for(unsigned int i=0;i<3*n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    std::vector<double> coeff=Filter->GetCoefficients();
+
+    // Filter with the original and the retuned frequencies for reference
+    RTFIR *target=createfilter(Design,Taps,0.8*Freq1,0.8*Freq2,Window,Beta);
+    RTFIR *filter=createfilter(Design,Taps,Freq1,Freq2,Window,Beta);
+    Filter->FilterBlock(&input[0],&original[0],3*n);
+    target->FilterBlock(&input[0],&retuned[0],3*n);
+
+    // Retune at once, then back with a crossfade
+    filter->FilterBlock(&input[0],&output[0],n);
+    filter->Retune(0.8*Freq1,0.8*Freq2);
+    filter->FilterBlock(&input[n],&output[n],n);
+    filter->Retune(Freq1,Freq2,fade);
+    for(unsigned int i=2*n;i<3*n;i++){
+        output[i]=filter->Filter(input[i]);
+    }
+
+    // Compare with the references and the linear mix while crossfading
+    bool passed=std::equal(&output[0],&output[n],&original[0]) && std::equal(&output[n],&output[2*n],&retuned[n]);
+    double error=0;
+    for(unsigned int i=0;i<fade;i++){
+        double mix=retuned[2*n+i]+(original[2*n+i]-retuned[2*n+i])*(i+1)/fade;
+        error=fmax(error,fabs(output[2*n+i]-mix));
+    }
+    passed&=error<1e-9 && std::equal(&output[2*n+fade],&output[3*n],&original[2*n+fade]);
+    passed&=Filter->GetCoefficients()==coeff;
+
+    // Replace the coefficients of an FFT filter between blocks
+    unsigned int blocksize=64;
+    RTFIR_fft fft(*Filter,blocksize,false);
+    RTFIR_fft fftretuned(*target,blocksize,false);
+    fft.FilterBlock(&input[0],&output[0],n);
+    fft.SetCoefficients(target->GetCoefficients());
+    fft.FilterBlock(&input[n],&output[n],n);
+    fftretuned.FilterBlock(&input[0],&retuned[0],2*n);
+    passed&=std::equal(&output[n+blocksize],&output[2*n],&retuned[n+blocksize]);
+    printf("%s retuned in place, crossfade over %u samples within %g: %s\n",Type,fade,error,passed ? "OK" : "FAILED");
+
+    // Retuning and new coefficients keep the folding mode
+    target->SetSparse(false);
+    target->SetFolding(RTFIR_FOLD_DISABLE);
+    target->Retune(Freq1,Freq2);
+    bool kept=target->GetSymmetry()==0 && target->GetCost()==coeff.size();
+    target->SetCoefficients(coeff);
+    kept&=target->GetSymmetry()==0 && target->GetCost()==coeff.size() && target->GetFolding()==RTFIR_FOLD_DISABLE;
+    printf("%s keeps folding disabled when retuned, cost %u: %s\n",Type,target->GetCost(),kept ? "OK" : "FAILED");
+    passed&=kept;
+    delete target;
+    delete filter;
+    return passed;
+}
+
+/*!\brief Compares chains of filters with filtering stage by stage
+ *
+ * The filter is chained with a symmetric smoothing lowpass, which the
+ * automatic plan should fuse if the filter folds over all taps, and with
+ * an asymmetric stage, which the automatic plan should keep staged if the
+ * filter folds. Each plan must match filtering with the stages one after
+ * the other.
+ *
+ * \param Filter Filter to chain
+ * \param Type Name of the filter type
+ * \return True if the chains match the stages
+ */
+bool filterchain(RTFIR *Filter,char *Type){
+    unsigned int n=1024;
+    std::vector<double> input(n),output(n),first(n),reference(n),skew(16);
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    for(unsigned int i=0;i<16;i++){
+        skew[i]=(rand()%2001)/1000.0-1.0;
+    }
+    Filter->FilterBlock(&input[0],&first[0],n);
+
+    // Check if the filter folds over all taps
+    std::vector<double> coeff=Filter->GetCoefficients();
+    bool full=Filter->GetSymmetry()!=0;
+    for(unsigned int i=0;i<coeff.size();i++){
+        full&=coeff[i]==Filter->GetSymmetry()*coeff[coeff.size()-1-i];
+    }
+
+    bool passed=true;
+    for(int asymmetric=0;asymmetric<2;asymmetric++){
+        // Filter stage by stage for reference
+        RTFIR *stage=0;
+        if(asymmetric){
+            stage=new RTFIR_lowpass(16,0.25);
+            stage->SetCoefficients(skew);
+        }
+        else{
+            // Half-band stages skip their zeros, so multiply all taps
+            // to compare the folded plans
+            stage=new RTFIR_lowpass(31,0.25,RTFIR_WINDOW_BLACKMAN);
+            stage->SetSparse(false);
+        }
+        std::vector<RTFIR*> stages;
+        stages.push_back(Filter);
+        stages.push_back(stage);
+        RTFIR_chain automatic(stages);
+        RTFIR_chain fused(stages,RTFIR_CHAIN_FUSED);
+        RTFIR_chain staged(stages,RTFIR_CHAIN_STAGED);
+        stage->FilterBlock(&first[0],&reference[0],n);
+
+        // Filter a few samples one at a time, then the rest as a block
+        double error=0;
+        RTFIR_chain *chains[3]={&automatic,&fused,&staged};
+        for(unsigned int c=0;c<3;c++){
+            for(unsigned int i=0;i<100;i++){
+                output[i]=chains[c]->Filter(input[i]);
+            }
+            chains[c]->FilterBlock(&input[100],&output[100],n-100);
+            for(unsigned int i=0;i<n;i++){
+                error=fmax(error,fabs(output[i]-reference[i]));
+            }
+        }
+
+        // The automatic plan must be the cheaper one
+        RTFIR_chain_plan planned=automatic.GetPlan();
+        bool ok=planned==(fused.GetCost()<=staged.GetCost() ? RTFIR_CHAIN_FUSED : RTFIR_CHAIN_STAGED);
+        ok&=fused.GetPlan()==RTFIR_CHAIN_FUSED && staged.GetPlan()==RTFIR_CHAIN_STAGED && automatic.GetStages()==2;
+        if(asymmetric && Filter->GetSymmetry()){
+            ok&=planned==RTFIR_CHAIN_STAGED;
+        }
+        if(!asymmetric && full){
+            ok&=planned==RTFIR_CHAIN_FUSED;
+        }
+        ok&=error<1e-9;
+        passed&=ok;
+        printf("%s chained with %s stage: fused cost %u, staged cost %u, planned %s, error %g: %s\n",Type,asymmetric ? "an asymmetric" : "a symmetric",
+            fused.GetCost(),staged.GetCost(),planned==RTFIR_CHAIN_FUSED ? "fused" : "staged",error,ok ? "OK" : "FAILED");
+        delete stage;
+    }
+
+    // New coefficients would not reach the staged copies, so chains refuse
+    // them, also through a base class pointer
+    RTFIR_lowpass smooth(31,0.2);
+    std::vector<RTFIR*> stages;
+    stages.push_back(Filter);
+    stages.push_back(&smooth);
+    RTFIR_chain chain(stages,RTFIR_CHAIN_STAGED);
+    RTFIR *base=&chain;
+    std::vector<double> fused=chain.GetCoefficients();
+    bool ok=false;
+    try{
+        base->SetCoefficients(std::vector<double>(fused.size(),0));
+    }
+    catch(const std::invalid_argument &e){
+        ok=true;
+    }
+    chain.FilterBlock(&input[0],&output[0],n);
+    smooth.FilterBlock(&first[0],&reference[0],n);
+    ok&=chain.GetCoefficients()==fused && std::equal(output.begin(),output.end(),reference.begin());
+    passed&=ok;
+    printf("%s staged chain refuses new coefficients: %s\n",Type,ok ? "OK" : "FAILED");
+
+    // Chains filter at one rate, so they refuse decimators
+    RTFIR_decimator decimator(31,4);
+    stages[0]=&decimator;
+    ok=false;
+    try{
+        RTFIR_chain decimating(stages);
+    }
+    catch(const std::invalid_argument &e){
+        ok=true;
+    }
+    passed&=ok;
+    printf("%s chains reject decimators: %s\n",Type,ok ? "OK" : "FAILED");
+    return passed;
+}
+
+/*!\brief Compares a bank of filters with filtering separately
+ *
+ * The filter is put in a bank with bandpass filters splitting the
+ * spectrum, which must give the output of each filter on its own within
+ * rounding, both per sample and per block. With the scalar kernel, which
+ * accumulates four filters in the order of a single filter, the output
+ * must match exactly.
+ *
+ * \param Filter Filter to put in the bank
+ * \param Type Name of the filter type
+ * \return True if the bank matches the filters
+ */
+bool filterbank(RTFIR *Filter,char *Type){
+    unsigned int n=4096,count=16;
+    std::vector<double> input(n),reference(count*n),block(count*n),sample(count*n),outputs(count);
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    std::vector<RTFIR*> filters;
+    filters.push_back(Filter);
+    for(unsigned int k=1;k<count;k++){
+        filters.push_back(new RTFIR_bandpass(filters[0]->GetCoefficients().size()+k%2,0.5*k/count,0.5*(k+1)/count));
+    }
+    const char *names[]={"auto","scalar","sse2","avx2","neon"};
+    bool passed=true;
+    RTFIR_kernel kernels[2]={RTFIR::GetKernel(),RTFIR_KERNEL_SCALAR};
+    for(unsigned int r=0;r<2;r++){
+        // Filter separately for reference, from empty delay lines
+        RTFIR::SetKernel(kernels[r]);
+        for(unsigned int k=0;k<count;k++){
+            filters[k]->SetState(std::vector<double>(filters[k]->GetCoefficients().size()-1,0));
+        }
+        RTFIR_bank bank(filters),single(filters);
+        double start=gettime();
+        for(unsigned int k=0;k<count;k++){
+            filters[k]->FilterBlock(&input[0],&reference[k*n],n);
+        }
+        double separate=gettime()-start;
+
+        // Filter with the banks per block and per sample
+        start=gettime();
+        bank.FilterBlock(&input[0],&block[0],n);
+        double shared=gettime()-start;
+        for(unsigned int i=0;i<n;i++){
+            single.Filter(input[i],&outputs[0]);
+            for(unsigned int k=0;k<count;k++){
+                sample[k*n+i]=outputs[k];
+            }
+        }
+        double error=0;
+        for(unsigned int i=0;i<count*n;i++){
+            error=fmax(error,fmax(fabs(block[i]-reference[i]),fabs(sample[i]-reference[i])));
+        }
+        bool ok=kernels[r]==RTFIR_KERNEL_SCALAR ? block==reference && sample==reference : error<1e-12;
+        ok&=bank.GetFilters()==count && bank.GetCoefficients(0)==Filter->GetCoefficients();
+        printf("%s in a bank of %u filters with the %s kernel, %.1f ns per sample against %.1f ns separately, error %g: %s\n",Type,count,names[kernels[r]],1e9*shared/n,1e9*separate/n,error,ok ? "OK" : "FAILED");
+        passed&=ok;
+    }
+    RTFIR::SetKernel(kernels[0]);
+
+    // Banks filter at one rate, so they refuse decimators
+    RTFIR_decimator decimator(31,4);
+    std::vector<RTFIR*> decimating(1,Filter);
+    decimating.push_back(&decimator);
+    bool ok=false;
+    try{
+        RTFIR_bank rejected(decimating);
+    }
+    catch(const std::invalid_argument &e){
+        ok=true;
+    }
+    passed&=ok;
+    printf("%s banks reject decimators: %s\n",Type,ok ? "OK" : "FAILED");
+    for(unsigned int k=1;k<count;k++){
+        delete filters[k];
+    }
+    return passed;
+}
+
+/*!\brief Moves the delay line of a filter to an identical filter half way
+ * \param Filter Filter to filter all samples with
+ * \param Copy Identical filter to continue from the state of Filter
+ * \param Input Length frames of Channels samples
+ * \param Length Number of frames to filter
+ * \param Channels Samples per input frame
+ * \param Outputs Samples per output frame
+ * \return True if Copy continues exactly like Filter
+ */
+template<class F> bool resumes(F &Filter,F &Copy,const double *Input,const unsigned int &Length,const unsigned int &Channels,const unsigned int &Outputs){
+    unsigned int half=Length/2;
+    std::vector<double> first(half*Outputs),reference((Length-half)*Outputs),output((Length-half)*Outputs);
+    Filter.FilterBlock(Input,&first[0],half);
+    Copy.SetState(Filter.GetState());
+    Filter.FilterBlock(&Input[half*Channels],&reference[0],Length-half);
+    Copy.FilterBlock(&Input[half*Channels],&output[0],Length-half);
+    return output==reference && Copy.GetState()==Filter.GetState();
+}
+
+/*!\brief Moves the delay line between identical filters part way through
+ *
+ * The filter, a staged chain, a multichannel filter and a bank built from
+ * it each hand their state to an identical object half way through a
+ * signal, which must continue with exactly the same output.
+ *
+ * \param Filter Filter to test
+ * \param Type Name of the filter type
+ * \return True if all copies continue exactly
+ */
+bool filterstate(RTFIR *Filter,char *Type){
+    unsigned int n=4096,channels=3;
+    std::vector<double> input(n*channels);
+    for(unsigned int i=0;i<n*channels;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    std::vector<double> coeff=Filter->GetCoefficients();
+    RTFIR copy(coeff.size());
+    copy.SetCoefficients(coeff);
+    std::vector<double> random(16);
+    for(unsigned int i=0;i<16;i++){
+        random[i]=(rand()%2001)/1000.0-1.0;
+    }
+    RTFIR stage(16);
+    stage.SetCoefficients(random);
+    RTFIR_highpass highpass(20,0.3);
+    std::vector<RTFIR*> stages,filters;
+    stages.push_back(Filter);
+    stages.push_back(&stage);
+    filters.push_back(Filter);
+    filters.push_back(&highpass);
+    RTFIR_chain chain(stages,RTFIR_CHAIN_STAGED),chaincopy(stages,RTFIR_CHAIN_STAGED);
+    RTFIR_multichannel multichannel(*Filter,channels),multichannelcopy(*Filter,channels);
+    RTFIR_bank bank(filters),bankcopy(filters);
+
+    bool filter=resumes(*Filter,copy,&input[0],n,1,1);
+    bool staged=resumes(chain,chaincopy,&input[0],n,1,1);
+    bool interleaved=resumes(multichannel,multichannelcopy,&input[0],n,channels,channels);
+    bool shared=resumes(bank,bankcopy,&input[0],n,1,2);
+    bool passed=filter && staged && interleaved && shared;
+    printf("%s restored from %u samples of state, filter %s, staged chain %s, multichannel %s, bank %s: %s\n",Type,(unsigned int)coeff.size()-1,
+            filter ? "OK" : "FAILED",staged ? "OK" : "FAILED",interleaved ? "OK" : "FAILED",shared ? "OK" : "FAILED",passed ? "OK" : "FAILED");
+    return passed;
+}
+
+/*!\brief Compares a sparse filter with the same filter multiplying all taps
+ * \param Sparse Filter that may skip zero coefficients
+ * \param Dense Identical filter with the sparse form disabled
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Speedup Receives the time of Dense divided by the time of Sparse
+ * \return Largest difference between the outputs
+ */
+double sparseerror(RTFIR &Sparse,RTFIR &Dense,const double *Input,const unsigned int &Length,double &Speedup){
+    std::vector<double> output(Length),reference(Length);
+    for(unsigned int i=0;i<100;i++){
+        output[i]=Sparse.Filter(Input[i]);
+        reference[i]=Dense.Filter(Input[i]);
+    }
+    double start=gettime();
+    Sparse.FilterBlock(&Input[100],&output[100],Length-100);
+    double sparse=gettime()-start;
+    start=gettime();
+    Dense.FilterBlock(&Input[100],&reference[100],Length-100);
+    Speedup=(gettime()-start)/sparse;
+    double error=0;
+    for(unsigned int i=0;i<Length;i++){
+        error=fmax(error,fabs(output[i]-reference[i]));
+    }
+    return error;
+}
+
+/*!\brief Compares sparse filters with filters multiplying all taps
+ *
+ * Half-band lowpass and highpass filters with the taps of the filter, a
+ * half-band decimator by two and the filter with its coefficients spread
+ * out by zeros must skip the zeros and give the output of the same filters
+ * with the sparse form disabled. Half-band filters are also retuned away
+ * from and back to a quarter of the samplerate, and have their delay line
+ * moved to another filter.
+ *
+ * \param Filter Filter to spread out
+ * \param Type Name of the filter type
+ * \return True if the sparse filters match
+ */
+bool filtersparse(RTFIR *Filter,char *Type){
+    unsigned int n=65536,taps=Filter->GetCoefficients().size()|1;
+    std::vector<double> input(n);
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+    double speedup=0,error=0;
+
+    // Half-band lowpass and highpass filters
+    RTFIR_lowpass lowpass(taps,0.25),denselowpass(taps,0.25);
+    RTFIR_highpass highpass(taps,0.25),densehighpass(taps,0.25);
+    denselowpass.SetSparse(false);
+    densehighpass.SetSparse(false);
+    error=sparseerror(lowpass,denselowpass,&input[0],n,speedup);
+    bool ok=lowpass.GetStride()==2 && highpass.GetStride()==2 && denselowpass.GetStride()==1 && 2*lowpass.GetCost()<denselowpass.GetCost()+4 && error<1e-12;
+    printf("%s half-band lowpass with %u taps: cost %u against %u, %.2fx faster, error %g: %s\n",Type,taps,lowpass.GetCost(),denselowpass.GetCost(),speedup,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+    error=sparseerror(highpass,densehighpass,&input[0],n,speedup);
+    ok=error<1e-12;
+    printf("%s half-band highpass with %u taps: cost %u against %u, %.2fx faster, error %g: %s\n",Type,taps,highpass.GetCost(),densehighpass.GetCost(),speedup,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+
+    // Half-band decimator by two
+    RTFIR_decimator decimator(taps,2),densedecimator(taps,2);
+    densedecimator.SetSparse(false);
+    std::vector<double> output(n/2),reference(n/2);
+    double start=gettime();
+    decimator.FilterBlock(&input[0],n,&output[0]);
+    double sparse=gettime()-start;
+    start=gettime();
+    densedecimator.FilterBlock(&input[0],n,&reference[0]);
+    speedup=(gettime()-start)/sparse;
+    error=0;
+    for(unsigned int i=0;i<n/2;i++){
+        error=fmax(error,fabs(output[i]-reference[i]));
+    }
+    ok=decimator.GetStride()==2 && error<1e-12;
+    printf("%s half-band decimator by 2: %.2fx faster, error %g: %s\n",Type,speedup,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+
+    // Retune away from a quarter of the samplerate and back, then move
+    // the delay line to another filter
+    lowpass.Retune(0.2);
+    denselowpass.Retune(0.2);
+    ok=lowpass.GetStride()==1;
+    error=sparseerror(lowpass,denselowpass,&input[0],n,speedup);
+    lowpass.Retune(0.25,0,64);
+    denselowpass.Retune(0.25,0,64);
+    ok&=lowpass.GetStride()==2;
+    error=fmax(error,sparseerror(lowpass,denselowpass,&input[0],n,speedup));
+    RTFIR_lowpass resumed(taps,0.25);
+    resumed.SetState(lowpass.GetState());
+    error=fmax(error,sparseerror(resumed,denselowpass,&input[0],n,speedup));
+    ok&=error<1e-12;
+    printf("%s half-band lowpass retuned and resumed, error %g: %s\n",Type,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+
+    // The filter spread out by zeros, as in an interpolated filter
+    std::vector<double> coeff=Filter->GetCoefficients(),stuffed(3*coeff.size()-2,0);
+    for(unsigned int i=0;i<coeff.size();i++){
+        stuffed[3*i]=coeff[i];
+    }
+    RTFIR spread(stuffed.size()),densespread(stuffed.size());
+    spread.SetCoefficients(stuffed);
+    densespread.SetSparse(false);
+    densespread.SetCoefficients(stuffed);
+    error=sparseerror(spread,densespread,&input[0],n,speedup);
+    ok=spread.GetStride()==3 && spread.GetCost()==densespread.GetCost()/3+(densespread.GetCost()%3!=0) && error<1e-12;
+    printf("%s spread out to %u taps: stride %u, cost %u against %u, %.2fx faster, error %g: %s\n",Type,(unsigned int)stuffed.size(),spread.GetStride(),
+            spread.GetCost(),densespread.GetCost(),speedup,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+    return passed;
+}
+
+/*!\brief Compares moving averages and CIC filters with FIR filters of the same response
+ * \param Filter Filter giving the length of the moving averages
+ * \param Type Name of filter
+ * \return True if passed
+ */
+bool filteraverage(RTFIR *Filter,char *Type){
+    unsigned int n=65536;
+    std::vector<double> input(n),output(n),reference(n);
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+
+    // Moving averages of the taps of the filter and of 4096 samples, with
+    // and without decimation, against FIR filters with uniform coefficients
+    unsigned int lengths[2]={(unsigned int)Filter->GetCoefficients().size(),4096};
+    for(unsigned int l=0;l<2;l++){
+        unsigned int length=lengths[l];
+        RTFIR uniform(length);
+        uniform.SetCoefficients(std::vector<double>(length,1.0/length));
+        double start=gettime();
+        uniform.FilterBlock(&input[0],&reference[0],n);
+        double fir=gettime()-start;
+        for(unsigned int factor=1;factor<=3;factor+=2){
+            RTFIR_moving_average average(length,factor);
+            unsigned int count=average.GetOutputLength(n);
+            start=gettime();
+            bool ok=average.FilterBlock(&input[0],n,&output[0])==count;
+            double speedup=fir/(gettime()-start);
+            double error=0;
+            for(unsigned int i=0;i<count;i++){
+                error=fmax(error,fabs(output[i]-reference[(i+1)*factor-1]));
+            }
+            ok&=count==n/factor && error<1e-12;
+            printf("%s moving average of %u samples decimated by %u: %.2fx faster, error %g: %s\n",Type,length,factor,speedup,error,ok ? "OK" : "FAILED");
+            passed&=ok;
+        }
+    }
+
+    // A long run of large values must not drift from the exact average
+    unsigned int length=4096,runs=256;
+    RTFIR_moving_average average(length);
+    for(unsigned int r=0;r<runs;r++){
+        for(unsigned int i=0;i<n;i++){
+            output[i]=1e6+input[(i*7+r)%n];
+        }
+        average.FilterBlock(&output[0],n,&reference[0]);
+    }
+    long double exact=0;
+    for(unsigned int i=n-length;i<n;i++){
+        exact+=output[i];
+    }
+    double drift=fabs(reference[n-1]-(double)(exact/length));
+    bool ok=drift<1e-9;
+    printf("%s moving average after %u samples of 1e6 plus noise, error %g: %s\n",Type,n*runs,drift,ok ? "OK" : "FAILED");
+    passed&=ok;
+
+    // CIC decimator of full scale 32 bit samples, against the integer
+    // convolution of its moving sums
+    unsigned int stages=3,factor=4,delay=2,span=factor*delay,taps=stages*(span-1)+1;
+    std::vector<int64_t> coeff(taps,0);
+    coeff[0]=1;
+    for(unsigned int k=0;k<stages;k++){
+        for(unsigned int i=taps;i-->0;){
+            int64_t sum=0;
+            for(unsigned int j=0;j<span && j<=i;j++){
+                sum+=coeff[i-j];
+            }
+            coeff[i]=sum;
+        }
+    }
+    std::vector<int32_t> samples(n);
+    std::vector<int64_t> filtered(n);
+    for(unsigned int i=0;i<n;i++){
+        samples[i]=(int32_t)(((uint32_t)rand()<<16)^(uint32_t)rand());
+    }
+    RTFIR_cic cic(stages,factor,delay);
+    unsigned int count=cic.FilterBlock(&samples[0],n/2,&filtered[0]);
+    count+=cic.FilterBlock(&samples[n/2],n-n/2,&filtered[count]);
+    ok=count==n/factor && cic.GetGain()==512;
+    for(unsigned int i=0;i<count;i++){
+        unsigned int last=(i+1)*factor-1;
+        int64_t expected=0;
+        for(unsigned int j=0;j<taps && j<=last;j++){
+            expected+=coeff[j]*samples[last-j];
+        }
+        ok&=filtered[i]==expected;
+    }
+    try{
+        RTFIR_cic overflow(5,1000);
+        ok=false;
+    }
+    catch(const std::invalid_argument &e){
+        // The gain does not fit in 32 bits
+    }
+    printf("%s CIC filter with %u stages decimating by %u: %s\n",Type,stages,factor,ok ? "OK" : "FAILED");
+    passed&=ok;
+    return passed;
+}
+
+/*!\brief Compares FFT filters with the direct form delayed by their latency
+ *
+ * Short filters must stay direct and long filters must choose FFT in
+ * automatic mode. Filtering through a base class pointer in uneven blocks
+ * and single samples must give the direct output delayed by GetLatency(),
+ * and chains and banks must reject filters using FFT.
+ *
+ * \param Filter Filter to copy the coefficients from
+ * \param Type Name of filter
+ * \return True if passed
+ */
+bool filterfft(RTFIR *Filter,char *Type){
+    bool passed=true;
+
+    // Automatic selection of FFT or direct filtering
+    unsigned int shorttaps[4]={31,63,127,255},longtaps[2]={2049,4097},blocks[3]={0,256,4096};
+    bool ok=true;
+    for(unsigned int t=0;t<4;t++){
+        RTFIR_lowpass design(shorttaps[t],0.1);
+        for(unsigned int b=0;b<3;b++){
+            ok&=!RTFIR_fft(design,blocks[b]).UsesFFT();
+        }
+    }
+    for(unsigned int t=0;t<2;t++){
+        RTFIR_lowpass design(longtaps[t],0.1);
+        for(unsigned int b=0;b<3;b++){
+            ok&=RTFIR_fft(design,blocks[b]).UsesFFT();
+        }
+    }
+    printf("%s automatic mode keeps up to 255 taps direct and uses FFT from 2049 taps: %s\n",Type,ok ? "OK" : "FAILED");
+    passed&=ok;
+
+    // FFT output against the delayed direct output
+    unsigned int n=8192;
+    std::vector<double> input(n),direct(n),output(n);
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    RTFIR reference(Filter->GetCoefficients().size());
+    reference.SetCoefficients(Filter->GetCoefficients());
+    reference.FilterBlock(&input[0],&direct[0],n);
+    unsigned int sizes[2]={0,16};
+    for(unsigned int b=0;b<2;b++){
+        RTFIR_fft fft(*Filter,sizes[b],false);
+        RTFIR *base=&fft;
+        unsigned int done=0,step=1;
+        while(done<n){
+            unsigned int length=std::min(step,n-done);
+            if(length==1){
+                output[done]=base->Filter(input[done]);
+            }
+            else{
+                base->FilterBlock(&input[done],&output[done],length);
+            }
+            done+=length;
+            step=step*3%211+1;
+        }
+        unsigned int latency=fft.GetLatency();
+        double error=0;
+        for(unsigned int i=0;i<n;i++){
+            error=fmax(error,fabs(output[i]-(i>=latency ? direct[i-latency] : 0)));
+        }
+        ok=fft.UsesFFT() && latency==fft.GetBlockSize() && error<1e-9;
+        printf("%s FFT with blocks of %u, latency %u, error %g: %s\n",Type,fft.GetBlockSize(),latency,error,ok ? "OK" : "FAILED");
+        passed&=ok;
+
+        // Restored part way into a block, the copy must continue the output
+        unsigned int split=n/2+5,taps=Filter->GetCoefficients().size();
+        RTFIR_fft original(*Filter,sizes[b],false),copy(*Filter,sizes[b],false);
+        std::vector<double> restored(n);
+        original.FilterBlock(&input[0],&output[0],split);
+        std::vector<double> state=original.GetState();
+        copy.SetState(state);
+        ok=state.size()==taps-1+latency+split%latency && copy.GetState()==state;
+        original.FilterBlock(&input[split],&output[split],n-split);
+        copy.FilterBlock(&input[split],&restored[split],n-split);
+        error=0;
+        for(unsigned int i=split;i<n;i++){
+            error=fmax(error,fabs(output[i]-restored[i]));
+        }
+        ok&=error<1e-9;
+        printf("%s FFT with blocks of %u restored after %u samples, error %g: %s\n",Type,latency,split,error,ok ? "OK" : "FAILED");
+        passed&=ok;
+    }
+
+    // Chains and banks run the direct form, so they refuse FFT filters
+    RTFIR_fft fft(*Filter,64,false);
+    RTFIR_lowpass stage(31,0.2);
+    std::vector<RTFIR*> filters;
+    filters.push_back(&fft);
+    filters.push_back(&stage);
+    unsigned int rejected=0;
+    try{
+        RTFIR_chain chain(filters);
+    }
+    catch(const std::invalid_argument &e){
+        rejected++;
+    }
+    try{
+        RTFIR_bank bank(filters);
+    }
+    catch(const std::invalid_argument &e){
+        rejected++;
+    }
+    ok=rejected==2;
+    printf("%s chains and banks reject FFT filters: %s\n",Type,ok ? "OK" : "FAILED");
+    passed&=ok;
+    return passed;
+}
+
+/*!\brief Compares resamplers with upsampling, filtering and downsampling
+ *
+ * Each ratio is resampled in uneven blocks, starting with an empty block,
+ * with a prototype of the taps of the filter. The output must match the
+ * prototype with the upsampling gain run over the input with Up-1 zeros
+ * stuffed after each sample, keeping every Down-th output. Ratios with
+ * Down of one use the interpolator.
+ *
+ * \param Filter Filter to take the number of taps from
+ * \param Type Name of filter
+ * \return True if passed
+ */
+bool filterresampler(RTFIR *Filter,char *Type){
+    unsigned int ratios[5][2]={{3,1},{3,2},{2,3},{5,7},{1,4}};
+    unsigned int n=2000,taps=Filter->GetCoefficients().size();
+    std::vector<double> input(n),output(5*n);
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+    for(unsigned int r=0;r<5;r++){
+        unsigned int up=ratios[r][0],down=ratios[r][1];
+        RTFIR_resampler *resampler=down==1 ? new RTFIR_interpolator(taps,up) : new RTFIR_resampler(taps,up,down);
+        std::vector<double> prototype=RTFIR_lowpass(taps,0.5/std::max(up,down)).GetCoefficients();
+
+        // Resample in uneven blocks, checking the predicted output lengths
+        bool ok=resampler->GetUp()==up && resampler->GetDown()==down;
+        unsigned int count=0;
+        for(unsigned int i=0,step=0;i<n;i+=step,step=step*3%97+1){
+            unsigned int length=std::min(step,n-i);
+            unsigned int expected=resampler->GetOutputLength(length);
+            unsigned int produced=resampler->FilterBlock(&input[i],length,&output[count]);
+            ok&=produced==expected;
+            count+=produced;
+        }
+        ok&=count==(n*up+down-1)/down;
+
+        // Filter the zero-stuffed input and keep every Down-th output
+        double error=0;
+        for(unsigned int m=0;m<count;m++){
+            double reference=0;
+            unsigned int t=m*down;
+            for(unsigned int i=t%up;i<taps && i<=t;i+=up){
+                reference+=up*prototype[i]*input[(t-i)/up];
+            }
+            error=fmax(error,fabs(output[m]-reference));
+        }
+        ok&=error<1e-12;
+        printf("%s resampling by %u/%u, %u outputs, max error %g: %s\n",Type,up,down,count,error,ok ? "OK" : "FAILED");
+        passed&=ok;
+        delete resampler;
+    }
+    return passed;
+}
+
+/*!\brief Compares decimators with lowpass filtering and downsampling
+ *
+ * Each factor decimates with an odd and an even number of taps, around the
+ * taps of the filter, in uneven blocks with an empty block after each, and
+ * then a factor of samples at a time. The output must match the lowpass
+ * with the cutoff of the decimator at the full rate, keeping every
+ * Factor-th output, so the phase must carry across calls.
+ *
+ * \param Filter Filter to take the number of taps from
+ * \param Type Name of filter
+ * \return True if passed
+ */
+bool filterdecimator(RTFIR *Filter,char *Type){
+    unsigned int factors[3]={2,10,32};
+    unsigned int n=4000,taps=Filter->GetCoefficients().size()|1;
+    std::vector<double> input(n),reference(n),output(n);
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+    for(unsigned int f=0;f<3;f++){
+        for(unsigned int length=taps;length<=taps+1;length++){
+            unsigned int factor=factors[f];
+            RTFIR_decimator decimator(length,factor);
+            RTFIR_lowpass lowpass(length,0.5/factor);
+            lowpass.FilterBlock(&input[0],&reference[0],n);
+
+            // Decimate in uneven blocks, checking the predicted output lengths
+            bool ok=decimator.GetFactor()==factor && decimator.GetCoefficients()==lowpass.GetCoefficients();
+            unsigned int count=0,i=0;
+            for(unsigned int step=0;i<n/2;step=step*3%97+1){
+                unsigned int size=std::min(step,n/2-i);
+                unsigned int expected=decimator.GetOutputLength(size);
+                unsigned int produced=decimator.FilterBlock(&input[i],size,&output[count]);
+                ok&=produced==expected;
+                count+=produced;
+                i+=size;
+                ok&=decimator.GetOutputLength(0)==0 && decimator.FilterBlock(&input[i],0,&output[count])==0;
+            }
+
+            // Then a factor of samples at a time
+            for(;i+factor<=n;i+=factor){
+                output[count++]=decimator.Filter(&input[i]);
+            }
+            ok&=count==i/factor;
+
+            // Compare with every Factor-th output of the lowpass
+            double error=0;
+            for(unsigned int m=0;m<count;m++){
+                error=fmax(error,fabs(output[m]-reference[m*factor+factor-1]));
+            }
+            ok&=error<1e-12;
+            printf("%s decimating by %u with %u taps, %u outputs, max error %g: %s\n",Type,factor,length,count,error,ok ? "OK" : "FAILED");
+            passed&=ok;
+        }
+    }
+    return passed;
+}
+
+/*!\brief Compares multichannel filters with independent filters per channel
+ *
+ * Channel counts below, at and above the four channels accumulated at a
+ * time are filtered frame by frame at the start and then in uneven blocks
+ * of frames, and each channel must match the filter run separately over
+ * that channel alone.
+ *
+ * \param Filter Filter to share between the channels
+ * \param Type Name of filter
+ * \return True if passed
+ */
+bool filtermultichannel(RTFIR *Filter,char *Type){
+    unsigned int counts[4]={1,3,4,7};
+    unsigned int n=2048;
+    std::vector<double> state(Filter->GetCoefficients().size()-1,0);
+    std::vector<double> input(n),reference(n),frames(7*n),output(7*n);
+    bool passed=true;
+    for(unsigned int c=0;c<4;c++){
+        unsigned int channels=counts[c];
+        for(unsigned int i=0;i<channels*n;i++){
+            frames[i]=(rand()%2001)/1000.0-1.0;
+        }
+
+        // Filter frame by frame at the start, then in uneven blocks
+        RTFIR_multichannel multi(*Filter,channels);
+        bool ok=multi.GetChannels()==channels && multi.GetCoefficients()==Filter->GetCoefficients();
+        for(unsigned int i=0;i<7;i++){
+            multi.Filter(&frames[i*channels],&output[i*channels]);
+        }
+        for(unsigned int i=7,step=1;i<n;i+=step,step=step*3%97+1){
+            unsigned int length=std::min(step,n-i);
+            multi.FilterBlock(&frames[i*channels],&output[i*channels],length);
+        }
+
+        // Filter each channel on its own from an empty delay line
+        double error=0;
+        for(unsigned int k=0;k<channels;k++){
+            for(unsigned int i=0;i<n;i++){
+                input[i]=frames[i*channels+k];
+            }
+            Filter->SetState(state);
+            Filter->FilterBlock(&input[0],&reference[0],n);
+            for(unsigned int i=0;i<n;i++){
+                error=fmax(error,fabs(output[i*channels+k]-reference[i]));
+            }
+        }
+        ok&=error<1e-12;
+        printf("%s with %u channels, max error %g: %s\n",Type,channels,error,ok ? "OK" : "FAILED");
+        passed&=ok;
+    }
+    return passed;
+}
+
 /*!\brief Displays help-message
  */
 void help(char *Caller){
@@ -78,15 +1360,42 @@ void help(char *Caller){
     printf("Options:\n");
     printf("\t--samplerate HZ\t\tSamplerate in hertz\n");
     printf("\t--performance\t\tTest performance by filtering a large dataset\n");
+    printf("\t--block\t\t\tUse block filtering for performance tests\n");
+    printf("\t--simd\t\t\tCompare SIMD kernels with the scalar kernel\n");
+    printf("\t--precision\t\tCompare float and fixed-point filters with double\n");
+    printf("\t--cache\t\t\tConstruct filters through the design cache\n");
+    printf("\t--spec\t\t\tCheck the response of Kaiser filters against the specification\n");
+    printf("\t--benchmark\t\tMeasure throughput for the benchmark harness\n");
+    printf("\t--blocksize N\t\tSamples per block for benchmarks, zero for per sample\n");
+    printf("\t--samples N\t\tSamples per benchmark repeat\n");
+    printf("\t--warmup N\t\tUntimed benchmark repeats\n");
+    printf("\t--repeats N\t\tTimed benchmark repeats\n");
+    printf("\t--latency\t\tMeasure the latency of each filtered sample\n");
+    printf("\t--deadline US\t\tFail latency tests if any sample takes longer\n");
+    printf("\t--cpu N\t\t\tPin the process to a CPU\n");
+    printf("\t--mlock\t\t\tLock the process memory\n");
+    printf("\t--stats\t\t\tCheck the statistics counted by filters\n");
+    printf("\t--retune\t\tRetune filters in place, with and without a crossfade\n");
+    printf("\t--chain\t\t\tCompare fused and staged chains of filters\n");
+    printf("\t--bank\t\t\tCompare a bank of filters with separate filters\n");
+    printf("\t--state\t\t\tMove the delay line to an identical filter part way through\n");
+    printf("\t--sparse\t\tCompare half-band and sparse filters with dense filters\n");
+    printf("\t--average\t\tCompare moving averages and CIC filters with FIR filters\n");
+    printf("\t--fft\t\t\tCompare FFT filters with the delayed direct form\n");
+    printf("\t--resampler\t\tCompare resamplers with zero stuffing, filtering and decimation\n");
+    printf("\t--decimator\t\tCompare decimators with lowpass filtering and downsampling\n");
+    printf("\t--multichannel\t\tCompare multichannel filters with one filter per channel\n");
     printf("\t--file PATH\t\tFilter data from file\n");
     printf("\t--stdin\t\t\tFilter data from stdin to stdout\n");
     printf("\t--coeff\t\t\tDump filter coefficients\n");
     printf("\n");
     printf("Filters:\n");
-    printf("\t--lowpass TAPS F0\tTest lowpass filter\n");
-    printf("\t--highpass TAPS F0\tTest highpass filter\n");
-    printf("\t--bandpass TAPS F1 F2\tTest bandpass filter\n");
-    printf("\t--bandstop TAPS F1 F2\tTest bandstop filter\n");
+    printf("\t--lowpass taps F0\tTest lowpass filter\n");
+    printf("\t--highpass taps F0\tTest highpass filter\n");
+    printf("\t--bandpass taps F1 F2\tTest bandpass filter\n");
+    printf("\t--bandstop taps F1 F2\tTest bandstop filter\n");
+    printf("\t--kaiser-lowpass FP FS DB\tTest shortest Kaiser lowpass filter meeting a specification\n");
+    printf("\t--kaiser-highpass FP FS DB\tTest shortest Kaiser highpass filter meeting a specification\n");
     printf("\n");
 }
 
@@ -95,6 +1404,11 @@ int main(int argc,char *argv[]){
     double samplerate=250;
     char *filename=0;
     testmode_t mode=MODE_STDIN;
+    bool block=false;
+    unsigned int blocksize=0,samples=100000,warmup=1,repeats=5;
+    double deadline=0;
+    int cpu=-1;
+    bool lock=false;
     for(int i=1;i<argc;i++){
         if(!strcmp(argv[i],"--samplerate")){
             samplerate=strtod(argv[++i],0);
@@ -112,6 +1426,81 @@ int main(int argc,char *argv[]){
         if(!strcmp(argv[i],"--performance")){
             mode=MODE_PERF;
         }
+        if(!strcmp(argv[i],"--block")){
+            block=true;
+        }
+        if(!strcmp(argv[i],"--simd")){
+            mode=MODE_SIMD;
+        }
+        if(!strcmp(argv[i],"--precision")){
+            mode=MODE_PRECISION;
+        }
+        if(!strcmp(argv[i],"--cache")){
+            mode=MODE_CACHE;
+        }
+        if(!strcmp(argv[i],"--spec")){
+            mode=MODE_SPEC;
+        }
+        if(!strcmp(argv[i],"--benchmark")){
+            mode=MODE_BENCHMARK;
+        }
+        if(!strcmp(argv[i],"--blocksize")){
+            blocksize=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--samples")){
+            samples=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--warmup")){
+            warmup=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--repeats")){
+            repeats=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--latency")){
+            mode=MODE_LATENCY;
+        }
+        if(!strcmp(argv[i],"--deadline")){
+            deadline=strtod(argv[++i],0);
+        }
+        if(!strcmp(argv[i],"--cpu")){
+            cpu=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--mlock")){
+            lock=true;
+        }
+        if(!strcmp(argv[i],"--stats")){
+            mode=MODE_STATS;
+        }
+        if(!strcmp(argv[i],"--retune")){
+            mode=MODE_RETUNE;
+        }
+        if(!strcmp(argv[i],"--chain")){
+            mode=MODE_CHAIN;
+        }
+        if(!strcmp(argv[i],"--bank")){
+            mode=MODE_BANK;
+        }
+        if(!strcmp(argv[i],"--state")){
+            mode=MODE_STATE;
+        }
+        if(!strcmp(argv[i],"--sparse")){
+            mode=MODE_SPARSE;
+        }
+        if(!strcmp(argv[i],"--average")){
+            mode=MODE_AVERAGE;
+        }
+        if(!strcmp(argv[i],"--fft")){
+            mode=MODE_FFT;
+        }
+        if(!strcmp(argv[i],"--resampler")){
+            mode=MODE_RESAMPLER;
+        }
+        if(!strcmp(argv[i],"--decimator")){
+            mode=MODE_DECIMATOR;
+        }
+        if(!strcmp(argv[i],"--multichannel")){
+            mode=MODE_MULTICHANNEL;
+        }
         if(!strcmp(argv[i],"--help")){
             help(argv[0]);
             return 0;
@@ -121,6 +1510,10 @@ int main(int argc,char *argv[]){
         help(argv[0]);
     }
 
+    if(!realtime(cpu,lock)){
+        return -1;
+    }
+
     // Open input
     FILE *fd=stdin;
     if(filename){
@@ -129,6 +1522,12 @@ int main(int argc,char *argv[]){
 
     // Run filters
     char *type=0;
+    bool passed=true;
+    RTFIR_design_type design=RTFIR_DESIGN_LOWPASS;
+    unsigned int taps=0;
+    double flow=0,fhigh=0;
+    RTFIR_window window=RTFIR_WINDOW_RECTANGULAR;
+    double beta=0,fpass=0,fstop=0,attenuation=0;
     RTFIR *filter=0;
     memset(&filter,0,sizeof(filter));
     for(int i=1;i<argc;i++){
@@ -138,33 +1537,90 @@ int main(int argc,char *argv[]){
         else if(!strcmp(argv[i],"--stdin")){}
         else if(!strcmp(argv[i],"--coeff")){}
         else if(!strcmp(argv[i],"--performance")){}
+        else if(!strcmp(argv[i],"--block")){}
+        else if(!strcmp(argv[i],"--simd")){}
+        else if(!strcmp(argv[i],"--precision")){}
+        else if(!strcmp(argv[i],"--cache")){}
+        else if(!strcmp(argv[i],"--spec")){}
+        else if(!strcmp(argv[i],"--benchmark")){}
+        else if(!strcmp(argv[i],"--blocksize")){i++;}
+        else if(!strcmp(argv[i],"--samples")){i++;}
+        else if(!strcmp(argv[i],"--warmup")){i++;}
+        else if(!strcmp(argv[i],"--repeats")){i++;}
+        else if(!strcmp(argv[i],"--latency")){}
+        else if(!strcmp(argv[i],"--deadline")){i++;}
+        else if(!strcmp(argv[i],"--cpu")){i++;}
+        else if(!strcmp(argv[i],"--mlock")){}
+        else if(!strcmp(argv[i],"--stats")){}
+        else if(!strcmp(argv[i],"--retune")){}
+        else if(!strcmp(argv[i],"--chain")){}
+        else if(!strcmp(argv[i],"--bank")){}
+        else if(!strcmp(argv[i],"--state")){}
+        else if(!strcmp(argv[i],"--sparse")){}
+        else if(!strcmp(argv[i],"--average")){}
+        else if(!strcmp(argv[i],"--fft")){}
+        else if(!strcmp(argv[i],"--resampler")){}
+        else if(!strcmp(argv[i],"--decimator")){}
+        else if(!strcmp(argv[i],"--multichannel")){}
 
         // Load filters
         else if(!strcmp(argv[i],"--lowpass")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double cutoff=strtod(argv[++i],0);
-            filter=new RTFIR_lowpass(taps,cutoff/samplerate);
+            design=RTFIR_DESIGN_LOWPASS;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=0;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            filter=new RTFIR_lowpass(taps,flow);
         }
         else if(!strcmp(argv[i],"--highpass")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double cutoff=strtod(argv[++i],0);
-            filter=new RTFIR_highpass(taps,cutoff/samplerate);
+            design=RTFIR_DESIGN_HIGHPASS;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=0;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            filter=new RTFIR_highpass(taps,flow);
         }
         else if(!strcmp(argv[i],"--bandpass")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double flow=strtod(argv[++i],0);
-            double fhigh=strtod(argv[++i],0);
-            filter=new RTFIR_bandpass(taps,flow/samplerate,fhigh/samplerate);
+            design=RTFIR_DESIGN_BANDPASS;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=strtod(argv[++i],0)/samplerate;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            filter=new RTFIR_bandpass(taps,flow,fhigh);
         }
         else if(!strcmp(argv[i],"--bandstop")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double flow=strtod(argv[++i],0);
-            double fhigh=strtod(argv[++i],0);
-            filter=new RTFIR_bandstop(taps,flow/samplerate,fhigh/samplerate);
+            design=RTFIR_DESIGN_BANDSTOP;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=strtod(argv[++i],0)/samplerate;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            filter=new RTFIR_bandstop(taps,flow,fhigh);
+        }
+        else if(!strcmp(argv[i],"--kaiser-lowpass") || !strcmp(argv[i],"--kaiser-highpass")){
+            type=argv[i]+2;
+            design=strcmp(argv[i],"--kaiser-lowpass") ? RTFIR_DESIGN_HIGHPASS : RTFIR_DESIGN_LOWPASS;
+            fpass=strtod(argv[++i],0)/samplerate;
+            fstop=strtod(argv[++i],0)/samplerate;
+            attenuation=strtod(argv[++i],0);
+            window=RTFIR_WINDOW_KAISER;
+            beta=RTFIR::KaiserBeta(attenuation);
+            if(design==RTFIR_DESIGN_LOWPASS){
+                filter=new RTFIR_kaiser_lowpass(fpass,fstop,attenuation);
+            }
+            else{
+                filter=new RTFIR_kaiser_highpass(fpass,fstop,attenuation);
+            }
+            taps=filter->GetCoefficients().size();
+            flow=(fpass+fstop)/2;
+            fhigh=0;
         }
         else{
             printf("Invalid parameter: %s\n",argv[i]);
@@ -175,7 +1631,24 @@ int main(int argc,char *argv[]){
         if(filter){
             if(mode==MODE_STDIN)    filterfile(filter,stdin);
             if(mode==MODE_FILE)     filterfile(filter,fd);
-            if(mode==MODE_PERF)     filterperf(filter,type);
+            if(mode==MODE_PERF)     filterperf(filter,type,block);
+            if(mode==MODE_SIMD)     passed&=filtersimd(filter,type);
+            if(mode==MODE_PRECISION)passed&=filterprecision(filter,type);
+            if(mode==MODE_CACHE)    passed&=filtercache(filter,type,design,taps,flow,fhigh,window,beta);
+            if(mode==MODE_SPEC)     passed&=filterspec(filter,type,fpass,fstop,attenuation);
+            if(mode==MODE_BENCHMARK)filterbenchmark(filter,type,blocksize,samples,warmup,repeats);
+            if(mode==MODE_LATENCY)  passed&=filterlatency(filter,type,samples,(uint64_t)(deadline*1000));
+            if(mode==MODE_STATS)    passed&=filterstats(filter,type);
+            if(mode==MODE_RETUNE)   passed&=filterretune(filter,type,design,taps,flow,fhigh,window,beta);
+            if(mode==MODE_CHAIN)    passed&=filterchain(filter,type);
+            if(mode==MODE_BANK)     passed&=filterbank(filter,type);
+            if(mode==MODE_STATE)    passed&=filterstate(filter,type);
+            if(mode==MODE_SPARSE)   passed&=filtersparse(filter,type);
+            if(mode==MODE_AVERAGE)  passed&=filteraverage(filter,type);
+            if(mode==MODE_FFT)      passed&=filterfft(filter,type);
+            if(mode==MODE_RESAMPLER) passed&=filterresampler(filter,type);
+            if(mode==MODE_DECIMATOR) passed&=filterdecimator(filter,type);
+            if(mode==MODE_MULTICHANNEL) passed&=filtermultichannel(filter,type);
             if(mode==MODE_COEFF){
                 std::vector<double> coeffs=filter->GetCoefficients();
                 for(int i=0;i<coeffs.size();i++){
@@ -189,6 +1662,6 @@ int main(int argc,char *argv[]){
 
     // Close input and terminate
     fclose(fd);
-    return 0;
+    return passed ? 0 : -1;
 }
 
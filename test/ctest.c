@@ -1,24 +1,47 @@
+#ifdef __linux__
+    #define _GNU_SOURCE
+    #include <sched.h>
+    #include <sys/mman.h>
+#endif
 #include <sys/time.h>
+#include <time.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <math.h>
+#include <float.h>
 #include "../src/rtfir.h"
 
 typedef enum {
     MODE_STDIN,
     MODE_FILE,
     MODE_COEFF,
-    MODE_PERF
+    MODE_PERF,
+    MODE_SIMD,
+    MODE_PRECISION,
+    MODE_CACHE,
+    MODE_SPEC,
+    MODE_BENCHMARK,
+    MODE_LATENCY,
+    MODE_STATS,
+    MODE_RETUNE,
+    MODE_CHAIN,
+    MODE_BANK,
+    MODE_STATE,
+    MODE_SPARSE,
+    MODE_POOL,
+    MODE_AVERAGE,
+    MODE_MULTICHANNEL,
+    MODE_RESAMPLER
 } testmode_t;
 
-/*!\brief High resolution clock
+/*!\brief High resolution monotonic clock
  * \return Current time as a double
  */
 double gettime(){
-    struct timeval tv;
-    struct timezone tz;
-    gettimeofday(&tv, &tz);
-    return 1e-6*tv.tv_usec + tv.tv_sec;
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC,&ts);
+    return 1e-9*ts.tv_nsec + ts.tv_sec;
 }
 
 /*!\brief Filter data provided on stdin
@@ -45,8 +68,10 @@ void filterfile(RTFIR *Filter,FILE *FD){
 
 /*!\brief Performance-test filter
  * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \param Block Filter each dataset as one block rather than per sample
  */
-void filterperf(RTFIR *Filter,char *Type){
+void filterperf(RTFIR *Filter,char *Type,bool Block){
     // Generate random input data
     size_t n=1000;
     double samples[n];
@@ -57,15 +82,1192 @@ void filterperf(RTFIR *Filter,char *Type){
     // Filter dataset ...
     double start=gettime();
     double dummy;
+    double output[n];
     for(size_t i=0;i<n;i++){
-        for(size_t j=0;j<n;j++){
-            dummy=RTFIR_filter(Filter,samples[j]);
+        if(Block){
+            RTFIR_filter_block(Filter,samples,output,n);
+        }
+        else{
+            for(size_t j=0;j<n;j++){
+                dummy=RTFIR_filter(Filter,samples[j]);
+            }
         }
     }
     double end=gettime();
     printf("Filtered %d samples with %s in %f seconds\n",n*n,Type,end-start);
 }
 
+/*!\brief Benchmark a filter for the benchmark harness
+ *
+ * Prints one line with the throughput of each repeat in samples/second:
+ * "benchmark TYPE TAPS BLOCKSIZE RATE..."
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \param BlockSize Samples per call to RTFIR_filter_block, zero to filter per sample
+ * \param Samples Samples to filter per repeat
+ * \param Warmup Untimed repeats before measuring
+ * \param Repeats Timed repeats
+ */
+void filterbenchmark(RTFIR *Filter,char *Type,unsigned int BlockSize,unsigned int Samples,unsigned int Warmup,unsigned int Repeats){
+    double *input=(double*)malloc(Samples*sizeof(double));
+    double *output=(double*)malloc(Samples*sizeof(double));
+    for(unsigned int i=0;i<Samples;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    volatile double sink=0;
+    printf("benchmark %s %u %u",Type,Filter->taps,BlockSize);
+    for(unsigned int r=0;r<Warmup+Repeats;r++){
+        double start=gettime();
+        if(BlockSize){
+            for(unsigned int i=0;i<Samples;i+=BlockSize){
+                RTFIR_filter_block(Filter,&input[i],&output[i],i+BlockSize<Samples ? BlockSize : Samples-i);
+            }
+        }
+        else{
+            for(unsigned int i=0;i<Samples;i++){
+                output[i]=RTFIR_filter(Filter,input[i]);
+            }
+        }
+        double elapsed=gettime()-start;
+        sink+=output[Samples-1];
+        if(r>=Warmup){
+            printf(" %.6g",Samples/elapsed);
+        }
+    }
+    printf("\n");
+    free(input);
+    free(output);
+}
+
+/*!\brief Compares two uint64_t for qsort
+ */
+int compareu64(const void *A,const void *B){
+    uint64_t a=*(const uint64_t*)A,b=*(const uint64_t*)B;
+    return a<b ? -1 : a>b;
+}
+
+/*!\brief Monotonic clock in nanoseconds
+ * \return Current time in nanoseconds
+ */
+uint64_t gettimens(){
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC,&ts);
+    return (uint64_t)ts.tv_sec*1000000000+ts.tv_nsec;
+}
+
+/*!\brief Pins the process to a CPU and locks its memory to reduce jitter
+ * \param Cpu CPU to run on, or negative to leave unpinned
+ * \param Lock Lock all current and future pages in memory
+ * \return True if successful
+ */
+bool realtime(int Cpu,bool Lock){
+#ifdef __linux__
+    if(Cpu>=0){
+        cpu_set_t set;
+        CPU_ZERO(&set);
+        CPU_SET(Cpu,&set);
+        if(sched_setaffinity(0,sizeof(set),&set)){
+            printf("Could not pin to CPU %d\n",Cpu);
+            return false;
+        }
+    }
+    if(Lock && mlockall(MCL_CURRENT|MCL_FUTURE)){
+        printf("Could not lock memory\n");
+        return false;
+    }
+    return true;
+#else
+    if(Cpu>=0 || Lock){
+        printf("CPU pinning and memory locking require linux\n");
+        return false;
+    }
+    return true;
+#endif
+}
+
+/*!\brief Measures the latency of each call to filter a sample
+ *
+ * Prints the median, 99th and 99.9th percentile and worst latency, and a
+ * histogram with power of two buckets. The latencies include the overhead
+ * of reading the clock, which is printed as well.
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \param Samples Number of samples to time
+ * \param Deadline Latency in nanoseconds no sample may exceed, or zero
+ * \return True if no sample exceeded the deadline
+ */
+bool filterlatency(RTFIR *Filter,char *Type,unsigned int Samples,uint64_t Deadline){
+    double *input=(double*)malloc(Samples*sizeof(double));
+    uint64_t *latency=(uint64_t*)malloc(Samples*sizeof(uint64_t));
+    for(unsigned int i=0;i<Samples;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+
+    // Measure the clock overhead, then time each sample after a warm-up
+    uint64_t overhead=UINT64_MAX;
+    for(int i=0;i<1000;i++){
+        uint64_t start=gettimens();
+        uint64_t elapsed=gettimens()-start;
+        overhead=elapsed<overhead ? elapsed : overhead;
+    }
+    volatile double sink=0;
+    for(unsigned int i=0;i<Samples && i<10000;i++){
+        sink+=RTFIR_filter(Filter,input[i]);
+    }
+    for(unsigned int i=0;i<Samples;i++){
+        uint64_t start=gettimens();
+        sink+=RTFIR_filter(Filter,input[i]);
+        latency[i]=gettimens()-start;
+    }
+
+    // Report percentiles, deadline misses and the histogram
+    unsigned int misses=0;
+    for(unsigned int i=0;i<Samples;i++){
+        misses+=Deadline && latency[i]>Deadline;
+    }
+    qsort(latency,Samples,sizeof(uint64_t),compareu64);
+    printf("%s latency: %u taps, %u samples, p50 %lluns p99 %lluns p99.9 %lluns max %lluns, clock overhead %lluns\n",Type,Filter->taps,Samples,
+        (unsigned long long)latency[Samples/2],(unsigned long long)latency[(unsigned int)(Samples*0.99)],
+        (unsigned long long)latency[(unsigned int)(Samples*0.999)],(unsigned long long)latency[Samples-1],(unsigned long long)overhead);
+    unsigned int i=0;
+    for(uint64_t bucket=64;i<Samples;bucket*=2){
+        unsigned int count=0;
+        while(i<Samples && latency[i]<=bucket){
+            count++;
+            i++;
+        }
+        if(count){
+            printf("%12lluns: %u\n",(unsigned long long)bucket,count);
+        }
+    }
+    if(Deadline){
+        printf("%s deadline %lluns: %u misses: %s\n",Type,(unsigned long long)Deadline,misses,misses ? "FAILED" : "OK");
+    }
+    free(input);
+    free(latency);
+    return misses==0;
+}
+
+/*!\brief Check the statistics counted by a filter
+ *
+ * Filters 1000 single samples and 10 blocks of 100 samples. Unless the
+ * library is compiled with RTFIR_STATS, the statistics must stay zero.
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \return True if the statistics match the calls
+ */
+bool filterstats(RTFIR *Filter,char *Type){
+    double input[100],output[100];
+    for(int i=0;i<100;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    RTFIR_reset_stats(Filter);
+    for(int i=0;i<1000;i++){
+        output[0]=RTFIR_filter(Filter,input[i%100]);
+    }
+    for(int i=0;i<10;i++){
+        RTFIR_filter_block(Filter,input,output,100);
+    }
+    RTFIR_stats stats=RTFIR_get_stats(Filter);
+    bool enabled=RTFIR_stats_enabled();
+    bool passed;
+    if(enabled){
+        passed=stats.samples==2000 && stats.calls==1010 && stats.block_calls==10 && stats.max_ns<=stats.total_ns && stats.total_ns>0;
+    }
+    else{
+        passed=!stats.samples && !stats.calls && !stats.block_calls && !stats.total_ns && !stats.max_ns;
+    }
+    printf("%s stats%s: %llu samples, %llu calls, %llu block calls, %lluns total, %lluns max: %s\n",Type,enabled ? "" : " (disabled)",
+        (unsigned long long)stats.samples,(unsigned long long)stats.calls,(unsigned long long)stats.block_calls,
+        (unsigned long long)stats.total_ns,(unsigned long long)stats.max_ns,passed ? "OK" : "FAILED");
+    return passed;
+}
+
+/*!\brief Compare SIMD kernels with the scalar reference kernel
+ *
+ * The SIMD kernels add in a different order, so for samples bounded by 1
+ * the outputs may differ by up to 2*taps*DBL_EPSILON*sum(|coeff|).
+ *
+ * \param Filter Filter to use
+ * \param Type Name of the filter
+ * \return True if all supported kernels are within the tolerance
+ */
+bool filtersimd(RTFIR *Filter,char *Type){
+    // Generate random input data and the tolerance
+    size_t n=10000;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc(n*sizeof(double));
+    double *output=(double*)malloc((n+Filter->taps)*sizeof(double));
+    double *zeros=(double*)calloc(Filter->taps,sizeof(double));
+    for(size_t i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    double tolerance=0;
+    for(unsigned int i=0;i<Filter->taps;i++){
+        tolerance+=fabs(Filter->coeff[i]);
+    }
+    tolerance*=2*Filter->taps*DBL_EPSILON;
+
+    // Filter with each kernel from the same (empty) state, folded and direct
+    const char *names[]={"auto","scalar","sse2","avx2","neon"};
+    RTFIR_fold folding[]={RTFIR_FOLD_AUTO,RTFIR_FOLD_DISABLE};
+    bool passed=true;
+    for(int f=0;f<2;f++){
+        RTFIR_set_folding(Filter,folding[f]);
+        RTFIR_set_kernel(RTFIR_KERNEL_SCALAR);
+        RTFIR_filter_block(Filter,zeros,output,Filter->taps);
+        RTFIR_filter_block(Filter,input,reference,n);
+        for(int k=RTFIR_KERNEL_SSE2;k<=RTFIR_KERNEL_NEON;k++){
+            if(!RTFIR_set_kernel((RTFIR_kernel)k)){
+                continue;
+            }
+            RTFIR_filter_block(Filter,zeros,output,Filter->taps);
+            RTFIR_filter_block(Filter,input,output,n);
+            double error=0;
+            for(size_t i=0;i<n;i++){
+                error=fmax(error,fabs(output[i]-reference[i]));
+            }
+            printf("%s %s%s: max error %g, tolerance %g: %s\n",Type,names[k],f ? "" : " folded",error,tolerance,error<=tolerance ? "OK" : "FAILED");
+            passed&=error<=tolerance;
+        }
+    }
+    RTFIR_set_folding(Filter,RTFIR_FOLD_AUTO);
+    RTFIR_set_kernel(RTFIR_KERNEL_AUTO);
+    free(input);
+    free(reference);
+    free(output);
+    free(zeros);
+    return passed;
+}
+
+/*!\brief Compare single precision and fixed-point variants with the double filter
+ *
+ * Single precision outputs may differ by up to taps*FLT_EPSILON*sum(|coeff|)
+ * for samples bounded by 1. Fixed-point outputs may differ by up to taps/2+1
+ * LSB from the double output saturated to the fixed-point range, as every
+ * coefficient is rounded by up to half an LSB, and so is the output.
+ *
+ * \param Filter Filter to use as reference
+ * \param Type Name of the filter
+ * \return True if all variants are within the tolerance
+ */
+bool filterprecision(RTFIR *Filter,char *Type){
+    // Generate random input data, exactly representable in all formats
+    unsigned int taps=Filter->taps;
+    const double *coeff=Filter->coeff;
+    RTFIR_float ffilter;
+    RTFIR_q15 q15filter;
+    RTFIR_q31 q31filter;
+    if(!RTFIR_init_float(&ffilter,Filter) || !RTFIR_init_q15(&q15filter,Filter) || !RTFIR_init_q31(&q31filter,Filter)){
+        return false;
+    }
+    size_t n=10000;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc((n+taps)*sizeof(double));
+    double *zeros=(double*)calloc(taps,sizeof(double));
+    float *finput=(float*)malloc(n*sizeof(float));
+    float *foutput=(float*)malloc(n*sizeof(float));
+    int16_t *q15input=(int16_t*)malloc(n*sizeof(int16_t));
+    int16_t *q15output=(int16_t*)malloc(n*sizeof(int16_t));
+    int32_t *q31input=(int32_t*)malloc(n*sizeof(int32_t));
+    int32_t *q31output=(int32_t*)malloc(n*sizeof(int32_t));
+    for(size_t i=0;i<n;i++){
+        q15input[i]=(int16_t)(rand()%32768-16384);
+        q31input[i]=q15input[i]*65536;
+        finput[i]=q15input[i]/32768.0f;
+        input[i]=q15input[i]/32768.0;
+    }
+    double sum=0;
+    for(unsigned int i=0;i<taps;i++){
+        sum+=fabs(coeff[i]);
+    }
+
+    // Filter with all variants
+    RTFIR_filter_block(Filter,zeros,reference,taps);
+    RTFIR_filter_block(Filter,input,reference,n);
+    RTFIR_filter_float_block(&ffilter,finput,foutput,n);
+    RTFIR_filter_q15_block(&q15filter,q15input,q15output,n);
+    RTFIR_filter_q31_block(&q31filter,q31input,q31output,n);
+
+    // Compare with the reference, saturated to the fixed-point range
+    double ferror=0,q15error=0,q31error=0;
+    for(size_t i=0;i<n;i++){
+        double q15reference=fmin(fmax(reference[i]*32768.0,INT16_MIN),INT16_MAX);
+        double q31reference=fmin(fmax(reference[i]*2147483648.0,INT32_MIN),INT32_MAX);
+        ferror=fmax(ferror,fabs(foutput[i]-reference[i]));
+        q15error=fmax(q15error,fabs(q15output[i]-q15reference));
+        q31error=fmax(q31error,fabs(q31output[i]-q31reference));
+    }
+    double ftolerance=taps*FLT_EPSILON*sum;
+    double qtolerance=taps/2.0+1;
+    printf("%s float: max error %g, tolerance %g: %s\n",Type,ferror,ftolerance,ferror<=ftolerance ? "OK" : "FAILED");
+    printf("%s q15: max error %g LSB, tolerance %g LSB: %s\n",Type,q15error,qtolerance,q15error<=qtolerance ? "OK" : "FAILED");
+    printf("%s q31: max error %g LSB, tolerance %g LSB: %s\n",Type,q31error,qtolerance,q31error<=qtolerance ? "OK" : "FAILED");
+    RTFIR_close_float(&ffilter);
+    RTFIR_close_q15(&q15filter);
+    RTFIR_close_q31(&q31filter);
+    free(input);
+    free(reference);
+    free(zeros);
+    free(finput);
+    free(foutput);
+    free(q15input);
+    free(q15output);
+    free(q31input);
+    free(q31output);
+    return ferror<=ftolerance && q15error<=qtolerance && q31error<=qtolerance;
+}
+
+/*!\brief Check the frequency response of a filter against its specification
+ *
+ * The Kaiser formula is an estimate, so the stopband attenuation may fall
+ * short of the specification by up to 1dB.
+ *
+ * \param Filter Filter to check
+ * \param Type Name of the filter
+ * \param Pass Normalized passband edge
+ * \param Stop Normalized stopband edge
+ * \param Attenuation Specified stopband attenuation in dB
+ * \return True if the stopband attenuation meets the specification
+ */
+bool filterspec(RTFIR *Filter,char *Type,double Pass,double Stop,double Attenuation){
+    if(Attenuation<=0){
+        printf("%s: no specification to check\n",Type);
+        return true;
+    }
+
+    // Evaluate the response on a dense grid
+    double stopgain=0,passmin=INFINITY,passmax=0;
+    for(int k=0;k<=4096;k++){
+        double f=0.5*k/4096;
+        double re=0,im=0;
+        for(unsigned int i=0;i<Filter->taps;i++){
+            re+=Filter->coeff[i]*cos(2*M_PI*f*i);
+            im-=Filter->coeff[i]*sin(2*M_PI*f*i);
+        }
+        double gain=sqrt(re*re+im*im);
+        bool stopband=Pass<Stop ? f>=Stop : f<=Stop;
+        bool passband=Pass<Stop ? f<=Pass : f>=Pass;
+        if(stopband){
+            stopgain=fmax(stopgain,gain);
+        }
+        if(passband){
+            passmin=fmin(passmin,gain);
+            passmax=fmax(passmax,gain);
+        }
+    }
+    double measured=-20*log10(stopgain);
+    bool passed=measured>=Attenuation-1;
+    printf("%s: %u taps, stopband %.1fdB (specified %.1fdB), passband ripple %.4fdB: %s\n",Type,Filter->taps,measured,Attenuation,20*log10(passmax/passmin),passed ? "OK" : "FAILED");
+    return passed;
+}
+
+/*!\brief Construct many filters through a design cache
+ * \param Filter Filter constructed without the cache, for reference
+ * \param Type Name of the filter
+ * \param Design Type of design
+ * \param Taps Number of taps
+ * \param Freq1 Normalized (lower) cutoff-frequency
+ * \param Freq2 Normalized upper cutoff-frequency
+ * \param Window Window of the design
+ * \param Beta Shape of the Kaiser window
+ * \return True if all filters share the reference coefficients
+ */
+bool filtercache(RTFIR *Filter,char *Type,RTFIR_design_type Design,unsigned int Taps,double Freq1,double Freq2,RTFIR_window Window,double Beta){
+    size_t n=1000;
+    RTFIR *filters=(RTFIR*)malloc(n*sizeof(RTFIR));
+    RTFIR_cache cache;
+    RTFIR_init_cache(&cache,4);
+
+    // Construct filters without the cache
+    double start=gettime();
+    for(size_t i=0;i<n;i++){
+        RTFIR_init_windowed(&filters[i],Design,Taps,Freq1,Freq2,Window,Beta);
+    }
+    double uncached=gettime()-start;
+    for(size_t i=0;i<n;i++){
+        RTFIR_close(&filters[i]);
+    }
+
+    // Construct filters with the cache
+    start=gettime();
+    for(size_t i=0;i<n;i++){
+        RTFIR_init_windowed_cached(&filters[i],&cache,Design,Taps,Freq1,Freq2,Window,Beta);
+    }
+    double cached=gettime()-start;
+
+    // Check that all filters share the reference coefficients
+    bool passed=!memcmp(filters[0].coeff,Filter->coeff,Taps*sizeof(double));
+    for(size_t i=0;i<n;i++){
+        passed&=filters[i].coeff==filters[0].coeff && filters[i].symmetry==Filter->symmetry;
+    }
+    RTFIR_cache_stats stats=RTFIR_get_cache_stats(&cache);
+    passed&=stats.hits==n-1 && stats.misses==1 && stats.size==1;
+    printf("Constructed %d %s filters in %f seconds, %f seconds cached\n",(int)n,Type,uncached,cached);
+    printf("%s cache: %lu hits, %lu misses, %u cached: %s\n",Type,stats.hits,stats.misses,stats.size,passed ? "OK" : "FAILED");
+    for(size_t i=0;i<n;i++){
+        RTFIR_close(&filters[i]);
+    }
+    RTFIR_close_cache(&cache);
+    free(filters);
+    return passed;
+}
+
+/*!\brief Retune a filter in place and compare with filters of the new frequencies
+ *
+ * The filter shares its design through a cache, is retuned to 0.8 times
+ * its frequencies at once, and back with a crossfade. Since the delay line
+ * is kept, the output after a retune must equal a filter designed for the
+ * new frequencies, and the linear mix of both during the crossfade.
+ *
+ * \param Filter Filter to use, with the original frequencies
+ * \param Type Name of the filter
+ * \param Design Type of design
+ * \param Taps Number of taps
+ * \param Freq1 Normalized (lower) cutoff-frequency
+ * \param Freq2 Normalized upper cutoff-frequency
+ * \param Window Window of the design
+ * \param Beta Shape of the Kaiser window
+ * \return True if the outputs match and the shared design is unchanged
+ */
+bool filterretune(RTFIR *Filter,char *Type,RTFIR_design_type Design,unsigned int Taps,double Freq1,double Freq2,RTFIR_window Window,double Beta){
+    unsigned int n=1024,fade=256;
+    double *input=(double*)malloc(3*n*sizeof(double));
+    double *output=(double*)malloc(3*n*sizeof(double));
+    double *original=(double*)malloc(3*n*sizeof(double));
+    double *retuned=(double*)malloc(3*n*sizeof(double));
+    for(unsigned int i=0;i<3*n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+
+    // Filter with the original and the retuned frequencies for reference
+    RTFIR target,filter,shared;
+    RTFIR_cache cache;
+    RTFIR_init_cache(&cache,4);
+    RTFIR_init_windowed(&target,Design,Taps,0.8*Freq1,0.8*Freq2,Window,Beta);
+    RTFIR_init_windowed_cached(&filter,&cache,Design,Taps,Freq1,Freq2,Window,Beta);
+    RTFIR_init_windowed_cached(&shared,&cache,Design,Taps,Freq1,Freq2,Window,Beta);
+    RTFIR_filter_block(Filter,input,original,3*n);
+    RTFIR_filter_block(&target,input,retuned,3*n);
+
+    // Retune at once, then back with a crossfade
+    RTFIR_filter_block(&filter,input,output,n);
+    bool passed=RTFIR_retune(&filter,0.8*Freq1,0.8*Freq2,0);
+    RTFIR_filter_block(&filter,input+n,output+n,n);
+    passed&=RTFIR_retune(&filter,Freq1,Freq2,fade);
+    for(unsigned int i=2*n;i<3*n;i++){
+        output[i]=RTFIR_filter(&filter,input[i]);
+    }
+
+    // Compare with the references and the linear mix while crossfading
+    passed&=!memcmp(output,original,n*sizeof(double)) && !memcmp(output+n,retuned+n,n*sizeof(double));
+    double error=0;
+    for(unsigned int i=0;i<fade;i++){
+        double mix=retuned[2*n+i]+(original[2*n+i]-retuned[2*n+i])*(i+1)/fade;
+        error=fmax(error,fabs(output[2*n+i]-mix));
+    }
+    passed&=error<1e-9 && !memcmp(output+2*n+fade,original+2*n+fade,(n-fade)*sizeof(double));
+    passed&=shared.coeff!=filter.coeff && !memcmp(shared.coeff,Filter->coeff,Taps*sizeof(double));
+    printf("%s retuned in place, crossfade over %u samples within %g: %s\n",Type,fade,error,passed ? "OK" : "FAILED");
+
+    // Retuning and new coefficients keep the folding mode
+    RTFIR_set_sparse(&target,false);
+    RTFIR_set_folding(&target,RTFIR_FOLD_DISABLE);
+    bool kept=RTFIR_retune(&target,Freq1,Freq2,0) && target.symmetry==0 && RTFIR_get_cost(&target)==target.taps;
+    kept&=RTFIR_set_coefficients(&target,Filter->coeff,0) && target.symmetry==0 && RTFIR_get_cost(&target)==target.taps;
+    printf("%s keeps folding disabled when retuned, cost %u: %s\n",Type,RTFIR_get_cost(&target),kept ? "OK" : "FAILED");
+    passed&=kept;
+
+    RTFIR_close(&target);
+    RTFIR_close(&filter);
+    RTFIR_close(&shared);
+    RTFIR_close_cache(&cache);
+    free(input);
+    free(output);
+    free(original);
+    free(retuned);
+    return passed;
+}
+
+/*!\brief Compares chains of filters with filtering stage by stage
+ *
+ * The filter is chained with a symmetric smoothing lowpass, which the
+ * automatic plan should fuse if the filter folds over all taps, and with
+ * an asymmetric stage, which the automatic plan should keep staged if the
+ * filter folds. Each plan must match filtering with the stages one after
+ * the other.
+ *
+ * \param Filter Filter to chain
+ * \param Type Name of the filter type
+ * \return True if the chains match the stages
+ */
+bool filterchain(RTFIR *Filter,char *Type){
+    unsigned int n=1024;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *output=(double*)malloc(n*sizeof(double));
+    double *first=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc(n*sizeof(double));
+    double skew[16];
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    for(unsigned int i=0;i<16;i++){
+        skew[i]=(rand()%2001)/1000.0-1.0;
+    }
+    RTFIR_filter_block(Filter,input,first,n);
+
+    bool passed=true;
+    for(int asymmetric=0;asymmetric<2;asymmetric++){
+        // Filter stage by stage for reference
+        RTFIR stage;
+        if(asymmetric){
+            RTFIR_init_lowpass(&stage,16,0.25);
+            RTFIR_set_coefficients(&stage,skew,0);
+        }
+        else{
+            // Half-band stages skip their zeros, so multiply all taps
+            // to compare the folded plans
+            RTFIR_init_windowed(&stage,RTFIR_DESIGN_LOWPASS,31,0.25,0,RTFIR_WINDOW_BLACKMAN,0);
+            RTFIR_set_sparse(&stage,false);
+        }
+        RTFIR stages[2]={*Filter,stage};
+        RTFIR_filter_block(&stage,first,reference,n);
+
+        // Filter a few samples one at a time, then the rest as a block
+        unsigned int cost[3];
+        RTFIR_chain_plan planned=RTFIR_CHAIN_AUTO;
+        double error=0;
+        for(int plan=RTFIR_CHAIN_AUTO;plan<=RTFIR_CHAIN_STAGED;plan++){
+            RTFIR_chain chain;
+            passed&=RTFIR_init_chain(&chain,stages,2,(RTFIR_chain_plan)plan);
+            for(unsigned int i=0;i<100;i++){
+                output[i]=RTFIR_filter_chain(&chain,input[i]);
+            }
+            RTFIR_filter_chain_block(&chain,input+100,output+100,n-100);
+            for(unsigned int i=0;i<n;i++){
+                error=fmax(error,fabs(output[i]-reference[i]));
+            }
+            cost[plan]=RTFIR_get_chain_cost(&chain);
+            if(plan==RTFIR_CHAIN_AUTO){
+                planned=RTFIR_get_chain_plan(&chain);
+            }
+            RTFIR_close_chain(&chain);
+        }
+
+        // The automatic plan must be the cheaper one
+        bool ok=planned==(cost[RTFIR_CHAIN_FUSED]<=cost[RTFIR_CHAIN_STAGED] ? RTFIR_CHAIN_FUSED : RTFIR_CHAIN_STAGED);
+        if(asymmetric && Filter->symmetry){
+            ok&=planned==RTFIR_CHAIN_STAGED;
+        }
+        if(!asymmetric && Filter->symmetry && Filter->first==0 && Filter->last==Filter->taps-1){
+            ok&=planned==RTFIR_CHAIN_FUSED;
+        }
+        ok&=error<1e-9;
+        passed&=ok;
+        printf("%s chained with %s stage: fused cost %u, staged cost %u, planned %s, error %g: %s\n",Type,asymmetric ? "an asymmetric" : "a symmetric",
+            cost[RTFIR_CHAIN_FUSED],cost[RTFIR_CHAIN_STAGED],planned==RTFIR_CHAIN_FUSED ? "fused" : "staged",error,ok ? "OK" : "FAILED");
+        RTFIR_close(&stage);
+    }
+
+    free(input);
+    free(output);
+    free(first);
+    free(reference);
+    return passed;
+}
+
+/*!\brief Compares a bank of filters with filtering separately
+ *
+ * The filter is put in a bank with bandpass filters splitting the
+ * spectrum, which must give the output of each filter on its own, both
+ * per sample and per block. The bank multiplies four filters at a time,
+ * so with a SIMD kernel the sums are within rounding, and with the scalar
+ * kernel they are exact.
+ *
+ * \param Filter Filter to put in the bank
+ * \param Type Name of the filter type
+ * \return True if the bank matches the filters
+ */
+bool filterbank(RTFIR *Filter,char *Type){
+    unsigned int n=4096,count=16;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc(count*n*sizeof(double));
+    double *block=(double*)malloc(count*n*sizeof(double));
+    double *sample=(double*)malloc(count*n*sizeof(double));
+    double *zeros=(double*)calloc(Filter->taps+1,sizeof(double));
+    double outputs[16];
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    RTFIR filters[16];
+    filters[0]=*Filter;
+    for(unsigned int k=1;k<count;k++){
+        RTFIR_init_bandpass(&filters[k],Filter->taps+k%2,0.5*k/count,0.5*(k+1)/count);
+    }
+
+    // Compare with the active kernel and with the scalar kernel
+    const char *names[]={"auto","scalar","sse2","avx2","neon"};
+    RTFIR_kernel kernels[2]={RTFIR_get_kernel(),RTFIR_KERNEL_SCALAR};
+    bool passed=true;
+    for(unsigned int r=0;r<2;r++){
+        RTFIR_set_kernel(kernels[r]);
+
+        // Filter separately for reference, from the same empty state
+        for(unsigned int k=0;k<count;k++){
+            RTFIR_set_state(&filters[k],zeros);
+        }
+        RTFIR_bank bank,single;
+        bool ok=RTFIR_init_bank(&bank,filters,count) && RTFIR_init_bank(&single,filters,count);
+        double start=gettime();
+        for(unsigned int k=0;k<count;k++){
+            RTFIR_filter_block(&filters[k],input,&reference[k*n],n);
+        }
+        double separate=gettime()-start;
+
+        // Filter with the banks per block and per sample
+        start=gettime();
+        RTFIR_filter_bank_block(&bank,input,block,n);
+        double shared=gettime()-start;
+        for(unsigned int i=0;i<n;i++){
+            RTFIR_filter_bank(&single,input[i],outputs);
+            for(unsigned int k=0;k<count;k++){
+                sample[k*n+i]=outputs[k];
+            }
+        }
+        double error=0;
+        for(unsigned int i=0;i<count*n;i++){
+            error=fmax(error,fmax(fabs(block[i]-reference[i]),fabs(sample[i]-reference[i])));
+        }
+        if(kernels[r]==RTFIR_KERNEL_SCALAR){
+            ok&=!memcmp(block,reference,count*n*sizeof(double)) && !memcmp(sample,reference,count*n*sizeof(double));
+        }else{
+            ok&=error<1e-12;
+        }
+        printf("%s in a bank of %u filters with the %s kernel, %.1f ns per sample against %.1f ns separately, error %g: %s\n",Type,count,names[kernels[r]],1e9*shared/n,1e9*separate/n,error,ok ? "OK" : "FAILED");
+        passed&=ok;
+        RTFIR_close_bank(&bank);
+        RTFIR_close_bank(&single);
+    }
+    RTFIR_set_kernel(kernels[0]);
+
+    for(unsigned int k=1;k<count;k++){
+        RTFIR_close(&filters[k]);
+    }
+    free(input);
+    free(reference);
+    free(block);
+    free(sample);
+    free(zeros);
+    return passed;
+}
+
+/*!\brief Saves and restores the delay line part way through a signal
+ *
+ * The state is saved half way, the filter continues with other samples,
+ * then the state is restored and the second half filtered again, which
+ * must repeat the output of the uninterrupted run exactly.
+ *
+ * \param Filter Filter to test
+ * \param Type Name of the filter type
+ * \return True if filtering resumes exactly
+ */
+bool filterstate(RTFIR *Filter,char *Type){
+    unsigned int n=4096,half=n/2;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc(n*sizeof(double));
+    double *output=(double*)malloc(n*sizeof(double));
+    double *state=(double*)malloc(Filter->taps*sizeof(double));
+    double *restored=(double*)malloc(Filter->taps*sizeof(double));
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+
+    // Save the state half way through the reference
+    RTFIR_filter_block(Filter,input,reference,half);
+    RTFIR_get_state(Filter,state);
+    RTFIR_filter_block(Filter,&input[half],&reference[half],n-half);
+
+    // Restore it and filter the second half again
+    RTFIR_set_state(Filter,state);
+    RTFIR_get_state(Filter,restored);
+    RTFIR_filter_block(Filter,&input[half],&output[half],n-half);
+    bool passed=!memcmp(&output[half],&reference[half],(n-half)*sizeof(double));
+    passed&=!memcmp(state,restored,(Filter->taps-1)*sizeof(double));
+    printf("%s restored from %u samples of state: %s\n",Type,Filter->taps-1,passed ? "OK" : "FAILED");
+
+    free(input);
+    free(reference);
+    free(output);
+    free(state);
+    free(restored);
+    return passed;
+}
+
+/*!\brief Compares a sparse filter with the same filter multiplying all taps
+ * \param Sparse Filter that may skip zero coefficients
+ * \param Dense Identical filter with the sparse form disabled
+ * \param Input Samples to filter
+ * \param Length Number of samples in Input
+ * \param Speedup Receives the time of Dense divided by the time of Sparse
+ * \return Largest difference between the outputs
+ */
+double sparseerror(RTFIR *Sparse,RTFIR *Dense,const double *Input,const unsigned int Length,double *Speedup){
+    double *output=(double*)malloc(Length*sizeof(double));
+    double *reference=(double*)malloc(Length*sizeof(double));
+    for(unsigned int i=0;i<100;i++){
+        output[i]=RTFIR_filter(Sparse,Input[i]);
+        reference[i]=RTFIR_filter(Dense,Input[i]);
+    }
+    double start=gettime();
+    RTFIR_filter_block(Sparse,&Input[100],&output[100],Length-100);
+    double sparse=gettime()-start;
+    start=gettime();
+    RTFIR_filter_block(Dense,&Input[100],&reference[100],Length-100);
+    *Speedup=(gettime()-start)/sparse;
+    double error=0;
+    for(unsigned int i=0;i<Length;i++){
+        error=fmax(error,fabs(output[i]-reference[i]));
+    }
+    free(output);
+    free(reference);
+    return error;
+}
+
+/*!\brief Compares sparse filters with filters multiplying all taps
+ *
+ * A half-band lowpass filter with the taps of the filter and the filter
+ * with its coefficients spread out by zeros must skip the zeros and give
+ * the output of the same filters with the sparse form disabled. The
+ * half-band filter is also retuned away from and back to a quarter of the
+ * samplerate, and has its delay line restored.
+ *
+ * \param Filter Filter to spread out
+ * \param Type Name of the filter type
+ * \return True if the sparse filters match
+ */
+bool filtersparse(RTFIR *Filter,char *Type){
+    unsigned int n=65536,taps=Filter->taps|1;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *state=(double*)malloc(taps*sizeof(double));
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+    double speedup=0,error=0;
+
+    // Half-band lowpass filter
+    RTFIR halfband,dense;
+    RTFIR_init_lowpass(&halfband,taps,0.25);
+    RTFIR_init_lowpass(&dense,taps,0.25);
+    RTFIR_set_sparse(&dense,false);
+    error=sparseerror(&halfband,&dense,input,n,&speedup);
+    bool ok=RTFIR_get_stride(&halfband)==2 && RTFIR_get_stride(&dense)==1 && 2*RTFIR_get_cost(&halfband)<RTFIR_get_cost(&dense)+4 && error<1e-12;
+    printf("%s half-band lowpass with %u taps: cost %u against %u, %.2fx faster, error %g: %s\n",Type,taps,RTFIR_get_cost(&halfband),RTFIR_get_cost(&dense),speedup,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+
+    // Retune away from a quarter of the samplerate and back, then restore
+    // the delay line
+    RTFIR_retune(&halfband,0.2,0,0);
+    RTFIR_retune(&dense,0.2,0,0);
+    ok=RTFIR_get_stride(&halfband)==1;
+    error=sparseerror(&halfband,&dense,input,n,&speedup);
+    RTFIR_retune(&halfband,0.25,0,64);
+    RTFIR_retune(&dense,0.25,0,64);
+    ok&=RTFIR_get_stride(&halfband)==2;
+    error=fmax(error,sparseerror(&halfband,&dense,input,n,&speedup));
+    RTFIR_get_state(&halfband,state);
+    RTFIR_close(&halfband);
+    RTFIR_init_lowpass(&halfband,taps,0.25);
+    RTFIR_set_state(&halfband,state);
+    error=fmax(error,sparseerror(&halfband,&dense,input,n,&speedup));
+    ok&=error<1e-12;
+    printf("%s half-band lowpass retuned and resumed, error %g: %s\n",Type,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+    RTFIR_close(&halfband);
+    RTFIR_close(&dense);
+
+    // The filter spread out by zeros, as in an interpolated filter
+    unsigned int length=3*Filter->taps-2;
+    double *stuffed=(double*)calloc(length,sizeof(double));
+    for(unsigned int i=0;i<Filter->taps;i++){
+        stuffed[3*i]=Filter->coeff[i];
+    }
+    RTFIR spread,densespread;
+    RTFIR_init_lowpass(&spread,length,0.1);
+    RTFIR_init_lowpass(&densespread,length,0.1);
+    RTFIR_set_coefficients(&spread,stuffed,0);
+    RTFIR_set_sparse(&densespread,false);
+    RTFIR_set_coefficients(&densespread,stuffed,0);
+    error=sparseerror(&spread,&densespread,input,n,&speedup);
+    unsigned int cost=RTFIR_get_cost(&densespread);
+    ok=RTFIR_get_stride(&spread)==3 && RTFIR_get_cost(&spread)==cost/3+(cost%3!=0) && error<1e-12;
+    printf("%s spread out to %u taps: stride %u, cost %u against %u, %.2fx faster, error %g: %s\n",Type,length,RTFIR_get_stride(&spread),
+            RTFIR_get_cost(&spread),cost,speedup,error,ok ? "OK" : "FAILED");
+    passed&=ok;
+    RTFIR_close(&spread);
+    RTFIR_close(&densespread);
+
+    free(input);
+    free(state);
+    free(stuffed);
+    return passed;
+}
+
+/*!\brief Tests filters in caller supplied storage and pools against allocated filters
+ * \param Filter Filter to test against
+ * \param Type Name of filter
+ * \return True if passed
+ */
+bool filterpool(RTFIR *Filter,char *Type){
+    unsigned int n=4096,taps=Filter->taps;
+    double *input=(double*)malloc(n*sizeof(double));
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+
+    // The filter in storage starting off a cache line, retuned in place
+    size_t size=RTFIR_get_storage_size(taps,true);
+    unsigned char *storage=(unsigned char*)malloc(size+1);
+    RTFIR placed;
+    bool ok=RTFIR_init_lowpass_storage(&placed,storage+1,size,taps,0.1) && RTFIR_set_coefficients(&placed,Filter->coeff,0);
+    ok&=((uintptr_t)placed.coeff)%RTFIR_ALIGNMENT==0 && ((uintptr_t)placed.buffer)%RTFIR_ALIGNMENT==0;
+    ok&=(unsigned char*)placed.phases>=storage && (unsigned char*)placed.phases<storage+size+1;
+    for(unsigned int i=0;i<n;i++){
+        ok&=RTFIR_filter(&placed,input[i])==RTFIR_filter(Filter,input[i]);
+    }
+    ok&=RTFIR_retune(&placed,0.2,0,64) && placed.storage==storage+1;
+    RTFIR_close(&placed);
+    ok&=!RTFIR_init_lowpass_storage(&placed,storage,RTFIR_get_storage_size(taps,false)-RTFIR_ALIGNMENT,taps,0.1);
+
+    // Storage without the arrays for retuning and the sparse form refuses both
+    RTFIR allocated;
+    ok&=RTFIR_init_lowpass_storage(&placed,storage,RTFIR_get_storage_size(taps,false),taps,0.25) && RTFIR_init_lowpass(&allocated,taps,0.25);
+    ok&=!placed.fade && !placed.compactcoeff && !placed.phases && RTFIR_get_stride(&placed)==1;
+    ok&=RTFIR_set_sparse(&allocated,false)==false;
+    for(unsigned int i=0;i<n;i++){
+        ok&=RTFIR_filter(&placed,input[i])==RTFIR_filter(&allocated,input[i]);
+    }
+    ok&=!RTFIR_retune(&placed,0.2,0,64) && !RTFIR_set_sparse(&placed,true) && !placed.phases;
+    RTFIR_close(&placed);
+    RTFIR_close(&allocated);
+    printf("\n%s in caller supplied storage: %s\n",Type,ok ? "OK" : "FAILED");
+    passed&=ok;
+    free(storage);
+
+    // A pool of filters of varying lengths, against separately allocated ones
+    unsigned int count=1000,frames=256,longest=taps+63;
+    RTFIR *separate=(RTFIR*)malloc(count*sizeof(RTFIR));
+    double *frame=(double*)malloc(frames*count*sizeof(double));
+    double *expected=(double*)malloc(frames*count*sizeof(double));
+    RTFIR_pool pool;
+    ok=RTFIR_init_pool(&pool,count,RTFIR_get_pool_size(count,longest,false),false);
+    for(unsigned int k=0;k<count && ok;k++){
+        unsigned int length=taps+k%64;
+        double freq=0.05+0.4*k/count;
+        RTFIR *added=RTFIR_add_pool_filter(&pool,RTFIR_DESIGN_LOWPASS,length,freq,0,RTFIR_WINDOW_HAMMING,0);
+        ok&=added==&pool.filters[k] && RTFIR_init_windowed(&separate[k],RTFIR_DESIGN_LOWPASS,length,freq,0,RTFIR_WINDOW_HAMMING,0);
+        RTFIR_set_sparse(&separate[k],false);  // Pool filters without the sparse arrays stay dense
+        ok&=(unsigned char*)added->coeff>=pool.arena && (unsigned char*)added->buffer<pool.arena+pool.used && !added->phases;
+        ok&=((uintptr_t)added->coeff)%RTFIR_ALIGNMENT==0 && ((uintptr_t)added->buffer)%RTFIR_ALIGNMENT==0;
+    }
+    ok&=RTFIR_add_pool_filter(&pool,RTFIR_DESIGN_LOWPASS,taps,0.1,0,RTFIR_WINDOW_HAMMING,0)==0;
+    printf("\n");
+    for(unsigned int i=0;i<frames*count;i++){
+        frame[i]=input[i%n];
+    }
+    for(unsigned int i=0;i<frames;i++){
+        for(unsigned int k=0;k<count;k++){
+            expected[i*count+k]=RTFIR_filter(&separate[k],frame[i*count+k]);
+        }
+    }
+    double *output=(double*)malloc(count*sizeof(double));
+    for(unsigned int i=0;i<frames/2;i++){
+        RTFIR_filter_pool(&pool,&frame[i*count],output);
+        for(unsigned int k=0;k<count;k++){
+            ok&=output[k]==expected[i*count+k];
+        }
+    }
+    RTFIR_filter_pool_block(&pool,&frame[frames/2*count],&frame[frames/2*count],frames/2);
+    for(unsigned int i=frames/2*count;i<frames*count;i++){
+        ok&=frame[i]==expected[i];
+    }
+
+    // Time the pool against the separate filters
+    double start=gettime();
+    RTFIR_filter_pool_block(&pool,frame,frame,frames);
+    double pooled=gettime()-start;
+    start=gettime();
+    for(unsigned int k=0;k<count;k++){
+        for(unsigned int i=0;i<frames;i++){
+            expected[i*count+k]=RTFIR_filter(&separate[k],expected[i*count+k]);
+        }
+    }
+    double separated=gettime()-start;
+    printf("%s pool of %u filters in %zu bytes, %.2fx the speed of separate filters: %s\n",Type,pool.count,pool.used,separated/pooled,ok ? "OK" : "FAILED");
+    passed&=ok;
+    RTFIR_close_pool(&pool);
+
+    // Filters of a pool with the arrays for retuning retune in the arena
+    ok=RTFIR_init_pool(&pool,2,RTFIR_get_pool_size(2,taps,true),true);
+    for(unsigned int k=0;k<2 && ok;k++){
+        RTFIR *added=RTFIR_add_pool_filter(&pool,RTFIR_DESIGN_LOWPASS,taps,0.25,0,RTFIR_WINDOW_HAMMING,0);
+        ok&=added && (unsigned char*)added->phases>=pool.arena && (unsigned char*)added->phases<pool.arena+pool.used;
+        ok&=added && RTFIR_retune(added,0.2,0,64);
+    }
+    printf("%s pool with retuning: %s\n",Type,ok ? "OK" : "FAILED");
+    passed&=ok;
+    RTFIR_close_pool(&pool);
+    for(unsigned int k=0;k<count;k++){
+        RTFIR_close(&separate[k]);
+    }
+    free(separate);
+    free(frame);
+    free(expected);
+    free(output);
+    free(input);
+    return passed;
+}
+
+/*!\brief Compares moving averages and CIC filters with FIR filters of the same response
+ * \param Filter Filter giving the length of the moving averages
+ * \param Type Name of filter
+ * \return True if passed
+ */
+bool filteraverage(RTFIR *Filter,char *Type){
+    unsigned int n=65536;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *output=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc(n*sizeof(double));
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+
+    // Moving averages of the taps of the filter and of 4096 samples, with
+    // and without decimation, against FIR filters with uniform coefficients
+    unsigned int lengths[2]={Filter->taps,4096};
+    for(unsigned int l=0;l<2;l++){
+        unsigned int length=lengths[l];
+        double *coeff=(double*)malloc(length*sizeof(double));
+        for(unsigned int i=0;i<length;i++){
+            coeff[i]=1.0/length;
+        }
+        RTFIR uniform;
+        RTFIR_init_lowpass(&uniform,length,0.1);
+        RTFIR_set_coefficients(&uniform,coeff,0);
+        double start=gettime();
+        RTFIR_filter_block(&uniform,input,reference,n);
+        double fir=gettime()-start;
+        for(unsigned int factor=1;factor<=3;factor+=2){
+            RTFIR_moving_average average;
+            RTFIR_init_moving_average(&average,length,factor);
+            unsigned int count=RTFIR_get_moving_average_output_length(&average,n);
+            start=gettime();
+            bool ok=RTFIR_filter_moving_average_block(&average,input,n,output)==count;
+            double speedup=fir/(gettime()-start);
+            double error=0;
+            for(unsigned int i=0;i<count;i++){
+                error=fmax(error,fabs(output[i]-reference[(i+1)*factor-1]));
+            }
+            ok&=count==n/factor && error<1e-12;
+            printf("%s moving average of %u samples decimated by %u: %.2fx faster, error %g: %s\n",Type,length,factor,speedup,error,ok ? "OK" : "FAILED");
+            passed&=ok;
+            RTFIR_close_moving_average(&average);
+        }
+        RTFIR_close(&uniform);
+        free(coeff);
+    }
+
+    // A long run of large values must not drift from the exact average
+    unsigned int length=4096,runs=256;
+    RTFIR_moving_average average;
+    RTFIR_init_moving_average(&average,length,1);
+    for(unsigned int r=0;r<runs;r++){
+        for(unsigned int i=0;i<n;i++){
+            output[i]=1e6+input[(i*7+r)%n];
+        }
+        RTFIR_filter_moving_average_block(&average,output,n,reference);
+    }
+    long double exact=0;
+    for(unsigned int i=n-length;i<n;i++){
+        exact+=output[i];
+    }
+    double drift=fabs(reference[n-1]-(double)(exact/length));
+    bool ok=drift<1e-9;
+    printf("%s moving average after %u samples of 1e6 plus noise, error %g: %s\n",Type,n*runs,drift,ok ? "OK" : "FAILED");
+    passed&=ok;
+    RTFIR_close_moving_average(&average);
+
+    // CIC decimator of full scale 32 bit samples, against the integer
+    // convolution of its moving sums
+    unsigned int stages=3,factor=4,delay=2,span=factor*delay,taps=stages*(span-1)+1;
+    int64_t coeff[22]={1};
+    for(unsigned int k=0;k<stages;k++){
+        for(unsigned int i=taps;i-->0;){
+            int64_t sum=0;
+            for(unsigned int j=0;j<span && j<=i;j++){
+                sum+=coeff[i-j];
+            }
+            coeff[i]=sum;
+        }
+    }
+    int32_t *samples=(int32_t*)malloc(n*sizeof(int32_t));
+    int64_t *filtered=(int64_t*)malloc(n*sizeof(int64_t));
+    for(unsigned int i=0;i<n;i++){
+        samples[i]=(int32_t)(((uint32_t)rand()<<16)^(uint32_t)rand());
+    }
+    RTFIR_cic cic;
+    RTFIR_init_cic(&cic,stages,factor,delay);
+    unsigned int count=RTFIR_filter_cic_block(&cic,samples,n/2,filtered);
+    count+=RTFIR_filter_cic_block(&cic,&samples[n/2],n-n/2,&filtered[count]);
+    ok=count==n/factor && RTFIR_get_cic_gain(&cic)==512;
+    for(unsigned int i=0;i<count;i++){
+        unsigned int last=(i+1)*factor-1;
+        int64_t expected=0;
+        for(unsigned int j=0;j<taps && j<=last;j++){
+            expected+=coeff[j]*samples[last-j];
+        }
+        ok&=filtered[i]==expected;
+    }
+    ok&=!RTFIR_init_cic(&cic,5,1000,1);
+    printf("\n%s CIC filter with %u stages decimating by %u: %s\n",Type,stages,factor,ok ? "OK" : "FAILED");
+    passed&=ok;
+    RTFIR_close_cic(&cic);
+
+    free(input);
+    free(output);
+    free(reference);
+    free(samples);
+    free(filtered);
+    return passed;
+}
+
+/*!\brief Compares a multichannel filter with independent filters per channel
+ *
+ * Channel counts below, at and above the four channels accumulated at a
+ * time are filtered in uneven blocks of frames, and each channel must
+ * match the filter run separately over that channel alone.
+ *
+ * \param Filter Filter to share between the channels
+ * \param Type Name of the filter type
+ * \return True if every channel matches
+ */
+bool filtermultichannel(RTFIR *Filter,char *Type){
+    const unsigned int counts[]={1,3,4,7};
+    unsigned int n=2048;
+    double *state=(double*)calloc(Filter->taps,sizeof(double));
+    double *input=(double*)malloc(n*sizeof(double));
+    double *reference=(double*)malloc(n*sizeof(double));
+    double *frames=(double*)malloc(7*n*sizeof(double));
+    double *output=(double*)malloc(7*n*sizeof(double));
+    bool passed=true;
+    for(unsigned int c=0;c<sizeof(counts)/sizeof(counts[0]);c++){
+        unsigned int channels=counts[c];
+        for(unsigned int i=0;i<channels*n;i++){
+            frames[i]=(rand()%2001)/1000.0-1.0;
+        }
+
+        // Filter in uneven blocks, and frame by frame at the start
+        RTFIR_multichannel multi;
+        passed&=RTFIR_init_multichannel(&multi,Filter,channels);
+        for(unsigned int i=0;i<7;i++){
+            RTFIR_filter_multichannel(&multi,&frames[i*channels],&output[i*channels]);
+        }
+        for(unsigned int i=7,step=1;i<n;i+=step,step=step*3%97+1){
+            unsigned int length=i+step<n ? step : n-i;
+            RTFIR_filter_multichannel_block(&multi,&frames[i*channels],&output[i*channels],length);
+        }
+        RTFIR_close_multichannel(&multi);
+
+        // Filter each channel on its own from an empty delay line
+        double error=0;
+        for(unsigned int k=0;k<channels;k++){
+            for(unsigned int i=0;i<n;i++){
+                input[i]=frames[i*channels+k];
+            }
+            RTFIR_set_state(Filter,state);
+            RTFIR_filter_block(Filter,input,reference,n);
+            for(unsigned int i=0;i<n;i++){
+                error=fmax(error,fabs(output[i*channels+k]-reference[i]));
+            }
+        }
+        passed&=error<1e-12;
+        printf("%s with %u channels, max error %g: %s\n",Type,channels,error,error<1e-12 ? "OK" : "FAILED");
+    }
+
+    free(state);
+    free(input);
+    free(reference);
+    free(frames);
+    free(output);
+    return passed;
+}
+
+/*!\brief Compares resamplers with upsampling, filtering and downsampling
+ *
+ * Each ratio is resampled in uneven blocks, starting with an empty block,
+ * with a prototype of the taps of the filter. The output must match the
+ * prototype with the upsampling gain run over the input with Up-1 zeros
+ * stuffed after each sample, keeping every Down-th output. Ratios with
+ * Down of one use the interpolator.
+ *
+ * \param Filter Filter to take the number of taps from
+ * \param Type Name of the filter type
+ * \return True if every ratio matches
+ */
+bool filterresampler(RTFIR *Filter,char *Type){
+    const unsigned int ratios[5][2]={{3,1},{3,2},{2,3},{5,7},{1,4}};
+    unsigned int n=2000,taps=Filter->taps;
+    double *input=(double*)malloc(n*sizeof(double));
+    double *output=(double*)malloc(5*n*sizeof(double));
+    for(unsigned int i=0;i<n;i++){
+        input[i]=(rand()%2001)/1000.0-1.0;
+    }
+    bool passed=true;
+    for(unsigned int r=0;r<5;r++){
+        unsigned int up=ratios[r][0],down=ratios[r][1];
+        RTFIR_resampler resampler;
+        RTFIR prototype;
+        bool ok=down==1 ? RTFIR_init_interpolator(&resampler,taps,up,0) : RTFIR_init_resampler(&resampler,taps,up,down,0);
+        ok&=RTFIR_init_lowpass(&prototype,taps,0.5/(up>down ? up : down));
+
+        // Resample in uneven blocks, checking the predicted output lengths
+        unsigned int count=0;
+        for(unsigned int i=0,step=0;i<n;i+=step,step=step*3%97+1){
+            unsigned int length=i+step<n ? step : n-i;
+            unsigned int expected=RTFIR_get_resampler_output_length(&resampler,length);
+            unsigned int produced=RTFIR_filter_resampler_block(&resampler,&input[i],length,&output[count]);
+            ok&=produced==expected;
+            count+=produced;
+        }
+        ok&=count==(n*up+down-1)/down;
+
+        // Filter the zero-stuffed input and keep every Down-th output
+        double error=0;
+        for(unsigned int m=0;m<count;m++){
+            double reference=0;
+            unsigned int t=m*down;
+            for(unsigned int i=t%up;i<taps && i<=t;i+=up){
+                reference+=up*prototype.coeff[i]*input[(t-i)/up];
+            }
+            error=fmax(error,fabs(output[m]-reference));
+        }
+        ok&=error<1e-12;
+        printf("%s resampling by %u/%u, %u outputs, max error %g: %s\n",Type,up,down,count,error,ok ? "OK" : "FAILED");
+        passed&=ok;
+        RTFIR_close_resampler(&resampler);
+        RTFIR_close(&prototype);
+    }
+
+    free(input);
+    free(output);
+    return passed;
+}
+
 /*!\brief Displays help-message
  */
 void help(char *Caller){
@@ -78,15 +1280,41 @@ void help(char *Caller){
     printf("Options:\n");
     printf("\t--samplerate HZ\t\tSamplerate in hertz\n");
     printf("\t--performance\t\tTest performance by filtering a large dataset\n");
+    printf("\t--block\t\t\tUse block filtering for performance tests\n");
+    printf("\t--simd\t\t\tCompare SIMD kernels with the scalar kernel\n");
+    printf("\t--precision\t\tCompare float and fixed-point filters with double\n");
+    printf("\t--cache\t\t\tConstruct filters through the design cache\n");
+    printf("\t--spec\t\t\tCheck the response of Kaiser filters against the specification\n");
+    printf("\t--benchmark\t\tMeasure throughput for the benchmark harness\n");
+    printf("\t--blocksize N\t\tSamples per block for benchmarks, zero for per sample\n");
+    printf("\t--samples N\t\tSamples per benchmark repeat\n");
+    printf("\t--warmup N\t\tUntimed benchmark repeats\n");
+    printf("\t--repeats N\t\tTimed benchmark repeats\n");
+    printf("\t--latency\t\tMeasure the latency of each filtered sample\n");
+    printf("\t--deadline US\t\tFail latency tests if any sample takes longer\n");
+    printf("\t--cpu N\t\t\tPin the process to a CPU\n");
+    printf("\t--mlock\t\t\tLock the process memory\n");
+    printf("\t--stats\t\t\tCheck the statistics counted by filters\n");
+    printf("\t--retune\t\tRetune filters in place, with and without a crossfade\n");
+    printf("\t--chain\t\t\tCompare fused and staged chains of filters\n");
+    printf("\t--bank\t\t\tCompare a bank of filters with separate filters\n");
+    printf("\t--state\t\t\tSave and restore the delay line part way through\n");
+    printf("\t--sparse\t\tCompare half-band and sparse filters with dense filters\n");
+    printf("\t--pool\t\t\tTest filters in caller supplied storage and pools\n");
+    printf("\t--average\t\tCompare moving averages and CIC filters with FIR filters\n");
+    printf("\t--multichannel\t\tCompare multichannel filters with one filter per channel\n");
+    printf("\t--resampler\t\tCompare resamplers with zero stuffing, filtering and decimation\n");
     printf("\t--file PATH\t\tFilter data from file\n");
     printf("\t--stdin\t\t\tFilter data from stdin to stdout\n");
     printf("\t--coeff\t\t\tDump filter coefficients\n");
     printf("\n");
     printf("Filters:\n");
-    printf("\t--lowpass TAPS F0\tTest lowpass filter\n");
-    printf("\t--highpass TAPS F0\tTest highpass filter\n");
-    printf("\t--bandpass TAPS F1 F2\tTest bandpass filter\n");
-    printf("\t--bandstop TAPS F1 F2\tTest bandstop filter\n");
+    printf("\t--lowpass taps F0\tTest lowpass filter\n");
+    printf("\t--highpass taps F0\tTest highpass filter\n");
+    printf("\t--bandpass taps F1 F2\tTest bandpass filter\n");
+    printf("\t--bandstop taps F1 F2\tTest bandstop filter\n");
+    printf("\t--kaiser-lowpass FP FS DB\tTest shortest Kaiser lowpass filter meeting a specification\n");
+    printf("\t--kaiser-highpass FP FS DB\tTest shortest Kaiser highpass filter meeting a specification\n");
     printf("\n");
 }
 
@@ -94,6 +1322,11 @@ int main(int argc,char *argv[]){
     // Set sampling rate and mode from parameters
     double samplerate=250;
     testmode_t mode=MODE_STDIN;
+    bool block=false;
+    unsigned int blocksize=0,samples=100000,warmup=1,repeats=5;
+    double deadline=0;
+    int cpu=-1;
+    bool lock=false;
     char *filename=0;
     for(int i=1;i<argc;i++){
         if(!strcmp(argv[i],"--samplerate")){
@@ -112,6 +1345,78 @@ int main(int argc,char *argv[]){
         if(!strcmp(argv[i],"--performance")){
             mode=MODE_PERF;
         }
+        if(!strcmp(argv[i],"--block")){
+            block=true;
+        }
+        if(!strcmp(argv[i],"--simd")){
+            mode=MODE_SIMD;
+        }
+        if(!strcmp(argv[i],"--precision")){
+            mode=MODE_PRECISION;
+        }
+        if(!strcmp(argv[i],"--cache")){
+            mode=MODE_CACHE;
+        }
+        if(!strcmp(argv[i],"--spec")){
+            mode=MODE_SPEC;
+        }
+        if(!strcmp(argv[i],"--benchmark")){
+            mode=MODE_BENCHMARK;
+        }
+        if(!strcmp(argv[i],"--blocksize")){
+            blocksize=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--samples")){
+            samples=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--warmup")){
+            warmup=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--repeats")){
+            repeats=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--latency")){
+            mode=MODE_LATENCY;
+        }
+        if(!strcmp(argv[i],"--deadline")){
+            deadline=strtod(argv[++i],0);
+        }
+        if(!strcmp(argv[i],"--cpu")){
+            cpu=atoi(argv[++i]);
+        }
+        if(!strcmp(argv[i],"--mlock")){
+            lock=true;
+        }
+        if(!strcmp(argv[i],"--stats")){
+            mode=MODE_STATS;
+        }
+        if(!strcmp(argv[i],"--retune")){
+            mode=MODE_RETUNE;
+        }
+        if(!strcmp(argv[i],"--chain")){
+            mode=MODE_CHAIN;
+        }
+        if(!strcmp(argv[i],"--bank")){
+            mode=MODE_BANK;
+        }
+        if(!strcmp(argv[i],"--state")){
+            mode=MODE_STATE;
+        }
+        if(!strcmp(argv[i],"--sparse")){
+            mode=MODE_SPARSE;
+        }
+        if(!strcmp(argv[i],"--pool")){
+            mode=MODE_POOL;
+        }
+        if(!strcmp(argv[i],"--average")){
+            mode=MODE_AVERAGE;
+        }
+        if(!strcmp(argv[i],"--multichannel")){
+            mode=MODE_MULTICHANNEL;
+        }
+        if(!strcmp(argv[i],"--resampler")){
+            mode=MODE_RESAMPLER;
+        }
         if(!strcmp(argv[i],"--help")){
             help(argv[0]);
             return 0;
@@ -121,6 +1426,10 @@ int main(int argc,char *argv[]){
         help(argv[0]);
     }
 
+    if(!realtime(cpu,lock)){
+        return -1;
+    }
+
     // Open input
     FILE *fd=stdin;
     if(filename){
@@ -129,6 +1438,12 @@ int main(int argc,char *argv[]){
 
     // Run filters
     char *type=0;
+    bool passed=true;
+    RTFIR_design_type design=RTFIR_DESIGN_LOWPASS;
+    unsigned int taps=0;
+    double flow=0,fhigh=0;
+    RTFIR_window window=RTFIR_WINDOW_RECTANGULAR;
+    double beta=0,fpass=0,fstop=0,attenuation=0;
     RTFIR filter;
     memset(&filter,0,sizeof(filter));
     for(int i=1;i<argc;i++){
@@ -138,33 +1453,89 @@ int main(int argc,char *argv[]){
         else if(!strcmp(argv[i],"--stdin")){}
         else if(!strcmp(argv[i],"--coeff")){}
         else if(!strcmp(argv[i],"--performance")){}
+        else if(!strcmp(argv[i],"--block")){}
+        else if(!strcmp(argv[i],"--simd")){}
+        else if(!strcmp(argv[i],"--precision")){}
+        else if(!strcmp(argv[i],"--cache")){}
+        else if(!strcmp(argv[i],"--spec")){}
+        else if(!strcmp(argv[i],"--benchmark")){}
+        else if(!strcmp(argv[i],"--blocksize")){i++;}
+        else if(!strcmp(argv[i],"--samples")){i++;}
+        else if(!strcmp(argv[i],"--warmup")){i++;}
+        else if(!strcmp(argv[i],"--repeats")){i++;}
+        else if(!strcmp(argv[i],"--latency")){}
+        else if(!strcmp(argv[i],"--deadline")){i++;}
+        else if(!strcmp(argv[i],"--cpu")){i++;}
+        else if(!strcmp(argv[i],"--mlock")){}
+        else if(!strcmp(argv[i],"--stats")){}
+        else if(!strcmp(argv[i],"--retune")){}
+        else if(!strcmp(argv[i],"--chain")){}
+        else if(!strcmp(argv[i],"--bank")){}
+        else if(!strcmp(argv[i],"--state")){}
+        else if(!strcmp(argv[i],"--sparse")){}
+        else if(!strcmp(argv[i],"--pool")){}
+        else if(!strcmp(argv[i],"--average")){}
+        else if(!strcmp(argv[i],"--multichannel")){}
+        else if(!strcmp(argv[i],"--resampler")){}
 
         // Load filters
         else if(!strcmp(argv[i],"--lowpass")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double cutoff=strtod(argv[++i],0);
-            RTFIR_init_lowpass(&filter,taps,cutoff/samplerate);
+            design=RTFIR_DESIGN_LOWPASS;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=0;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            RTFIR_init_lowpass(&filter,taps,flow);
         }
         else if(!strcmp(argv[i],"--highpass")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double cutoff=strtod(argv[++i],0);
-            RTFIR_init_highpass(&filter,taps,cutoff/samplerate);
+            design=RTFIR_DESIGN_HIGHPASS;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=0;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            RTFIR_init_highpass(&filter,taps,flow);
         }
         else if(!strcmp(argv[i],"--bandpass")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double flow=strtod(argv[++i],0);
-            double fhigh=strtod(argv[++i],0);
-            RTFIR_init_bandpass(&filter,taps,flow/samplerate,fhigh/samplerate);
+            design=RTFIR_DESIGN_BANDPASS;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=strtod(argv[++i],0)/samplerate;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            RTFIR_init_bandpass(&filter,taps,flow,fhigh);
         }
         else if(!strcmp(argv[i],"--bandstop")){
             type=argv[i]+2;
-            unsigned int taps=atoi(argv[++i]);
-            double flow=strtod(argv[++i],0);
-            double fhigh=strtod(argv[++i],0);
-            RTFIR_init_bandstop(&filter,taps,flow/samplerate,fhigh/samplerate);
+            design=RTFIR_DESIGN_BANDSTOP;
+            taps=atoi(argv[++i]);
+            flow=strtod(argv[++i],0)/samplerate;
+            fhigh=strtod(argv[++i],0)/samplerate;
+            window=RTFIR_WINDOW_RECTANGULAR;
+            attenuation=0;
+            RTFIR_init_bandstop(&filter,taps,flow,fhigh);
+        }
+        else if(!strcmp(argv[i],"--kaiser-lowpass") || !strcmp(argv[i],"--kaiser-highpass")){
+            type=argv[i]+2;
+            design=strcmp(argv[i],"--kaiser-lowpass") ? RTFIR_DESIGN_HIGHPASS : RTFIR_DESIGN_LOWPASS;
+            fpass=strtod(argv[++i],0)/samplerate;
+            fstop=strtod(argv[++i],0)/samplerate;
+            attenuation=strtod(argv[++i],0);
+            window=RTFIR_WINDOW_KAISER;
+            beta=RTFIR_kaiser_beta(attenuation);
+            if(design==RTFIR_DESIGN_LOWPASS){
+                RTFIR_init_kaiser_lowpass(&filter,fpass,fstop,attenuation);
+            }
+            else{
+                RTFIR_init_kaiser_highpass(&filter,fpass,fstop,attenuation);
+            }
+            taps=filter.taps;
+            flow=(fpass+fstop)/2;
+            fhigh=0;
         }
         else{
             printf("Invalid parameter: %s\n",argv[i]);
@@ -175,7 +1546,23 @@ int main(int argc,char *argv[]){
         if(filter.taps){
             if(mode==MODE_STDIN)    filterfile(&filter,stdin);
             if(mode==MODE_FILE)     filterfile(&filter,fd);
-            if(mode==MODE_PERF)     filterperf(&filter,type);
+            if(mode==MODE_PERF)     filterperf(&filter,type,block);
+            if(mode==MODE_SIMD)     passed&=filtersimd(&filter,type);
+            if(mode==MODE_PRECISION)passed&=filterprecision(&filter,type);
+            if(mode==MODE_CACHE)    passed&=filtercache(&filter,type,design,taps,flow,fhigh,window,beta);
+            if(mode==MODE_SPEC)     passed&=filterspec(&filter,type,fpass,fstop,attenuation);
+            if(mode==MODE_BENCHMARK)filterbenchmark(&filter,type,blocksize,samples,warmup,repeats);
+            if(mode==MODE_LATENCY)  passed&=filterlatency(&filter,type,samples,(uint64_t)(deadline*1000));
+            if(mode==MODE_STATS)    passed&=filterstats(&filter,type);
+            if(mode==MODE_RETUNE)   passed&=filterretune(&filter,type,design,taps,flow,fhigh,window,beta);
+            if(mode==MODE_CHAIN)    passed&=filterchain(&filter,type);
+            if(mode==MODE_BANK)     passed&=filterbank(&filter,type);
+            if(mode==MODE_STATE)    passed&=filterstate(&filter,type);
+            if(mode==MODE_SPARSE)   passed&=filtersparse(&filter,type);
+            if(mode==MODE_POOL)     passed&=filterpool(&filter,type);
+            if(mode==MODE_AVERAGE)  passed&=filteraverage(&filter,type);
+            if(mode==MODE_MULTICHANNEL) passed&=filtermultichannel(&filter,type);
+            if(mode==MODE_RESAMPLER) passed&=filterresampler(&filter,type);
             if(mode==MODE_COEFF){
                 for(int i=0;i<filter.taps;i++){
                     printf("%f\n",filter.coeff[i]);
@@ -187,6 +1574,6 @@ int main(int argc,char *argv[]){
 
     // Close input and terminate
     fclose(fd);
-    return 0;
+    return passed ? 0 : -1;
 }
 
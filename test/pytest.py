@@ -3,7 +3,7 @@
 # Script to test realtime fir filters
 #
 
-import time,sys,random,subprocess,rtfir
+import time,sys,os,io,math,random,subprocess,ctypes,asyncio,pickle,tempfile,threading,rtfir
 import matplotlib.pyplot as plt
 import numpy as np
 
@@ -11,6 +11,23 @@ MODE_STDIN=0
 MODE_FILE=1
 MODE_COEFF=2
 MODE_PERF=3
+MODE_BATCH=4
+MODE_SPEC=5
+MODE_BENCHMARK=6
+MODE_LATENCY=7
+MODE_STATS=8
+MODE_STREAM=9
+MODE_RETUNE=10
+MODE_CHAIN=11
+MODE_BANK=12
+MODE_SHARD=13
+MODE_SPARSE=14
+MODE_AVERAGE=15
+MODE_FFT=16
+MODE_RESAMPLER=17
+MODE_DECIMATOR=18
+MODE_MULTICHANNEL=19
+MODE_TOOL=20
 
 # Generates frequency sweep
 def chirp(fs_Hz, rep_Hz, f0_Hz, f1_Hz, phase_rad=0):
@@ -45,7 +62,7 @@ def filterfile(filter,fd):
             print(str(filter.Filter(sample)))
 
 # Test performance of a filter
-def filterperf(filter,type):
+def filterperf(filter,type,block):
     # Generate set of random samples
     n=1000
     samples=[]
@@ -54,12 +71,690 @@ def filterperf(filter,type):
 
     # Filter dataset ...
     start=time.time()
-    for i in range(0,n):
-        for j in range(0,n):
-            dummy=filter.Filter(samples[j])
+    if block:
+        samples=np.array(samples)
+        for i in range(0,n):
+            dummy=filter.FilterBlock(samples)
+    else:
+        for i in range(0,n):
+            for j in range(0,n):
+                dummy=filter.Filter(samples[j])
     end=time.time()
     print('Filtered '+str(n*n)+' samples with '+type+' in '+str(end-start)+' seconds')
 
+# Benchmark a filter for the benchmark harness, printing the throughput of
+# each repeat in samples/second: "benchmark TYPE TAPS BLOCKSIZE RATE..."
+def filterbenchmark(filter,type,blocksize,samples,warmup,repeats):
+    input=np.random.uniform(-1,1,samples)
+    values=input.tolist()
+    rates=[]
+    for r in range(warmup+repeats):
+        start=time.perf_counter()
+        if blocksize:
+            for i in range(0,samples,blocksize):
+                filter.FilterBlock(input[i:i+blocksize])
+        else:
+            for x in values:
+                filter.Filter(x)
+        elapsed=time.perf_counter()-start
+        if r>=warmup:
+            rates.append('%.6g' % (samples/elapsed))
+    print('benchmark '+type+' '+str(len(filter.GetCoefficients()))+' '+str(blocksize)+' '+' '.join(rates))
+
+# Pin the process to a CPU and lock its memory to reduce jitter
+def realtime(cpu,lock):
+    if cpu>=0:
+        os.sched_setaffinity(0,{cpu})
+    if lock:
+        libc=ctypes.CDLL(None,use_errno=True)
+        if libc.mlockall(3):    # MCL_CURRENT|MCL_FUTURE
+            raise OSError(ctypes.get_errno(),'Could not lock memory')
+
+# Measure the latency of each call to filter a sample, including the
+# overhead of reading the clock, and print percentiles and a histogram
+def filterlatency(filter,type,samples,deadline):
+    values=np.random.uniform(-1,1,samples).tolist()
+    clock=time.perf_counter_ns
+    overhead=sys.maxsize
+    for i in range(1000):
+        start=clock()
+        overhead=min(overhead,clock()-start)
+    for x in values[:10000]:
+        filter.Filter(x)
+    latency=[0]*samples
+    for i,x in enumerate(values):
+        start=clock()
+        filter.Filter(x)
+        latency[i]=clock()-start
+    misses=sum(1 for l in latency if deadline and l>deadline)
+    latency.sort()
+    print('%s latency: %d taps, %d samples, p50 %dns p99 %dns p99.9 %dns max %dns, clock overhead %dns' % (type,len(filter.GetCoefficients()),samples,
+        latency[samples//2],latency[int(samples*0.99)],latency[int(samples*0.999)],latency[-1],overhead))
+    bucket=64
+    i=0
+    while i<samples:
+        count=0
+        while i<samples and latency[i]<=bucket:
+            count+=1
+            i+=1
+        if count:
+            print('%12dns: %d' % (bucket,count))
+        bucket*=2
+    if deadline:
+        print('%s deadline %dns: %d misses: %s' % (type,deadline,misses,'FAILED' if misses else 'OK'))
+    return misses==0
+
+# Check the statistics counted by a filter, which stay zero unless the
+# module is compiled with RTFIR_STATS
+def filterstats(filter,type):
+    input=np.random.uniform(-1,1,100)
+    filter.ResetStats()
+    for i in range(1000):
+        filter.Filter(input[i%100])
+    for i in range(10):
+        filter.FilterBlock(input)
+    stats=filter.GetStats()
+    if stats['enabled']:
+        passed=stats['samples']==2000 and stats['calls']==1010 and stats['block_calls']==10 and 0<stats['max_ns']<=stats['total_ns']
+    else:
+        passed=not any(stats[k] for k in ('samples','calls','block_calls','total_ns','max_ns'))
+    print(type+' stats'+('' if stats['enabled'] else ' (disabled)')+': '+str(stats)+': '+('OK' if passed else 'FAILED'))
+    return passed
+
+# Test batch filtering of independent streams on a thread pool, and that
+# FilterBlock releases the GIL so other threads run while it filters
+def filterbatch(factory,type):
+    # Generate one random stream per filter
+    streams=32
+    filters=[factory() for i in range(streams)]
+    references=[factory() for i in range(streams)]
+    inputs=[np.random.uniform(-1,1,100000) for i in range(streams)]
+
+    # Filter streams one by one, then as a batch
+    start=time.time()
+    expected=[f.FilterBlock(x) for f,x in zip(references,inputs)]
+    middle=time.time()
+    outputs=rtfir.FilterBatch(filters,inputs)
+    end=time.time()
+    passed=all(np.array_equal(a,b) for a,b in zip(expected,outputs))
+    print('Filtered '+str(streams)+' streams with '+type+' in '+str(middle-start)+' seconds, '+str(end-middle)+' seconds on '+str(rtfir.GetBatchThreads())+' threads: '+('OK' if passed else 'FAILED'))
+
+    # A background thread must make progress while FilterBlock runs. The GIL
+    # may pass to it for a switch interval just before and after the call, so
+    # look for progress in the middle half of a block lasting at least 100ms.
+    filter=factory()
+    n=1<<16
+    while n<(1<<23):
+        start=time.perf_counter()
+        filter.FilterBlock(np.zeros(n))
+        if time.perf_counter()-start>=0.1:
+            break
+        n*=2
+    input=np.random.uniform(-1,1,n)
+    stamps=[]
+    done=threading.Event()
+    def count():
+        while not done.is_set():
+            stamps.append(time.perf_counter())
+    thread=threading.Thread(target=count)
+    thread.start()
+    while not stamps:
+        time.sleep(0.001)
+    start=time.perf_counter()
+    filter.FilterBlock(input)
+    end=time.perf_counter()
+    done.set()
+    thread.join()
+    margin=(end-start)/4
+    during=sum(1 for t in stamps if start+margin<t<end-margin)
+    ok=margin>4*sys.getswitchinterval() and during>0
+    passed&=ok
+    print('Background thread counted %d times during %.3f seconds of FilterBlock: %s' % (during,end-start,'OK' if ok else 'FAILED'))
+    return passed
+
+# Test streaming chunks of random size through generators, the streamed
+# output must equal filtering the whole input as one block
+def filterstream(factory,type,blocksize):
+    input=np.random.uniform(-1,1,100000)
+    expected=factory().FilterBlock(input)
+    sizes=[]
+    while sum(sizes)<len(input):
+        sizes.append(random.choice([0,1,random.randint(2,100),random.randint(100,10000)]))
+    offsets=np.cumsum([0]+sizes)
+
+    # The producer reuses one buffer to check that pending samples are copied
+    def chunks():
+        buffer=np.empty(max(sizes))
+        for start,end in zip(offsets[:-1],offsets[1:]):
+            chunk=buffer[:len(input[start:end])]
+            chunk[:]=input[start:end]
+            yield chunk
+    async def achunks():
+        for chunk in chunks():
+            await asyncio.sleep(0)
+            yield chunk
+    async def afilter(size):
+        return [y async for y in rtfir.FilterStreamAsync(factory(),achunks(),size)]
+
+    passed=True
+    for size in sorted(set([0,blocksize or 1024,16384])):
+        outputs=list(rtfir.FilterStream(factory(),chunks(),size))
+        passed&=np.array_equal(np.concatenate(outputs),expected)
+        passed&=not size or all(len(y)==size for y in outputs[:-1])
+        passed&=np.array_equal(np.concatenate(asyncio.run(afilter(size))),expected)
+    print('Streamed '+str(len(sizes))+' chunks through '+type+': '+('OK' if passed else 'FAILED'))
+    return passed
+
+# Retune a filter in place and compare with a filter of the new frequencies,
+# the filter shares its design through the cache, which must stay unchanged
+def filterretune(factory,type,freq1,freq2):
+    n,fade=1024,256
+    input=np.random.uniform(-1,1,3*n)
+    reference=factory()
+    coeff=np.array(reference.GetCoefficients())
+    original=reference.FilterBlock(input)
+    target=factory()
+    target.Retune(0.8*freq1,0.8*freq2)
+    retuned=target.FilterBlock(input)
+
+    # Retune at once, then back with a crossfade
+    filter=factory()
+    output=[filter.FilterBlock(input[:n])]
+    filter.Retune(0.8*freq1,0.8*freq2)
+    output.append(filter.FilterBlock(input[n:2*n]))
+    filter.Retune(freq1,freq2,fade)
+    output.append(filter.FilterBlock(input[2*n:]))
+    output=np.concatenate(output)
+
+    # Compare with the references and the linear mix while crossfading
+    mix=retuned[2*n:2*n+fade]+(original[2*n:2*n+fade]-retuned[2*n:2*n+fade])*np.arange(1,fade+1)/fade
+    expected=np.concatenate((original[:n],retuned[n:2*n],mix,original[2*n+fade:]))
+    error=np.max(np.abs(output-expected))
+    passed=error<1e-9 and np.array_equal(reference.GetCoefficients(),coeff)
+    print(type+' retuned in place, crossfade over '+str(fade)+' samples within '+str(error)+': '+('OK' if passed else 'FAILED'))
+
+    # Retuning, new coefficients and pickling keep the folding mode
+    target.SetSparse(False)
+    target.SetFolding(rtfir.RTFIR_FOLD_DISABLE)
+    target.Retune(freq1,freq2)
+    kept=target.GetSymmetry()==0 and target.GetCost()==len(coeff)
+    target.SetCoefficients(coeff)
+    kept&=target.GetSymmetry()==0 and target.GetCost()==len(coeff) and target.GetFolding()==rtfir.RTFIR_FOLD_DISABLE
+    copy=pickle.loads(pickle.dumps(target))
+    copy.Retune(0.8*freq1,0.8*freq2)
+    kept&=copy.GetSymmetry()==0 and copy.GetCost()==len(coeff)
+    print(type+' keeps folding disabled when retuned, cost '+str(target.GetCost())+': '+('OK' if kept else 'FAILED'))
+    return passed and kept
+
+# Compare chains of filters with filtering stage by stage. The automatic
+# plan should fuse a symmetric stage if the filter folds over all taps, and
+# keep an asymmetric stage staged if the filter folds.
+def filterchain(factory,type):
+    n=1024
+    input=np.random.uniform(-1,1,n)
+    filter=factory()
+    first=factory().FilterBlock(input)
+    coeff=np.array(filter.GetCoefficients())
+    symmetry=filter.GetSymmetry()
+    full=symmetry!=0 and np.array_equal(coeff,symmetry*coeff[::-1])
+
+    passed=True
+    for asymmetric in (False,True):
+        if asymmetric:
+            stage=rtfir.RTFIR_lowpass(16,0.25)
+            stage.SetCoefficients(np.random.uniform(-1,1,16))
+        else:
+            # Half-band stages skip their zeros, so multiply all taps to
+            # compare the folded plans
+            stage=rtfir.RTFIR_lowpass(31,0.25,rtfir.RTFIR_WINDOW_BLACKMAN)
+            stage.SetSparse(False)
+        automatic=rtfir.RTFIR_chain([filter,stage])
+        fused=rtfir.RTFIR_chain([filter,stage],rtfir.RTFIR_CHAIN_FUSED)
+        staged=rtfir.RTFIR_chain([filter,stage],rtfir.RTFIR_CHAIN_STAGED)
+        reference=stage.FilterBlock(first)
+
+        # Filter a few samples one at a time, then the rest as a block
+        error=0
+        for chain in (automatic,fused,staged):
+            output=np.concatenate(([chain.Filter(x) for x in input[:100]],chain.FilterBlock(input[100:])))
+            error=max(error,np.max(np.abs(output-reference)))
+
+        # The automatic plan must be the cheaper one
+        planned=automatic.GetPlan()
+        ok=planned==(rtfir.RTFIR_CHAIN_FUSED if fused.GetCost()<=staged.GetCost() else rtfir.RTFIR_CHAIN_STAGED)
+        ok&=fused.GetPlan()==rtfir.RTFIR_CHAIN_FUSED and staged.GetPlan()==rtfir.RTFIR_CHAIN_STAGED and automatic.GetStages()==2
+        if asymmetric and symmetry:
+            ok&=planned==rtfir.RTFIR_CHAIN_STAGED
+        if not asymmetric and full:
+            ok&=planned==rtfir.RTFIR_CHAIN_FUSED
+        ok&=error<1e-9
+        passed&=ok
+        print(type+' chained with '+('an asymmetric' if asymmetric else 'a symmetric')+' stage: fused cost '+str(fused.GetCost())+', staged cost '+str(staged.GetCost())+
+              ', planned '+('fused' if planned==rtfir.RTFIR_CHAIN_FUSED else 'staged')+', error '+str(error)+': '+('OK' if ok else 'FAILED'))
+
+    # New coefficients would not reach the staged copies, so chains refuse them
+    smooth=rtfir.RTFIR_lowpass(31,0.2)
+    chain=rtfir.RTFIR_chain([filter,smooth],rtfir.RTFIR_CHAIN_STAGED)
+    fused=np.array(chain.GetCoefficients())
+    try:
+        chain.SetCoefficients(np.zeros(len(fused)))
+        ok=False
+    except ValueError:
+        ok=True
+    ok&=np.array_equal(chain.GetCoefficients(),fused) and np.array_equal(chain.FilterBlock(input),smooth.FilterBlock(first))
+    passed&=ok
+    print(type+' staged chain refuses new coefficients: '+('OK' if ok else 'FAILED'))
+
+    # Chains filter at one rate, so they refuse decimators
+    try:
+        rtfir.RTFIR_chain([rtfir.RTFIR_decimator(31,4),smooth])
+        ok=False
+    except Exception:
+        ok=True
+    passed&=ok
+    print(type+' chains reject decimators: '+('OK' if ok else 'FAILED'))
+    return passed
+
+# Compare a bank of filters with filtering separately, per sample and per
+# block, with bandpass filters splitting the spectrum
+def filterbank(factory,type):
+    n,count=4096,16
+    input=np.random.uniform(-1,1,n)
+    taps=len(factory().GetCoefficients())
+    filters=[factory()]+[rtfir.RTFIR_bandpass(taps+k%2,0.5*k/count,0.5*(k+1)/count) for k in range(1,count)]
+    bank=rtfir.RTFIR_bank(filters)
+    single=rtfir.RTFIR_bank(filters)
+    start=time.perf_counter()
+    reference=np.array([f.FilterBlock(input) for f in filters])
+    separate=time.perf_counter()-start
+
+    # Filter with the banks per block and per sample
+    start=time.perf_counter()
+    block=bank.FilterBlock(input)
+    shared=time.perf_counter()-start
+    sample=np.array([single.Filter(x) for x in input]).T
+    error=max(np.max(np.abs(block-reference)),np.max(np.abs(sample-reference)))
+    passed=block.shape==(count,n) and error<1e-9 and bank.GetFilters()==count
+    print('%s in a bank of %d filters, %.1f ns per sample against %.1f ns separately, error %g: %s' % (type,count,1e9*shared/n,1e9*separate/n,error,'OK' if passed else 'FAILED'))
+
+    # Banks filter at one rate, so they refuse decimators
+    try:
+        rtfir.RTFIR_bank([factory(),rtfir.RTFIR_decimator(31,4)])
+        ok=False
+    except Exception:
+        ok=True
+    passed&=ok
+    print('%s banks reject decimators: %s' % (type,'OK' if ok else 'FAILED'))
+    return passed
+
+# Pickle filters part way through a signal and filter the rest sharded across
+# processes, which must match filtering in one process bit for bit. Plain,
+# multichannel, bank and staged chain filters are sharded from memory, and
+# plain filters from a memory mapped file as well.
+def filtershard(factory,type):
+    n=100000
+    input=np.random.uniform(-1,1,n)
+    frames=np.random.uniform(-1,1,(n,3))
+    stage=rtfir.RTFIR_lowpass(16,0.25)
+    stage.SetCoefficients(np.random.uniform(-1,1,16))
+    makers={'filter':(lambda: factory(),input),
+            'multichannel':(lambda: rtfir.RTFIR_multichannel(factory(),3),frames),
+            'bank':(lambda: rtfir.RTFIR_bank([factory(),rtfir.RTFIR_highpass(20,0.3)]),input),
+            'staged chain':(lambda: rtfir.RTFIR_chain([factory(),stage],rtfir.RTFIR_CHAIN_STAGED),input)}
+    path=os.path.join(tempfile.mkdtemp(),'input.npy')
+    np.save(path,input)
+    makers['memory mapped']=(lambda: factory(),np.load(path,mmap_mode='r'))
+
+    passed=True
+    for kind,(maker,data) in makers.items():
+        serial=maker()
+        serial.FilterBlock(data[:1000])
+        copy=pickle.loads(pickle.dumps(serial))
+        reference=serial.FilterBlock(data)
+        start=time.perf_counter()
+        output=rtfir.FilterSharded(copy,data,4,n//7)
+        elapsed=time.perf_counter()-start
+        ok=output.shape==reference.shape and np.array_equal(output,reference)
+        ok&=np.array_equal(np.asarray(copy.GetState()),np.asarray(serial.GetState()))
+        passed&=ok
+        print('%s as %s sharded in %.1f ms: %s' % (type,kind,1e3*elapsed,'OK' if ok else 'FAILED'))
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+    # Filters without state methods refuse pickling and sharding up front
+    unpicklable=[rtfir.RTFIR_decimator(31,4),rtfir.RTFIR_resampler(31,3,2),rtfir.RTFIR_interpolator(31,2),
+                 rtfir.RTFIR_moving_average(8),rtfir.RTFIR_cic(3,4),rtfir.RTFIR_float_lowpass(31,0.1),
+                 rtfir.RTFIR_q15_lowpass(31,0.1),rtfir.RTFIR_q31_lowpass(31,0.1)]
+    ok=True
+    for filter in unpicklable:
+        try:
+            pickle.dumps(filter)
+            ok=False
+        except TypeError as e:
+            ok&='can not be pickled' in str(e)
+        try:
+            rtfir.FilterSharded(filter,input,4,n//7)
+            ok=False
+        except ValueError:
+            pass
+    passed&=ok
+    print('%s unpicklable filters rejected by pickle and FilterSharded: %s' % (type,'OK' if ok else 'FAILED'))
+    return passed
+
+# Compare half-band and sparse filters with the same filters multiplying all
+# taps. Half-band lowpass and highpass filters with the taps of the filter, a
+# half-band decimator by two and the filter spread out by zeros must skip the
+# zeros, and pickling must keep the sparse form disabled.
+def filtersparse(factory,type):
+    n=65536
+    input=np.random.uniform(-1,1,n)
+    coeff=np.asarray(factory().GetCoefficients())
+    taps=len(coeff)|1
+    stuffed=np.zeros(3*len(coeff)-2)
+    stuffed[::3]=coeff
+    def spread():
+        filter=rtfir.RTFIR(len(stuffed))
+        filter.SetCoefficients(stuffed)
+        return filter
+    makers={'half-band lowpass':(lambda: rtfir.RTFIR_lowpass(taps,0.25),2),
+            'half-band highpass':(lambda: rtfir.RTFIR_highpass(taps,0.25),2),
+            'half-band decimator':(lambda: rtfir.RTFIR_decimator(taps,2),2),
+            'spread out':(spread,3)}
+
+    passed=True
+    for kind,(maker,stride) in makers.items():
+        sparse=maker()
+        dense=maker()
+        dense.SetSparse(False)
+        start=time.perf_counter()
+        output=sparse.FilterBlock(input)
+        elapsed=time.perf_counter()-start
+        start=time.perf_counter()
+        reference=dense.FilterBlock(input)
+        speedup=(time.perf_counter()-start)/elapsed
+        error=np.max(np.abs(output-reference))
+        ok=sparse.GetStride()==stride and dense.GetStride()==1 and sparse.GetCost()<dense.GetCost() and error<1e-12
+        if not isinstance(dense,rtfir.RTFIR_decimator):
+            ok&=pickle.loads(pickle.dumps(dense)).GetStride()==1
+        passed&=ok
+        print('%s %s: stride %d, cost %d against %d, %.2fx faster, error %g: %s' % (type,kind,sparse.GetStride(),sparse.GetCost(),dense.GetCost(),speedup,error,'OK' if ok else 'FAILED'))
+    return passed
+
+# Compare moving averages of the taps of the filter and of 4096 samples with
+# FIR filters of uniform coefficients, and a CIC decimator of full scale 32
+# bit samples with the integer convolution of its moving sums. Outputs must
+# match across blocks, and long runs of large values must not drift.
+def filteraverage(factory,type):
+    n=65536
+    input=np.random.uniform(-1,1,n)
+    passed=True
+    for length in (len(factory().GetCoefficients()),4096):
+        uniform=rtfir.RTFIR(length)
+        uniform.SetCoefficients(np.full(length,1.0/length))
+        start=time.perf_counter()
+        reference=uniform.FilterBlock(input)
+        fir=time.perf_counter()-start
+        for factor in (1,3):
+            average=rtfir.RTFIR_moving_average(length,factor)
+            start=time.perf_counter()
+            output=np.concatenate((average.FilterBlock(input[:n//3]),average.FilterBlock(input[n//3:])))
+            speedup=fir/(time.perf_counter()-start)
+            error=np.max(np.abs(output-reference[factor-1::factor]))
+            ok=len(output)==n//factor and error<1e-12
+            passed&=ok
+            print('%s moving average of %d samples decimated by %d: %.2fx faster, error %g: %s' % (type,length,factor,speedup,error,'OK' if ok else 'FAILED'))
+
+    # A long run of large values must not drift from the exact average, the
+    # fallback sums runs without compensation so allow a few ulps of 1e6
+    average=rtfir.RTFIR_moving_average(4096)
+    for r in range(64):
+        block=1e6+np.roll(input,r)
+        output=average.FilterBlock(block)
+    drift=abs(output[-1]-math.fsum(block[-4096:])/4096)
+    ok=drift<1e-8
+    passed&=ok
+    print('%s moving average after %d samples of 1e6 plus noise, error %g: %s' % (type,64*n,drift,'OK' if ok else 'FAILED'))
+
+    # CIC decimator against the integer convolution of its moving sums
+    stages,factor,delay=3,4,2
+    coeff=np.ones(1,dtype=np.int64)
+    for k in range(stages):
+        coeff=np.convolve(coeff,np.ones(factor*delay,dtype=np.int64))
+    samples=np.random.randint(-2**31,2**31,n,dtype=np.int64)
+    cic=rtfir.RTFIR_cic(stages,factor,delay)
+    output=np.concatenate((cic.FilterBlock(samples[:n//2]),cic.FilterBlock(samples[n//2:])))
+    expected=np.array([sum(int(c)*int(x) for c,x in zip(coeff,samples[i::-1])) for i in range(factor-1,n,factor)],dtype=np.int64)
+    ok=np.array_equal(output,expected) and cic.GetGain()==512
+    try:
+        rtfir.RTFIR_cic(5,1000)
+        ok=False
+    except Exception:
+        pass
+    passed&=ok
+    print('%s CIC filter with %d stages decimating by %d: %s' % (type,stages,factor,'OK' if ok else 'FAILED'))
+    return passed
+
+# Compare FFT filters with the direct form delayed by their latency. Short
+# filters must stay direct and long filters must choose FFT in automatic mode,
+# filtering in uneven blocks and single samples must give the direct output
+# delayed by GetLatency(), and chains and banks must reject FFT filters.
+def filterfft(factory,type):
+    passed=True
+    ok=all(not rtfir.RTFIR_fft(rtfir.RTFIR_lowpass(taps,0.1),blocksize).UsesFFT() for taps in (31,63,127,255) for blocksize in (0,256,4096))
+    ok&=all(rtfir.RTFIR_fft(rtfir.RTFIR_lowpass(taps,0.1),blocksize).UsesFFT() for taps in (2049,4097) for blocksize in (0,256,4096))
+    passed&=ok
+    print('%s automatic mode keeps up to 255 taps direct and uses FFT from 2049 taps: %s' % (type,'OK' if ok else 'FAILED'))
+
+    n=8192
+    input=np.random.uniform(-1,1,n)
+    direct=factory().FilterBlock(input)
+    for blocksize in (0,16):
+        fft=rtfir.RTFIR_fft(factory(),blocksize,False)
+        output=np.zeros(n)
+        done,step=0,1
+        while done<n:
+            length=min(step,n-done)
+            if length==1:
+                output[done]=fft.Filter(input[done])
+            else:
+                output[done:done+length]=fft.FilterBlock(input[done:done+length])
+            done+=length
+            step=step*3%211+1
+        latency=fft.GetLatency()
+        error=np.max(np.abs(output-np.concatenate((np.zeros(latency),direct[:n-latency]))))
+        ok=fft.UsesFFT() and latency==fft.GetBlockSize() and error<1e-9
+        passed&=ok
+        print('%s FFT with blocks of %d, latency %d, error %g: %s' % (type,fft.GetBlockSize(),latency,error,'OK' if ok else 'FAILED'))
+
+        # Pickled part way into a block, the copy must continue the output
+        split=n//2+5
+        fft=rtfir.RTFIR_fft(factory(),blocksize,False)
+        fft.FilterBlock(input[:split])
+        copy=pickle.loads(pickle.dumps(fft))
+        taps=len(fft.GetCoefficients())
+        ok=len(fft.GetState())==taps-1+latency+split%latency and np.array_equal(copy.GetState(),fft.GetState())
+        error=np.max(np.abs(copy.FilterBlock(input[split:])-fft.FilterBlock(input[split:])))
+        ok&=error<1e-9
+        passed&=ok
+        print('%s FFT with blocks of %d pickled after %d samples, error %g: %s' % (type,latency,split,error,'OK' if ok else 'FAILED'))
+
+    # Chains and banks run the direct form, so they refuse FFT filters
+    rejected=0
+    for maker in (rtfir.RTFIR_chain,rtfir.RTFIR_bank):
+        try:
+            maker([rtfir.RTFIR_fft(factory(),64,False),rtfir.RTFIR_lowpass(31,0.2)])
+        except Exception:
+            rejected+=1
+    ok=rejected==2
+    passed&=ok
+    print('%s chains and banks reject FFT filters: %s' % (type,'OK' if ok else 'FAILED'))
+    return passed
+
+# Compare resamplers with upsampling, filtering and downsampling. Each ratio is
+# resampled in uneven blocks, starting with an empty block, with a prototype of
+# the taps of the filter, and must match the prototype with the upsampling gain
+# run over the input with Up-1 zeros stuffed after each sample, keeping every
+# Down-th output. Ratios with Down of one use the interpolator.
+def filterresampler(factory,type):
+    n=2000
+    input=np.random.uniform(-1,1,n)
+    taps=len(factory().GetCoefficients())
+    passed=True
+    for up,down in ((3,1),(3,2),(2,3),(5,7),(1,4)):
+        resampler=rtfir.RTFIR_interpolator(taps,up) if down==1 else rtfir.RTFIR_resampler(taps,up,down)
+        ok=resampler.GetUp()==up and resampler.GetDown()==down
+        outputs=[]
+        done,step=0,0
+        while done<n:
+            length=min(step,n-done)
+            expected=resampler.GetOutputLength(length)
+            outputs.append(resampler.FilterBlock(input[done:done+length]))
+            ok&=len(outputs[-1])==expected
+            done+=length
+            step=step*3%97+1
+        output=np.concatenate(outputs)
+
+        # Filter the zero-stuffed input and keep every Down-th output
+        stuffed=np.zeros(n*up)
+        stuffed[::up]=input
+        prototype=np.asarray(rtfir.RTFIR_lowpass(taps,0.5/max(up,down)).GetCoefficients())
+        reference=np.convolve(stuffed,up*prototype)[:n*up:down]
+        ok&=len(output)==len(reference)
+        error=np.max(np.abs(output-reference)) if ok else float('inf')
+        ok&=error<1e-12
+        passed&=ok
+        print('%s resampling by %d/%d, %d outputs, max error %g: %s' % (type,up,down,len(output),error,'OK' if ok else 'FAILED'))
+    return passed
+
+# Compare decimators with lowpass filtering and downsampling. Each factor
+# decimates with an odd and an even number of taps, around the taps of the
+# filter, in uneven blocks with an empty block after each, and then a factor
+# of samples at a time, and must match the lowpass with the cutoff of the
+# decimator at the full rate, keeping every Factor-th output.
+def filterdecimator(factory,type):
+    n=4000
+    input=np.random.uniform(-1,1,n)
+    taps=len(factory().GetCoefficients())|1
+    passed=True
+    for factor in (2,10,32):
+        for length in (taps,taps+1):
+            decimator=rtfir.RTFIR_decimator(length,factor)
+            lowpass=rtfir.RTFIR_lowpass(length,0.5/factor)
+            reference=lowpass.FilterBlock(input)[factor-1::factor]
+            ok=decimator.GetFactor()==factor and np.array_equal(decimator.GetCoefficients(),lowpass.GetCoefficients())
+
+            # Decimate in uneven blocks, checking the predicted output lengths
+            outputs=[]
+            done,step=0,0
+            while done<n//2:
+                size=min(step,n//2-done)
+                expected=decimator.GetOutputLength(size)
+                outputs.append(decimator.FilterBlock(input[done:done+size]))
+                ok&=len(outputs[-1])==expected
+                done+=size
+                step=step*3%97+1
+                ok&=decimator.GetOutputLength(0)==0 and len(decimator.FilterBlock(input[done:done]))==0
+
+            # Then a factor of samples at a time
+            while done+factor<=n:
+                outputs.append(np.array([decimator.Filter(input[done:done+factor])]))
+                done+=factor
+            output=np.concatenate(outputs)
+            ok&=len(output)==done//factor
+            error=np.max(np.abs(output-reference[:len(output)])) if ok else float('inf')
+            ok&=error<1e-12
+            passed&=ok
+            print('%s decimating by %d with %d taps, %d outputs, max error %g: %s' % (type,factor,length,len(output),error,'OK' if ok else 'FAILED'))
+    return passed
+
+# Compare multichannel filters with one filter per channel, below, at and above
+# the four channels accumulated at a time, frame by frame at the start and then
+# in uneven blocks of frames
+def filtermultichannel(factory,type):
+    n=2048
+    passed=True
+    for channels in (1,3,4,7):
+        frames=np.random.uniform(-1,1,(n,channels))
+        multi=rtfir.RTFIR_multichannel(factory(),channels)
+        ok=multi.GetChannels()==channels and np.array_equal(multi.GetCoefficients(),factory().GetCoefficients())
+        outputs=[np.array([multi.Filter(frame) for frame in frames[:7]])]
+        done,step=7,1
+        while done<n:
+            size=min(step,n-done)
+            outputs.append(multi.FilterBlock(frames[done:done+size]))
+            done+=size
+            step=step*3%97+1
+        output=np.concatenate(outputs)
+        reference=np.array([factory().FilterBlock(frames[:,k]) for k in range(channels)]).T
+        error=np.max(np.abs(output-reference)) if output.shape==reference.shape else float('inf')
+        ok&=error<1e-12
+        passed&=ok
+        print('%s with %d channels, max error %g: %s' % (type,channels,error,'OK' if ok else 'FAILED'))
+    return passed
+
+# Run rtfirfilter.py over files and pipes in small chunks, which must match a
+# single FilterBlock over the whole recording: npy and f32 files, raw and npy
+# through stdin and stdout, a pipe written to npy so the header is rewritten
+# at the end, interleaved and 2-D multichannel input, and a file sharded
+# across processes. Options holds the filter on the command line.
+def filtertool(factory,type,options):
+    n=10000
+    input=np.random.uniform(-1,1,n)
+    frames=np.random.uniform(-1,1,(n,3))
+    single=factory().FilterBlock(input)
+    multi=rtfir.RTFIR_multichannel(factory(),3).FilterBlock(frames)
+    folder=tempfile.mkdtemp()
+    tool=os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','rtfirfilter.py')
+    env=dict(os.environ,PYTHONPATH=os.path.dirname(os.path.abspath(rtfir.__file__)))
+    path=lambda name: os.path.join(folder,name)
+    np.save(path('input.npy'),input)
+    np.save(path('frames.npy'),frames)
+    input.astype(np.float32).tofile(path('input.f32'))
+    frames.tofile(path('frames.f64'))
+    cases=[('npy file',[path('input.npy'),path('output.npy')],None,single),
+           ('f32 file',[path('input.f32'),path('output.f32')],None,factory().FilterBlock(input.astype(np.float32)).astype(np.float32)),
+           ('raw pipe',['--format','f64','-','-'],input.tobytes(),single),
+           ('npy pipe',['--output-format','npy','-','-'],open(path('input.npy'),'rb').read(),single),
+           ('raw pipe to npy',['--format','f64','-',path('output.npy')],input.tobytes(),single),
+           ('interleaved channels',['--channels','3',path('frames.f64'),path('output.f64')],None,multi.ravel()),
+           ('npy channels',[path('frames.npy'),path('output.npy')],None,multi),
+           ('processes',['--processes','3',path('input.npy'),path('output.npy')],None,single)]
+    passed=True
+    for kind,args,data,reference in cases:
+        run=subprocess.run([sys.executable,tool,'--samplerate',repr(fs),'--chunk','777']+options+args,input=data,stdout=subprocess.PIPE,stderr=subprocess.PIPE,env=env,cwd=folder)
+        result=args[-1]
+        if result=='-':
+            stream=run.stdout
+            output=np.load(io.BytesIO(stream)) if stream[:6]==b'\x93NUMPY' else np.frombuffer(stream,dtype=np.float64)
+        elif result.endswith('.npy'):
+            output=np.load(result)
+        else:
+            output=np.fromfile(result,dtype=reference.dtype)
+        ok=run.returncode==0 and output.shape==reference.shape and np.array_equal(output,reference)
+        passed&=ok
+        print('%s through rtfirfilter.py as %s: %s' % (type,kind,'OK' if ok else 'FAILED'))
+    for file in os.listdir(folder):
+        os.remove(path(file))
+    os.rmdir(folder)
+    return passed
+
+# Check the frequency response of a filter against its specification, the
+# Kaiser formula is an estimate so the attenuation may fall short by 1dB
+def filterspec(filter,type,spec):
+    if not spec:
+        print(type+': no specification to check')
+        return
+    fpass,fstop,attenuation=spec
+    coeff=np.asarray(filter.GetCoefficients())
+    f=np.linspace(0,0.5,4097)
+    gain=np.abs(np.exp(-2j*np.pi*np.outer(f,np.arange(len(coeff))))@coeff)
+    stopband=f>=fstop if fpass<fstop else f<=fstop
+    passband=f<=fpass if fpass<fstop else f>=fpass
+    measured=-20*np.log10(np.max(gain[stopband]))
+    ripple=20*np.log10(np.max(gain[passband])/np.min(gain[passband]))
+    passed=measured>=attenuation-1
+    print('%s: %d taps, stopband %.1fdB (specified %.1fdB), passband ripple %.4fdB: %s' % (type,len(coeff),measured,attenuation,ripple,'OK' if passed else 'FAILED'))
+
 # Call subprocess and concatenate stdout
 def call(caller,parameters):
     cmd=[caller]
@@ -85,6 +780,31 @@ def helpmsg(caller):
     print('Options:')
     print('\t--samplerate HZ\t\tSet sampling frequency in hertz')
     print('\t--performance\t\tTest performance by filtering a large dataset')
+    print('\t--block\t\t\tUse block filtering for performance tests')
+    print('\t--batch\t\t\tFilter independent streams on a thread pool')
+    print('\t--spec\t\t\tCheck the response of Kaiser filters against the specification')
+    print('\t--benchmark\t\tMeasure throughput for the benchmark harness')
+    print('\t--blocksize N\t\tSamples per block for benchmarks, zero for per sample')
+    print('\t--samples N\t\tSamples per benchmark repeat')
+    print('\t--warmup N\t\tUntimed benchmark repeats')
+    print('\t--repeats N\t\tTimed benchmark repeats')
+    print('\t--latency\t\tMeasure the latency of each filtered sample')
+    print('\t--deadline US\t\tFail latency tests if any sample takes longer')
+    print('\t--cpu N\t\t\tPin the process to a CPU')
+    print('\t--mlock\t\t\tLock the process memory')
+    print('\t--stats\t\t\tCheck the statistics counted by filters')
+    print('\t--retune\t\tRetune filters in place, with and without a crossfade')
+    print('\t--chain\t\t\tCompare fused and staged chains of filters')
+    print('\t--bank\t\t\tCompare a bank of filters with separate filters')
+    print('\t--shard\t\t\tPickle filters and shard filtering across processes')
+    print('\t--sparse\t\tCompare half-band and sparse filters with dense filters')
+    print('\t--average\t\tCompare moving averages and CIC filters with FIR filters')
+    print('\t--fft\t\t\tCompare FFT filters with the delayed direct form')
+    print('\t--resampler\t\tCompare resamplers with zero stuffing, filtering and decimation')
+    print('\t--decimator\t\tCompare decimators with lowpass filtering and downsampling')
+    print('\t--multichannel\t\tCompare multichannel filters with one filter per channel')
+    print('\t--tool\t\t\tCompare rtfirfilter.py on files and pipes with filtering at once')
+    print('\t--stream\t\tCheck streaming with generators and asyncio, rechunked to --blocksize')
     print('\t--file PATH\t\tFilter data from file');
     print('\t--stdin\t\t\tFilter data from stdin to stdout')
     print('\t--coeff\t\t\tDump filter coefficients')
@@ -94,6 +814,8 @@ def helpmsg(caller):
     print('\t--highpass TAPS F0\tTest highpass filter')
     print('\t--bandpass TAPS F1 F2\tTest bandpass filter')
     print('\t--bandstop TAPS F1 F2\tTest bandstop filter')
+    print('\t--kaiser-lowpass FP FS DB\tTest shortest Kaiser lowpass filter meeting a specification')
+    print('\t--kaiser-highpass FP FS DB\tTest shortest Kaiser highpass filter meeting a specification')
     print('')
     exit()
 
@@ -101,6 +823,14 @@ def helpmsg(caller):
 # Set samplerate and mode
 filename=''
 mode=0
+block=False
+blocksize=0
+samples=100000
+warmup=1
+repeats=5
+deadline=0
+cpu=-1
+lock=False
 fs=250.0
 i=1
 while i<len(sys.argv):
@@ -117,12 +847,70 @@ while i<len(sys.argv):
         mode=MODE_COEFF
     elif sys.argv[i]=='--performance':
         mode=MODE_PERF
+    elif sys.argv[i]=='--block':
+        block=True
+    elif sys.argv[i]=='--batch':
+        mode=MODE_BATCH
+    elif sys.argv[i]=='--spec':
+        mode=MODE_SPEC
+    elif sys.argv[i]=='--benchmark':
+        mode=MODE_BENCHMARK
+    elif sys.argv[i]=='--blocksize':
+        i+=1
+        blocksize=int(sys.argv[i])
+    elif sys.argv[i]=='--samples':
+        i+=1
+        samples=int(sys.argv[i])
+    elif sys.argv[i]=='--warmup':
+        i+=1
+        warmup=int(sys.argv[i])
+    elif sys.argv[i]=='--repeats':
+        i+=1
+        repeats=int(sys.argv[i])
+    elif sys.argv[i]=='--latency':
+        mode=MODE_LATENCY
+    elif sys.argv[i]=='--deadline':
+        i+=1
+        deadline=int(float(sys.argv[i])*1000)
+    elif sys.argv[i]=='--cpu':
+        i+=1
+        cpu=int(sys.argv[i])
+    elif sys.argv[i]=='--mlock':
+        lock=True
+    elif sys.argv[i]=='--stats':
+        mode=MODE_STATS
+    elif sys.argv[i]=='--stream':
+        mode=MODE_STREAM
+    elif sys.argv[i]=='--retune':
+        mode=MODE_RETUNE
+    elif sys.argv[i]=='--chain':
+        mode=MODE_CHAIN
+    elif sys.argv[i]=='--bank':
+        mode=MODE_BANK
+    elif sys.argv[i]=='--shard':
+        mode=MODE_SHARD
+    elif sys.argv[i]=='--sparse':
+        mode=MODE_SPARSE
+    elif sys.argv[i]=='--average':
+        mode=MODE_AVERAGE
+    elif sys.argv[i]=='--fft':
+        mode=MODE_FFT
+    elif sys.argv[i]=='--resampler':
+        mode=MODE_RESAMPLER
+    elif sys.argv[i]=='--decimator':
+        mode=MODE_DECIMATOR
+    elif sys.argv[i]=='--multichannel':
+        mode=MODE_MULTICHANNEL
+    elif sys.argv[i]=='--tool':
+        mode=MODE_TOOL
     elif sys.argv[i]=='--help':
         helpmsg(sys.argv[0])
     i+=1
 if len(sys.argv)==1:
     helpmsg(sys.argv[0])
 
+realtime(cpu,lock)
+
 # Open input file
 fd=sys.stdin
 if len(filename):
@@ -130,9 +918,12 @@ if len(filename):
 
 # Execute filter options
 i=1
+passed=True
 name=''
 filter=None
+spec=None
 while i<len(sys.argv):
+    start=i
     if sys.argv[i]=='--samplerate':
         i+=1
     elif sys.argv[i]=='--file':
@@ -143,20 +934,38 @@ while i<len(sys.argv):
         pass
     elif sys.argv[i]=='--performance':
         pass
+    elif sys.argv[i]=='--block':
+        pass
+    elif sys.argv[i]=='--batch':
+        pass
+    elif sys.argv[i]=='--spec':
+        pass
+    elif sys.argv[i]=='--benchmark':
+        pass
+    elif sys.argv[i] in ('--blocksize','--samples','--warmup','--repeats','--deadline','--cpu'):
+        i+=1
+    elif sys.argv[i] in ('--latency','--mlock','--stats','--stream','--retune','--chain','--bank','--shard','--sparse','--average','--fft','--resampler','--decimator','--multichannel','--tool'):
+        pass
     elif sys.argv[i]=='--lowpass':
         name=sys.argv[i][2:]
         i+=1
         taps=int(sys.argv[i])
         i+=1
         f0=float(sys.argv[i])
-        filter=rtfir.RTFIR_lowpass(taps,f0/fs)
+        spec=None
+        frequencies=(f0/fs,0)
+        factory=lambda: rtfir.RTFIR_lowpass(taps,f0/fs)
+        filter=factory()
     elif sys.argv[i]=='--highpass':
         name=sys.argv[i][2:]
         i+=1
         taps=int(sys.argv[i])
         i+=1
         f0=float(sys.argv[i])
-        filter=rtfir.RTFIR_highpass(taps,f0/fs)
+        spec=None
+        frequencies=(f0/fs,0)
+        factory=lambda: rtfir.RTFIR_highpass(taps,f0/fs)
+        filter=factory()
     elif sys.argv[i]=='--bandpass':
         name=sys.argv[i][2:]
         i+=1
@@ -165,7 +974,10 @@ while i<len(sys.argv):
         f1=float(sys.argv[i])
         i+=1
         f2=float(sys.argv[i])
-        filter=rtfir.RTFIR_bandpass(taps,f1/fs,f2/fs)
+        spec=None
+        frequencies=(f1/fs,f2/fs)
+        factory=lambda: rtfir.RTFIR_bandpass(taps,f1/fs,f2/fs)
+        filter=factory()
     elif sys.argv[i]=='--bandstop':
         name=sys.argv[i][2:]
         i+=1
@@ -174,7 +986,25 @@ while i<len(sys.argv):
         f1=float(sys.argv[i])
         i+=1
         f2=float(sys.argv[i])
-        filter=rtfir.RTFIR_bandstop(taps,f1/fs,f2/fs)
+        spec=None
+        frequencies=(f1/fs,f2/fs)
+        factory=lambda: rtfir.RTFIR_bandstop(taps,f1/fs,f2/fs)
+        filter=factory()
+    elif sys.argv[i] in ('--kaiser-lowpass','--kaiser-highpass'):
+        name=sys.argv[i][2:]
+        i+=1
+        fp=float(sys.argv[i])
+        i+=1
+        fst=float(sys.argv[i])
+        i+=1
+        db=float(sys.argv[i])
+        spec=(fp/fs,fst/fs,db)
+        frequencies=((fp+fst)/2/fs,0)
+        if name=='kaiser-lowpass':
+            factory=lambda: rtfir.RTFIR_kaiser_lowpass(fp/fs,fst/fs,db)
+        else:
+            factory=lambda: rtfir.RTFIR_kaiser_highpass(fp/fs,fst/fs,db)
+        filter=factory()
     else:
         print('Invalid parameter: '+sys.argv[i])
         exit()
@@ -182,11 +1012,29 @@ while i<len(sys.argv):
     if filter:
         if mode==MODE_STDIN:    filterfile(filter,sys.stdin)
         if mode==MODE_FILE:     filterfile(filter,fd)
-        if mode==MODE_PERF:     filterperf(filter,name)
+        if mode==MODE_PERF:     filterperf(filter,name,block)
+        if mode==MODE_BATCH:    passed&=filterbatch(factory,name)
+        if mode==MODE_SPEC:     filterspec(filter,name,spec)
+        if mode==MODE_BENCHMARK:filterbenchmark(filter,name,blocksize,samples,warmup,repeats)
+        if mode==MODE_LATENCY:  passed&=filterlatency(filter,name,samples,deadline)
+        if mode==MODE_STATS:    passed&=filterstats(filter,name)
+        if mode==MODE_STREAM:   passed&=filterstream(factory,name,blocksize)
+        if mode==MODE_RETUNE:   passed&=filterretune(factory,name,*frequencies)
+        if mode==MODE_CHAIN:    passed&=filterchain(factory,name)
+        if mode==MODE_BANK:     passed&=filterbank(factory,name)
+        if mode==MODE_SHARD:    passed&=filtershard(factory,name)
+        if mode==MODE_SPARSE:   passed&=filtersparse(factory,name)
+        if mode==MODE_AVERAGE:  passed&=filteraverage(factory,name)
+        if mode==MODE_FFT:      passed&=filterfft(factory,name)
+        if mode==MODE_RESAMPLER: passed&=filterresampler(factory,name)
+        if mode==MODE_DECIMATOR: passed&=filterdecimator(factory,name)
+        if mode==MODE_MULTICHANNEL: passed&=filtermultichannel(factory,name)
+        if mode==MODE_TOOL:     passed&=filtertool(factory,name,sys.argv[start:i+1])
         if mode==MODE_COEFF:
             coeff=filter.GetCoefficients()
             for c in coeff:
                 print(str(c))
         filter=None
     i+=1
-
+if not passed:
+    exit(1)
@@ -36,14 +36,18 @@ def fft(unfiltered,filtered,fs,maxf):
     return unfilteredf,filteredf,xf
 
 
-# Performance test filters in c,c++ and python
+# Mean samples/second of a benchmark line from a test program
+def benchmark(caller,fs,taps):
+    result=call(caller,'--samplerate '+str(fs)+' --benchmark --lowpass '+str(taps)+' 10')
+    rates=[float(r) for r in result.split()[4:]]
+    return sum(rates)/len(rates)
+
+
+# Performance test filters in c,c++ and python, see benchmark.py for more
 def performance(fs,taps):
-    result=call('./pytest.py','--samplerate '+str(fs)+' --performance --lowpass '+str(taps)+' 10')
-    p=1000000/float(result[result.find(' in ')+4:result.find(' seconds')])
-    result=call('./cpptest','--samplerate '+str(fs)+' --performance --lowpass '+str(taps)+' 10')
-    cpp=1000000/float(result[result.find(' in ')+4:result.find(' seconds')])
-    result=call('./ctest','--samplerate '+str(fs)+' --performance --lowpass '+str(taps)+' 10')
-    c=1000000/float(result[result.find(' in ')+4:result.find(' seconds')])
+    p=benchmark('./pytest.py',fs,taps)
+    cpp=benchmark('./cpptest',fs,taps)
+    c=benchmark('./ctest',fs,taps)
     print('taps:'+str(taps)+'\tc:'+str(c)+'sps c++:'+str(cpp)+'sps python: '+str(p)+'sps')
     return c,cpp,p
 